@@ -252,7 +252,8 @@ def is_retriable_error(exc: BaseException) -> bool:
     - HTTP 429 (rate limit)
     - HTTP 503 (service unavailable)
     - HTTP 5xx (server errors)
-    - ProviderError with retriable=True
+    - ProviderError with retriable=True, except a concurrency limit timeout
+      (that falls back to another provider instead of waiting again)
 
     Args:
         exc: The exception to check
@@ -262,6 +263,10 @@ def is_retriable_error(exc: BaseException) -> bool:
     """
     # Check ProviderError types
     if isinstance(exc, ProviderError):
+        from app.adapters.concurrency_limiter import ConcurrencyLimitError
+
+        if isinstance(exc, ConcurrencyLimitError):
+            return False
         if exc.retriable:
             return True
         # Also retry on specific status codes
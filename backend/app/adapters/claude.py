@@ -1,10 +1,12 @@
 """Claude adapter with OAuth via Claude SDK (zero API cost)."""
 
 import asyncio
+import json
 import logging
 import shutil
 from collections.abc import AsyncIterator, Awaitable, Callable
-from typing import Any, ClassVar, Literal, cast
+from contextlib import asynccontextmanager
+from typing import Any, ClassVar, cast
 
 from app.adapters.base import (
     CompletionResult,
@@ -13,6 +15,15 @@ from app.adapters.base import (
     ProviderError,
     StreamEvent,
 )
+from app.adapters.claude_pool import (
+    PoolExhaustedError,
+    ToolHook,
+    WorkerSpec,
+    build_client_options,
+    get_claude_pool,
+)
+from app.adapters.concurrency_limiter import get_concurrency_limiter
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -102,6 +113,38 @@ class ClaudeAdapter(ProviderAdapter):
         """Return current authentication mode."""
         return "oauth"
 
+    @asynccontextmanager
+    async def _checkout_client(
+        self,
+        spec: WorkerSpec,
+        pre_tool_hook: ToolHook | None = None,
+        post_tool_hook: ToolHook | None = None,
+    ) -> AsyncIterator[Any]:
+        """Yield a connected SDK client for one request.
+
+        Uses a warm worker from the shared pool when claude_pool_enabled,
+        otherwise spawns a dedicated CLI process for the request.
+
+        Raises:
+            ProviderError: Pool exhausted (retriable).
+        """
+        if not settings.claude_pool_enabled:
+            from claude_agent_sdk import ClaudeSDKClient
+
+            options = build_client_options(spec, self._cli_path, pre_tool_hook, post_tool_hook)
+            async with ClaudeSDKClient(options=options) as client:
+                yield client
+            return
+
+        pool = get_claude_pool(self._cli_path)
+        try:
+            async with pool.checkout(spec) as worker:
+                worker.pre_tool_hook = pre_tool_hook
+                worker.post_tool_hook = post_tool_hook
+                yield worker.client
+        except PoolExhaustedError as e:
+            raise ProviderError(str(e), provider=self.provider_name, retriable=True) from e
+
     async def complete(
         self,
         messages: list[Message],
@@ -139,8 +182,12 @@ class ClaudeAdapter(ProviderAdapter):
             reraise=True,
         )
 
-        _complete_with_retry = retry_decorator(self._complete_oauth)
-        result: CompletionResult = await _complete_with_retry(messages, model, **kwargs)
+        async def _attempt() -> CompletionResult:
+            # One concurrency slot per attempt, released during retry backoff
+            async with get_concurrency_limiter().slot(self.provider_name, model):
+                return await self._complete_oauth(messages, model, **kwargs)
+
+        result: CompletionResult = await retry_decorator(_attempt)()
         return result
 
     def _extract_json_from_response(self, content: str) -> str:
@@ -213,10 +260,8 @@ class ClaudeAdapter(ProviderAdapter):
         For structured output (JSON mode), uses native SDK output_format parameter
         which enforces JSON schema validation via StructuredOutput tool.
         """
-        import json
         import time
 
-        from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
         from claude_agent_sdk.types import AssistantMessage, TextBlock
 
         start_time = time.time()
@@ -250,34 +295,29 @@ class ClaudeAdapter(ProviderAdapter):
         # Extended thinking support via OAuth
         thinking_budget = _get_claude_thinking_budget(kwargs.get("thinking_level"))
 
-        # Build SDK options
-        sdk_options: dict[str, Any] = {
-            "cwd": kwargs.get("working_dir", "."),
-            "permission_mode": "bypassPermissions",  # For simple queries
-            "cli_path": self._cli_path,
-            "model": sdk_model,
-            "max_thinking_tokens": thinking_budget,  # Extended thinking via OAuth
-        }
-
-        # Native structured output via SDK output_format (preferred approach)
-        # SDK uses StructuredOutput tool internally for schema validation
+        # Worker spec (SDK options); structured output uses native SDK output_format,
+        # enforced via the StructuredOutput tool, and needs an extra turn for it
+        output_format: str | None = None
         if json_mode and json_schema:
-            sdk_options["output_format"] = {
-                "type": "json_schema",
-                "schema": json_schema,
-            }
-            # Structured output requires extra turn for tool response
-            sdk_options["max_turns"] = 2
+            output_format = json.dumps(
+                {"type": "json_schema", "schema": json_schema}, sort_keys=True
+            )
             logger.info("OAuth: Structured output enabled via native SDK output_format")
 
-        options = ClaudeAgentOptions(**sdk_options)
+        spec = WorkerSpec(
+            model=sdk_model,
+            cwd=kwargs.get("working_dir", "."),
+            permission_mode="bypassPermissions",  # For simple queries
+            max_thinking_tokens=thinking_budget,  # Extended thinking via OAuth
+            output_format=output_format,
+            max_turns=2 if output_format else None,
+        )
 
         content_parts = []
         thinking_parts = []
         structured_output: dict[str, Any] | None = None
         try:
-            client = ClaudeSDKClient(options=options)
-            async with client:
+            async with self._checkout_client(spec) as client:
                 # Application-level timeout for OAuth (120s based on profiling)
                 await asyncio.wait_for(client.query(full_prompt), timeout=120.0)
 
@@ -415,8 +455,10 @@ class ClaudeAdapter(ProviderAdapter):
         """
         Stream completion from Claude via OAuth.
         """
-        async for event in self._stream_oauth(messages, model, **kwargs):
-            yield event
+        limiter = get_concurrency_limiter()
+        async with limiter.slot(self.provider_name, model, track_latency=False):
+            async for event in self._stream_oauth(messages, model, **kwargs):
+                yield event
 
     async def _stream_oauth(
         self,
@@ -425,7 +467,6 @@ class ClaudeAdapter(ProviderAdapter):
         **kwargs: Any,
     ) -> AsyncIterator[StreamEvent]:
         """Stream using OAuth via Claude Agent SDK."""
-        from claude_agent_sdk import ClaudeAgentOptions, query
         from claude_agent_sdk.types import AssistantMessage, TextBlock
 
         # Map model to SDK short name
@@ -447,28 +488,25 @@ class ClaudeAdapter(ProviderAdapter):
 
         full_prompt = "\n".join(system_parts + prompt_parts)
 
-        options = ClaudeAgentOptions(
+        spec = WorkerSpec(
+            model=sdk_model,
             cwd=kwargs.get("working_dir", "."),
             permission_mode="bypassPermissions",
-            cli_path=self._cli_path,
-            model=sdk_model,
         )
 
         total_content = ""
         try:
-            # Application-level timeout for streaming (120s)
-            async def _stream_with_timeout() -> AsyncIterator[StreamEvent]:
-                nonlocal total_content
-                async for message in query(prompt=full_prompt, options=options):
+            # Worker stays checked out until the stream is drained or abandoned;
+            # an abandoned stream retires the worker mid-response
+            async with self._checkout_client(spec) as client:
+                await asyncio.wait_for(client.query(full_prompt), timeout=120.0)
+                async for message in client.receive_response():
                     if isinstance(message, AssistantMessage):
                         for block in message.content:
                             if isinstance(block, TextBlock):
                                 total_content += block.text
                                 yield StreamEvent(type="content", content=block.text)
 
-            async for event in _stream_with_timeout():
-                yield event
-
             yield StreamEvent(
                 type="done",
                 input_tokens=0,
@@ -511,7 +549,6 @@ class ClaudeAdapter(ProviderAdapter):
             session_id is populated from init and included with each yield.
         """
 
-        from claude_agent_sdk import ClaudeAgentOptions, HookMatcher, query
         from claude_agent_sdk.types import (
             AsyncHookJSONOutput,
             HookContext,
@@ -639,34 +676,12 @@ class ClaudeAdapter(ProviderAdapter):
 
             return cast(AsyncHookJSONOutput, {})
 
-        # Build hooks
-        hooks: dict[str, list[HookMatcher]] = {"PreToolUse": [HookMatcher(hooks=[permission_hook])]}
-        if after_tool_callback:
-            hooks["PostToolUse"] = [HookMatcher(hooks=[post_tool_hook])]
-
         # Map model to SDK name
         sdk_model = self.MODEL_MAP.get(model, model)
 
-        hooks_typed = cast(
-            dict[
-                Literal[
-                    "PreToolUse",
-                    "PostToolUse",
-                    "UserPromptSubmit",
-                    "Stop",
-                    "SubagentStop",
-                    "PreCompact",
-                ],
-                list[HookMatcher],
-            ],
-            hooks,
-        )
-        options = ClaudeAgentOptions(
-            cwd=working_dir or ".",
-            cli_path=self._cli_path,
-            model=sdk_model,
-            hooks=hooks_typed,
-        )
+        # Hooks are installed as trampolines at spawn time, so pooled workers can
+        # run this request's permission and observation hooks
+        spec = WorkerSpec(model=sdk_model, cwd=working_dir or ".", tool_hooks=True)
 
         # Build prompt from messages
         system_parts: list[str] = []
@@ -684,18 +699,24 @@ class ClaudeAdapter(ProviderAdapter):
 
         session_id: str | None = None
         try:
-            async for message in query(prompt=full_prompt, options=options):
-                # Capture session ID from init
-                if (
-                    hasattr(message, "subtype")
-                    and message.subtype == "init"
-                    and hasattr(message, "data")
-                ):
-                    session_id = message.data.get("session_id")
-                    if session_id:
-                        logger.info(f"Claude SDK session ID: {session_id}")
-
-                yield (message, session_id)
+            async with self._checkout_client(
+                spec,
+                pre_tool_hook=permission_hook,
+                post_tool_hook=post_tool_hook if after_tool_callback else None,
+            ) as client:
+                await client.query(full_prompt)
+                async for message in client.receive_response():
+                    # Capture session ID from init
+                    if (
+                        hasattr(message, "subtype")
+                        and message.subtype == "init"
+                        and hasattr(message, "data")
+                    ):
+                        session_id = message.data.get("session_id")
+                        if session_id:
+                            logger.info(f"Claude SDK session ID: {session_id}")
+
+                    yield (message, session_id)
 
         except Exception as e:
             logger.error(f"Claude tool error: {e}")
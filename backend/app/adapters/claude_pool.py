@@ -0,0 +1,548 @@
+"""Warm pool of pre-spawned Claude CLI workers.
+
+Every ClaudeSDKClient connection spawns and boots a Claude CLI subprocess, which
+often costs more than the model call itself for short one-shot requests. The pool
+keeps connected clients warm per worker spec (model + CLI options) so requests
+check out a ready worker instead of paying process startup.
+
+Workers are:
+- Sized per model (max_workers_per_model live processes, spawning included);
+  with overflow enabled, requests beyond the cap get a one-shot worker that is
+  retired after the request instead of waiting for a pooled one
+- Replenished in the background up to min_idle per spec
+- Recycled after max_requests_per_worker requests or idle_timeout seconds idle
+- Retired immediately on any error or when found dead during checkout
+
+Each worker's client is connected and disconnected by a dedicated owner task,
+because the SDK requires connect/disconnect to run in the same async context.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from collections import Counter, deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Prompt used to drop conversation state before a worker is reused
+RESET_PROMPT = "/clear"
+
+# Seconds to wait for a recycled worker to acknowledge RESET_PROMPT
+RESET_TIMEOUT = 10.0
+
+# Hook signature used by the SDK (input_data, tool_use_id, context) -> output
+ToolHook = Callable[[Any, str | None, Any], Awaitable[Any]]
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no worker becomes available within the acquire timeout."""
+
+
+@dataclass(frozen=True)
+class WorkerSpec:
+    """CLI options a worker is spawned with.
+
+    Options are fixed at connect time, so workers are only shared between
+    requests with an identical spec.
+    """
+
+    model: str
+    cwd: str = "."
+    permission_mode: str | None = None
+    max_thinking_tokens: int | None = None
+    output_format: str | None = None  # JSON-encoded SDK output_format
+    max_turns: int | None = None
+    tool_hooks: bool = False  # Install PreToolUse/PostToolUse trampolines
+
+
+@dataclass
+class PoolMetrics:
+    """Cumulative pool counters."""
+
+    spawned: int = 0
+    spawn_failures: int = 0
+    retired: int = 0
+    recycled: int = 0
+    unhealthy: int = 0
+    idle_expired: int = 0
+    warm_checkouts: int = 0
+    cold_checkouts: int = 0
+    overflow_checkouts: int = 0  # One-shot workers spawned beyond the cap
+    exhausted: int = 0
+
+
+@dataclass(eq=False)
+class ClaudeWorker:
+    """A connected Claude CLI client owned by the pool."""
+
+    spec: WorkerSpec
+    client: Any = None
+    requests_served: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    healthy: bool = True
+    one_shot: bool = False  # Overflow worker, retired after its request
+    # Per-checkout tool hooks, called through the trampolines installed at spawn
+    pre_tool_hook: ToolHook | None = None
+    post_tool_hook: ToolHook | None = None
+    _owner: asyncio.Task[None] | None = field(default=None, repr=False)
+    _retire_event: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def is_alive(self) -> bool:
+        """Check the worker can still serve requests."""
+        return (
+            self.healthy
+            and self._owner is not None
+            and not self._owner.done()
+            and not self._retire_event.is_set()
+        )
+
+
+ClientFactory = Callable[[ClaudeWorker], Any]
+
+
+def build_client_options(
+    spec: WorkerSpec,
+    cli_path: str | None,
+    pre_tool_hook: ToolHook | None = None,
+    post_tool_hook: ToolHook | None = None,
+) -> Any:
+    """Build ClaudeAgentOptions for a worker spec."""
+    from claude_agent_sdk import ClaudeAgentOptions, HookMatcher
+
+    sdk_options: dict[str, Any] = {
+        "cwd": spec.cwd,
+        "cli_path": cli_path,
+        "model": spec.model,
+    }
+    if spec.permission_mode is not None:
+        sdk_options["permission_mode"] = spec.permission_mode
+    if spec.max_thinking_tokens is not None:
+        sdk_options["max_thinking_tokens"] = spec.max_thinking_tokens
+    if spec.output_format is not None:
+        sdk_options["output_format"] = json.loads(spec.output_format)
+    if spec.max_turns is not None:
+        sdk_options["max_turns"] = spec.max_turns
+    if spec.tool_hooks:
+        hooks: dict[str, list[Any]] = {}
+        if pre_tool_hook:
+            hooks["PreToolUse"] = [HookMatcher(hooks=[pre_tool_hook])]
+        if post_tool_hook:
+            hooks["PostToolUse"] = [HookMatcher(hooks=[post_tool_hook])]
+        sdk_options["hooks"] = hooks
+    return ClaudeAgentOptions(**sdk_options)
+
+
+class ClaudeWorkerPool:
+    """Pool of warm Claude CLI workers keyed by WorkerSpec."""
+
+    def __init__(
+        self,
+        cli_path: str | None,
+        *,
+        max_workers_per_model: int = 4,
+        min_idle: int = 1,
+        max_requests_per_worker: int = 1,
+        idle_timeout: float = 300.0,
+        acquire_timeout: float = 30.0,
+        connect_timeout: float = 60.0,
+        overflow: bool = False,
+        client_factory: ClientFactory | None = None,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            cli_path: Path to the Claude CLI binary.
+            max_workers_per_model: Max live workers per model across all specs.
+            min_idle: Idle workers to keep pre-spawned per spec once it is used.
+            max_requests_per_worker: Requests served before a worker is retired.
+                Values above 1 reuse the process after sending RESET_PROMPT.
+            idle_timeout: Seconds an idle worker lives before being retired.
+            acquire_timeout: Seconds to wait for a worker before PoolExhaustedError.
+            connect_timeout: Seconds to wait for a new worker to connect.
+            overflow: At capacity, spawn a one-shot worker beyond the cap
+                instead of waiting (acquire_timeout then never applies).
+            client_factory: Builds an unconnected client for a worker.
+                Defaults to ClaudeSDKClient with options from the worker spec.
+        """
+        self._cli_path = cli_path
+        self._max_workers_per_model = max_workers_per_model
+        self._min_idle = min_idle
+        self._max_requests_per_worker = max_requests_per_worker
+        self._idle_timeout = idle_timeout
+        self._acquire_timeout = acquire_timeout
+        self._connect_timeout = connect_timeout
+        self._overflow = overflow
+        self._client_factory = client_factory or self._default_client_factory
+
+        self.loop = asyncio.get_running_loop()
+        self.metrics = PoolMetrics()
+        self._idle: dict[WorkerSpec, deque[ClaudeWorker]] = {}
+        self._live: Counter[str] = Counter()  # model -> live + spawning workers
+        self._in_use: Counter[str] = Counter()
+        self._spawning: Counter[WorkerSpec] = Counter()
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._background: set[asyncio.Task[Any]] = set()
+        self._owners: set[asyncio.Task[None]] = set()
+        self._reaper_task: asyncio.Task[None] | None = None
+        self._closed = False
+
+    def _default_client_factory(self, worker: ClaudeWorker) -> Any:
+        """Create a ClaudeSDKClient whose tool hooks forward to the worker."""
+        from claude_agent_sdk import ClaudeSDKClient
+
+        async def pre_tool(input_data: Any, tool_use_id: str | None, context: Any) -> Any:
+            hook = worker.pre_tool_hook
+            return await hook(input_data, tool_use_id, context) if hook else {}
+
+        async def post_tool(input_data: Any, tool_use_id: str | None, context: Any) -> Any:
+            hook = worker.post_tool_hook
+            return await hook(input_data, tool_use_id, context) if hook else {}
+
+        options = build_client_options(worker.spec, self._cli_path, pre_tool, post_tool)
+        return ClaudeSDKClient(options=options)
+
+    # ------------------------------------------------------------------
+    # Checkout / release
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def checkout(self, spec: WorkerSpec) -> AsyncIterator[ClaudeWorker]:
+        """Check out a worker for one request.
+
+        Any exception raised inside the block marks the worker unhealthy so it
+        is retired instead of being handed to the next request.
+
+        Raises:
+            PoolExhaustedError: No worker available within acquire_timeout
+                (never raised with overflow, except once the pool is closed).
+        """
+        worker = await self._acquire(spec)
+        try:
+            yield worker
+        except BaseException:
+            worker.healthy = False
+            raise
+        finally:
+            worker.pre_tool_hook = None
+            worker.post_tool_hook = None
+            self._release(worker)
+
+    async def _acquire(self, spec: WorkerSpec) -> ClaudeWorker:
+        if self._closed:
+            raise PoolExhaustedError("Claude worker pool is closed")
+        self._ensure_reaper()
+
+        deadline = self.loop.time() + self._acquire_timeout
+        while True:
+            worker = self._take_idle(spec)
+            if worker is not None:
+                self.metrics.warm_checkouts += 1
+                break
+
+            if self._live[spec.model] < self._max_workers_per_model:
+                self.metrics.cold_checkouts += 1
+                worker = await self._spawn_counted(spec)
+                break
+
+            # At capacity: make room by retiring an idle worker of another spec
+            if self._evict_idle(spec.model):
+                continue
+
+            if self._overflow:
+                self.metrics.overflow_checkouts += 1
+                worker = await self._spawn_counted(spec)
+                worker.one_shot = True
+                break
+
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                self.metrics.exhausted += 1
+                raise PoolExhaustedError(
+                    f"No Claude worker available for {spec.model} within "
+                    f"{self._acquire_timeout}s ({self._live[spec.model]} live)"
+                )
+            waiter: asyncio.Future[None] = self.loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except TimeoutError:
+                pass
+            finally:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+
+        self._in_use[spec.model] += 1
+        worker.last_used = time.monotonic()
+        self._replenish(spec)
+        return worker
+
+    async def _spawn_counted(self, spec: WorkerSpec) -> ClaudeWorker:
+        """Spawn a worker for a checkout, counting it as live while it spawns."""
+        self._live[spec.model] += 1
+        try:
+            return await self._spawn(spec)
+        except BaseException:
+            self._live[spec.model] -= 1
+            self._wake_waiters()
+            raise
+
+    def _release(self, worker: ClaudeWorker) -> None:
+        self._in_use[worker.spec.model] -= 1
+        worker.requests_served += 1
+        worker.last_used = time.monotonic()
+
+        if not worker.is_alive():
+            self.metrics.unhealthy += 1
+            self._retire(worker)
+        elif (
+            self._closed
+            or worker.one_shot
+            or worker.requests_served >= self._max_requests_per_worker
+        ):
+            self._retire(worker)
+            self._replenish(worker.spec)
+        else:
+            self._track(self._recycle(worker))
+
+    async def _recycle(self, worker: ClaudeWorker) -> None:
+        """Clear conversation state off the request path, then return to idle."""
+        try:
+            await asyncio.wait_for(self._reset(worker), RESET_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Claude worker reset failed, retiring: {e}")
+            worker.healthy = False
+
+        if worker.is_alive() and not self._closed:
+            self.metrics.recycled += 1
+            self._idle.setdefault(worker.spec, deque()).append(worker)
+            self._wake_waiters()
+        else:
+            self._retire(worker)
+
+    async def _reset(self, worker: ClaudeWorker) -> None:
+        await worker.client.query(RESET_PROMPT)
+        async for _ in worker.client.receive_response():
+            pass
+
+    def _take_idle(self, spec: WorkerSpec) -> ClaudeWorker | None:
+        idle = self._idle.get(spec)
+        while idle:
+            worker = idle.popleft()
+            if worker.is_alive():
+                return worker
+            self.metrics.unhealthy += 1
+            self._retire(worker)
+        return None
+
+    def _evict_idle(self, model: str) -> bool:
+        for spec, idle in self._idle.items():
+            if spec.model == model and idle:
+                self._retire(idle.popleft())
+                return True
+        return False
+
+    def _wake_waiters(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    # ------------------------------------------------------------------
+    # Worker lifecycle
+    # ------------------------------------------------------------------
+
+    async def _spawn(self, spec: WorkerSpec) -> ClaudeWorker:
+        """Spawn a worker and wait until its client is connected."""
+        worker = ClaudeWorker(spec=spec)
+        ready: asyncio.Future[None] = self.loop.create_future()
+        worker._owner = asyncio.create_task(self._run_worker(worker, ready))
+        self._owners.add(worker._owner)
+        worker._owner.add_done_callback(self._owners.discard)
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), self._connect_timeout)
+        except BaseException as e:
+            self.metrics.spawn_failures += 1
+            worker._retire_event.set()
+            if not isinstance(e, asyncio.CancelledError):
+                logger.warning(f"Failed to spawn Claude worker ({spec.model}): {e}")
+            raise
+        self.metrics.spawned += 1
+        return worker
+
+    async def _run_worker(self, worker: ClaudeWorker, ready: asyncio.Future[None]) -> None:
+        """Owner task: connect, wait for retirement, disconnect."""
+        try:
+            client = self._client_factory(worker)
+            async with client:
+                worker.client = client
+                if not ready.done():
+                    ready.set_result(None)
+                await worker._retire_event.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"Claude worker ({worker.spec.model}) exited: {e}")
+        finally:
+            worker.healthy = False
+            if not ready.done():
+                ready.cancel()
+
+    def _retire(self, worker: ClaudeWorker) -> None:
+        if worker._retire_event.is_set():
+            return
+        worker._retire_event.set()
+        self._live[worker.spec.model] -= 1
+        self.metrics.retired += 1
+        self._wake_waiters()
+
+    def _replenish(self, spec: WorkerSpec) -> None:
+        """Pre-spawn idle workers for spec in the background up to min_idle."""
+        if self._closed:
+            return
+        idle = len(self._idle.get(spec, ()))
+        while (
+            idle + self._spawning[spec] < self._min_idle
+            and self._live[spec.model] < self._max_workers_per_model
+        ):
+            self._live[spec.model] += 1
+            self._spawning[spec] += 1
+            self._track(self._prespawn(spec))
+
+    async def _prespawn(self, spec: WorkerSpec) -> None:
+        try:
+            worker = await self._spawn(spec)
+        except BaseException as e:
+            # Free the slot on cancellation (close()) too, not only on failure
+            self._live[spec.model] -= 1
+            self._wake_waiters()
+            if isinstance(e, Exception):
+                return  # Logged by _spawn
+            raise
+        finally:
+            self._spawning[spec] -= 1
+
+        if self._closed:
+            self._retire(worker)
+            return
+        self._idle.setdefault(spec, deque()).append(worker)
+        self._wake_waiters()
+
+    def _track(self, coro: Awaitable[Any]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+    async def _reap_loop(self) -> None:
+        interval = max(min(self._idle_timeout / 2, 30.0), 0.05)
+        while not self._closed:
+            await asyncio.sleep(interval)
+            self.reap()
+
+    def reap(self) -> int:
+        """Retire idle workers that are dead or idle past idle_timeout.
+
+        Returns:
+            Number of workers retired.
+        """
+        now = time.monotonic()
+        retired = 0
+        for idle in self._idle.values():
+            for worker in list(idle):
+                expired = now - worker.last_used >= self._idle_timeout
+                if expired or not worker.is_alive():
+                    idle.remove(worker)
+                    if expired:
+                        self.metrics.idle_expired += 1
+                    else:
+                        self.metrics.unhealthy += 1
+                    self._retire(worker)
+                    retired += 1
+        return retired
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Retire every worker and wait for CLI processes to exit."""
+        self._closed = True
+        if self._reaper_task:
+            self._reaper_task.cancel()
+        for idle in self._idle.values():
+            while idle:
+                self._retire(idle.popleft())
+        self._wake_waiters()
+
+        for task in list(self._background):
+            task.cancel()
+        # Owner tasks disconnect their clients once retired; in-use workers
+        # are retired when released
+        pending = self._background | self._owners
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get pool size and cumulative counters."""
+        models: dict[str, dict[str, int]] = {}
+        for model in set(self._live) | set(self._in_use):
+            idle = sum(len(q) for spec, q in self._idle.items() if spec.model == model)
+            models[model] = {
+                "live": self._live[model],
+                "idle": idle,
+                "in_use": self._in_use[model],
+                "max": self._max_workers_per_model,
+            }
+        return {
+            "models": models,
+            "waiting": sum(1 for w in self._waiters if not w.done()),
+            **asdict(self.metrics),
+        }
+
+
+# Process-wide pool, bound to the event loop it was created on
+_pool: ClaudeWorkerPool | None = None
+
+
+def get_claude_pool(cli_path: str | None) -> ClaudeWorkerPool:
+    """Get the shared worker pool, creating it on first use in this event loop."""
+    global _pool
+    loop = asyncio.get_running_loop()
+    if _pool is None or _pool.loop is not loop:
+        from app.config import settings
+
+        _pool = ClaudeWorkerPool(
+            cli_path,
+            max_workers_per_model=settings.claude_pool_max_workers_per_model,
+            min_idle=settings.claude_pool_min_idle,
+            max_requests_per_worker=settings.claude_pool_max_requests_per_worker,
+            idle_timeout=settings.claude_pool_idle_timeout,
+            acquire_timeout=settings.claude_pool_acquire_timeout,
+            overflow=settings.claude_pool_overflow,
+        )
+    return _pool
+
+
+def get_claude_pool_stats() -> dict[str, Any] | None:
+    """Get stats for the shared pool, or None if it was never started."""
+    return _pool.get_stats() if _pool is not None else None
+
+
+async def shutdown_claude_pool() -> None:
+    """Close the shared pool (called from the FastAPI lifespan)."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
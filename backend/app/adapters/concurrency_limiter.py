@@ -0,0 +1,245 @@
+"""Adaptive per provider/model concurrency limits.
+
+Caps simultaneous in-flight provider calls per (provider, model) and adjusts
+each cap from what the provider tells us (AIMD):
+
+- Additive increase: a successful call made while the limit was in use adds
+  1/limit, i.e. about one slot per limit's worth of successes
+- Multiplicative decrease: a 429 or a timeout multiplies the limit by
+  settings.provider_concurrency_backoff, at most once per observed latency
+  so one burst of rejections counts as one congestion signal
+- Latency gradient: when short-term latency exceeds the long-term baseline
+  by settings.provider_concurrency_latency_tolerance, queueing at the
+  provider has started, so the limit shrinks gently before 429s appear
+
+Calls over the limit wait in a FIFO queue with a deadline; callers that are
+still waiting when it passes get ConcurrencyLimitError. Adapters hold a slot
+per attempt, so tenacity's retry backoff does not hold one.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.adapters.base import ProviderError, RateLimitError
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Multiplier applied when latency exceeds the tolerated gradient
+LATENCY_BACKOFF = 0.9
+
+# EWMA weights of the newest latency sample (short-term and baseline)
+SHORT_LATENCY_ALPHA = 0.3
+LONG_LATENCY_ALPHA = 0.02
+
+
+class ConcurrencyLimitError(ProviderError):
+    """A call waited past its deadline for a provider concurrency slot.
+
+    Retriable, so routers fall back to the next provider; adapters don't
+    retry it in place (see is_retriable_error), since waiting again for the
+    same saturated provider only adds latency.
+    """
+
+    def __init__(self, provider: str, model: str, waited: float):
+        super().__init__(
+            f"Concurrency limit for {provider}/{model}: no slot within {waited:.1f}s",
+            provider=provider,
+            retriable=True,
+        )
+        self.model = model
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """Whether an error means the provider is overloaded (429 or timeout)."""
+    if isinstance(exc, RateLimitError) or getattr(exc, "status_code", None) == 429:
+        return True
+    seen: BaseException | None = exc
+    while seen is not None:
+        if isinstance(seen, TimeoutError) or type(seen).__name__.endswith("Timeout"):
+            return True
+        seen = seen.__cause__
+    return False
+
+
+@dataclass
+class AdaptiveLimit:
+    """Concurrency limit and queue of one provider/model."""
+
+    limit: float
+    min_limit: int
+    max_limit: int
+    in_flight: int = 0
+    waiters: deque[asyncio.Future[None]] = field(default_factory=deque)
+    queued: int = 0  # Live waiters (cancelled ones linger in `waiters`)
+    short_latency_ms: float | None = None
+    long_latency_ms: float | None = None
+    last_decrease: float = 0.0
+    admitted: int = 0
+    rejected: int = 0  # Waiters that hit their deadline or found the queue full
+    overloads: int = 0  # 429s and timeouts observed
+
+    @property
+    def current(self) -> int:
+        """Slots currently available to callers."""
+        return max(int(self.limit), self.min_limit)
+
+    def record_latency(self, latency_ms: float) -> None:
+        """Feed the short-term and baseline latency EWMAs."""
+        if self.short_latency_ms is None or self.long_latency_ms is None:
+            self.short_latency_ms = self.long_latency_ms = latency_ms
+            return
+        self.short_latency_ms += SHORT_LATENCY_ALPHA * (latency_ms - self.short_latency_ms)
+        self.long_latency_ms += LONG_LATENCY_ALPHA * (latency_ms - self.long_latency_ms)
+
+    def decrease(self, factor: float, now: float) -> None:
+        """Shrink the limit, at most once per observed latency."""
+        hold = (self.long_latency_ms or 1000.0) / 1000
+        if now - self.last_decrease < hold:
+            return
+        self.limit = max(self.limit * factor, float(self.min_limit))
+        self.last_decrease = now
+
+    def increase(self) -> None:
+        """Grow the limit by one slot per limit's worth of successes."""
+        self.limit = min(self.limit + 1 / self.limit, float(self.max_limit))
+
+
+class ConcurrencyLimiter:
+    """Per provider/model adaptive concurrency limits."""
+
+    def __init__(self) -> None:
+        self._limits: dict[tuple[str, str], AdaptiveLimit] = {}
+
+    def _get_limit(self, provider: str, model: str) -> AdaptiveLimit:
+        key = (provider, model)
+        if key not in self._limits:
+            max_limit = settings.provider_concurrency_max_by_provider.get(
+                provider, settings.provider_concurrency_max
+            )
+            self._limits[key] = AdaptiveLimit(
+                limit=float(min(settings.provider_concurrency_initial, max_limit)),
+                min_limit=settings.provider_concurrency_min,
+                max_limit=max_limit,
+            )
+        return self._limits[key]
+
+    @asynccontextmanager
+    async def slot(
+        self, provider: str, model: str, track_latency: bool = True
+    ) -> AsyncIterator[None]:
+        """Hold a concurrency slot for one provider call.
+
+        The outcome of the block adjusts the limit: success (with its latency
+        unless track_latency is False, e.g. for streams), or an overload error.
+        Other errors release the slot without adjusting anything.
+
+        Raises:
+            ConcurrencyLimitError: No slot freed up before the queue deadline
+        """
+        if not settings.provider_concurrency_enabled:
+            yield
+            return
+
+        state = self._get_limit(provider, model)
+        await self._acquire(state, provider, model)
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            if is_overload_error(e):
+                state.overloads += 1
+                state.decrease(settings.provider_concurrency_backoff, time.monotonic())
+                logger.info(
+                    f"Overload from {provider}/{model}, concurrency limit now {state.current}"
+                )
+            self._release(state)
+            raise
+        now = time.monotonic()
+        if track_latency:
+            state.record_latency((now - start) * 1000)
+        tolerance = settings.provider_concurrency_latency_tolerance
+        if (
+            state.short_latency_ms is not None
+            and state.long_latency_ms is not None
+            and state.short_latency_ms > state.long_latency_ms * tolerance
+        ):
+            state.decrease(LATENCY_BACKOFF, now)
+        elif state.in_flight * 2 >= state.current:
+            # Only grow a limit that is actually being used
+            state.increase()
+        self._release(state)
+
+    async def _acquire(self, state: AdaptiveLimit, provider: str, model: str) -> None:
+        """Take a slot now, or wait in line for one until the deadline."""
+        if state.in_flight < state.current and not state.queued:
+            state.in_flight += 1
+            state.admitted += 1
+            return
+        timeout = settings.provider_concurrency_queue_timeout
+        if state.queued >= settings.provider_concurrency_max_queue:
+            state.rejected += 1
+            raise ConcurrencyLimitError(provider, model, 0.0)
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        state.waiters.append(waiter)
+        state.queued += 1
+        try:
+            await asyncio.wait_for(waiter, timeout=timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self._release(state)
+            else:
+                state.queued -= 1
+            if isinstance(e, TimeoutError):
+                state.rejected += 1
+                raise ConcurrencyLimitError(provider, model, timeout) from e
+            raise
+        state.admitted += 1
+
+    def _release(self, state: AdaptiveLimit) -> None:
+        """Free a slot, handing it straight to waiters while under the limit."""
+        state.in_flight -= 1
+        while state.waiters and state.in_flight < state.current:
+            waiter = state.waiters.popleft()
+            if waiter.done():
+                continue
+            state.queued -= 1
+            state.in_flight += 1
+            waiter.set_result(None)
+
+    def get_status(self) -> dict[str, dict[str, Any]]:
+        """Limit, in-flight and queue depth per provider/model."""
+        return {
+            f"{provider}/{model}": {
+                "provider": provider,
+                "model": model,
+                "limit": state.current,
+                "in_flight": state.in_flight,
+                "queued": state.queued,
+                "admitted": state.admitted,
+                "rejected": state.rejected,
+                "overloads": state.overloads,
+                "latency_ms": state.short_latency_ms,
+            }
+            for (provider, model), state in self._limits.items()
+        }
+
+
+# Shared limiter for all adapters
+_limiter: ConcurrencyLimiter | None = None
+
+
+def get_concurrency_limiter() -> ConcurrencyLimiter:
+    """Get or create the shared concurrency limiter."""
+    global _limiter
+    if _limiter is None:
+        _limiter = ConcurrencyLimiter()
+    return _limiter
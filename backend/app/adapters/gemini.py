@@ -18,6 +18,7 @@ from app.adapters.base import (
     StreamEvent,
     ToolCallResult,
 )
+from app.adapters.concurrency_limiter import get_concurrency_limiter
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -182,7 +183,9 @@ class GeminiAdapter(ProviderAdapter):
             reraise=True,
         )
         async def _do_complete() -> CompletionResult:
-            return await self._complete_impl(messages, model, max_tokens, temperature, **kwargs)
+            # One concurrency slot per attempt, so 429s shrink the limit before the retry
+            async with get_concurrency_limiter().slot(self.provider_name, model):
+                return await self._complete_impl(messages, model, max_tokens, temperature, **kwargs)
 
         return await _do_complete()
 
@@ -421,16 +424,18 @@ class GeminiAdapter(ProviderAdapter):
             if system_instruction:
                 config.system_instruction = system_instruction
 
-            # Stream response
+            # Stream response, holding a concurrency slot until it ends
             total_content = ""
-            async for chunk in await self._client.aio.models.generate_content_stream(
-                model=model,
-                contents=contents,
-                config=config,
-            ):
-                if chunk.text:
-                    total_content += chunk.text
-                    yield StreamEvent(type="content", content=chunk.text)
+            limiter = get_concurrency_limiter()
+            async with limiter.slot(self.provider_name, model, track_latency=False):
+                async for chunk in await self._client.aio.models.generate_content_stream(
+                    model=model,
+                    contents=contents,
+                    config=config,
+                ):
+                    if chunk.text:
+                        total_content += chunk.text
+                        yield StreamEvent(type="content", content=chunk.text)
 
             # Final event with usage
             input_tokens = 0
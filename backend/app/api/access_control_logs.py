@@ -75,6 +75,8 @@ async def get_request_log(
                 tokens_in=log.tokens_in,
                 tokens_out=log.tokens_out,
                 latency_ms=log.latency_ms,
+                ttfb_ms=log.ttfb_ms,
+                duration_ms=log.duration_ms,
                 model=log.model,
                 agent_slug=log.agent_slug,
                 tool_type=log.tool_type,
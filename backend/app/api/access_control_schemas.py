@@ -117,6 +117,8 @@ class RequestLogEntry(BaseModel):
     tokens_in: int | None
     tokens_out: int | None
     latency_ms: int | None
+    ttfb_ms: int | None = None
+    duration_ms: int | None = None
     model: str | None
     agent_slug: str | None
     tool_type: str | None
@@ -11,6 +11,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
 from app.models import ClientControl
+from app.services.response_cache import get_response_cache
+from app.services.routing_scorer import get_routing_scorer
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -473,3 +475,105 @@ async def clear_request_audit() -> dict[str, Any]:
     count = len(_request_audit_log)
     _request_audit_log.clear()
     return {"cleared": count, "message": f"Cleared {count} audit log entries"}
+
+
+class ResponseCachePurgeResponse(BaseModel):
+    """Response for a response cache purge."""
+
+    deleted: int
+    scope: str
+
+
+@router.delete("/response-cache", response_model=ResponseCachePurgeResponse)
+async def purge_response_cache(
+    model: Annotated[str | None, Query(description="Purge responses for this model")] = None,
+    agent: Annotated[str | None, Query(description="Purge responses for this agent slug")] = None,
+    project: Annotated[str | None, Query(description="Purge responses for this project")] = None,
+) -> ResponseCachePurgeResponse:
+    """Purge cached completion responses.
+
+    Give at most one of model, agent or project; with none, the whole
+    response cache (primary and fallback entries) is cleared.
+    """
+    cache = get_response_cache()
+    try:
+        deleted = await cache.purge(model=model, agent_slug=agent, project_id=project)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    if model:
+        scope = f"model={model}"
+    elif agent:
+        scope = f"agent={agent}"
+    elif project:
+        scope = f"project={project}"
+    else:
+        scope = "all"
+    return ResponseCachePurgeResponse(deleted=deleted, scope=scope)
+
+
+class RoutingDecisionLog(BaseModel):
+    """How an agent request's candidate models were ordered."""
+
+    timestamp: datetime
+    agent_slug: str
+    policy: str
+    order: list[str]
+    scores: dict[str, float]
+    demoted: dict[str, str]
+    attempts: list[str]
+    model_used: str | None
+
+
+class ModelRoutingHealth(BaseModel):
+    """Rolling routing health of a model."""
+
+    model: str
+    latency_ms: float | None
+    error_rate: float
+    in_flight: int
+    requests: int
+
+
+class RoutingDecisionsResponse(BaseModel):
+    """Response for the routing decision log."""
+
+    decisions: list[RoutingDecisionLog]
+    models: list[ModelRoutingHealth]
+    total: int
+
+
+@router.get("/routing-decisions", response_model=RoutingDecisionsResponse)
+async def get_routing_decisions(
+    limit: int = Query(default=100, ge=1, le=1000, description="Max entries to return"),
+    agent: str | None = Query(default=None, description="Filter by agent slug"),
+) -> RoutingDecisionsResponse:
+    """Get recent agent fallback-chain routing decisions and per-model health."""
+    scorer = get_routing_scorer()
+    decisions = scorer.get_decisions(limit=limit, agent_slug=agent)
+    return RoutingDecisionsResponse(
+        decisions=[
+            RoutingDecisionLog(
+                timestamp=d.timestamp,
+                agent_slug=d.agent_slug,
+                policy=d.policy,
+                order=d.order,
+                scores=d.scores,
+                demoted=d.demoted,
+                attempts=d.attempts,
+                model_used=d.model_used,
+            )
+            for d in decisions
+        ],
+        models=[
+            ModelRoutingHealth(
+                model=model,
+                latency_ms=health.latency_ms,
+                error_rate=health.error_rate,
+                in_flight=health.in_flight,
+                requests=health.requests,
+            )
+            for model, health in sorted(scorer.get_health().items())
+        ],
+        total=len(decisions),
+    )
@@ -15,7 +15,8 @@ from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
-from app.models import CostLog, Session, TruncationEvent
+from app.models import CostLog, TruncationEvent
+from app.services.cost_rollups import CostFilters, aggregate_costs
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/analytics", tags=["analytics"])
@@ -55,6 +56,26 @@ class CostAggregationResponse(BaseModel):
     total_requests: int = Field(..., description="Total request count")
 
 
+# Rollup key column of each grouping (other groupings share their name)
+_GROUP_COLUMNS = {GroupBy.project: "project_id"}
+
+# Label of missing group keys (agent_slug/external_id are rolled up as "")
+_MISSING_KEY_LABELS = {
+    GroupBy.agent_slug: "unspecified",
+    GroupBy.external_id: "unspecified",
+    GroupBy.session_type: "completion",
+}
+
+
+def _group_label(group_by: GroupBy, key: Any) -> str:
+    """Response group_key for a group's key."""
+    if group_by == GroupBy.none:
+        return "total"
+    if group_by in (GroupBy.day, GroupBy.week, GroupBy.month):
+        return str(key)
+    return str(key) if key else _MISSING_KEY_LABELS.get(group_by, "unknown")
+
+
 @router.get("/costs", response_model=CostAggregationResponse)
 async def get_costs(
     db: Annotated[AsyncSession, Depends(get_db)],
@@ -73,9 +94,14 @@ async def get_costs(
     """
     Get aggregated cost data with flexible grouping.
 
+    Answered from the hourly cost rollups, plus cost_logs for partial hours
+    and the hours not rolled up yet (see app.services.cost_rollups). All
+    filters apply to every grouping.
+
     Supports grouping by:
     - project: Group by project_id (via session)
     - model: Group by model name
+    - agent_slug, session_type, external_id: Group by session attribute
     - day: Group by calendar day
     - week: Group by calendar week
     - month: Group by calendar month
@@ -92,292 +118,33 @@ async def get_costs(
     if days and not start_date:
         start_date = datetime.now(UTC) - timedelta(days=days)
 
-    # Build base query
-    aggregations: list[CostAggregation] = []
-    query: Any
-
-    if group_by == GroupBy.project:
-        # Need to join with sessions to get project_id
-        query = (
-            select(
-                Session.project_id.label("group_key"),
-                func.sum(CostLog.input_tokens + CostLog.output_tokens).label("total_tokens"),
-                func.sum(CostLog.input_tokens).label("input_tokens"),
-                func.sum(CostLog.output_tokens).label("output_tokens"),
-                func.sum(CostLog.cost_usd).label("total_cost"),
-                func.count(CostLog.id).label("request_count"),
-            )
-            .join(Session, CostLog.session_id == Session.id)
-            .group_by(Session.project_id)
-        )
-
-        # Apply filters
-        if project_id:
-            query = query.where(Session.project_id == project_id)
-        if model:
-            query = query.where(CostLog.model.contains(model))
-        if agent_slug:
-            query = query.where(Session.agent_slug == agent_slug)
-        if session_type:
-            query = query.where(Session.session_type == session_type)
-        if external_id:
-            query = query.where(Session.external_id == external_id)
-        if start_date:
-            query = query.where(CostLog.created_at >= start_date)
-        if end_date:
-            query = query.where(CostLog.created_at <= end_date)
-
-        result = await db.execute(query)
-        for row in result.all():
-            aggregations.append(
-                CostAggregation(
-                    group_key=row.group_key or "unknown",
-                    total_tokens=int(row.total_tokens or 0),
-                    input_tokens=int(row.input_tokens or 0),
-                    output_tokens=int(row.output_tokens or 0),
-                    total_cost_usd=float(row.total_cost or 0.0),
-                    request_count=int(row.request_count or 0),
-                )
-            )
-
-    elif group_by == GroupBy.agent_slug:
-        # Group by agent_slug - join with sessions
-        query = (
-            select(
-                Session.agent_slug.label("group_key"),
-                func.sum(CostLog.input_tokens + CostLog.output_tokens).label("total_tokens"),
-                func.sum(CostLog.input_tokens).label("input_tokens"),
-                func.sum(CostLog.output_tokens).label("output_tokens"),
-                func.sum(CostLog.cost_usd).label("total_cost"),
-                func.count(CostLog.id).label("request_count"),
-            )
-            .join(Session, CostLog.session_id == Session.id)
-            .group_by(Session.agent_slug)
-        )
-
-        if project_id:
-            query = query.where(Session.project_id == project_id)
-        if model:
-            query = query.where(CostLog.model.contains(model))
-        if session_type:
-            query = query.where(Session.session_type == session_type)
-        if start_date:
-            query = query.where(CostLog.created_at >= start_date)
-        if end_date:
-            query = query.where(CostLog.created_at <= end_date)
-
-        result = await db.execute(query)
-        for row in result.all():
-            aggregations.append(
-                CostAggregation(
-                    group_key=row.group_key or "unspecified",
-                    total_tokens=int(row.total_tokens or 0),
-                    input_tokens=int(row.input_tokens or 0),
-                    output_tokens=int(row.output_tokens or 0),
-                    total_cost_usd=float(row.total_cost or 0.0),
-                    request_count=int(row.request_count or 0),
-                )
-            )
-
-    elif group_by == GroupBy.session_type:
-        # Group by session_type - join with sessions
-        query = (
-            select(
-                Session.session_type.label("group_key"),
-                func.sum(CostLog.input_tokens + CostLog.output_tokens).label("total_tokens"),
-                func.sum(CostLog.input_tokens).label("input_tokens"),
-                func.sum(CostLog.output_tokens).label("output_tokens"),
-                func.sum(CostLog.cost_usd).label("total_cost"),
-                func.count(CostLog.id).label("request_count"),
-            )
-            .join(Session, CostLog.session_id == Session.id)
-            .group_by(Session.session_type)
-        )
-
-        if project_id:
-            query = query.where(Session.project_id == project_id)
-        if model:
-            query = query.where(CostLog.model.contains(model))
-        if agent_slug:
-            query = query.where(Session.agent_slug == agent_slug)
-        if start_date:
-            query = query.where(CostLog.created_at >= start_date)
-        if end_date:
-            query = query.where(CostLog.created_at <= end_date)
-
-        result = await db.execute(query)
-        for row in result.all():
-            aggregations.append(
-                CostAggregation(
-                    group_key=str(row.group_key) if row.group_key else "completion",
-                    total_tokens=int(row.total_tokens or 0),
-                    input_tokens=int(row.input_tokens or 0),
-                    output_tokens=int(row.output_tokens or 0),
-                    total_cost_usd=float(row.total_cost or 0.0),
-                    request_count=int(row.request_count or 0),
-                )
-            )
-
-    elif group_by == GroupBy.external_id:
-        # Group by external_id - join with sessions
-        query = (
-            select(
-                Session.external_id.label("group_key"),
-                func.sum(CostLog.input_tokens + CostLog.output_tokens).label("total_tokens"),
-                func.sum(CostLog.input_tokens).label("input_tokens"),
-                func.sum(CostLog.output_tokens).label("output_tokens"),
-                func.sum(CostLog.cost_usd).label("total_cost"),
-                func.count(CostLog.id).label("request_count"),
-            )
-            .join(Session, CostLog.session_id == Session.id)
-            .group_by(Session.external_id)
-        )
-
-        if project_id:
-            query = query.where(Session.project_id == project_id)
-        if model:
-            query = query.where(CostLog.model.contains(model))
-        if agent_slug:
-            query = query.where(Session.agent_slug == agent_slug)
-        if session_type:
-            query = query.where(Session.session_type == session_type)
-        if external_id:
-            query = query.where(Session.external_id == external_id)
-        if start_date:
-            query = query.where(CostLog.created_at >= start_date)
-        if end_date:
-            query = query.where(CostLog.created_at <= end_date)
-
-        result = await db.execute(query)
-        for row in result.all():
-            aggregations.append(
-                CostAggregation(
-                    group_key=row.group_key or "unspecified",
-                    total_tokens=int(row.total_tokens or 0),
-                    input_tokens=int(row.input_tokens or 0),
-                    output_tokens=int(row.output_tokens or 0),
-                    total_cost_usd=float(row.total_cost or 0.0),
-                    request_count=int(row.request_count or 0),
-                )
-            )
-
-    elif group_by == GroupBy.model:
-        query = select(
-            CostLog.model.label("group_key"),
-            func.sum(CostLog.input_tokens + CostLog.output_tokens).label("total_tokens"),
-            func.sum(CostLog.input_tokens).label("input_tokens"),
-            func.sum(CostLog.output_tokens).label("output_tokens"),
-            func.sum(CostLog.cost_usd).label("total_cost"),
-            func.count(CostLog.id).label("request_count"),
-        ).group_by(CostLog.model)
-
-        # Apply filters
-        if model:
-            query = query.where(CostLog.model.contains(model))
-        if start_date:
-            query = query.where(CostLog.created_at >= start_date)
-        if end_date:
-            query = query.where(CostLog.created_at <= end_date)
-        if project_id:
-            # Need to join with sessions for project filter
-            query = query.join(Session, CostLog.session_id == Session.id).where(
-                Session.project_id == project_id
-            )
-
-        result = await db.execute(query)
-        for row in result.all():
-            aggregations.append(
-                CostAggregation(
-                    group_key=row.group_key or "unknown",
-                    total_tokens=int(row.total_tokens or 0),
-                    input_tokens=int(row.input_tokens or 0),
-                    output_tokens=int(row.output_tokens or 0),
-                    total_cost_usd=float(row.total_cost or 0.0),
-                    request_count=int(row.request_count or 0),
-                )
-            )
-
-    elif group_by in (GroupBy.day, GroupBy.week, GroupBy.month):
-        # Date-based grouping
-        if group_by == GroupBy.day:
-            date_trunc = func.date_trunc("day", CostLog.created_at)
-        elif group_by == GroupBy.week:
-            date_trunc = func.date_trunc("week", CostLog.created_at)
-        else:  # month
-            date_trunc = func.date_trunc("month", CostLog.created_at)
-
-        query = (
-            select(
-                date_trunc.label("group_key"),
-                func.sum(CostLog.input_tokens + CostLog.output_tokens).label("total_tokens"),
-                func.sum(CostLog.input_tokens).label("input_tokens"),
-                func.sum(CostLog.output_tokens).label("output_tokens"),
-                func.sum(CostLog.cost_usd).label("total_cost"),
-                func.count(CostLog.id).label("request_count"),
-            )
-            .group_by(date_trunc)
-            .order_by(date_trunc)
-        )
-
-        # Apply filters
-        if model:
-            query = query.where(CostLog.model.contains(model))
-        if start_date:
-            query = query.where(CostLog.created_at >= start_date)
-        if end_date:
-            query = query.where(CostLog.created_at <= end_date)
-        if project_id:
-            query = query.join(Session, CostLog.session_id == Session.id).where(
-                Session.project_id == project_id
-            )
-
-        result = await db.execute(query)
-        for row in result.all():
-            aggregations.append(
-                CostAggregation(
-                    group_key=str(row.group_key),
-                    total_tokens=int(row.total_tokens or 0),
-                    input_tokens=int(row.input_tokens or 0),
-                    output_tokens=int(row.output_tokens or 0),
-                    total_cost_usd=float(row.total_cost or 0.0),
-                    request_count=int(row.request_count or 0),
-                )
-            )
-
-    else:  # GroupBy.none - just totals
-        query = select(
-            func.sum(CostLog.input_tokens + CostLog.output_tokens).label("total_tokens"),
-            func.sum(CostLog.input_tokens).label("input_tokens"),
-            func.sum(CostLog.output_tokens).label("output_tokens"),
-            func.sum(CostLog.cost_usd).label("total_cost"),
-            func.count(CostLog.id).label("request_count"),
+    group = None if group_by == GroupBy.none else _GROUP_COLUMNS.get(group_by, group_by.value)
+    filters = CostFilters(
+        project_id=project_id,
+        model=model,
+        agent_slug=agent_slug,
+        session_type=session_type,
+        external_id=external_id,
+        start=start_date,
+        end=end_date,
+    )
+    totals = await aggregate_costs(db, group, filters)
+
+    keys = list(totals)
+    if group_by in (GroupBy.day, GroupBy.week, GroupBy.month):
+        keys.sort()
+    aggregations = [
+        CostAggregation(
+            group_key=_group_label(group_by, key),
+            total_tokens=totals[key].total_tokens,
+            input_tokens=totals[key].input_tokens,
+            output_tokens=totals[key].output_tokens,
+            total_cost_usd=totals[key].cost_usd,
+            request_count=totals[key].request_count,
         )
-
-        # Apply filters
-        if model:
-            query = query.where(CostLog.model.contains(model))
-        if start_date:
-            query = query.where(CostLog.created_at >= start_date)
-        if end_date:
-            query = query.where(CostLog.created_at <= end_date)
-        if project_id:
-            query = query.join(Session, CostLog.session_id == Session.id).where(
-                Session.project_id == project_id
-            )
-
-        result = await db.execute(query)
-        row = result.one()
-        if row.total_tokens:
-            aggregations.append(
-                CostAggregation(
-                    group_key="total",
-                    total_tokens=int(row.total_tokens or 0),
-                    input_tokens=int(row.input_tokens or 0),
-                    output_tokens=int(row.output_tokens or 0),
-                    total_cost_usd=float(row.total_cost or 0.0),
-                    request_count=int(row.request_count or 0),
-                )
-            )
+        for key in keys
+        if group_by != GroupBy.none or totals[key].total_tokens
+    ]
 
     # Calculate grand totals
     grand_total_cost = sum(a.total_cost_usd for a in aggregations)
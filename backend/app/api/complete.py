@@ -5,7 +5,7 @@ from __future__ import annotations
 import json
 import logging
 import uuid
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Awaitable, Callable
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Annotated, Any, Literal, cast
 
@@ -20,10 +20,10 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.adapters.base import (
     AuthenticationError,
+    CacheMetrics,
     CompletionResult,
     Message,
     ProviderError,
@@ -32,6 +32,7 @@ from app.adapters.base import (
 from app.adapters.claude import ClaudeAdapter
 from app.adapters.gemini import GeminiAdapter
 from app.adapters.openai import OpenAIAdapter
+from app.config import settings
 from app.constants import (
     CLAUDE_HAIKU,
     CLAUDE_OPUS,
@@ -40,7 +41,6 @@ from app.constants import (
     GEMINI_PRO,
 )
 from app.db import get_db
-from app.models import Message as DBMessage
 from app.models import Session as DBSession
 from app.models import TruncationEvent
 from app.services.agent_routing import (
@@ -54,15 +54,24 @@ from app.services.agent_routing import (
 # Context management belongs in the harness (SummitFlow), not the API layer.
 # Agent Hub provides token tracking and warnings; the caller decides when to
 # checkpoint and restart. See: anthropic.com/engineering/effective-harnesses-for-long-running-agents
+from app.services.completion_writer import (
+    CompletionWrite,
+    persist_completion,
+    wait_for_session_writes,
+)
 from app.services.context_tracker import (
     check_context_before_request,
-    log_token_usage,
     should_emit_warning,
 )
+from app.services.distributed_rate_limiter import (
+    Limit,
+    client_limits,
+    get_distributed_rate_limiter,
+    provider_limits,
+    token_limits,
+)
 from app.services.events import (
-    publish_complete,
     publish_error,
-    publish_message,
     publish_session_start,
 )
 from app.services.memory import (
@@ -73,12 +82,16 @@ from app.services.memory import (
     track_loaded_batch,
     track_referenced_batch,
 )
-from app.services.response_cache import get_response_cache
+from app.services.request_coalescer import get_request_coalescer
+from app.services.response_cache import ResponseCache, get_response_cache
+from app.services.session_context_cache import get_session_context_cache
 from app.services.token_counter import (
     build_output_usage,
-    count_message_tokens,
+    count_message_tokens_async,
     estimate_cost,
-    estimate_request,
+    estimate_request_async,
+    get_context_limit,
+    prime_message_tokens,
 )
 
 logger = logging.getLogger(__name__)
@@ -98,11 +111,13 @@ class CompletionInternalResult:
     memory_uuids: list[str]
     cited_uuids: list[str]
     from_cache: bool = False
+    coalesced: bool = False
     cache_metrics: Any | None = None
     thinking_content: str | None = None
     thinking_tokens: int | None = None
     tool_calls: list[Any] | None = None
     container: Any | None = None
+    pending_write: CompletionWrite | None = None  # Set when called with persist=False
 
 
 router = APIRouter()
@@ -566,6 +581,45 @@ def clear_adapter_cache() -> None:
     _adapter_cache.clear()
 
 
+async def _enforce_rate_limits(
+    http_request: Request,
+    provider: str,
+    messages: list[MessageInput],
+) -> list[Limit]:
+    """Check the client's and provider's RPM/TPM before a completion.
+
+    TPM buckets are charged the estimated input tokens up front.
+
+    Returns:
+        The buckets that were charged (to charge output tokens to afterwards)
+
+    Raises:
+        HTTPException: 429 with Retry-After if any limit is exceeded
+    """
+    if not settings.rate_limit_enabled:
+        return []
+
+    tokens = await count_message_tokens_async(
+        [{"role": m.role, "content": m.content} for m in messages]
+    )
+    limits = provider_limits(provider, tokens)
+    client = getattr(http_request.state, "client", None)
+    if client is not None:
+        limits = [
+            *client_limits(str(client.id), client.rate_limit_rpm, client.rate_limit_tpm, tokens),
+            *limits,
+        ]
+
+    decision = await get_distributed_rate_limiter().acquire(limits)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=decision.message,
+            headers={"Retry-After": decision.retry_after_header},
+        )
+    return limits
+
+
 async def _get_or_create_session(
     db: AsyncSession,
     session_id: str | None,
@@ -578,14 +632,17 @@ async def _get_or_create_session(
     request_source: str | None = None,
     agent_slug: str | None = None,
 ) -> tuple[DBSession, list[Message], bool]:
-    """Get existing session or create new one. Returns (session, messages, is_new)."""
+    """Get existing session or create new one. Returns (session, messages, is_new).
+
+    Updates to an existing session are left to the caller's commit. A new
+    session is committed right away, before session_start announces it, so it
+    persists even if the provider call then fails.
+    """
     if session_id:
-        # Try to load existing session
-        result = await db.execute(
-            select(DBSession)
-            .options(selectinload(DBSession.messages))
-            .where(DBSession.id == session_id)
-        )
+        # Deferred writes of the previous turn must land before history is read
+        await wait_for_session_writes(session_id)
+        # Try to load existing session (its history comes from the context cache)
+        result = await db.execute(select(DBSession).where(DBSession.id == session_id))
         session = result.scalar_one_or_none()
         if session:
             # Update models_used and providers_used arrays
@@ -600,12 +657,20 @@ async def _get_or_create_session(
             # Update agent_slug if provided and not already set
             if agent_slug and not session.agent_slug:
                 session.agent_slug = agent_slug
-            await db.commit()
             # Load existing messages as context
-            context_messages = [
-                Message(role=m.role, content=m.content)
-                for m in sorted(session.messages, key=lambda x: x.created_at)
-            ]
+            context = await get_session_context_cache().load(
+                db, session_id, get_context_limit(model)
+            )
+            context_messages = []
+            for m in context.messages:
+                # Stored counts spare re-encoding history when the request is counted
+                prime_message_tokens(m.role, m.content, m.tokens)
+                context_messages.append(
+                    Message(
+                        role=cast(Literal["user", "assistant", "system"], m.role),
+                        content=m.content,
+                    )
+                )
             return session, context_messages, False
 
     # Create new session
@@ -630,73 +695,49 @@ async def _get_or_create_session(
     return session, [], True
 
 
-def _normalize_content_for_storage(content: str | list[Any]) -> str:
-    """Normalize message content for database storage.
+def _message_pairs(
+    messages: list[MessageInput] | None,
+) -> list[tuple[str, str | list[Any]]]:
+    """(role, content) of request messages, for a CompletionWrite."""
+    return [(m.role, m.content) for m in messages or []]
 
-    Multi-modal content (list of text/image blocks) is serialized to JSON.
-    """
-    if isinstance(content, list):
-        import json
 
-        return json.dumps(content)
-    return content
+def _cache_metrics_dict(cache_metrics: CacheMetrics | None) -> dict[str, int] | None:
+    """Prompt-cache token counts to record in the session's provider metadata."""
+    if cache_metrics is None:
+        return None
+    return {
+        "cache_creation_input_tokens": cache_metrics.cache_creation_input_tokens,
+        "cache_read_input_tokens": cache_metrics.cache_read_input_tokens,
+    }
 
 
-async def _save_messages(
-    db: AsyncSession,
-    session_id: str,
-    user_messages: list[MessageInput],
-    assistant_content: str,
-    input_tokens: int,
-    output_tokens: int,
-    model_used: str | None = None,
-) -> None:
-    """Save user messages and assistant response to database."""
-    # Save user messages (only new ones - last message typically)
-    for msg in user_messages:
-        if msg.role in ("user", "system"):
-            db_msg = DBMessage(
-                session_id=session_id,
-                role=msg.role,
-                content=_normalize_content_for_storage(msg.content),
-            )
-            db.add(db_msg)
-
-    # Save assistant response
-    db_msg = DBMessage(
-        session_id=session_id,
-        role="assistant",
-        content=assistant_content,
-        tokens=output_tokens,
-        model_used=model_used,
-    )
-    db.add(db_msg)
-    await db.commit()
+async def _complete_coalesced(
+    cache: ResponseCache,
+    model: str,
+    messages: list[dict[str, Any]],
+    temperature: float,
+    fn: Callable[[], Awaitable[CompletionResult]],
+    **params: Any,
+) -> tuple[CompletionResult, bool]:
+    """Run a provider call once for all identical in-flight requests.
 
+    Args:
+        cache: Response cache whose key identifies identical requests
+        model: Model identifier
+        messages: Messages sent to the provider
+        temperature: Sampling temperature
+        fn: Coroutine factory performing the provider call
+        **params: Other parameters that change the response
 
-async def _update_provider_metadata(
-    db: AsyncSession,
-    session: DBSession,
-    cache_metrics: dict[str, Any] | None,
-) -> None:
-    """Update session with provider-specific metadata like cache info."""
-    if not cache_metrics:
-        return
-
-    # Merge with existing metadata
-    existing = session.provider_metadata or {}
-    existing["cache"] = {
-        "last_cache_creation_tokens": cache_metrics.get("cache_creation_input_tokens", 0),
-        "last_cache_read_tokens": cache_metrics.get("cache_read_input_tokens", 0),
-        "total_cache_creation_tokens": existing.get("cache", {}).get(
-            "total_cache_creation_tokens", 0
-        )
-        + cache_metrics.get("cache_creation_input_tokens", 0),
-        "total_cache_read_tokens": existing.get("cache", {}).get("total_cache_read_tokens", 0)
-        + cache_metrics.get("cache_read_input_tokens", 0),
-    }
-    session.provider_metadata = existing
-    await db.commit()
+    Returns:
+        Tuple of (result, coalesced)
+    """
+    if not settings.request_coalescing_enabled:
+        return await fn(), False
+    base_key = cache._generate_cache_key(model, cast(list[dict[str, str]], messages), temperature)
+    coalescer = get_request_coalescer()
+    return await coalescer.run(coalescer.make_key(base_key, **params), fn)
 
 
 async def complete_internal(
@@ -721,7 +762,9 @@ async def complete_internal(
     container_id: str | None = None,
     response_format: dict[str, Any] | None = None,
     skip_cache: bool = False,
+    skip_semantic_cache: bool = False,
     user_messages_for_db: list[MessageInput] | None = None,
+    persist: bool = True,
 ) -> CompletionInternalResult:
     """Core completion logic reusable by /complete and run_agent.
 
@@ -746,8 +789,11 @@ async def complete_internal(
         enable_programmatic_tools: Enable code execution tools
         container_id: Container ID for code execution
         response_format: Response format spec for JSON mode
-        skip_cache: Skip response cache lookup
+        skip_cache: Skip response cache lookup and request coalescing
+        skip_semantic_cache: Skip only the semantic (similarity) cache tier
         user_messages_for_db: Original user messages to save to DB
+        persist: Persist the completion before returning; if False the caller
+            persists result.pending_write (e.g. together with its own writes)
 
     Returns:
         CompletionInternalResult with content, session_id, memory_uuids, cited_uuids
@@ -806,32 +852,26 @@ async def complete_internal(
             model=model,
             messages=messages_dict,
             temperature=temperature,
+            agent_slug=agent_slug,
+            semantic=not skip_semantic_cache,
         )
         if cached:
             logger.info(f"complete_internal: returning cached response for {model}")
-            if user_messages_for_db:
-                await _save_messages(
-                    db,
-                    final_session_id,
-                    user_messages_for_db,
-                    cached.content,
-                    cached.input_tokens,
-                    cached.output_tokens,
-                    model_used=model,
-                )
             cost = estimate_cost(cached.input_tokens, cached.output_tokens, model)
-            await log_token_usage(
-                db,
-                final_session_id,
-                model,
-                cached.input_tokens,
-                cached.output_tokens,
-                cost.total_cost_usd,
-            )
-            await publish_complete(
-                final_session_id, cached.input_tokens, cached.output_tokens, cost.total_cost_usd
+            write = CompletionWrite(
+                session_id=final_session_id,
+                model=model,
+                provider=provider,
+                input_tokens=cached.input_tokens,
+                output_tokens=cached.output_tokens,
+                user_messages=_message_pairs(user_messages_for_db),
+                assistant_content=cached.content if user_messages_for_db else None,
+                cost_usd=cost.total_cost_usd,
+                publish_messages=False,
+                agent_slug=agent_slug,
             )
-            await db.commit()
+            if persist:
+                await persist_completion(db, write)
             return CompletionInternalResult(
                 content=cached.content,
                 model=cached.model,
@@ -843,24 +883,45 @@ async def complete_internal(
                 memory_uuids=loaded_memory_uuids,
                 cited_uuids=[],
                 from_cache=True,
+                pending_write=None if persist else write,
             )
 
     adapter = _get_adapter(provider)
     messages_for_adapter = [Message(role=m["role"], content=m["content"]) for m in messages_dict]
 
-    result = await adapter.complete(
-        messages=messages_for_adapter,
-        model=model,
-        max_tokens=None,
-        temperature=temperature,
-        enable_caching=enable_caching,
-        cache_ttl=cache_ttl,
-        thinking_level=thinking_level,
-        tools=tools,
-        enable_programmatic_tools=enable_programmatic_tools,
-        container_id=container_id,
-        response_format=response_format,
-    )
+    def _call_provider() -> Awaitable[CompletionResult]:
+        return adapter.complete(
+            messages=messages_for_adapter,
+            model=model,
+            max_tokens=None,
+            temperature=temperature,
+            enable_caching=enable_caching,
+            cache_ttl=cache_ttl,
+            thinking_level=thinking_level,
+            tools=tools,
+            enable_programmatic_tools=enable_programmatic_tools,
+            container_id=container_id,
+            response_format=response_format,
+        )
+
+    # Container-backed calls are stateful per caller, so never shared
+    coalesced = False
+    if skip_cache or container_id or enable_programmatic_tools:
+        result = await _call_provider()
+    else:
+        result, coalesced = await _complete_coalesced(
+            cache,
+            model,
+            messages_dict,
+            temperature,
+            _call_provider,
+            provider=provider,
+            thinking_level=thinking_level,
+            tools=tools,
+            response_format=response_format,
+        )
+        if coalesced:
+            logger.info(f"complete_internal: shared in-flight response for {model}")
 
     def _is_error_response(content: str) -> bool:
         error_indicators = [
@@ -873,7 +934,8 @@ async def complete_internal(
         content_lower = content.lower()
         return any(ind.lower() in content_lower for ind in error_indicators)
 
-    if not skip_cache and not _is_error_response(result.content):
+    # A coalesced result was already cached by its leader
+    if not skip_cache and not coalesced and not _is_error_response(result.content):
         await cache.set(
             model=model,
             messages=messages_dict,
@@ -883,48 +945,30 @@ async def complete_internal(
             input_tokens=result.input_tokens,
             output_tokens=result.output_tokens,
             finish_reason=result.finish_reason,
+            semantic=not skip_semantic_cache,
+            agent_slug=agent_slug,
+            project_id=project_id,
         )
 
-    if user_messages_for_db:
-        await _save_messages(
-            db,
-            final_session_id,
-            user_messages_for_db,
-            result.content,
-            result.input_tokens,
-            result.output_tokens,
-            model_used=model,
-        )
-        for msg in user_messages_for_db:
-            if msg.role in ("user", "system"):
-                content_str = msg.content if isinstance(msg.content, str) else str(msg.content)
-                await publish_message(final_session_id, msg.role, content_str)
-        await publish_message(final_session_id, "assistant", result.content, result.output_tokens)
-
+    # Messages, cost log, events and session updates commit as one unit
     cost = estimate_cost(result.input_tokens, result.output_tokens, model)
-    await log_token_usage(
-        db, final_session_id, model, result.input_tokens, result.output_tokens, cost.total_cost_usd
-    )
-    await publish_complete(
-        final_session_id, result.input_tokens, result.output_tokens, cost.total_cost_usd
+    write = CompletionWrite(
+        session_id=final_session_id,
+        model=model,
+        provider=provider,
+        input_tokens=result.input_tokens,
+        output_tokens=result.output_tokens,
+        user_messages=_message_pairs(user_messages_for_db),
+        assistant_content=result.content if user_messages_for_db else None,
+        cost_usd=cost.total_cost_usd,
+        cache_metrics=_cache_metrics_dict(result.cache_metrics),
+        agent_slug=agent_slug,
+        # Close one-shot sessions immediately (no continuation expected)
+        # Only for new completion-type sessions without a provided session_id
+        close_session=(is_new_session and session.session_type == "completion" and not session_id),
     )
-
-    if result.cache_metrics:
-        await _update_provider_metadata(
-            db,
-            session,
-            {
-                "cache_creation_input_tokens": result.cache_metrics.cache_creation_input_tokens,
-                "cache_read_input_tokens": result.cache_metrics.cache_read_input_tokens,
-            },
-        )
-
-    # Close one-shot sessions immediately (no continuation expected)
-    # Only for new completion-type sessions without a provided session_id
-    if is_new_session and session.session_type == "completion" and not session_id:
-        session.status = "completed"
-
-    await db.commit()
+    if persist:
+        await persist_completion(db, write)
 
     cited_uuids: list[str] = []
     if loaded_memory_uuids and result.content:
@@ -952,11 +996,13 @@ async def complete_internal(
         memory_uuids=loaded_memory_uuids,
         cited_uuids=cited_uuids,
         from_cache=False,
+        coalesced=coalesced,
         cache_metrics=result.cache_metrics,
         thinking_content=result.thinking_content,
         thinking_tokens=result.thinking_tokens,
         tool_calls=result.tool_calls,
         container=result.container,
+        pending_write=None if persist else write,
     )
 
 
@@ -1005,37 +1051,29 @@ async def _stream_completion(
                 if event.output_tokens is not None:
                     output_tokens = event.output_tokens
 
-                # Save messages to database
-                if db and user_messages and accumulated_content:
+                # Save messages and close one-shot sessions (no continuation
+                # expected) in one transaction
+                save_messages = bool(user_messages and accumulated_content)
+                close_session = is_new_session and is_one_shot
+                if db and (save_messages or close_session):
                     try:
-                        await _save_messages(
-                            db=db,
-                            session_id=session_id,
-                            user_messages=user_messages,
-                            assistant_content=accumulated_content,
-                            input_tokens=input_tokens,
-                            output_tokens=output_tokens,
-                            model_used=model,
+                        await persist_completion(
+                            db,
+                            CompletionWrite(
+                                session_id=session_id,
+                                model=model,
+                                provider=provider,
+                                input_tokens=input_tokens,
+                                output_tokens=output_tokens,
+                                user_messages=_message_pairs(user_messages),
+                                assistant_content=accumulated_content if save_messages else None,
+                                publish_messages=False,
+                                close_session=close_session,
+                            ),
                         )
-                        logger.info(f"Streaming: saved messages for session {session_id}")
+                        logger.info(f"Streaming: persisted completion for session {session_id}")
                     except Exception as save_err:
-                        logger.error(f"Failed to save streaming messages: {save_err}")
-
-                # Close one-shot streaming sessions (no continuation expected)
-                if db and is_new_session and is_one_shot:
-                    try:
-                        from sqlalchemy import select
-
-                        result = await db.execute(
-                            select(DBSession).where(DBSession.id == session_id)
-                        )
-                        session = result.scalar_one_or_none()
-                        if session:
-                            session.status = "completed"
-                            await db.commit()
-                            logger.info(f"Streaming: closed one-shot session {session_id}")
-                    except Exception as close_err:
-                        logger.error(f"Failed to close one-shot session: {close_err}")
+                        logger.error(f"Failed to persist streaming completion: {save_err}")
 
                 # Send final done event with all metadata
                 done_chunk = StreamingChunk(
@@ -1070,6 +1108,7 @@ async def complete(
     request: CompletionRequest,
     http_request: Request,
     x_skip_cache: Annotated[str | None, Header(alias="X-Skip-Cache")] = None,
+    x_skip_semantic_cache: Annotated[str | None, Header(alias="X-Skip-Semantic-Cache")] = None,
     db: Annotated[AsyncSession | None, Depends(get_db)] = None,
 ) -> CompletionResponse | StreamingResponse:
     """
@@ -1080,6 +1119,7 @@ async def complete(
 
     Headers:
         X-Skip-Cache: Set to "true" to bypass response cache
+        X-Skip-Semantic-Cache: Set to "true" to bypass only the semantic cache tier
     """
     # Validate: agent_slug is required (model parameter is deprecated)
     if not request.agent_slug:
@@ -1183,6 +1223,7 @@ async def complete(
             )
         provider = _get_provider(resolved_model)
     skip_cache = bool(x_skip_cache and x_skip_cache.lower() == "true")
+    skip_semantic_cache = bool(x_skip_semantic_cache and x_skip_semantic_cache.lower() == "true")
 
     # Check for @mention routing in the last user message (takes priority over header selection)
     mentioned_model = None
@@ -1195,6 +1236,9 @@ async def complete(
                 resolved_model = mentioned_model
                 provider = _get_provider(resolved_model)
 
+    # Enforce client and provider RPM/TPM (shared across workers)
+    rate_limits = await _enforce_rate_limits(http_request, provider, request.messages)
+
     # Handle streaming mode
     if request.stream:
         session_id = request.session_id or str(uuid.uuid4())
@@ -1372,7 +1416,7 @@ async def complete(
     # 2. Checkpointing work (git commit, task update) when approaching limits
     # 3. Starting a fresh session with targeted file reads
     # This preserves the external scaffolding pattern that enables long-running agents.
-    estimated_input_tokens = count_message_tokens(messages_dict)
+    estimated_input_tokens = await count_message_tokens_async(messages_dict)
     context_usage_info: ContextUsageInfo | None = None
     if db and session:
         can_proceed, ctx_usage = await check_context_before_request(
@@ -1403,35 +1447,29 @@ async def complete(
             model=resolved_model,
             messages=cast(list[dict[str, str]], messages_dict),
             temperature=request.temperature,
+            agent_slug=request.agent_slug,
+            semantic=not skip_semantic_cache,
         )
         if cached:
             logger.info(f"Returning cached response for {resolved_model}")
             # Always save to session (mandatory tracking)
             if db and session:
-                await _save_messages(
-                    db,
-                    session_id,
-                    request.messages,
-                    cached.content,
-                    cached.input_tokens,
-                    cached.output_tokens,
-                    model_used=resolved_model,
-                )
-                # Log token usage for cached response too
+                # Publish complete event for cached response (skip message events)
                 cost = estimate_cost(cached.input_tokens, cached.output_tokens, resolved_model)
-                await log_token_usage(
+                await persist_completion(
                     db,
-                    session_id,
-                    resolved_model,
-                    cached.input_tokens,
-                    cached.output_tokens,
-                    cost.total_cost_usd,
-                )
-                # Publish complete event for cached response (skip message events)
-                await publish_complete(
-                    session_id, cached.input_tokens, cached.output_tokens, cost.total_cost_usd
+                    CompletionWrite(
+                        session_id=session_id,
+                        model=resolved_model,
+                        provider=provider,
+                        input_tokens=cached.input_tokens,
+                        output_tokens=cached.output_tokens,
+                        user_messages=_message_pairs(request.messages),
+                        assistant_content=cached.content,
+                        cost_usd=cost.total_cost_usd,
+                        publish_messages=False,
+                    ),
                 )
-                await db.commit()
             # Build output_usage for cached response
             cached_output_usage = build_output_usage(
                 output_tokens=cached.output_tokens,
@@ -1509,6 +1547,9 @@ async def complete(
             for m in messages_dict
         ]
 
+        coalesced = False
+        pending_write: CompletionWrite | None = None
+
         # Use agent fallback chain if agent routing is enabled
         if resolved_agent and resolved_agent.agent.fallback_models:
             # Determine effective temperature (agent config takes precedence)
@@ -1551,7 +1592,9 @@ async def complete(
                     cache_ttl=request.cache_ttl,
                     thinking_level=thinking_level,
                     skip_cache=skip_cache,
+                    skip_semantic_cache=skip_semantic_cache,
                     user_messages_for_db=request.messages,
+                    persist=False,
                 )
                 # Convert internal result to CompletionResult for unified handling
                 result = CompletionResult(
@@ -1568,15 +1611,19 @@ async def complete(
                     container=internal_result.container,
                 )
                 model_used = resolved_model
+                coalesced = internal_result.coalesced
                 # Track citations from internal result
                 loaded_memory_uuids = internal_result.memory_uuids
-                # Session was already created by complete_internal
+                # Session was already created by complete_internal, which
+                # leaves its write to us so the truncation event joins it
                 session_id = internal_result.session_id
+                pending_write = internal_result.pending_write
             else:
                 # Standard completion with tools or special features
                 debug(f"LLM request: model={resolved_model}, messages={len(messages_for_adapter)}")
-                async with debug_async_timer(f"adapter.complete ({resolved_model})"):
-                    result = await adapter.complete(
+
+                def _call_provider() -> Awaitable[CompletionResult]:
+                    return adapter.complete(
                         messages=messages_for_adapter,
                         model=resolved_model,
                         max_tokens=None,
@@ -1589,6 +1636,23 @@ async def complete(
                         container_id=request.container_id,
                         response_format=response_format_dict,
                     )
+
+                async with debug_async_timer(f"adapter.complete ({resolved_model})"):
+                    # Container-backed calls are stateful per caller, so never shared
+                    if skip_cache or request.container_id or request.enable_programmatic_tools:
+                        result = await _call_provider()
+                    else:
+                        result, coalesced = await _complete_coalesced(
+                            cache,
+                            resolved_model,
+                            messages_dict,
+                            request.temperature,
+                            _call_provider,
+                            provider=provider,
+                            thinking_level=thinking_level,
+                            tools=tools_api,
+                            response_format=response_format_dict,
+                        )
                 debug(f"LLM response: tokens={result.input_tokens}+{result.output_tokens}")
                 model_used = resolved_model
 
@@ -1622,8 +1686,17 @@ async def complete(
             content_lower = content.lower()
             return any(ind.lower() in content_lower for ind in error_indicators)
 
-        # Cache the response for future identical requests (but NOT errors)
-        if not skip_cache and not _is_error_response(result.content):
+        # Charge output tokens to the TPM buckets (shared results cost nothing)
+        if not coalesced and rate_limits:
+            await get_distributed_rate_limiter().charge(
+                token_limits(rate_limits, result.output_tokens)
+            )
+
+        # Cache the response for future identical requests (but NOT errors);
+        # coalesced results were already cached by their leader
+        if coalesced:
+            logger.info(f"DEBUG[{request_hash}] Shared in-flight response for {resolved_model}")
+        elif not skip_cache and not _is_error_response(result.content):
             await cache.set(
                 model=resolved_model,
                 messages=cast(list[dict[str, str]], messages_dict),
@@ -1633,55 +1706,30 @@ async def complete(
                 input_tokens=result.input_tokens,
                 output_tokens=result.output_tokens,
                 finish_reason=result.finish_reason,
+                semantic=not skip_semantic_cache,
+                agent_slug=request.agent_slug,
+                project_id=request.project_id,
             )
         elif _is_error_response(result.content):
             logger.warning(
                 f"Not caching error response for {request.model}: {result.content[:100]}..."
             )
 
-        # Always save messages to database (mandatory tracking)
-        if db and session:
-            await _save_messages(
-                db,
-                session_id,
-                request.messages,
-                result.content,
-                result.input_tokens,
-                result.output_tokens,
-                model_used=resolved_model,
-            )
-            # Publish message events for user input and assistant response
-            for msg in request.messages:
-                if msg.role in ("user", "system"):
-                    content_str = msg.content if isinstance(msg.content, str) else str(msg.content)
-                    await publish_message(session_id, msg.role, content_str)
-            await publish_message(session_id, "assistant", result.content, result.output_tokens)
-
-            # Log token usage for cost tracking
+        # Always save messages to database (mandatory tracking); the write is
+        # persisted once output usage is known so it includes truncation
+        if db and session and pending_write is None:
             cost = estimate_cost(result.input_tokens, result.output_tokens, resolved_model)
-            await log_token_usage(
-                db,
-                session_id,
-                resolved_model,
-                result.input_tokens,
-                result.output_tokens,
-                cost.total_cost_usd,
-            )
-            # Publish complete event
-            await publish_complete(
-                session_id, result.input_tokens, result.output_tokens, cost.total_cost_usd
+            pending_write = CompletionWrite(
+                session_id=session_id,
+                model=resolved_model,
+                provider=provider,
+                input_tokens=result.input_tokens,
+                output_tokens=result.output_tokens,
+                user_messages=_message_pairs(request.messages),
+                assistant_content=result.content,
+                cost_usd=cost.total_cost_usd,
+                cache_metrics=_cache_metrics_dict(result.cache_metrics),
             )
-            # Update provider metadata (cache info, etc.)
-            if result.cache_metrics:
-                await _update_provider_metadata(
-                    db,
-                    session,
-                    {
-                        "cache_creation_input_tokens": result.cache_metrics.cache_creation_input_tokens,
-                        "cache_read_input_tokens": result.cache_metrics.cache_read_input_tokens,
-                    },
-                )
-            await db.commit()
 
         # Build cache info if available
         cache_info = None
@@ -1746,9 +1794,9 @@ async def complete(
         )
 
         # Log truncation event for telemetry
-        if output_usage.was_truncated and db:
-            truncation_event = TruncationEvent(
-                session_id=session_id if session else None,
+        if output_usage.was_truncated and pending_write is not None:
+            pending_write.truncation = TruncationEvent(
+                session_id=session_id,
                 model=resolved_model,
                 endpoint="complete",
                 max_tokens_requested=None,
@@ -1757,12 +1805,13 @@ async def complete(
                 was_capped=0,
                 project_id=request.project_id,
             )
-            db.add(truncation_event)
-            await db.commit()
             logger.info(
                 f"Response truncated: model={resolved_model}, tokens={result.output_tokens}"
             )
 
+        if db and pending_write is not None:
+            await persist_completion(db, pending_write)
+
         # Track cited memory rules from response
         if loaded_memory_uuids and result.content:
             try:
@@ -1899,7 +1948,7 @@ async def estimate(request: EstimateRequest) -> EstimateResponse:
     resolved_model = resolve_model(request.model)
     messages_dict = [{"role": m.role, "content": m.content} for m in request.messages]
 
-    estimate_result = estimate_request(
+    estimate_result = await estimate_request_async(
         messages=cast(list[dict[str, str]], messages_dict),
         model=resolved_model,
     )
@@ -9,7 +9,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.orchestration_models import AgentProgressInfo, AgentRunRequest, AgentRunResponse
 from app.db import get_db
 from app.models import Message as DBMessage
+from app.services.completion_writer import add_message_rollups
+from app.services.session_context_cache import get_session_context_cache
 from app.services.telemetry import get_current_trace_id
+from app.services.token_counter import count_single_message_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -99,34 +102,44 @@ async def run_agent(
 
     # Save messages to database for session history
     if db and result.session_id:
+        db_messages = []
         # Save system message if present
         if system_prompt:
-            db_msg = DBMessage(
-                session_id=result.session_id,
-                role="system",
-                content=system_prompt,
+            db_messages.append(
+                DBMessage(
+                    session_id=result.session_id,
+                    role="system",
+                    content=system_prompt,
+                    context_tokens=count_single_message_tokens("system", system_prompt),
+                )
             )
-            db.add(db_msg)
 
         # Save user task
-        db_msg = DBMessage(
-            session_id=result.session_id,
-            role="user",
-            content=request.task,
+        db_messages.append(
+            DBMessage(
+                session_id=result.session_id,
+                role="user",
+                content=request.task,
+                context_tokens=count_single_message_tokens("user", request.task),
+            )
         )
-        db.add(db_msg)
 
         # Save assistant response
-        db_msg = DBMessage(
-            session_id=result.session_id,
-            role="assistant",
-            content=result.content,
-            tokens=result.output_tokens,
-            model_used=result.model,
+        db_messages.append(
+            DBMessage(
+                session_id=result.session_id,
+                role="assistant",
+                content=result.content,
+                tokens=result.output_tokens,
+                context_tokens=count_single_message_tokens("assistant", result.content),
+                model_used=result.model,
+            )
         )
-        db.add(db_msg)
+        db.add_all(db_messages)
+        await add_message_rollups(db, result.session_id, db_messages)
 
         await db.commit()
+        await get_session_context_cache().invalidate(result.session_id)
 
     return AgentRunResponse(
         agent_id=result.agent_id,
@@ -27,6 +27,9 @@ class SubscribeRequest(BaseModel):
     event_types: list[str] | None = Field(
         default=None, description="Event types to filter (empty = all)"
     )
+    last_event_id: str | None = Field(
+        default=None, description="Resume after this event ID (subscribe only)"
+    )
 
 
 class SubscribeResponse(BaseModel):
@@ -48,9 +51,13 @@ async def events_websocket(websocket: WebSocket) -> None:
        - session_ids: optional, filters to specific sessions. Empty/null = all sessions.
        - event_types: optional, filters to specific event types. Empty/null = all types.
          Valid types: session_start, message, tool_use, complete, error
+       - last_event_id: optional, the event_id of the last event received on a
+         previous connection. Matching events published since are replayed first
+         (as far back as the event stream retains them).
     3. Server responds: {"type": "subscribed", "subscription_id": "..."}
     4. Server pushes events as they occur:
-       {"event_type": "...", "session_id": "...", "timestamp": "...", "data": {...}}
+       {"event_type": "...", "session_id": "...", "timestamp": "...", "data": {...},
+        "event_id": "..."}
     5. Client can update filters: {"type": "update", "session_ids": [...], "event_types": [...]}
     6. Client can unsubscribe: {"type": "unsubscribe"}
     7. Connection closes on client disconnect or unsubscribe
@@ -99,6 +106,7 @@ async def events_websocket(websocket: WebSocket) -> None:
                         websocket=websocket,
                         session_ids=session_ids if session_ids else None,
                         event_types=event_types if event_types else None,
+                        last_event_id=data.get("last_event_id"),
                     )
 
                     await websocket.send_json(
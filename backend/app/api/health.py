@@ -280,6 +280,10 @@ async def metrics(db: DbDep) -> Response:
     thrashing_events = 0
     circuit_trips = 0
     circuit_state_lines: list[str] = []
+    window_state_lines: list[str] = []
+    window_error_rate_lines: list[str] = []
+    window_p95_lines: list[str] = []
+    hedge_lines: list[str] = []
     try:
         from app.services.router import get_router, get_thrashing_metrics
 
@@ -295,9 +299,218 @@ async def metrics(db: DbDep) -> Response:
             circuit_state_lines.append(
                 f'agent_hub_circuit_state{{provider="{provider}"}} {state_val}'
             )
+        for key, window in router_instance.get_circuit_window_status().items():
+            provider, _, model = key.partition("/")
+            labels = f'provider="{provider}",model="{model}"'
+            state_val = {"closed": 0, "half_open": 1, "open": 2}.get(cast(str, window["state"]), -1)
+            window_state_lines.append(f"agent_hub_circuit_window_state{{{labels}}} {state_val}")
+            window_error_rate_lines.append(
+                f"agent_hub_circuit_window_error_rate{{{labels}}} {window['error_rate']:.4f}"
+            )
+            window_p95_lines.append(
+                f"agent_hub_circuit_window_p95_ms{{{labels}}} {window['p95_ms']:.1f}"
+            )
+
+        hedge_stats = router_instance.get_hedge_stats()
+        hedge_lines = [
+            "# HELP agent_hub_hedged_requests_total Requests raced against a fallback provider",
+            "# TYPE agent_hub_hedged_requests_total counter",
+            f"agent_hub_hedged_requests_total {hedge_stats.hedged}",
+            "",
+            "# HELP agent_hub_hedge_wins_total Hedged requests served by the fallback provider",
+            "# TYPE agent_hub_hedge_wins_total counter",
+            f"agent_hub_hedge_wins_total {hedge_stats.hedge_wins}",
+            "",
+            "# HELP agent_hub_hedge_win_rate Fraction of hedged requests won by the fallback",
+            "# TYPE agent_hub_hedge_win_rate gauge",
+            f"agent_hub_hedge_win_rate {hedge_stats.win_rate:.4f}",
+            "",
+            "# HELP agent_hub_hedge_budget_denied_total Hedges skipped by the per-agent budget",
+            "# TYPE agent_hub_hedge_budget_denied_total counter",
+            f"agent_hub_hedge_budget_denied_total {hedge_stats.budget_denied}",
+            "",
+            "# HELP agent_hub_hedge_extra_cost_usd Estimated cost of cancelled duplicate calls",
+            "# TYPE agent_hub_hedge_extra_cost_usd counter",
+            f"agent_hub_hedge_extra_cost_usd {hedge_stats.extra_cost_usd:.6f}",
+            "",
+        ]
     except Exception as e:
         logger.warning(f"Failed to get thrashing metrics: {e}")
 
+    # Claude CLI warm pool metrics
+    pool_lines: list[str] = []
+    from app.adapters.claude_pool import get_claude_pool_stats
+
+    pool_stats = get_claude_pool_stats()
+    if pool_stats:
+        for model, counts in pool_stats["models"].items():
+            for key in ("live", "idle", "in_use"):
+                pool_lines.append(
+                    f'agent_hub_claude_pool_workers{{model="{model}",state="{key}"}} {counts[key]}'
+                )
+        pool_lines.append(f"agent_hub_claude_pool_waiting {pool_stats['waiting']}")
+        for key in ("warm_checkouts", "cold_checkouts", "exhausted", "spawned", "retired"):
+            pool_lines.append(f"agent_hub_claude_pool_{key}_total {pool_stats[key]}")
+
+    # Batched request log writer metrics
+    request_log_lines: list[str] = []
+    from app.services.request_log_writer import get_request_log_writer_stats
+
+    log_stats = get_request_log_writer_stats()
+    if log_stats:
+        request_log_lines.append(f"agent_hub_request_log_pending {log_stats['pending']}")
+        for key in ("written", "dropped", "failed"):
+            request_log_lines.append(f"agent_hub_request_log_{key}_total {log_stats[key]}")
+
+    # Deferred completion writer metrics
+    completion_write_lines: list[str] = []
+    from app.services.completion_writer import get_completion_writer_stats
+
+    writer_stats = get_completion_writer_stats()
+    if writer_stats:
+        completion_write_lines.append(
+            f"agent_hub_completion_writes_pending {writer_stats['pending']}"
+        )
+        for key in ("written", "failed", "overflowed"):
+            completion_write_lines.append(
+                f"agent_hub_completion_writes_{key}_total {writer_stats[key]}"
+            )
+
+    # Webhook delivery metrics (per webhook)
+    from app.services.webhooks import get_webhook_dispatcher
+
+    webhook_lines: list[str] = []
+    for webhook_id, hook_stats in get_webhook_dispatcher().get_stats().items():
+        label = f'webhook_id="{webhook_id}"'
+        webhook_lines += [
+            f"agent_hub_webhook_deliveries_total{{{label}}} {hook_stats.deliveries}",
+            f"agent_hub_webhook_events_total{{{label}}} {hook_stats.events}",
+            f"agent_hub_webhook_failures_total{{{label}}} {hook_stats.failures}",
+            f"agent_hub_webhook_latency_avg_ms{{{label}}} {hook_stats.avg_ms:.1f}",
+            f"agent_hub_webhook_latency_p95_ms{{{label}}} {hook_stats.p95_ms:.1f}",
+        ]
+    from app.services.webhook_outbox import get_outbox_relay
+
+    relay = get_outbox_relay()
+    if relay is not None:
+        relay_stats = relay.get_stats()
+        webhook_lines += [
+            f"agent_hub_webhook_outbox_delivered_total {relay_stats.delivered}",
+            f"agent_hub_webhook_outbox_failed_total {relay_stats.failed}",
+            f"agent_hub_webhook_outbox_dead_total {relay_stats.dead}",
+            f"agent_hub_webhook_outbox_relay_errors_total {relay_stats.errors}",
+        ]
+
+    # Response cache metrics (L1 in-process, L2 Redis)
+    from app.services.response_cache import get_response_cache
+
+    response_cache = get_response_cache()
+    cache_stats = response_cache.get_stats()
+    cache_lines = [
+        f'agent_hub_response_cache_hits_total{{level="l1"}} {cache_stats.l1_hits}',
+        f'agent_hub_response_cache_hits_total{{level="l2"}} {cache_stats.l2_hits}',
+        f"agent_hub_response_cache_misses_total {cache_stats.misses}",
+        f"agent_hub_response_cache_l1_evictions_total {cache_stats.l1_evictions}",
+    ]
+    l1_info = response_cache.get_l1_info()
+    if l1_info:
+        cache_lines.append(f"agent_hub_response_cache_l1_bytes {l1_info['bytes']}")
+    semantic_stats = response_cache.get_semantic_stats()
+    if semantic_stats is not None:
+        cache_lines += [
+            f'agent_hub_response_cache_hits_total{{level="semantic"}} {semantic_stats.hits}',
+            f"agent_hub_response_cache_semantic_misses_total {semantic_stats.misses}",
+            f"agent_hub_response_cache_semantic_evictions_total {semantic_stats.evictions}",
+            f"agent_hub_response_cache_semantic_entries {response_cache.get_semantic_info()['entries']}",
+        ]
+
+    # Session context cache metrics
+    from app.services.session_context_cache import get_session_context_cache
+
+    context_cache = get_session_context_cache()
+    context_stats = context_cache.get_stats()
+    context_cache_lines = [
+        f'agent_hub_session_context_hits_total{{level="l1"}} {context_stats.l1_hits}',
+        f'agent_hub_session_context_hits_total{{level="redis"}} {context_stats.redis_hits}',
+        f"agent_hub_session_context_db_loads_total {context_stats.db_loads}",
+        f"agent_hub_session_context_appends_total {context_stats.appends}",
+        f"agent_hub_session_context_invalidations_total {context_stats.invalidations}",
+        f"agent_hub_session_context_l1_sessions {context_cache.l1_size}",
+    ]
+
+    # Request coalescing (single-flight) metrics
+    from app.services.request_coalescer import get_request_coalescer
+
+    coalescer = get_request_coalescer()
+    coalesce_stats = coalescer.get_stats()
+    coalesce_lines = [
+        f'agent_hub_coalesced_requests_total{{scope="local"}} {coalesce_stats.coalesced_local}',
+        f'agent_hub_coalesced_requests_total{{scope="remote"}} {coalesce_stats.coalesced_remote}',
+        f"agent_hub_coalesce_leaders_total {coalesce_stats.leaders}",
+        f"agent_hub_coalesce_remote_fallbacks_total {coalesce_stats.remote_fallbacks}",
+        f"agent_hub_coalesce_inflight {coalescer.inflight}",
+    ]
+
+    # Distributed rate limiter metrics
+    from app.services.distributed_rate_limiter import get_distributed_rate_limiter
+
+    rate_limit_stats = get_distributed_rate_limiter().get_stats()
+    rate_limit_lines = [
+        f'agent_hub_rate_limit_decisions_total{{outcome="allowed"}} {rate_limit_stats.allowed}',
+        f'agent_hub_rate_limit_decisions_total{{outcome="rejected"}} {rate_limit_stats.rejected}',
+        f"agent_hub_rate_limit_local_fallbacks_total {rate_limit_stats.local_fallbacks}",
+    ]
+
+    # Adaptive provider concurrency limits
+    from app.adapters.concurrency_limiter import get_concurrency_limiter
+
+    concurrency_status = get_concurrency_limiter().get_status().values()
+    concurrency_lines: list[str] = []
+    for name, key, kind, help_text in (
+        ("limit", "limit", "gauge", "Current adaptive concurrency limit per provider/model"),
+        ("in_flight", "in_flight", "gauge", "Provider calls holding a concurrency slot"),
+        ("queue_depth", "queued", "gauge", "Provider calls waiting for a concurrency slot"),
+        ("rejected_total", "rejected", "counter", "Provider calls that got no slot in time"),
+    ):
+        concurrency_lines += [
+            f"# HELP agent_hub_provider_concurrency_{name} {help_text}",
+            f"# TYPE agent_hub_provider_concurrency_{name} {kind}",
+        ]
+        for status in concurrency_status:
+            labels = f'provider="{status["provider"]}",model="{status["model"]}"'
+            concurrency_lines.append(
+                f"agent_hub_provider_concurrency_{name}{{{labels}}} {status[key]}"
+            )
+        concurrency_lines.append("")
+
+    # Session event fan-out metrics
+    from app.services.events import get_event_publisher
+
+    event_publisher = get_event_publisher()
+    event_stats = event_publisher.get_stats()
+    queue_depths = event_publisher.get_queue_depths().values()
+    event_lines = [
+        f"agent_hub_event_queue_depth {sum(queue_depths)}",
+        f"agent_hub_event_queue_depth_max {max(queue_depths, default=0)}",
+        f"agent_hub_event_subscribers {len(queue_depths)}",
+        f"agent_hub_events_published_total {event_stats.published}",
+        f"agent_hub_event_deliveries_sent_total {event_stats.sent}",
+        f"agent_hub_event_deliveries_dropped_total {event_stats.dropped}",
+        f"agent_hub_event_slow_disconnects_total {event_stats.slow_disconnects}",
+        f"agent_hub_event_send_failures_total {event_stats.send_failures}",
+    ]
+    backend_stats = getattr(event_publisher.backend, "get_stats", None)
+    if backend_stats is not None:
+        stream_stats = backend_stats()
+        event_lines += [
+            f"agent_hub_event_stream_pending {getattr(event_publisher.backend, 'pending', 0)}",
+            f"agent_hub_event_stream_appended_total {stream_stats.appended}",
+            f"agent_hub_event_stream_local_fallbacks_total {stream_stats.local_fallbacks}",
+            f"agent_hub_event_stream_handled_total {stream_stats.handled}",
+            f"agent_hub_event_stream_claimed_total {stream_stats.claimed}",
+            f"agent_hub_event_stream_read_errors_total {stream_stats.read_errors}",
+        ]
+
     # Build Prometheus format output
     lines = [
         "# HELP agent_hub_requests_total Total number of requests",
@@ -333,6 +546,56 @@ async def metrics(db: DbDep) -> Response:
         "# TYPE agent_hub_circuit_state gauge",
         *circuit_state_lines,
         "",
+        "# HELP agent_hub_circuit_window_state Provider/model window circuit state",
+        "# TYPE agent_hub_circuit_window_state gauge",
+        *window_state_lines,
+        "",
+        "# HELP agent_hub_circuit_window_error_rate Provider/model error rate over the window",
+        "# TYPE agent_hub_circuit_window_error_rate gauge",
+        *window_error_rate_lines,
+        "",
+        "# HELP agent_hub_circuit_window_p95_ms Provider/model p95 latency over the window",
+        "# TYPE agent_hub_circuit_window_p95_ms gauge",
+        *window_p95_lines,
+        "",
+        *hedge_lines,
+        "# HELP agent_hub_claude_pool_workers Claude CLI pool workers by state",
+        "# TYPE agent_hub_claude_pool_workers gauge",
+        *pool_lines,
+        "",
+        "# HELP agent_hub_response_cache_hits_total Response cache hits by level",
+        "# TYPE agent_hub_response_cache_hits_total counter",
+        *cache_lines,
+        "",
+        "# HELP agent_hub_coalesced_requests_total Requests served by an identical in-flight request",
+        "# TYPE agent_hub_coalesced_requests_total counter",
+        *coalesce_lines,
+        "",
+        "# HELP agent_hub_session_context_hits_total Session context loads served from cache",
+        "# TYPE agent_hub_session_context_hits_total counter",
+        *context_cache_lines,
+        "",
+        "# HELP agent_hub_rate_limit_decisions_total Client/API key/provider rate limit checks",
+        "# TYPE agent_hub_rate_limit_decisions_total counter",
+        *rate_limit_lines,
+        "",
+        *concurrency_lines,
+        "# HELP agent_hub_event_queue_depth Session events queued for WebSocket subscribers",
+        "# TYPE agent_hub_event_queue_depth gauge",
+        *event_lines,
+        "",
+        "# HELP agent_hub_webhook_deliveries_total Webhook POSTs attempted (batches count once)",
+        "# TYPE agent_hub_webhook_deliveries_total counter",
+        *webhook_lines,
+        "",
+        "# HELP agent_hub_request_log_pending Request log rows queued for batched insert",
+        "# TYPE agent_hub_request_log_pending gauge",
+        *request_log_lines,
+        "",
+        "# HELP agent_hub_completion_writes_pending Deferred completion writes not yet committed",
+        "# TYPE agent_hub_completion_writes_pending gauge",
+        *completion_write_lines,
+        "",
     ]
 
     return Response(
@@ -218,3 +218,11 @@ async def get_memory_metrics(
             status_code=500,
             detail=f"Failed to get metrics: {e}",
         ) from e
+
+
+@router.get("/context-cache")
+async def get_context_cache_stats() -> dict[str, Any]:
+    """Get compiled memory-context snapshot cache statistics for this worker."""
+    from app.services.memory.context_snapshot import get_context_snapshot_cache
+
+    return get_context_snapshot_cache().get_stats()
@@ -1,20 +1,26 @@
 """Sessions API - CRUD operations for conversation sessions."""
 
+import base64
+import json
+import logging
 import uuid
 from datetime import datetime
-from typing import Annotated, Any
+from typing import Annotated, Any, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, Field
-from sqlalchemy import func, select
+from sqlalchemy import Select, func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.db import get_db
-from app.models import Message, Session
+from app.models import Session
 from app.services.agent_routing import resolve_agent
-from app.services.context_tracker import calculate_context_usage
+from app.services.context_tracker import context_usage_from_session
 from app.services.events import publish_session_start
+from app.services.session_context_cache import get_session_context_cache
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -72,6 +78,12 @@ class ContextUsageResponse(BaseModel):
     percent_used: float = Field(..., description="Percentage of context used")
     remaining_tokens: int = Field(..., description="Tokens available")
     warning: str | None = Field(default=None, description="Warning if approaching limit")
+    cumulative_input_tokens: int = Field(
+        default=0, description="Provider-reported input tokens over all requests"
+    )
+    cumulative_output_tokens: int = Field(
+        default=0, description="Provider-reported output tokens over all requests"
+    )
 
 
 class SessionResponse(BaseModel):
@@ -118,9 +130,15 @@ class SessionListResponse(BaseModel):
     """Response body for listing sessions."""
 
     sessions: list[SessionListItem]
-    total: int
+    total: int | None = Field(default=None, description="Matching sessions (None when count=none)")
+    total_is_estimate: bool = Field(
+        default=False, description="Whether total is the query planner's estimate"
+    )
     page: int
     page_size: int
+    next_cursor: str | None = Field(
+        default=None, description="Cursor for the next page (None on the last page)"
+    )
 
 
 @router.post("/sessions", response_model=SessionResponse, status_code=201)
@@ -186,14 +204,16 @@ async def get_session(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Calculate context usage
-    ctx_usage = await calculate_context_usage(db, session_id, session.model)
+    # Context usage from the session's running usage record
+    ctx_usage = context_usage_from_session(session)
     context_usage_response = ContextUsageResponse(
         used_tokens=ctx_usage.used_tokens,
         limit_tokens=ctx_usage.limit_tokens,
         percent_used=ctx_usage.percent_used,
         remaining_tokens=ctx_usage.remaining_tokens,
         warning=ctx_usage.warning,
+        cumulative_input_tokens=ctx_usage.cumulative_input_tokens,
+        cumulative_output_tokens=ctx_usage.cumulative_output_tokens,
     )
 
     # Calculate agent token breakdown for multi-agent sessions
@@ -281,6 +301,67 @@ async def delete_session(
     # Mark as completed rather than hard delete
     session.status = "completed"
     await db.commit()
+    await get_session_context_cache().invalidate(session_id)
+
+
+# Session list columns (the JSON metadata columns are not needed for the list)
+_LIST_COLUMNS = (
+    Session.id,
+    Session.project_id,
+    Session.provider,
+    Session.model,
+    Session.status,
+    Session.agent_slug,
+    Session.session_type,
+    Session.message_count,
+    Session.total_input_tokens,
+    Session.total_output_tokens,
+    Session.created_at,
+    Session.updated_at,
+)
+
+
+def encode_session_cursor(created_at: datetime, session_id: str) -> str:
+    """Opaque cursor for the session list position after (created_at, id)."""
+    raw = json.dumps([created_at.isoformat(), session_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_session_cursor(cursor: str) -> tuple[datetime, str]:
+    """Inverse of encode_session_cursor; raises 400 for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, session_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(session_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+async def _estimate_rows(db: AsyncSession, query: Select[Any]) -> int | None:
+    """
+    Planner's row estimate for query, from EXPLAIN (no rows are read).
+
+    Returns None when the estimate is unavailable (non-PostgreSQL database or
+    EXPLAIN failure), so the caller can fall back to an exact count.
+    """
+    try:
+        conn = await db.connection()
+        if conn.dialect.name != "postgresql":
+            return None
+        compiled = query.compile(dialect=conn.dialect)
+        params: Any = compiled.params
+        if compiled.positiontup is not None:
+            params = tuple(compiled.params[name] for name in compiled.positiontup)
+        # Savepoint, so a failed EXPLAIN doesn't abort the request's transaction
+        async with db.begin_nested():
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+            plan: Any = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.warning(f"Session count estimate failed, counting exactly: {e}")
+        return None
 
 
 @router.get("/sessions", response_model=SessionListResponse)
@@ -290,73 +371,69 @@ async def list_sessions(
     status: Annotated[str | None, Query(description="Filter by status")] = None,
     agent_slug: Annotated[str | None, Query(description="Filter by agent slug")] = None,
     session_type: Annotated[str | None, Query(description="Filter by session type")] = None,
-    page: Annotated[int, Query(ge=1, description="Page number")] = 1,
+    cursor: Annotated[
+        str | None, Query(description="next_cursor of the previous page (keyset pagination)")
+    ] = None,
+    page: Annotated[
+        int, Query(ge=1, description="Page number (OFFSET pagination, ignored with cursor)")
+    ] = 1,
     page_size: Annotated[int, Query(ge=1, le=100, description="Items per page")] = 20,
+    count: Annotated[
+        Literal["estimate", "exact", "none"],
+        Query(description="Total: planner estimate, exact count(*), or omitted"),
+    ] = "estimate",
 ) -> SessionListResponse:
-    """List sessions with pagination and filtering."""
-    # Build base query
-    query = select(Session)
-    count_query = select(func.count(Session.id))
+    """List sessions newest first with keyset pagination and filtering.
 
-    # Apply filters
+    Pass the returned next_cursor to get the following page; it seeks on
+    ix_sessions_created_id instead of scanning past skipped rows. Message
+    counts and token totals come from the sessions' rollup columns.
+    """
+    filters = []
     if project_id:
-        query = query.where(Session.project_id == project_id)
-        count_query = count_query.where(Session.project_id == project_id)
+        filters.append(Session.project_id == project_id)
     if status:
-        query = query.where(Session.status == status)
-        count_query = count_query.where(Session.status == status)
+        filters.append(Session.status == status)
     if agent_slug:
-        query = query.where(Session.agent_slug == agent_slug)
-        count_query = count_query.where(Session.agent_slug == agent_slug)
+        filters.append(Session.agent_slug == agent_slug)
     if session_type:
-        query = query.where(Session.session_type == session_type)
-        count_query = count_query.where(Session.session_type == session_type)
-
-    # Get total count
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-
-    # Apply pagination and ordering
-    offset = (page - 1) * page_size
-    query = query.order_by(Session.created_at.desc()).offset(offset).limit(page_size)
-
-    # Execute query
-    result = await db.execute(query)
-    sessions = result.scalars().all()
-
-    # Get message counts and token sums for each session
-    session_ids = [s.id for s in sessions]
-    msg_counts: dict[str, int] = {}
-    token_stats: dict[str, dict[str, int]] = {}
-
-    if session_ids:
-        # Message counts
-        msg_counts_result = await db.execute(
-            select(Message.session_id, func.count(Message.id))
-            .where(Message.session_id.in_(session_ids))
-            .group_by(Message.session_id)
-        )
-        from typing import cast
-
-        msg_counts = dict(cast(list[tuple[str, int]], msg_counts_result.all()))
-
-        # Token sums by role (input = user messages, output = assistant messages)
-        token_result = await db.execute(
-            select(
-                Message.session_id,
-                Message.role,
-                func.coalesce(func.sum(Message.tokens), 0),
-            )
-            .where(Message.session_id.in_(session_ids))
-            .group_by(Message.session_id, Message.role)
-        )
-        for session_id, role, tokens in token_result.all():
-            if session_id not in token_stats:
-                token_stats[session_id] = {"input": 0, "output": 0}
-            if role == "user":
-                token_stats[session_id]["input"] = tokens
-            elif role == "assistant":
-                token_stats[session_id]["output"] = tokens
+        filters.append(Session.session_type == session_type)
+
+    # One extra row tells whether there is a next page
+    query = (
+        select(*_LIST_COLUMNS)
+        .where(*filters)
+        .order_by(Session.created_at.desc(), Session.id.desc())
+        .limit(page_size + 1)
+    )
+    offset = 0
+    if cursor:
+        query = query.where(tuple_(Session.created_at, Session.id) < decode_session_cursor(cursor))
+    else:
+        offset = (page - 1) * page_size
+        query = query.offset(offset)
+
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_session_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+
+    total: int | None = None
+    total_is_estimate = False
+    if count != "none":
+        if not has_more and not cursor:
+            # Last page reached by offset: the total is known without counting
+            total = offset + len(rows)
+        else:
+            if count == "estimate":
+                total = await _estimate_rows(db, select(Session.id).where(*filters))
+                total_is_estimate = total is not None
+            if total is None:
+                total_result = await db.execute(select(func.count(Session.id)).where(*filters))
+                total = total_result.scalar() or 0
+            elif not cursor:
+                # Estimates can lag behind; never report fewer than were seen
+                total = max(total, offset + len(rows) + 1)
 
     return SessionListResponse(
         sessions=[
@@ -368,17 +445,19 @@ async def list_sessions(
                 status=s.status,
                 agent_slug=s.agent_slug,
                 session_type=s.session_type or "completion",
-                message_count=msg_counts.get(s.id, 0),
-                total_input_tokens=token_stats.get(s.id, {}).get("input", 0),
-                total_output_tokens=token_stats.get(s.id, {}).get("output", 0),
+                message_count=s.message_count or 0,
+                total_input_tokens=s.total_input_tokens or 0,
+                total_output_tokens=s.total_output_tokens or 0,
                 created_at=s.created_at,
                 updated_at=s.updated_at,
             )
-            for s in sessions
+            for s in rows
         ],
         total=total,
+        total_is_estimate=total_is_estimate,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
@@ -415,6 +494,7 @@ async def close_session(
 
     session.status = "completed"
     await db.commit()
+    await get_session_context_cache().invalidate(session_id)
 
     return CloseSessionResponse(
         id=session.id,
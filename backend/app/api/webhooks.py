@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_db
 from app.models import WebhookSubscription
 from app.services.events import SessionEventType
+from app.services.webhook_outbox import invalidate_active_webhooks
 from app.services.webhooks import (
     WebhookConfig,
     generate_webhook_secret,
@@ -137,6 +138,7 @@ async def create_webhook(
         )
     )
 
+    await invalidate_active_webhooks()
     logger.info(f"Created webhook {webhook.id} for {request.url}")
     return _webhook_to_response(webhook, include_secret=True)
 
@@ -217,6 +219,7 @@ async def update_webhook(
     else:
         dispatcher.unregister_webhook(webhook.id)
 
+    await invalidate_active_webhooks()
     logger.info(f"Updated webhook {webhook_id}")
     return _webhook_to_response(webhook)
 
@@ -240,4 +243,5 @@ async def delete_webhook(
     dispatcher = get_webhook_dispatcher()
     dispatcher.unregister_webhook(webhook_id)
 
+    await invalidate_active_webhooks()
     logger.info(f"Deleted webhook {webhook_id}")
@@ -13,6 +13,7 @@ celery_app = Celery(
         "app.tasks.webhook_tasks",
         "app.tasks.session_cleanup_task",
         "app.tasks.tier_optimizer_task",
+        "app.tasks.cost_rollup_task",
     ],
 )
 
@@ -32,6 +33,10 @@ celery_app.conf.update(
             "task": "app.tasks.session_cleanup_task.cleanup_stale_sessions_task",
             "schedule": 300.0,  # Every 5 minutes
         },
+        "refresh-cost-rollups": {
+            "task": "app.tasks.cost_rollup_task.refresh_cost_rollups_task",
+            "schedule": 300.0,  # Every 5 minutes
+        },
         "tier-optimizer-daily": {
             "task": "app.tasks.tier_optimizer_task.run_tier_optimizer",
             "schedule": crontab(hour=2, minute=0),  # Daily at 2am UTC
@@ -61,6 +61,107 @@ class Settings(BaseSettings):
     session_timeout_image_generation: int = 120  # 2 hours for image gen
     session_timeout_agent: int = 1440  # 24 hours for long-running agents
 
+    # Claude CLI warm pool (pre-spawned OAuth workers)
+    claude_pool_enabled: bool = True
+    claude_pool_max_workers_per_model: int = 4  # Live CLI processes per model
+    claude_pool_min_idle: int = 1  # Pre-spawned idle workers per worker spec
+    claude_pool_max_requests_per_worker: int = 1  # >1 reuses workers via /clear
+    claude_pool_idle_timeout: float = 300.0  # Seconds before idle workers exit
+    claude_pool_acquire_timeout: float = 30.0  # Backpressure wait when exhausted
+    claude_pool_overflow: bool = True  # Beyond the cap, spawn one-shot workers (no waiting)
+
+    # Response cache L1 (in-process LRU in front of Redis)
+    response_cache_l1_enabled: bool = True
+    response_cache_l1_max_bytes: int = 32 * 1024 * 1024  # Total cached payload bytes
+    response_cache_l1_ttl: float = 60.0  # Max seconds an entry lives in L1
+
+    # Semantic response cache tier (opt-in, per worker)
+    semantic_cache_enabled: bool = False
+    semantic_cache_embedder: str = "gemini"  # "gemini" or "hashing" (local, deterministic)
+    semantic_cache_threshold: float = 0.95  # Min cosine similarity to serve a response
+    semantic_cache_agent_thresholds: dict[str, float] = {}  # Per agent slug overrides
+    semantic_cache_max_entries: int = 10_000
+
+    # Single-flight coalescing of identical in-flight completions
+    request_coalescing_enabled: bool = True
+    request_coalescing_lock_ttl: float = 120.0  # Seconds a leader holds the cross-worker lock
+    request_coalescing_wait_timeout: float = 120.0  # Remote follower wait before executing itself
+
+    # Distributed rate limiting (GCRA buckets in Redis, per-worker buckets if Redis is down)
+    rate_limit_enabled: bool = True
+    rate_limit_provider_rpm: dict[str, int] = {}  # Provider -> requests/minute (unset = unlimited)
+    rate_limit_provider_tpm: dict[str, int] = {}  # Provider -> tokens/minute (unset = unlimited)
+
+    # Circuit breaker rolling window (per provider/model error rate and latency)
+    circuit_window_enabled: bool = True
+    circuit_window_size: int = 50  # Most recent outcomes kept per provider/model
+    circuit_window_seconds: float = 300.0  # Outcomes older than this are ignored
+    circuit_window_min_requests: int = 10  # Outcomes needed before the window can trip
+    circuit_error_rate_threshold: float = 0.5  # Open at this failure ratio
+    circuit_p95_latency_threshold_ms: float = 90_000.0  # Open at this p95 (0 = off)
+    circuit_half_open_max_probes: int = 1  # Concurrent trial requests while half-open
+    circuit_max_cooldown: float = 900.0  # Cap for the cooldown doubling on repeated trips
+
+    # Hedged requests in ModelRouter (race the fallback provider when the primary is slow)
+    router_hedging_enabled: bool = False
+    router_hedge_percentile: float = 0.9  # Hedge once the primary exceeds this latency percentile
+    router_hedge_default_delay_ms: float = 10_000.0  # Used until the model has enough samples
+    router_hedge_min_delay_ms: float = 1_000.0  # Never hedge sooner than this
+    router_hedge_budget: float = 0.05  # Max fraction of an agent's requests that may hedge
+    router_hedge_agent_budgets: dict[str, float] = {}  # Per agent slug overrides
+
+    # Agent fallback-chain routing (latency/load-aware ordering of allowed models)
+    routing_policy: str = "strict"  # "strict", "least_latency" or "p2c"; agents may override
+    routing_ewma_alpha: float = 0.3  # Weight of the newest sample in latency/error EWMAs
+    routing_default_latency_ms: float = 5_000.0  # Assumed latency for models without samples
+    routing_max_in_flight: int = 0  # Demote models with this many requests in flight (0 = off)
+    routing_decision_log_size: int = 500  # Recent decisions kept for inspection
+
+    # Adaptive per provider/model concurrency limits (AIMD on 429s, timeouts and latency)
+    provider_concurrency_enabled: bool = True
+    provider_concurrency_initial: int = 8  # Starting limit for a provider/model
+    provider_concurrency_min: int = 1
+    provider_concurrency_max: int = 64
+    provider_concurrency_max_by_provider: dict[str, int] = {}  # Per provider caps on the limit
+    provider_concurrency_backoff: float = 0.5  # Limit multiplier on a 429 or timeout
+    provider_concurrency_latency_tolerance: float = 2.0  # Short/baseline latency ratio to back off
+    provider_concurrency_queue_timeout: float = 30.0  # Seconds a call may wait for a slot
+    provider_concurrency_max_queue: int = 100  # Waiting calls per provider/model
+
+    # Completion persistence (messages, cost log and session updates in one transaction)
+    completion_persistence_mode: str = "sync"  # "sync": commit before responding; "deferred"
+    completion_write_queue_size: int = 1000  # Deferred writes queued before falling back to sync
+
+    # Session context cache (ordered history per session, in-process LRU + Redis)
+    session_context_cache_enabled: bool = True
+    session_context_cache_max_sessions: int = 1000  # Sessions held in the in-process LRU
+    session_context_cache_ttl: int = 3600  # Seconds an idle session's context stays in Redis
+    session_context_page_size: int = 200  # Messages per keyset page when loading a cold session
+
+    # Cost rollups (hourly cost totals for /analytics/costs, refreshed by celery beat)
+    cost_rollups_enabled: bool = True  # False: analytics aggregate cost_logs directly
+    cost_rollup_grace_seconds: int = 300  # Hours are rolled up this long after they end
+    cost_rollup_lookback_hours: int = 1  # Rolled hours recomputed each run (late commits)
+
+    # Session event fan-out (bounded per-WebSocket send queues)
+    event_subscriber_queue_size: int = 256  # Queued events per subscriber
+    event_slow_consumer_policy: str = "drop_oldest"  # "drop_oldest" or "disconnect" when full
+    event_backend: str = "redis"  # "redis" (Redis Streams, all workers) or "memory" (this worker)
+    event_stream_maxlen: int = 10_000  # Approximate events retained for replay
+
+    # Webhook delivery (shared pooled HTTP client)
+    webhook_max_connections: int = 100  # Pooled connections across all endpoints
+    webhook_max_concurrency_per_endpoint: int = 4  # In-flight POSTs per webhook URL
+    webhook_http2: bool = True  # Negotiate HTTP/2 when the optional h2 package is installed
+    webhook_batch_window_ms: int = 0  # >0 batches events per webhook into one POST (opt-in)
+    webhook_batch_max_events: int = 50  # Send a batch early once it holds this many events
+    webhook_outbox_enabled: bool = True  # Stage /complete webhooks in Postgres, relay delivers
+    webhook_outbox_batch_size: int = 100  # Rows claimed per relay iteration
+    webhook_outbox_poll_interval: float = 1.0  # Seconds between polls when idle
+    webhook_outbox_max_attempts: int = 10  # Attempts before a row is marked dead
+    webhook_outbox_lease_seconds: float = 300.0  # Claimed rows are reclaimed after this
+    webhook_outbox_cache_ttl: float = 60.0  # Max age of a worker's cached active webhooks
+
     @property
     def celery_broker_url(self) -> str:
         """Celery broker URL (Redis)."""
@@ -9,11 +9,24 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.adapters.claude_pool import shutdown_claude_pool
 from app.config import settings
 from app.db import get_db
+from app.services.completion_writer import shutdown_completion_writer
 from app.services.credential_manager import get_credential_manager
+from app.services.events import shutdown_event_bus, start_event_bus
 from app.services.memory.usage_tracker import shutdown_usage_tracker, start_usage_tracker
+from app.services.request_log_writer import (
+    shutdown_request_log_writer,
+    start_request_log_writer,
+)
 from app.services.telemetry import init_telemetry
+from app.services.webhook_outbox import shutdown_outbox_relay, start_outbox_relay
+from app.services.webhooks import (
+    get_webhook_dispatcher,
+    init_webhook_dispatcher,
+    shutdown_webhook_dispatcher,
+)
 
 # Configure logging for application modules (must be after imports)
 logging.basicConfig(
@@ -43,14 +56,42 @@ async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
         logger.warning(f"Failed to load credentials at startup: {e}")
         # Non-fatal - credentials can be loaded later or provided via env
 
+    # Register active webhooks for live dispatch (outbox staging reads the database)
+    try:
+        async for db in get_db():
+            loaded = await get_webhook_dispatcher().load_webhooks(db)
+            logger.info(f"Loaded {loaded} webhooks at startup")
+            break
+    except Exception as e:
+        logger.warning(f"Failed to load webhooks at startup: {e}")
+
     # Start background usage tracking flush task (30s interval)
     await start_usage_tracker()
     logger.info("Usage tracker started")
 
+    # Start batched request log writer
+    await start_request_log_writer()
+
+    # Start the session event bus; webhooks consume events from it
+    init_webhook_dispatcher()
+    await start_event_bus()
+    await start_outbox_relay()
+
     yield
     # Shutdown
     await shutdown_usage_tracker()
     logger.info("Usage tracker stopped")
+    await shutdown_request_log_writer()
+    logger.info("Request log writer flushed")
+    await shutdown_completion_writer()
+    logger.info("Completion writer flushed")
+    await shutdown_outbox_relay()
+    await shutdown_event_bus()
+    logger.info("Event bus flushed")
+    await shutdown_webhook_dispatcher()
+    logger.info("Webhook deliveries flushed")
+    await shutdown_claude_pool()
+    logger.info("Claude worker pool stopped")
     print("Shutting down agent-hub")
 
 
@@ -14,14 +14,15 @@ from time import monotonic
 from typing import Any
 
 from sqlalchemy import select
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.config import settings
 from app.db import get_db
-from app.models import Client, RequestLog
+from app.models import Client
 from app.services.client_auth import verify_secret
+from app.services.request_log_writer import get_request_log_writer
 
 # Client lookup cache: client_id -> (Client data dict, timestamp)
 _client_cache: dict[str, tuple[dict[str, Any], float]] = {}
@@ -163,7 +164,38 @@ def is_internal_request(request: Request) -> bool:
     return internal_header == settings.internal_service_secret
 
 
-class AccessControlMiddleware(BaseHTTPMiddleware):
+class _ResponseTimer:
+    """Wraps ASGI send to capture status and response timing without buffering.
+
+    latency_ms: time until response headers (matches the old call_next timing)
+    ttfb_ms: time until the first non-empty body chunk
+    duration_ms: time until the final body chunk (full stream for SSE)
+    """
+
+    def __init__(self, send: Send, start_time: float) -> None:
+        self._send = send
+        self._start_time = start_time
+        self.status_code: int | None = None
+        self.latency_ms: int | None = None
+        self.ttfb_ms: int | None = None
+        self.duration_ms: int | None = None
+
+    def _elapsed_ms(self) -> int:
+        return int((time.time() - self._start_time) * 1000)
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.status_code = message["status"]
+            self.latency_ms = self._elapsed_ms()
+        elif message["type"] == "http.response.body":
+            if self.ttfb_ms is None and message.get("body"):
+                self.ttfb_ms = self._elapsed_ms()
+            if not message.get("more_body", False):
+                self.duration_ms = self._elapsed_ms()
+        await self._send(message)
+
+
+class AccessControlMiddleware:
     """Middleware for mandatory client authentication.
 
     All /api/* requests must provide:
@@ -172,32 +204,42 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
     - X-Request-Source: Identifier for caller attribution
 
     Internal dashboard requests bypass auth with X-Agent-Hub-Internal header.
+
+    Pure ASGI: authentication only reads the scope headers, and the request body
+    and response stream pass through untouched (no BaseHTTPMiddleware task or
+    body buffering on SSE responses).
     """
 
-    async def dispatch(self, request: Request, call_next: Any) -> Any:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Validate authentication before processing request."""
-        path = request.url.path
-        method = request.method
-        start_time = time.time()
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
 
         # Skip non-API paths
         if not path.startswith("/api/"):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
         # Skip exempt paths (truly public: health checks, docs, webhooks, websocket)
         if is_path_exempt(path):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        start_time = time.time()
 
         # Auth bypass paths: skip auth verification but still log requests
         # Used for memory system (no LLM costs, but want telemetry)
         if is_auth_bypass_path(path):
             # Extract headers for logging (no validation, just attribution)
             client_id = request.headers.get(CLIENT_ID_HEADER)
-            source_client = request.headers.get(SOURCE_CLIENT_HEADER)
-            tool_name = request.headers.get(TOOL_NAME_HEADER)
-            source_path = request.headers.get(SOURCE_PATH_HEADER)
             request_source = request.headers.get(REQUEST_SOURCE_HEADER)
-            tool_type = detect_tool_type(source_client)
 
             # Set request state (no client validation)
             request.state.client = None
@@ -205,24 +247,10 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
             request.state.request_source = request_source or "auth-bypass"
             request.state.is_internal = False
 
-            # Process request
-            response = await call_next(request)
-
-            # Log request (async)
-            latency_ms = int((time.time() - start_time) * 1000)
-            await self._log_request(
-                client_id=client_id,
-                request_source=request_source,
-                endpoint=path,
-                method=method,
-                status_code=response.status_code,
-                rejection_reason=None,
-                latency_ms=latency_ms,
-                tool_type=tool_type,
-                tool_name=tool_name,
-                source_path=source_path,
+            await self._call_and_log(
+                request, receive, send, start_time, client_id=client_id, include_agent_slug=False
             )
-            return response
+            return
 
         # Check internal-only paths (dashboard endpoints that require internal header)
         if is_internal_only_path(path):
@@ -232,10 +260,11 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
                 request.state.client_id = None
                 request.state.request_source = "agent-hub-dashboard"
                 request.state.is_internal = True
-                return await call_next(request)
+                await self.app(scope, receive, send)
+                return
             else:
                 # Internal-only paths require the internal header
-                return JSONResponse(
+                response = JSONResponse(
                     status_code=403,
                     content={
                         "error": "internal_only",
@@ -248,6 +277,8 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
                         },
                     },
                 )
+                await response(scope, receive, send)
+                return
 
         # Skip internal agent-hub dashboard calls (for non-internal-only paths)
         if is_internal_request(request):
@@ -257,7 +288,67 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
             request.state.client_id = None
             request.state.request_source = "agent-hub-dashboard"
             request.state.is_internal = True
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+
+        rejection = await self._authenticate(request, start_time)
+        if rejection is not None:
+            await rejection(scope, receive, send)
+            return
+
+        await self._call_and_log(
+            request,
+            receive,
+            send,
+            start_time,
+            client_id=request.headers.get(CLIENT_ID_HEADER),
+            include_agent_slug=True,
+        )
+
+    async def _call_and_log(
+        self,
+        request: Request,
+        receive: Receive,
+        send: Send,
+        start_time: float,
+        client_id: str | None,
+        include_agent_slug: bool,
+    ) -> None:
+        """Run the app, then queue a request log with status and stream timing."""
+        timer = _ResponseTimer(send, start_time)
+        try:
+            await self.app(request.scope, receive, timer)
+        finally:
+            if timer.status_code is not None:
+                self._log_request(
+                    client_id=client_id,
+                    request_source=request.headers.get(REQUEST_SOURCE_HEADER),
+                    endpoint=request.scope["path"],
+                    method=request.method,
+                    status_code=timer.status_code,
+                    rejection_reason=None,
+                    latency_ms=timer.latency_ms or 0,
+                    ttfb_ms=timer.ttfb_ms,
+                    duration_ms=timer.duration_ms,
+                    # Capture agent_slug from request.state if set by route handler
+                    agent_slug=getattr(request.state, "agent_slug", None)
+                    if include_agent_slug
+                    else None,
+                    tool_type=detect_tool_type(request.headers.get(SOURCE_CLIENT_HEADER)),
+                    tool_name=request.headers.get(TOOL_NAME_HEADER),
+                    source_path=request.headers.get(SOURCE_PATH_HEADER),
+                )
+
+    async def _authenticate(self, request: Request, start_time: float) -> JSONResponse | None:
+        """Authenticate the client from headers.
+
+        Sets request.state on success.
+
+        Returns:
+            Rejection response, or None if the client is authenticated
+        """
+        path = request.scope["path"]
+        method = request.method
 
         # Get auth headers
         client_id = request.headers.get(CLIENT_ID_HEADER)
@@ -280,7 +371,7 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
             missing_headers.append(REQUEST_SOURCE_HEADER)
 
         if missing_headers:
-            await self._log_request(
+            self._log_request(
                 client_id=None,
                 request_source=request_source,
                 endpoint=path,
@@ -318,7 +409,7 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
             client_data = await _get_cached_client(client_id)
 
             if not client_data:
-                await self._log_request(
+                self._log_request(
                     client_id=client_id,
                     request_source=request_source,
                     endpoint=path,
@@ -347,7 +438,7 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
             # Verify secret (cached - avoids 190ms bcrypt on repeat requests)
             assert client_secret is not None
             if not verify_secret(client_secret, client_data["secret_hash"], client_id=client_id):
-                await self._log_request(
+                self._log_request(
                     client_id=client_id,
                     request_source=request_source,
                     endpoint=path,
@@ -375,7 +466,7 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
 
             # Check client status
             if client_data["status"] == "suspended":
-                await self._log_request(
+                self._log_request(
                     client_id=client_id,
                     request_source=request_source,
                     endpoint=path,
@@ -406,7 +497,7 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
                 )
 
             if client_data["status"] == "blocked":
-                await self._log_request(
+                self._log_request(
                     client_id=client_id,
                     request_source=request_source,
                     endpoint=path,
@@ -453,32 +544,9 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
                 },
             )
 
-        # Process request
-        response = await call_next(request)
-
-        # Log successful request (async, fire and forget)
-        latency_ms = int((time.time() - start_time) * 1000)
-
-        # Capture agent_slug from request.state if set by route handler
-        agent_slug = getattr(request.state, "agent_slug", None)
-
-        await self._log_request(
-            client_id=client_id,
-            request_source=request_source,
-            endpoint=path,
-            method=method,
-            status_code=response.status_code,
-            rejection_reason=None,
-            latency_ms=latency_ms,
-            agent_slug=agent_slug,
-            tool_type=tool_type,
-            tool_name=tool_name,
-            source_path=source_path,
-        )
-
-        return response
+        return None
 
-    async def _log_request(
+    def _log_request(
         self,
         client_id: str | None,
         request_source: str | None,
@@ -487,6 +555,8 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
         status_code: int,
         rejection_reason: str | None,
         latency_ms: int,
+        ttfb_ms: int | None = None,
+        duration_ms: int | None = None,
         tokens_in: int | None = None,
         tokens_out: int | None = None,
         model: str | None = None,
@@ -496,28 +566,26 @@ class AccessControlMiddleware(BaseHTTPMiddleware):
         tool_name: str | None = None,
         source_path: str | None = None,
     ) -> None:
-        """Log request to request_logs table."""
+        """Queue request for the batched request_logs writer (never blocks the response)."""
         try:
-            async for db in get_db():
-                log_entry = RequestLog(
-                    client_id=client_id,
-                    request_source=request_source,
-                    endpoint=endpoint,
-                    method=method,
-                    status_code=status_code,
-                    rejection_reason=rejection_reason,
-                    latency_ms=latency_ms,
-                    tokens_in=tokens_in,
-                    tokens_out=tokens_out,
-                    model=model,
-                    session_id=session_id,
-                    agent_slug=agent_slug,
-                    tool_type=tool_type,
-                    tool_name=tool_name,
-                    source_path=source_path,
-                )
-                db.add(log_entry)
-                await db.commit()
-                break
+            get_request_log_writer().enqueue(
+                client_id=client_id,
+                request_source=request_source,
+                endpoint=endpoint,
+                method=method,
+                status_code=status_code,
+                rejection_reason=rejection_reason,
+                latency_ms=latency_ms,
+                ttfb_ms=ttfb_ms,
+                duration_ms=duration_ms,
+                tokens_in=tokens_in,
+                tokens_out=tokens_out,
+                model=model,
+                session_id=session_id,
+                agent_slug=agent_slug,
+                tool_type=tool_type,
+                tool_name=tool_name,
+                source_path=source_path,
+            )
         except Exception as e:
             logger.warning(f"Failed to log request: {e}")
@@ -6,6 +6,7 @@ Tables:
 - messages: Individual messages within sessions
 - credentials: Encrypted API credentials
 - cost_logs: Token usage and cost tracking
+- cost_rollups: Hourly cost totals maintained from cost_logs
 - llm_models: LLM model registry (centralized model definitions)
 """
 
@@ -17,10 +18,10 @@ from .agent import Agent, AgentVersion
 # Import Base first
 from .base import Base
 from .client import APIKey, Client, ClientControl
-from .config import Credential, UserPreferences, WebhookSubscription
+from .config import Credential, UserPreferences, WebhookOutbox, WebhookSubscription
 from .memory import MemoryInjectionMetric, MemorySettings, UsageStatLog
 from .roundtable import RoundtableMessage, RoundtableSession
-from .session import CostLog, Message, Session
+from .session import CostLog, CostRollup, Message, Session
 from .telemetry import RequestLog, TruncationEvent
 
 # Export all models for backward compatibility
@@ -32,6 +33,7 @@ __all__ = [
     "Client",
     "ClientControl",
     "CostLog",
+    "CostRollup",
     "Credential",
     "MemoryInjectionMetric",
     "MemorySettings",
@@ -43,5 +45,6 @@ __all__ = [
     "TruncationEvent",
     "UsageStatLog",
     "UserPreferences",
+    "WebhookOutbox",
     "WebhookSubscription",
 ]
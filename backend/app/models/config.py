@@ -2,7 +2,18 @@
 
 from datetime import datetime
 
-from sqlalchemy import JSON, DateTime, Enum, Index, Integer, LargeBinary, String, func
+from sqlalchemy import (
+    JSON,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.constants import DEFAULT_CLAUDE_MODEL
@@ -55,6 +66,38 @@ class WebhookSubscription(Base):
     __table_args__ = (Index("ix_webhook_subscriptions_project", "project_id"),)
 
 
+class WebhookOutbox(Base):
+    """Webhook deliveries staged in the same transaction as the data they describe.
+
+    Payloads are serialized and signed once when staged; the outbox relay
+    delivers pending rows and deletes them once acknowledged.
+    """
+
+    __tablename__ = "webhook_outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    webhook_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("webhook_subscriptions.id", ondelete="CASCADE")
+    )
+    url: Mapped[str] = mapped_column(String(2048))  # Callback URL when staged
+    event_type: Mapped[str] = mapped_column(String(50))
+    session_id: Mapped[str] = mapped_column(String(36))
+    payload: Mapped[str] = mapped_column(Text)  # Serialized JSON body, sent verbatim
+    signature: Mapped[str] = mapped_column(String(64))  # HMAC-SHA256 of payload
+    # pending, in_flight (claimed by a relay), dead
+    status: Mapped[str] = mapped_column(String(10), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    # Lease of an in_flight row; the row can be claimed again once it expires
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_webhook_outbox_pending", "status", "next_attempt_at"),)
+
+
 class UserPreferences(Base):
     """User preferences for AI interactions."""
 
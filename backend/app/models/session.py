@@ -5,6 +5,7 @@ from typing import Any
 
 from sqlalchemy import (
     JSON,
+    BigInteger,
     Boolean,
     DateTime,
     Enum,
@@ -14,6 +15,7 @@ from sqlalchemy import (
     Integer,
     String,
     Text,
+    UniqueConstraint,
     func,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -70,6 +72,19 @@ class Session(Base):
     providers_used: Mapped[list[str] | None] = mapped_column(
         JSON, nullable=True, default=list
     )  # Array of providers used
+    # Message rollups, maintained in the same transaction as message inserts so
+    # listing sessions doesn't aggregate messages (input = user message tokens,
+    # output = assistant message tokens)
+    message_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    total_input_tokens: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    total_output_tokens: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Running context usage, maintained with each cost log: the latest request's
+    # input tokens (current context size), cumulative provider-reported tokens
+    # and the context limit of the model that request used
+    last_input_tokens: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    usage_input_tokens: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    usage_output_tokens: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    context_limit_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -81,7 +96,11 @@ class Session(Base):
     cost_logs = relationship("CostLog", back_populates="session", cascade="all, delete-orphan")
     injection_metrics = relationship("MemoryInjectionMetric", back_populates="session")
 
-    __table_args__ = (Index("ix_sessions_project_created", "project_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_sessions_project_created", "project_id", "created_at"),
+        # Keyset pagination of the session list
+        Index("ix_sessions_created_id", "created_at", "id"),
+    )
 
 
 class Message(Base):
@@ -96,6 +115,9 @@ class Message(Base):
     role: Mapped[str] = mapped_column(String(20))  # user, assistant, system
     content: Mapped[str] = mapped_column(Text)
     tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Prompt-side token count of this message (role + content + overhead), so
+    # session context can be counted without re-encoding history
+    context_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
     # Agent identifier for multi-agent sessions (roundtable, orchestration)
     agent_id: Mapped[str | None] = mapped_column(String(100), nullable=True, index=True)
     # Agent display name for UI
@@ -135,3 +157,38 @@ class CostLog(Base):
         Index("ix_cost_logs_session", "session_id"),
         Index("ix_cost_logs_created", "created_at"),
     )
+
+
+class CostRollup(Base):
+    """Hourly cost totals per project/agent/model/session type/external ID.
+
+    Maintained from cost_logs by the cost rollup task, so cost analytics read
+    one row per bucket and group instead of every request. NULL agent_slug
+    and external_id are stored as "" to keep the bucket key unique.
+    """
+
+    __tablename__ = "cost_rollups"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True))  # Start of the hour
+    project_id: Mapped[str] = mapped_column(String(100))
+    agent_slug: Mapped[str] = mapped_column(String(50), default="")
+    model: Mapped[str] = mapped_column(String(100))
+    session_type: Mapped[str] = mapped_column(String(20))
+    external_id: Mapped[str] = mapped_column(String(100), default="")
+    input_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
+    output_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
+    cost_usd: Mapped[float] = mapped_column(Float, default=0.0)
+    request_count: Mapped[int] = mapped_column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "bucket",
+            "project_id",
+            "agent_slug",
+            "model",
+            "session_type",
+            "external_id",
+            name="uq_cost_rollups_key",
+        ),
+    )
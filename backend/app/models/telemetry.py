@@ -41,7 +41,9 @@ class RequestLog(Base):
     # Performance metrics
     tokens_in: Mapped[int | None] = mapped_column(Integer, nullable=True)
     tokens_out: Mapped[int | None] = mapped_column(Integer, nullable=True)
-    latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)  # Until headers
+    ttfb_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)  # First body chunk
+    duration_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)  # Full stream
     # Request context
     model: Mapped[str | None] = mapped_column(String(100), nullable=True)
     session_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
@@ -29,6 +29,7 @@ from app.adapters.base import (
 from app.adapters.claude import ClaudeAdapter
 from app.adapters.gemini import GeminiAdapter
 from app.services.agent_service import AgentDTO, get_agent_service
+from app.services.routing_scorer import get_routing_scorer
 
 logger = logging.getLogger(__name__)
 
@@ -201,10 +202,13 @@ async def complete_with_fallback(
     temperature: float,
     max_tokens: int | None = None,
 ) -> CompletionResult:
-    """Attempt completion with agent's primary model, falling back if needed.
+    """Attempt completion with agent's allowed models, falling back if needed.
 
-    Tries the primary model first, then each fallback model in order
-    if the primary fails with RateLimitError or ProviderError.
+    The primary and fallback models are ordered by the routing scorer
+    (settings.routing_policy, or the agent's strategies["routing_policy"]);
+    with the default "strict" policy that is primary first, then each
+    fallback in order. The next model is tried if one fails with
+    RateLimitError or ProviderError.
 
     Args:
         messages: Messages to complete
@@ -218,45 +222,44 @@ async def complete_with_fallback(
     Raises:
         ProviderError: If all models (primary + fallbacks) fail
     """
-    # Try primary model first
     primary_provider = get_provider_for_model(agent.primary_model_id)
+    scorer = get_routing_scorer()
+    decision = scorer.plan(
+        agent.slug,
+        [agent.primary_model_id, *(agent.fallback_models or [])],
+        policy=agent.strategies.get("routing_policy"),
+        is_circuit_open=_is_circuit_open,
+    )
 
-    try:
-        adapter = get_adapter(primary_provider)
-        result = await adapter.complete(
-            messages=messages,
-            model=agent.primary_model_id,
-            max_tokens=max_tokens,
-            temperature=temperature,
-        )
-        return CompletionResult(
-            result=result,
-            model_used=agent.primary_model_id,
-            used_fallback=False,
-        )
-    except (RateLimitError, ProviderError) as e:
-        logger.warning(f"Primary model {agent.primary_model_id} failed for agent {agent.slug}: {e}")
-
-    # Try fallback models
-    for fallback_model in agent.fallback_models or []:
-        fallback_provider = get_provider_for_model(fallback_model)
+    for model in decision.order:
+        decision.attempts.append(model)
+        started = scorer.start(model)
+        failed: bool | None = None
         try:
-            adapter = get_adapter(fallback_provider)
+            adapter = get_adapter(get_provider_for_model(model))
             result = await adapter.complete(
                 messages=messages,
-                model=fallback_model,
+                model=model,
                 max_tokens=max_tokens,
                 temperature=temperature,
             )
-            logger.info(f"Agent {agent.slug} used fallback model: {fallback_model}")
-            return CompletionResult(
-                result=result,
-                model_used=fallback_model,
-                used_fallback=True,
-            )
+            failed = False
         except (RateLimitError, ProviderError) as e:
-            logger.warning(f"Fallback model {fallback_model} also failed: {e}")
+            failed = True
+            logger.warning(f"Model {model} failed for agent {agent.slug}: {e}")
             continue
+        finally:
+            scorer.finish(model, started, failed)
+
+        decision.model_used = model
+        used_fallback = model != agent.primary_model_id
+        if used_fallback:
+            logger.info(f"Agent {agent.slug} used fallback model: {model}")
+        return CompletionResult(
+            result=result,
+            model_used=model,
+            used_fallback=used_fallback,
+        )
 
     # All models failed
     raise ProviderError(
@@ -266,6 +269,13 @@ async def complete_with_fallback(
     )
 
 
+def _is_circuit_open(model: str) -> bool:
+    """Whether the router's circuit breaker is rejecting model's provider or model."""
+    from app.services.router import get_router
+
+    return get_router().is_circuit_open(get_provider_for_model(model), model)
+
+
 def inject_system_prompt_into_messages(
     messages: list[Message],
     system_content: str,
@@ -8,8 +8,6 @@ Provides:
 
 import hashlib
 import secrets
-import time
-from collections import defaultdict
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from typing import Annotated
@@ -20,24 +18,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
 from app.models import APIKey
+from app.services.distributed_rate_limiter import (
+    RateLimitDecision,
+    api_key_limits,
+    get_distributed_rate_limiter,
+    token_limits,
+)
 
 # API key prefix for Agent Hub keys
 KEY_PREFIX = "sk-ah-"
 
 
-@dataclass
-class RateLimitState:
-    """Track rate limit state for an API key."""
-
-    request_count: int = 0
-    token_count: int = 0
-    window_start: float = 0.0
-
-
-# In-memory rate limit tracking (would use Redis in production)
-_rate_limits: dict[str, RateLimitState] = defaultdict(RateLimitState)
-
-
 def generate_api_key() -> tuple[str, str]:
     """Generate a new API key.
 
@@ -102,13 +93,13 @@ async def update_key_last_used(db: AsyncSession, key_id: int) -> None:
     await db.commit()
 
 
-def check_rate_limit(
+async def check_rate_limit(
     key_hash: str,
     rpm_limit: int,
     tpm_limit: int,
     token_count: int = 0,
-) -> tuple[bool, str | None]:
-    """Check if a request is within rate limits.
+) -> RateLimitDecision:
+    """Check if a request is within rate limits (shared across workers).
 
     Args:
         key_hash: Hash of the API key
@@ -117,41 +108,18 @@ def check_rate_limit(
         token_count: Estimated tokens for this request
 
     Returns:
-        Tuple of (is_allowed, error_message)
+        Decision with retry delay and message when rejected
     """
-    now = time.time()
-    state = _rate_limits[key_hash]
-
-    # Reset window if expired (1 minute window)
-    if now - state.window_start >= 60:
-        state.request_count = 0
-        state.token_count = 0
-        state.window_start = now
-
-    # Check request limit
-    if state.request_count >= rpm_limit:
-        retry_after = int(60 - (now - state.window_start))
-        return (
-            False,
-            f"Rate limit exceeded: {rpm_limit} requests/minute. Retry after {retry_after}s",
-        )
-
-    # Check token limit
-    if state.token_count + token_count > tpm_limit:
-        retry_after = int(60 - (now - state.window_start))
-        return False, f"Token limit exceeded: {tpm_limit} tokens/minute. Retry after {retry_after}s"
-
-    # Update counters
-    state.request_count += 1
-    state.token_count += token_count
-
-    return True, None
+    return await get_distributed_rate_limiter().acquire(
+        api_key_limits(key_hash, rpm_limit, tpm_limit, token_count)
+    )
 
 
-def update_token_count(key_hash: str, tokens: int) -> None:
-    """Update token count after a request completes."""
-    if key_hash in _rate_limits:
-        _rate_limits[key_hash].token_count += tokens
+async def update_token_count(key_hash: str, tpm_limit: int, tokens: int) -> None:
+    """Charge tokens to the key's TPM bucket after a request completes."""
+    await get_distributed_rate_limiter().charge(
+        token_limits(api_key_limits(key_hash, 0, tpm_limit, tokens), tokens)
+    )
 
 
 @dataclass
@@ -216,19 +184,20 @@ async def require_api_key(
     key_hash = hash_api_key(api_key)
 
     # Check rate limits (estimate 1000 tokens per request for pre-check)
-    is_allowed, error_msg = check_rate_limit(
+    decision = await check_rate_limit(
         key_hash, key_record.rate_limit_rpm, key_record.rate_limit_tpm, 1000
     )
-    if not is_allowed:
+    if not decision.allowed:
         raise HTTPException(
             status_code=429,
             detail={
                 "error": {
-                    "message": error_msg,
+                    "message": decision.message,
                     "type": "rate_limit_error",
                     "code": "rate_limit_exceeded",
                 }
             },
+            headers={"Retry-After": decision.retry_after_header},
         )
 
     # Update last used (fire and forget - don't await)
@@ -1,17 +1,52 @@
-"""Circuit breaker implementation for provider failure management."""
-
+"""Circuit breaker implementation for provider failure management.
+
+Each worker keeps the breaker state for its providers in memory and answers
+check_circuit() from it, so the request path never touches Redis. Redis is
+only written when a provider fails or recovers from a failure streak:
+
+- Shared state is a hash per provider (state, failures, signature,
+  cooldown_until) updated by atomic Lua scripts, so failures recorded by
+  many workers at once are counted exactly once each. As in the local
+  breaker, only consecutive identical failures count: a failure with a new
+  signature restarts the count at 1.
+- The scripts publish every real transition (closed -> open, open -> closed)
+  and the failure count of a closed circuit on CIRCUIT_CHANNEL; each worker's
+  listener applies it to the local state, so a success on any worker clears
+  the shared count.
+- OPEN -> HALF_OPEN is derived locally from cooldown_until and needs no write.
+
+When Redis is unavailable the breaker runs per worker on the local state.
+
+On top of the provider-wide consecutive-failure breaker, each worker keeps a
+rolling window of recent outcomes and latencies per provider/model. A
+provider/model circuit opens when the window's error rate or p95 latency
+crosses its threshold, so slow-but-successful providers are skipped before
+requests start timing out. Window circuits are per worker.
+
+Both kinds of circuit let at most settings.circuit_half_open_max_probes
+trial requests through while half-open. The cooldown doubles on each repeated
+trip, up to settings.circuit_max_cooldown.
+"""
+
+import asyncio
+import contextlib
 import json
 import logging
+import math
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
     from redis.asyncio.client import Redis as AsyncRedis
 
 import redis.asyncio as aioredis
 
+from app.config import settings
+from app.services.error_tracking import increment_circuit_trips
+
 logger = logging.getLogger(__name__)
 
 # Circuit breaker constants
@@ -22,6 +57,85 @@ CIRCUIT_BREAKER_COOLDOWN = 60.0  # Seconds before half-open
 REDIS_CIRCUIT_KEY_PREFIX = "agent-hub:circuit-breaker"
 REDIS_CIRCUIT_TTL = 300  # 5 minutes TTL to prevent stale state
 
+# Pub/sub channel carrying state transitions to every worker
+CIRCUIT_CHANNEL = f"{REDIS_CIRCUIT_KEY_PREFIX}:transitions"
+
+# Don't retry a failed Redis connection more often than this
+REDIS_RETRY_SECONDS = 30.0
+
+# Delay before resubscribing after the transition listener fails
+SUBSCRIBER_RETRY_SECONDS = 1.0
+
+# A half-open trial request that never reported back frees its slot after this
+PROBE_TIMEOUT_SECONDS = 180.0
+
+# Count a failure (restarting at 1 when the signature changed); open the
+# circuit at the threshold, or reopen it when the half-open test request
+# failed. Transitions, or the new count while closed, are published.
+# The cooldown doubles with each trip until the circuit closes again.
+# KEYS: state hash. ARGV: threshold, base cooldown, now, signature, ttl,
+# channel, provider, reopen ("1" if this worker saw the circuit half-open),
+# max cooldown.
+# Returns {state, failures, cooldown_until, trips, transitioned}
+_FAILURE_SCRIPT = """
+local previous_signature = redis.call("HGET", KEYS[1], "signature")
+local failures = 1
+if previous_signature and previous_signature ~= ARGV[4] then
+    redis.call("HSET", KEYS[1], "failures", failures)
+else
+    failures = redis.call("HINCRBY", KEYS[1], "failures", 1)
+end
+local state = redis.call("HGET", KEYS[1], "state") or "closed"
+local cooldown_until = tonumber(redis.call("HGET", KEYS[1], "cooldown_until") or "0")
+local trips = tonumber(redis.call("HGET", KEYS[1], "trips") or "0")
+local now = tonumber(ARGV[3])
+local transitioned = 0
+redis.call("HSET", KEYS[1], "signature", ARGV[4])
+if state == "open" then
+    if ARGV[8] == "1" or now >= cooldown_until then
+        transitioned = 1
+    end
+elseif failures >= tonumber(ARGV[1]) or ARGV[8] == "1" then
+    transitioned = 1
+end
+if transitioned == 1 then
+    state = "open"
+    trips = trips + 1
+    local cooldown = math.min(tonumber(ARGV[2]) * 2 ^ (trips - 1), tonumber(ARGV[9]))
+    cooldown_until = now + cooldown
+    redis.call("HSET", KEYS[1], "state", state, "cooldown_until", tostring(cooldown_until), "trips", trips)
+    redis.call("PUBLISH", ARGV[6], cjson.encode({
+        provider = ARGV[7],
+        state = state,
+        failures = failures,
+        signature = ARGV[4],
+        cooldown_until = cooldown_until,
+        trips = trips,
+    }))
+elseif state ~= "open" then
+    redis.call("PUBLISH", ARGV[6], cjson.encode({
+        provider = ARGV[7],
+        state = state,
+        failures = failures,
+        signature = ARGV[4],
+    }))
+end
+redis.call("EXPIRE", KEYS[1], ARGV[5])
+return {state, failures, tostring(cooldown_until), trips, transitioned}
+"""
+
+# Clear the shared state after a success, publishing if the circuit was open.
+# KEYS: state hash. ARGV: channel, provider. Returns 1 if it was open.
+_SUCCESS_SCRIPT = """
+local state = redis.call("HGET", KEYS[1], "state")
+redis.call("DEL", KEYS[1])
+if state == "open" then
+    redis.call("PUBLISH", ARGV[1], cjson.encode({provider = ARGV[2], state = "closed"}))
+    return 1
+end
+return 0
+"""
+
 
 class CircuitState(Enum):
     """Circuit breaker state."""
@@ -39,32 +153,152 @@ class CircuitBreakerState:
     consecutive_failures: int = 0
     last_error_signature: str | None = None
     cooldown_until: float | None = None
+    trips: int = 0  # Times opened since the circuit last closed
+    probes: list[float] = field(default_factory=list)  # Start times of half-open trials
+
+    def open(self, now: float) -> None:
+        """Open (or reopen) the circuit, doubling the cooldown on repeated trips."""
+        self.state = CircuitState.OPEN
+        self.trips += 1
+        self.cooldown_until = now + cooldown_for(self.trips)
+        self.probes.clear()
+
+    def close(self) -> None:
+        """Close the circuit and forget the failure streak."""
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.last_error_signature = None
+        self.cooldown_until = None
+        self.trips = 0
+        self.probes.clear()
+
+    def admit(self, provider: str) -> bool:
+        """Decide whether a request may go through, moving OPEN to HALF_OPEN."""
+        if self.state == CircuitState.CLOSED:
+            return True
+        now = time.time()
+        if self.state == CircuitState.OPEN:
+            # Check if cooldown has passed
+            if not self.cooldown_until or now < self.cooldown_until:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            logger.info(f"Circuit half-open for {provider}, allowing test request")
+        # HALF_OPEN: allow a limited number of concurrent trial requests
+        self.probes = [t for t in self.probes if now - t < PROBE_TIMEOUT_SECONDS]
+        if len(self.probes) >= settings.circuit_half_open_max_probes:
+            return False
+        self.probes.append(now)
+        return True
+
+    def release_probe(self) -> None:
+        """Free the trial slot of a request that finished."""
+        if self.probes:
+            self.probes.pop(0)
+
+    def apply(self, data: dict[str, Any]) -> None:
+        """Update in place from shared state (a hash or a transition message)."""
+        if data.get("state", "closed") != CircuitState.OPEN.value:
+            self.close()
+            self.consecutive_failures = int(data.get("failures") or 0)
+            self.last_error_signature = data.get("signature") or None
+            return
+        self.state = CircuitState.OPEN
+        self.consecutive_failures = int(data.get("failures") or 0)
+        self.last_error_signature = data.get("signature") or None
+        self.cooldown_until = float(data.get("cooldown_until") or 0)
+        self.trips = int(data.get("trips") or 1)
+
+
+def cooldown_for(trips: int) -> float:
+    """Cooldown after the given number of trips without recovering."""
+    return min(CIRCUIT_BREAKER_COOLDOWN * 2.0 ** max(trips - 1, 0), settings.circuit_max_cooldown)
+
+
+@dataclass
+class WindowStats:
+    """Summary of a provider/model outcome window."""
+
+    requests: int = 0
+    failures: int = 0
+    p95_ms: float = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """Fraction of requests in the window that failed."""
+        return self.failures / self.requests if self.requests else 0.0
+
+
+class OutcomeWindow:
+    """Rolling window of recent outcomes (count- and time-bounded)."""
+
+    def __init__(self, size: int, seconds: float) -> None:
+        self._seconds = seconds
+        # (timestamp, failed, latency_ms)
+        self._samples: deque[tuple[float, bool, float]] = deque(maxlen=size)
+
+    def record(self, failed: bool, latency_ms: float, now: float) -> None:
+        """Add an outcome, evicting the oldest once full."""
+        self._samples.append((now, failed, latency_ms))
+
+    def _prune(self, now: float) -> None:
+        """Drop outcomes older than the time window."""
+        while self._samples and now - self._samples[0][0] > self._seconds:
+            self._samples.popleft()
+
+    def stats(self, now: float) -> WindowStats:
+        """Error rate and p95 latency over outcomes still inside the window."""
+        self._prune(now)
+        if not self._samples:
+            return WindowStats()
+        return WindowStats(
+            requests=len(self._samples),
+            failures=sum(1 for sample in self._samples if sample[1]),
+            p95_ms=self.percentile(0.95, now),
+        )
+
+    def percentile(self, q: float, now: float) -> float:
+        """Nearest-rank latency percentile (0 if the window is empty)."""
+        self._prune(now)
+        if not self._samples:
+            return 0.0
+        latencies = sorted(sample[2] for sample in self._samples)
+        return latencies[max(math.ceil(len(latencies) * q), 1) - 1]
+
+    def clear(self) -> None:
+        """Forget all outcomes."""
+        self._samples.clear()
 
 
 # Global Redis client for circuit breaker
 _redis_client: "AsyncRedis[str] | None" = None
+_redis_retry_at = 0.0
 
 
 async def get_redis_client() -> "AsyncRedis[str] | None":
     """Get or create Redis client for circuit breaker state.
 
-    Returns None if Redis is unavailable (falls back to in-memory).
+    Returns None if Redis is unavailable (falls back to in-memory). A failed
+    connection is not retried for REDIS_RETRY_SECONDS.
     """
-    global _redis_client
+    global _redis_client, _redis_retry_at
     if _redis_client is None:
+        if time.monotonic() < _redis_retry_at:
+            return None
         try:
             from app.config import get_settings
 
             settings = get_settings()
-            _redis_client = aioredis.from_url(
+            client = aioredis.from_url(
                 settings.agent_hub_redis_url,
                 encoding="utf-8",
                 decode_responses=True,
             )
             # Test connection
-            await _redis_client.ping()
+            await client.ping()
+            _redis_client = client
             logger.info("Redis connected for circuit breaker")
         except Exception as e:
+            _redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
             logger.warning(f"Redis unavailable for circuit breaker, using in-memory: {e}")
             return None
     return _redis_client
@@ -81,146 +315,306 @@ class CircuitBreakerManager:
         """
         self._provider_chain = provider_chain
         self._circuit_state: dict[str, CircuitBreakerState] = {}
+        # Rolling-window circuits, keyed by "provider/model"
+        self._window_state: dict[str, CircuitBreakerState] = {}
+        self._windows: dict[str, OutcomeWindow] = {}
+        self._subscriber_task: asyncio.Task[None] | None = None
+        self._background_tasks: set[asyncio.Task[None]] = set()
 
     def _get_circuit_state(self, provider: str) -> CircuitBreakerState:
-        """Get or create circuit breaker state for provider (in-memory fallback)."""
+        """Get or create the local circuit breaker state for provider."""
         if provider not in self._circuit_state:
             self._circuit_state[provider] = CircuitBreakerState()
         return self._circuit_state[provider]
 
+    def _get_window_state(self, provider: str, model: str) -> CircuitBreakerState:
+        """Get or create the rolling-window circuit state for provider/model."""
+        key = f"{provider}/{model}"
+        if key not in self._window_state:
+            self._window_state[key] = CircuitBreakerState()
+        return self._window_state[key]
+
     def _redis_key(self, provider: str) -> str:
         """Get Redis key for provider circuit breaker state."""
         return f"{REDIS_CIRCUIT_KEY_PREFIX}:{provider}"
 
-    async def _get_circuit_state_from_redis(
-        self, provider: str, client: "AsyncRedis[str]"
-    ) -> CircuitBreakerState | None:
-        """Get circuit state from Redis if available."""
+    async def _ensure_synced(self) -> None:
+        """Load shared state and start the transition listener once Redis is up."""
+        if self._subscriber_task is not None and not self._subscriber_task.done():
+            return
+        client = await get_redis_client()
+        if client is None:
+            return
+        await self._load_shared_state(client)
+        self._subscriber_task = asyncio.create_task(self._listen_for_transitions(client))
+
+    async def _load_shared_state(self, client: "AsyncRedis[str]") -> None:
+        """Replace local state with the shared hashes for every provider."""
         try:
-            data = await client.get(self._redis_key(provider))
-            if data:
-                state_dict = json.loads(data)
-                return CircuitBreakerState(
-                    state=CircuitState(state_dict["state"]),
-                    consecutive_failures=state_dict["consecutive_failures"],
-                    last_error_signature=state_dict.get("last_error_signature"),
-                    cooldown_until=state_dict.get("cooldown_until"),
-                )
+            pipe = client.pipeline(transaction=False)
+            for provider in self._provider_chain:
+                pipe.hgetall(self._redis_key(provider))
+            results = await pipe.execute()
         except Exception as e:
             logger.warning(f"Error reading circuit state from Redis: {e}")
-        return None
-
-    async def _save_circuit_state_to_redis(
-        self, provider: str, state: CircuitBreakerState, client: "AsyncRedis[str]"
-    ) -> None:
-        """Save circuit state to Redis with TTL."""
+            return
+        for provider, data in zip(self._provider_chain, results, strict=True):
+            self._get_circuit_state(provider).apply(data or {})
+
+    async def _listen_for_transitions(self, client: "AsyncRedis[str]") -> None:
+        """Apply transitions published by any worker to the local state."""
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(CIRCUIT_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        self._apply_transition(message.get("data"))
+                finally:
+                    with contextlib.suppress(Exception):
+                        await pubsub.aclose()  # type: ignore[attr-defined]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Circuit breaker listener error: {e}")
+            await asyncio.sleep(SUBSCRIBER_RETRY_SECONDS)
+            # Transitions may have been missed while disconnected
+            await self._load_shared_state(client)
+
+    def _apply_transition(self, data: Any) -> None:
+        """Apply one transition message to the local state."""
         try:
-            state_dict = {
-                "state": state.state.value,
-                "consecutive_failures": state.consecutive_failures,
-                "last_error_signature": state.last_error_signature,
-                "cooldown_until": state.cooldown_until,
-            }
-            await client.set(
-                self._redis_key(provider),
-                json.dumps(state_dict),
-                ex=REDIS_CIRCUIT_TTL,
-            )
-        except Exception as e:
-            logger.warning(f"Error saving circuit state to Redis: {e}")
+            transition = json.loads(data)
+            provider = transition["provider"]
+        except (TypeError, ValueError, KeyError):
+            return
+        state = self._get_circuit_state(provider)
+        previous = state.state
+        state.apply(transition)
+        if state.state != previous:
+            logger.info(f"Circuit {state.state.value} for {provider} (from another worker)")
 
-    async def check_circuit(self, provider: str) -> bool:
+    async def check_circuit(self, provider: str, model: str | None = None) -> bool:
         """Check if circuit allows requests.
 
-        Reads from Redis if available, falls back to in-memory.
+        Answered from local state; other workers' transitions arrive by pub/sub.
+
+        Args:
+            provider: Provider name
+            model: Model to also check the provider/model window circuit for
 
         Returns:
             True if request should proceed, False if blocked.
         """
-        # Try Redis first
-        redis = await get_redis_client()
-        if redis:
-            redis_state = await self._get_circuit_state_from_redis(provider, redis)
-            if redis_state:
-                # Sync in-memory state with Redis
-                self._circuit_state[provider] = redis_state
-
+        await self._ensure_synced()
         state = self._get_circuit_state(provider)
-
-        if state.state == CircuitState.CLOSED:
+        if not state.admit(provider):
+            return False
+        if model is None or not settings.circuit_window_enabled:
             return True
-
-        if state.state == CircuitState.OPEN:
-            # Check if cooldown has passed
-            if state.cooldown_until and time.time() >= state.cooldown_until:
-                state.state = CircuitState.HALF_OPEN
-                logger.info(f"Circuit half-open for {provider}, allowing test request")
-                # Save half-open state to Redis
-                if redis:
-                    await self._save_circuit_state_to_redis(provider, state, redis)
-                return True
+        if not self._get_window_state(provider, model).admit(f"{provider}/{model}"):
+            state.release_probe()
             return False
-
-        # HALF_OPEN: allow one test request
         return True
 
+    def is_open(self, provider: str, model: str | None = None) -> bool:
+        """Whether provider (or provider/model) is rejecting requests, without side effects."""
+        now = time.time()
+        states = [self._circuit_state.get(provider)]
+        if model is not None:
+            states.append(self._window_state.get(f"{provider}/{model}"))
+        return any(
+            state is not None
+            and state.state == CircuitState.OPEN
+            and (state.cooldown_until or 0) > now
+            for state in states
+        )
+
+    def blocking_state(self, provider: str, model: str | None = None) -> CircuitBreakerState:
+        """State of the circuit that rejected a request (provider-wide first)."""
+        state = self._get_circuit_state(provider)
+        if state.state != CircuitState.CLOSED or model is None:
+            return state
+        return self._get_window_state(provider, model)
+
+    def record_outcome(self, provider: str, model: str, latency_ms: float, failed: bool) -> None:
+        """Add a request outcome to the provider/model window, tripping it if unhealthy.
+
+        Args:
+            provider: Provider name
+            model: Model the request was sent with
+            latency_ms: Time until the provider answered or failed
+            failed: Whether the provider failed the request
+        """
+        if not settings.circuit_window_enabled:
+            return
+        key = f"{provider}/{model}"
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = OutcomeWindow(
+                settings.circuit_window_size, settings.circuit_window_seconds
+            )
+        state = self._get_window_state(provider, model)
+        state.release_probe()
+        now = time.time()
+        window.record(failed, latency_ms, now)
+
+        if state.state == CircuitState.HALF_OPEN:
+            if failed or self._is_slow(latency_ms):
+                state.open(now)
+                self._window_opened(key, state, "trial request failed or was slow")
+            else:
+                state.close()
+                window.clear()
+                logger.info(f"Circuit closed for {key} after successful trial request")
+            return
+        if state.state != CircuitState.CLOSED:
+            return
+
+        stats = window.stats(now)
+        if stats.requests < settings.circuit_window_min_requests:
+            return
+        if stats.error_rate >= settings.circuit_error_rate_threshold:
+            reason = f"error rate {stats.error_rate:.0%} over {stats.requests} requests"
+        elif self._is_slow(stats.p95_ms):
+            reason = f"p95 latency {stats.p95_ms:.0f}ms over {stats.requests} requests"
+        else:
+            return
+        state.consecutive_failures = stats.failures
+        state.last_error_signature = f"window:{key}:{reason}"
+        state.open(now)
+        self._window_opened(key, state, reason)
+
+    def latency_percentile(self, provider: str, model: str, q: float) -> float | None:
+        """Latency percentile for provider/model, or None until the window has enough outcomes."""
+        window = self._windows.get(f"{provider}/{model}")
+        if window is None:
+            return None
+        now = time.time()
+        if window.stats(now).requests < settings.circuit_window_min_requests:
+            return None
+        return window.percentile(q, now)
+
+    def release_probe(self, provider: str, model: str | None = None) -> None:
+        """Free trial slots for a request that ended without a countable outcome."""
+        self._get_circuit_state(provider).release_probe()
+        if model is not None:
+            self._get_window_state(provider, model).release_probe()
+
+    @staticmethod
+    def _is_slow(latency_ms: float) -> bool:
+        """Whether a latency crosses the p95 threshold (if one is set)."""
+        threshold = settings.circuit_p95_latency_threshold_ms
+        return threshold > 0 and latency_ms >= threshold
+
+    def _window_opened(self, key: str, state: CircuitBreakerState, reason: str) -> None:
+        """Count and log a window circuit opening."""
+        increment_circuit_trips()
+        logger.error(
+            f"Circuit breaker OPEN for {key}: {reason}, cooldown until "
+            f"{time.strftime('%H:%M:%S', time.localtime(state.cooldown_until))}"
+        )
+
     async def on_success(self, provider: str) -> None:
         """Handle successful request - reset circuit state."""
         state = self._get_circuit_state(provider)
+        if state.state == CircuitState.CLOSED and state.consecutive_failures == 0:
+            return
         if state.state != CircuitState.CLOSED:
             logger.info(f"Circuit closed for {provider} after successful request")
-        state.state = CircuitState.CLOSED
-        state.consecutive_failures = 0
-        state.last_error_signature = None
-        state.cooldown_until = None
+        state.close()
+        await self._clear_shared_state(provider)
 
-        # Save to Redis
+    async def _clear_shared_state(self, provider: str) -> None:
+        """Close the shared circuit, notifying other workers if it was open."""
         redis = await get_redis_client()
-        if redis:
-            await self._save_circuit_state_to_redis(provider, state, redis)
+        if redis is None:
+            return
+        try:
+            await redis.eval(  # type: ignore[no-untyped-call]
+                _SUCCESS_SCRIPT, 1, self._redis_key(provider), CIRCUIT_CHANNEL, provider
+            )
+        except Exception as e:
+            logger.warning(f"Error saving circuit state to Redis: {e}")
 
     async def on_failure(
         self, provider: str, consecutive: int, error_signature: str
     ) -> CircuitBreakerState:
         """Handle failed request - update circuit state.
 
+        With Redis, the failure is counted in the shared state, which opens
+        the circuit for every worker once the threshold is reached.
+
         Args:
             provider: Provider name
-            consecutive: Number of consecutive failures
+            consecutive: Number of consecutive failures seen by this worker
             error_signature: Signature of the error
 
         Returns:
             Updated circuit breaker state
         """
         state = self._get_circuit_state(provider)
-        state.consecutive_failures = consecutive
         state.last_error_signature = error_signature
+        was_half_open = state.state == CircuitState.HALF_OPEN
+        state.release_probe()
 
-        # Save to Redis
         redis = await get_redis_client()
+        if redis is not None:
+            try:
+                shared_state, failures, cooldown_until, trips, transitioned = await redis.eval(  # type: ignore[no-untyped-call]
+                    _FAILURE_SCRIPT,
+                    1,
+                    self._redis_key(provider),
+                    CIRCUIT_BREAKER_THRESHOLD,
+                    CIRCUIT_BREAKER_COOLDOWN,
+                    time.time(),
+                    error_signature,
+                    REDIS_CIRCUIT_TTL,
+                    CIRCUIT_CHANNEL,
+                    provider,
+                    "1" if was_half_open else "0",
+                    settings.circuit_max_cooldown,
+                )
+            except Exception as e:
+                logger.warning(f"Error saving circuit state to Redis: {e}")
+            else:
+                if shared_state == CircuitState.OPEN.value:
+                    state.state = CircuitState.OPEN
+                    state.cooldown_until = float(cooldown_until)
+                    state.trips = int(trips)
+                    state.probes.clear()
+                state.consecutive_failures = max(consecutive, int(failures))
+                if transitioned:
+                    self._log_opened(provider, state)
+                return state
 
-        if consecutive >= CIRCUIT_BREAKER_THRESHOLD:
-            state.state = CircuitState.OPEN
-            state.cooldown_until = time.time() + CIRCUIT_BREAKER_COOLDOWN
-            logger.error(
-                f"Circuit breaker OPEN for {provider}: "
-                f"{consecutive} consecutive failures, cooldown until "
-                f"{time.strftime('%H:%M:%S', time.localtime(state.cooldown_until))}"
-            )
-            # Save to Redis before returning
-            if redis:
-                await self._save_circuit_state_to_redis(provider, state, redis)
-        elif redis:
-            # Save non-threshold state to Redis
-            await self._save_circuit_state_to_redis(provider, state, redis)
+        state.consecutive_failures = consecutive
+        if state.state != CircuitState.OPEN and (
+            was_half_open or consecutive >= CIRCUIT_BREAKER_THRESHOLD
+        ):
+            state.open(time.time())
+            self._log_opened(provider, state)
 
         return state
 
+    def _log_opened(self, provider: str, state: CircuitBreakerState) -> None:
+        """Log a circuit opening."""
+        logger.error(
+            f"Circuit breaker OPEN for {provider}: "
+            f"{state.consecutive_failures} consecutive failures, cooldown until "
+            f"{time.strftime('%H:%M:%S', time.localtime(state.cooldown_until))}"
+        )
+
     def reset_circuit(self, provider: str) -> None:
         """Manually reset circuit breaker for a provider."""
         if provider in self._circuit_state:
             self._circuit_state[provider] = CircuitBreakerState()
             logger.info(f"Circuit manually reset for {provider}")
+            # Reset the shared state too, when called from within the event loop
+            with contextlib.suppress(RuntimeError):
+                task = asyncio.get_running_loop().create_task(self._clear_shared_state(provider))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
 
     def get_circuit_status(self) -> dict[str, dict[str, str | int | float | None]]:
         """Get current circuit breaker status for all providers."""
@@ -234,3 +628,25 @@ class CircuitBreakerManager:
                 "cooldown_until": state.cooldown_until,
             }
         return status
+
+    def get_window_status(self) -> dict[str, dict[str, str | int | float]]:
+        """Get rolling-window stats and circuit state per provider/model."""
+        now = time.time()
+        status: dict[str, dict[str, str | int | float]] = {}
+        for key, window in self._windows.items():
+            stats = window.stats(now)
+            status[key] = {
+                "state": self._window_state[key].state.value,
+                "requests": stats.requests,
+                "error_rate": stats.error_rate,
+                "p95_ms": stats.p95_ms,
+            }
+        return status
+
+    async def close(self) -> None:
+        """Stop the transition listener."""
+        if self._subscriber_task is not None:
+            self._subscriber_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._subscriber_task
+            self._subscriber_task = None
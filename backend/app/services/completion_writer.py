@@ -0,0 +1,469 @@
+"""
+Single-transaction persistence for completions.
+
+Everything a completion writes after the provider call (user and assistant
+messages, the cost log, session metadata and status, a truncation event and
+the outbox rows of its events) is collected in one CompletionWrite and
+flushed in a single transaction. Its live events (WebSocket and stream
+fan-out) are published only once that transaction has committed, so
+subscribers never see a message that was not stored, nor see it twice when
+a failed batch is retried.
+
+settings.completion_persistence_mode picks the durability:
+
+- "sync": the request applies the write and commits before responding
+- "deferred": the write is queued for a background writer, which commits
+  batches of writes in one transaction each, so the response returns as soon
+  as the provider does. A crash loses queued writes; a full queue falls back
+  to "sync". Requests that continue a session wait for that session's queued
+  writes first, so they always see their own history.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import _get_session_factory
+from app.models import Message as DBMessage
+from app.models import Session as DBSession
+from app.models import TruncationEvent
+from app.services.context_tracker import log_token_usage
+from app.services.events import (
+    SessionEvent,
+    complete_event,
+    get_event_publisher,
+    message_event,
+)
+from app.services.session_context_cache import ContextMessage, get_session_context_cache
+from app.services.token_counter import count_single_message_tokens
+from app.services.webhook_outbox import stage_webhook_event
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_MODES = ("sync", "deferred")
+
+# Writes committed together by the deferred writer
+FLUSH_BATCH_SIZE = 50
+
+# Longest a request waits for its session's deferred writes
+SESSION_WAIT_TIMEOUT_SECONDS = 10.0
+
+# Time allowed for the final flush on shutdown
+SHUTDOWN_TIMEOUT_SECONDS = 10.0
+
+
+def normalize_content_for_storage(content: str | list[Any]) -> str:
+    """Normalize message content for database storage.
+
+    Multi-modal content (list of text/image blocks) is serialized to JSON.
+    """
+    if isinstance(content, list):
+        return json.dumps(content)
+    return content
+
+
+@dataclass
+class CompletionWrite:
+    """Everything one completion persists after the provider call."""
+
+    session_id: str
+    model: str
+    provider: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # (role, content) of the request's messages; only user/system ones are stored
+    user_messages: list[tuple[str, str | list[Any]]] = field(default_factory=list)
+    assistant_content: str | None = None  # None: no messages are stored
+    cost_usd: float | None = None  # None: no cost log or complete event
+    publish_messages: bool = True  # Cached responses only publish the complete event
+    cache_metrics: dict[str, int] | None = None
+    agent_slug: str | None = None  # Set on the session if it has none yet
+    close_session: bool = False  # One-shot sessions are completed immediately
+    truncation: TruncationEvent | None = None
+    # Messages added by apply(), for the session context cache
+    added_messages: list[ContextMessage] = field(default_factory=list, init=False, repr=False)
+    # Events staged by apply(), published by after_commit()
+    events: list[SessionEvent] = field(default_factory=list, init=False, repr=False)
+
+    async def apply(self, db: AsyncSession) -> None:
+        """Add all rows and updates to db's transaction (the caller commits)."""
+        self.events = []
+        if self.assistant_content is not None:
+            rows = self._add_messages(db, self.assistant_content)
+            await add_message_rollups(db, self.session_id, rows)
+
+        if self.assistant_content is not None and self.publish_messages:
+            for role, content in self.user_messages:
+                if role in ("user", "system"):
+                    content_str = content if isinstance(content, str) else str(content)
+                    await self._stage_event(db, message_event(self.session_id, role, content_str))
+            await self._stage_event(
+                db,
+                message_event(
+                    self.session_id, "assistant", self.assistant_content, self.output_tokens
+                ),
+            )
+
+        if self.cost_usd is not None:
+            await log_token_usage(
+                db,
+                self.session_id,
+                self.model,
+                self.input_tokens,
+                self.output_tokens,
+                self.cost_usd,
+            )
+            await self._stage_event(
+                db,
+                complete_event(
+                    self.session_id, self.input_tokens, self.output_tokens, self.cost_usd
+                ),
+            )
+
+        # The request's own session object when it is in db's identity map
+        session = await db.get(DBSession, self.session_id)
+        if session is not None:
+            _record_usage(session, self.model, self.provider)
+            if self.agent_slug and not session.agent_slug:
+                session.agent_slug = self.agent_slug
+            if self.cache_metrics:
+                _merge_cache_metrics(session, self.cache_metrics)
+            if self.close_session:
+                session.status = "completed"
+
+        if self.truncation is not None:
+            db.add(self.truncation)
+
+    async def _stage_event(self, db: AsyncSession, event: SessionEvent) -> None:
+        """Stage the event's webhook deliveries in db's transaction, publish it later."""
+        await stage_webhook_event(db, event)
+        self.events.append(event)
+
+    def _add_messages(self, db: AsyncSession, assistant_content: str) -> list[DBMessage]:
+        """Add the request's user/system messages and the assistant response."""
+        self.added_messages = []
+        rows = []
+        for role, content in self.user_messages:
+            if role in ("user", "system"):
+                stored = normalize_content_for_storage(content)
+                tokens = count_single_message_tokens(role, stored)
+                rows.append(
+                    DBMessage(
+                        session_id=self.session_id,
+                        role=role,
+                        content=stored,
+                        context_tokens=tokens,
+                    )
+                )
+                self.added_messages.append(ContextMessage(role, stored, tokens))
+        tokens = count_single_message_tokens("assistant", assistant_content)
+        rows.append(
+            DBMessage(
+                session_id=self.session_id,
+                role="assistant",
+                content=assistant_content,
+                tokens=self.output_tokens,
+                context_tokens=tokens,
+                model_used=self.model,
+            )
+        )
+        self.added_messages.append(ContextMessage("assistant", assistant_content, tokens))
+        for row in rows:
+            db.add(row)
+        return rows
+
+    async def after_commit(self) -> None:
+        """
+        Publish the staged events and update the session context cache.
+
+        Call once apply()'s transaction has committed. Never raises: the write
+        is stored, so a failure here must not make the caller apply it again.
+        """
+        publisher = get_event_publisher()
+        for event in self.events:
+            try:
+                await publisher.publish(event)
+            except Exception as e:
+                logger.warning(f"Failed to publish {event.event_type.value} event: {e}")
+        try:
+            await self.update_context_cache()
+        except Exception as e:
+            logger.warning(f"Failed to update context cache for {self.session_id}: {e}")
+
+    async def update_context_cache(self) -> None:
+        """Bring the session context cache up to date (call after the commit)."""
+        cache = get_session_context_cache()
+        if self.close_session:
+            await cache.invalidate(self.session_id)
+        else:
+            await cache.append(self.session_id, self.added_messages)
+
+
+async def add_message_rollups(db: AsyncSession, session_id: str, messages: list[DBMessage]) -> None:
+    """Add new messages to the session's rollup columns in db's transaction.
+
+    Every path that inserts messages calls this, so Session.message_count and
+    the token totals stay in step with the messages table. The increment is a
+    single UPDATE, so concurrent turns of the same session don't lose counts.
+    """
+    if not messages:
+        return
+    await db.execute(
+        update(DBSession)
+        .where(DBSession.id == session_id)
+        .values(
+            message_count=DBSession.message_count + len(messages),
+            total_input_tokens=DBSession.total_input_tokens
+            + sum(m.tokens or 0 for m in messages if m.role == "user"),
+            total_output_tokens=DBSession.total_output_tokens
+            + sum(m.tokens or 0 for m in messages if m.role == "assistant"),
+        )
+    )
+
+
+def _record_usage(session: DBSession, model: str, provider: str) -> None:
+    """Add model and provider to the session's usage arrays (idempotent)."""
+    models_used = list(session.models_used or [])
+    if model not in models_used:
+        session.models_used = [*models_used, model]
+    providers_used = list(session.providers_used or [])
+    if provider not in providers_used:
+        session.providers_used = [*providers_used, provider]
+
+
+def _merge_cache_metrics(session: DBSession, cache_metrics: dict[str, int]) -> None:
+    """Fold a response's prompt-cache metrics into the session's provider metadata."""
+    existing = dict(session.provider_metadata or {})
+    previous = existing.get("cache", {})
+    creation = cache_metrics.get("cache_creation_input_tokens", 0)
+    read = cache_metrics.get("cache_read_input_tokens", 0)
+    existing["cache"] = {
+        "last_cache_creation_tokens": creation,
+        "last_cache_read_tokens": read,
+        "total_cache_creation_tokens": previous.get("total_cache_creation_tokens", 0) + creation,
+        "total_cache_read_tokens": previous.get("total_cache_read_tokens", 0) + read,
+    }
+    session.provider_metadata = existing
+
+
+@dataclass
+class CompletionWriterStats:
+    """Counters for the deferred completion writer."""
+
+    enqueued: int = 0
+    written: int = 0
+    failed: int = 0  # Writes lost because their transaction failed
+    overflowed: int = 0  # Writes applied synchronously because the queue was full
+    flushes: int = 0
+
+
+class CompletionWriter:
+    """Bounded queue of CompletionWrites committed in batches in the background."""
+
+    def __init__(
+        self,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        max_queue_size: int | None = None,
+    ) -> None:
+        self._batch_size = batch_size
+        self._max_queue_size = max_queue_size or settings.completion_write_queue_size
+        self._writes: deque[CompletionWrite] = deque()
+        self._pending_sessions: dict[str, int] = {}
+        self._flushed = asyncio.Condition()
+        self._wakeup = asyncio.Event()
+        self._shutdown_event = asyncio.Event()
+        self._flush_task: asyncio.Task[None] | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.stats = CompletionWriterStats()
+
+    @property
+    def pending(self) -> int:
+        """Number of writes waiting to be committed."""
+        return len(self._writes)
+
+    def submit(self, write: CompletionWrite) -> bool:
+        """
+        Queue a write for the background writer (never blocks).
+
+        Returns:
+            False if the queue is full and the caller must write synchronously
+        """
+        if len(self._writes) >= self._max_queue_size or self._shutdown_event.is_set():
+            self.stats.overflowed += 1
+            return False
+        self._writes.append(write)
+        self._pending_sessions[write.session_id] = (
+            self._pending_sessions.get(write.session_id, 0) + 1
+        )
+        self.stats.enqueued += 1
+        self._ensure_started()
+        self._wakeup.set()
+        return True
+
+    async def wait_for_session(self, session_id: str) -> None:
+        """Wait until the session's queued writes are committed (or failed)."""
+        if session_id not in self._pending_sessions:
+            return
+        async with self._flushed:
+            try:
+                await asyncio.wait_for(
+                    self._flushed.wait_for(lambda: session_id not in self._pending_sessions),
+                    timeout=SESSION_WAIT_TIMEOUT_SECONDS,
+                )
+            except TimeoutError:
+                logger.warning(f"Timed out waiting for deferred writes of session {session_id}")
+
+    def _ensure_started(self) -> None:
+        """Start the flush task on first use (also covers apps run without lifespan)."""
+        if self._flush_task is None and not self._shutdown_event.is_set():
+            self.start()
+
+    def start(self) -> None:
+        """Start the background flush task in the running event loop."""
+        if self._flush_task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._shutdown_event.clear()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Started deferred completion writer (batch={self._batch_size})")
+
+    async def _flush_loop(self) -> None:
+        """Commit queued writes as soon as they arrive."""
+        while not self._shutdown_event.is_set():
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Commit all queued writes, one transaction per batch.
+
+        A failed batch is retried one write per transaction, so one bad write
+        does not take its neighbours down with it.
+
+        Returns:
+            Number of writes committed
+        """
+        written = 0
+        while self._writes:
+            count = min(len(self._writes), self._batch_size)
+            batch = [self._writes.popleft() for _ in range(count)]
+            try:
+                written += await self._write_batch(batch)
+            except Exception as e:
+                logger.warning(f"Failed to commit {len(batch)} completion writes: {e}")
+                written += await self._write_each(batch)
+            finally:
+                await self._release_sessions(batch)
+        self.stats.written += written
+        return written
+
+    async def _write_batch(self, batch: list[CompletionWrite]) -> int:
+        """Apply writes in one transaction, then publish their events."""
+        session_factory = _get_session_factory()
+        async with session_factory() as db, db.begin():
+            for write in batch:
+                await write.apply(db)
+        self.stats.flushes += 1
+        for write in batch:
+            await write.after_commit()
+        return len(batch)
+
+    async def _write_each(self, batch: list[CompletionWrite]) -> int:
+        """Retry a failed batch one write per transaction."""
+        written = 0
+        for write in batch:
+            try:
+                written += await self._write_batch([write])
+            except Exception as e:
+                self.stats.failed += 1
+                logger.error(f"Lost completion write for session {write.session_id}: {e}")
+        return written
+
+    async def _release_sessions(self, batch: list[CompletionWrite]) -> None:
+        async with self._flushed:
+            for write in batch:
+                remaining = self._pending_sessions.get(write.session_id, 0) - 1
+                if remaining > 0:
+                    self._pending_sessions[write.session_id] = remaining
+                else:
+                    self._pending_sessions.pop(write.session_id, None)
+            self._flushed.notify_all()
+
+    async def shutdown(self) -> None:
+        """Stop the flush task and commit everything still queued."""
+        self._shutdown_event.set()
+        self._wakeup.set()
+        if self._flush_task is not None:
+            try:
+                await asyncio.wait_for(self._flush_task, timeout=SHUTDOWN_TIMEOUT_SECONDS)
+            except TimeoutError:
+                self._flush_task.cancel()
+            self._flush_task = None
+
+        try:
+            await asyncio.wait_for(self.flush(), timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        except TimeoutError:
+            logger.warning(f"Timed out flushing completion writes, {self.pending} lost")
+        logger.info(
+            f"Completion writer stopped (written={self.stats.written} failed={self.stats.failed})"
+        )
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get writer statistics."""
+        return {
+            "pending": self.pending,
+            "enqueued": self.stats.enqueued,
+            "written": self.stats.written,
+            "failed": self.stats.failed,
+            "overflowed": self.stats.overflowed,
+            "flushes": self.stats.flushes,
+        }
+
+
+# Global writer instance
+_writer: CompletionWriter | None = None
+
+
+def get_completion_writer() -> CompletionWriter:
+    """Get the shared writer, creating it on first use in this event loop."""
+    global _writer
+    loop = asyncio.get_running_loop()
+    if _writer is None or (_writer.loop is not None and _writer.loop is not loop):
+        _writer = CompletionWriter()
+    return _writer
+
+
+def get_completion_writer_stats() -> dict[str, Any] | None:
+    """Get stats for the shared writer, or None if it was never started."""
+    return _writer.get_stats() if _writer is not None else None
+
+
+async def persist_completion(db: AsyncSession, write: CompletionWrite) -> None:
+    """Persist a completion according to settings.completion_persistence_mode."""
+    if settings.completion_persistence_mode == "deferred" and get_completion_writer().submit(write):
+        return
+    await write.apply(db)
+    await db.commit()
+    await write.after_commit()
+
+
+async def wait_for_session_writes(session_id: str) -> None:
+    """Wait for a session's deferred writes before reading its history."""
+    if _writer is not None:
+        await _writer.wait_for_session(session_id)
+
+
+async def shutdown_completion_writer() -> None:
+    """Commit queued writes and stop the writer (call on app shutdown)."""
+    global _writer
+    if _writer is not None:
+        await _writer.shutdown()
+        _writer = None
@@ -3,16 +3,22 @@ Context tracking service for session token usage.
 
 Tracks cumulative token usage per session, calculates context window utilization,
 and provides warnings when approaching model limits.
+
+Usage is kept as a running record on the session row (last request's input
+tokens, cumulative input/output tokens and the model's context limit),
+updated atomically by log_token_usage in the same transaction as the cost
+log. Reading it is a primary-key lookup, or free when the session is already
+loaded, instead of aggregating cost_logs.
 """
 
 import logging
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
-from sqlalchemy import func, select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import CostLog
+from app.models import CostLog, Session
 from app.services.token_counter import get_context_limit
 
 if TYPE_CHECKING:
@@ -35,6 +41,8 @@ class ContextUsage:
     percent_used: float
     remaining_tokens: int
     warning: str | None = None
+    cumulative_input_tokens: int = 0
+    cumulative_output_tokens: int = 0
 
 
 async def log_token_usage(
@@ -48,6 +56,9 @@ async def log_token_usage(
     """
     Log token usage for a request to the CostLog table.
 
+    Also updates the session's running usage record with a single UPDATE, so
+    concurrent requests of the same session don't lose counts.
+
     Args:
         db: Database session
         session_id: Session ID
@@ -64,6 +75,16 @@ async def log_token_usage(
         cost_usd=cost_usd,
     )
     db.add(cost_log)
+    await db.execute(
+        update(Session)
+        .where(Session.id == session_id)
+        .values(
+            last_input_tokens=input_tokens,
+            usage_input_tokens=Session.usage_input_tokens + input_tokens,
+            usage_output_tokens=Session.usage_output_tokens + output_tokens,
+            context_limit_tokens=get_context_limit(model),
+        )
+    )
     # Don't commit here - let caller handle transaction
 
 
@@ -82,49 +103,23 @@ async def get_session_token_totals(
         Tuple of (total_input_tokens, total_output_tokens)
     """
     result = await db.execute(
-        select(
-            func.coalesce(func.sum(CostLog.input_tokens), 0),
-            func.coalesce(func.sum(CostLog.output_tokens), 0),
-        ).where(CostLog.session_id == session_id)
+        select(Session.usage_input_tokens, Session.usage_output_tokens).where(
+            Session.id == session_id
+        )
     )
-    row = result.one()
-    return int(row[0]), int(row[1])
+    row = result.one_or_none()
+    if row is None:
+        return 0, 0
+    return int(row[0] or 0), int(row[1] or 0)
 
 
-async def calculate_context_usage(
-    db: AsyncSession,
-    session_id: str,
-    model: str,
+def build_context_usage(
+    current_context: int,
+    limit: int,
+    cumulative_input_tokens: int = 0,
+    cumulative_output_tokens: int = 0,
 ) -> ContextUsage:
-    """
-    Calculate current context window usage for a session.
-
-    Uses cumulative input tokens from CostLog as the context usage,
-    since input tokens include the conversation history.
-
-    Args:
-        db: Database session
-        session_id: Session ID
-        model: Model identifier (for context limit lookup)
-
-    Returns:
-        ContextUsage with current stats and any warnings
-    """
-    _total_input, _total_output = await get_session_token_totals(db, session_id)
-
-    # The latest input_tokens represents the full context sent
-    # (conversation history + new message)
-    # Get the most recent request's input tokens as current context size
-    result = await db.execute(
-        select(CostLog.input_tokens)
-        .where(CostLog.session_id == session_id)
-        .order_by(CostLog.created_at.desc())
-        .limit(1)
-    )
-    latest_row = result.scalar_one_or_none()
-    current_context = latest_row if latest_row else 0
-
-    limit = get_context_limit(model)
+    """Context usage and warning for a context of current_context tokens."""
     percent = (current_context / limit * 100) if limit > 0 else 0.0
     remaining = max(0, limit - current_context)
 
@@ -142,6 +137,62 @@ async def calculate_context_usage(
         percent_used=round(percent, 2),
         remaining_tokens=remaining,
         warning=warning,
+        cumulative_input_tokens=cumulative_input_tokens,
+        cumulative_output_tokens=cumulative_output_tokens,
+    )
+
+
+def context_usage_from_session(session: Session) -> ContextUsage:
+    """
+    Context usage of an already loaded session (no queries).
+
+    The latest request's input tokens represent the full context sent
+    (conversation history + new message). The limit is that of the model
+    the latest request used, or the session's model before any request.
+    """
+    return build_context_usage(
+        session.last_input_tokens or 0,
+        session.context_limit_tokens or get_context_limit(session.model),
+        session.usage_input_tokens or 0,
+        session.usage_output_tokens or 0,
+    )
+
+
+async def calculate_context_usage(
+    db: AsyncSession,
+    session_id: str,
+    model: str,
+) -> ContextUsage:
+    """
+    Calculate current context window usage for a session.
+
+    Reads the session's running usage record, whose latest input tokens are
+    the current context size (input tokens include the conversation history).
+
+    Args:
+        db: Database session
+        session_id: Session ID
+        model: Model identifier (for context limit lookup before any request)
+
+    Returns:
+        ContextUsage with current stats and any warnings
+    """
+    result = await db.execute(
+        select(
+            Session.last_input_tokens,
+            Session.usage_input_tokens,
+            Session.usage_output_tokens,
+            Session.context_limit_tokens,
+        ).where(Session.id == session_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return build_context_usage(0, get_context_limit(model))
+    return build_context_usage(
+        row.last_input_tokens or 0,
+        row.context_limit_tokens or get_context_limit(model),
+        row.usage_input_tokens or 0,
+        row.usage_output_tokens or 0,
     )
 
 
@@ -154,6 +205,9 @@ async def check_context_before_request(
     """
     Check if request will exceed context limit.
 
+    Runs no queries: the estimate is counted from the session's cached context
+    (see session_context_cache) plus the new messages.
+
     Args:
         db: Database session
         session_id: Session ID
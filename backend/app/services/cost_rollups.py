@@ -0,0 +1,325 @@
+"""
+Hourly cost rollups for cost analytics.
+
+cost_rollups holds one row per (hour, project, agent, model, session type,
+external ID) with summed tokens, cost and request count. refresh_cost_rollups
+(celery beat, every 5 minutes) recomputes the closed hours since the newest
+rolled bucket, replacing the last settings.cost_rollup_lookback_hours of them
+so cost logs committed shortly after their hour ended are still counted.
+
+aggregate_costs answers from the rollups for every whole hour they cover and
+from cost_logs only for the rest of the requested range: the partial hours at
+its edges and everything after the newest rolled bucket (the current hour).
+Analytics therefore scale with the number of buckets, not requests.
+
+Rollups keep the session attributes (agent, external ID) a cost log had when
+its hour was rolled up, and deleting a session does not remove its rolled
+costs.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import String, and_, cast, delete, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import CostLog, CostRollup, Session
+
+logger = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+
+# Groups that are columns of the rollup key
+DIMENSIONS = ("project_id", "agent_slug", "model", "session_type", "external_id")
+
+# Groups that truncate the time column
+DATE_GROUPS = ("day", "week", "month")
+
+
+@dataclass
+class CostFilters:
+    """Filters for cost aggregation."""
+
+    project_id: str | None = None
+    model: str | None = None  # Substring match
+    agent_slug: str | None = None
+    session_type: str | None = None
+    external_id: str | None = None
+    start: datetime | None = None  # Inclusive
+    end: datetime | None = None  # Inclusive
+
+
+@dataclass
+class CostTotals:
+    """Summed usage of one group."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    request_count: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """Input plus output tokens."""
+        return self.input_tokens + self.output_tokens
+
+
+@dataclass
+class RawRange:
+    """Part of a time range answered from cost_logs (start inclusive)."""
+
+    start: datetime | None
+    end: datetime | None
+    end_inclusive: bool
+
+
+def floor_hour(ts: datetime) -> datetime:
+    """Start of the hour containing ts."""
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(ts: datetime) -> datetime:
+    """Start of the first hour that begins at or after ts."""
+    floored = floor_hour(ts)
+    return floored if floored == ts else floored + HOUR
+
+
+def _aware(ts: datetime | None) -> datetime | None:
+    """Naive datetimes are UTC (as the database session assumes)."""
+    if ts is not None and ts.tzinfo is None:
+        return ts.replace(tzinfo=UTC)
+    return ts
+
+
+def plan_ranges(
+    start: datetime | None,
+    end: datetime | None,
+    boundary: datetime | None,
+) -> tuple[tuple[datetime | None, datetime] | None, list[RawRange]]:
+    """
+    Split [start, end] into rolled-up hours and raw cost_logs ranges.
+
+    Args:
+        start: Range start (inclusive), None for unbounded
+        end: Range end (inclusive), None for unbounded
+        boundary: End of the newest rolled bucket, None without rollups
+
+    Returns:
+        ((first bucket or None, end of the last bucket) or None, raw ranges)
+    """
+    start, end = _aware(start), _aware(end)
+    if boundary is None:
+        return None, [RawRange(start, end, True)]
+
+    rolled_start = ceil_hour(start) if start is not None else None
+    rolled_end = min(boundary, floor_hour(end)) if end is not None else boundary
+    if rolled_start is not None and rolled_start >= rolled_end:
+        return None, [RawRange(start, end, True)]
+
+    raw = []
+    if start is not None and rolled_start is not None and start < rolled_start:
+        raw.append(RawRange(start, rolled_start, False))
+    raw.append(RawRange(rolled_end, end, True))
+    return (rolled_start, rolled_end), raw
+
+
+def _raw_columns() -> dict[str, Any]:
+    """Rollup key expressions over cost_logs joined to sessions."""
+    return {
+        "project_id": Session.project_id,
+        "agent_slug": func.coalesce(Session.agent_slug, ""),
+        "model": CostLog.model,
+        "session_type": cast(Session.session_type, String),
+        "external_id": func.coalesce(Session.external_id, ""),
+        "time": CostLog.created_at,
+    }
+
+
+def _rollup_columns() -> dict[str, Any]:
+    return {
+        "project_id": CostRollup.project_id,
+        "agent_slug": CostRollup.agent_slug,
+        "model": CostRollup.model,
+        "session_type": CostRollup.session_type,
+        "external_id": CostRollup.external_id,
+        "time": CostRollup.bucket,
+    }
+
+
+def _aggregate_query(
+    group: str | None,
+    filters: CostFilters,
+    rolled: bool,
+) -> Any:
+    """Grouped sums from cost_rollups (rolled) or cost_logs, without the time range."""
+    columns = _rollup_columns() if rolled else _raw_columns()
+    if rolled:
+        sums = [
+            func.sum(CostRollup.input_tokens).label("input_tokens"),
+            func.sum(CostRollup.output_tokens).label("output_tokens"),
+            func.sum(CostRollup.cost_usd).label("total_cost"),
+            func.sum(CostRollup.request_count).label("request_count"),
+        ]
+    else:
+        sums = [
+            func.sum(CostLog.input_tokens).label("input_tokens"),
+            func.sum(CostLog.output_tokens).label("output_tokens"),
+            func.sum(CostLog.cost_usd).label("total_cost"),
+            func.count(CostLog.id).label("request_count"),
+        ]
+
+    if group in DATE_GROUPS:
+        key = func.date_trunc(group, columns["time"])
+    elif group is not None:
+        key = columns[group]
+    else:
+        key = None
+
+    query = select(*([key.label("group_key")] if key is not None else []), *sums)
+    if not rolled:
+        query = query.join(Session, CostLog.session_id == Session.id)
+    if key is not None:
+        query = query.group_by(key)
+
+    for name in ("project_id", "agent_slug", "session_type", "external_id"):
+        value = getattr(filters, name)
+        if value:
+            query = query.where(columns[name] == value)
+    if filters.model:
+        query = query.where(columns["model"].contains(filters.model))
+    return query
+
+
+async def rollup_boundary(db: AsyncSession) -> datetime | None:
+    """End of the newest rolled bucket (rollups are complete before it)."""
+    result = await db.execute(select(func.max(CostRollup.bucket)))
+    newest = result.scalar()
+    return newest + HOUR if newest else None
+
+
+async def aggregate_costs(
+    db: AsyncSession,
+    group: str | None,
+    filters: CostFilters,
+) -> dict[Any, CostTotals]:
+    """
+    Sum cost_logs by group, from rollups where possible.
+
+    Args:
+        db: Database session
+        group: One of DIMENSIONS or DATE_GROUPS, None for a single total
+        filters: Filters and time range
+
+    Returns:
+        Totals by group key (None key when group is None), in no particular order
+    """
+    boundary = await rollup_boundary(db) if settings.cost_rollups_enabled else None
+    rolled_range, raw_ranges = plan_ranges(filters.start, filters.end, boundary)
+
+    statements = []
+    if rolled_range is not None:
+        rolled_start, rolled_end = rolled_range
+        query = _aggregate_query(group, filters, rolled=True).where(CostRollup.bucket < rolled_end)
+        if rolled_start is not None:
+            query = query.where(CostRollup.bucket >= rolled_start)
+        statements.append(query)
+
+    # One cost_logs query for the edge hours and the tail after the rollups
+    conditions = []
+    for raw in raw_ranges:
+        bounds = []
+        if raw.start is not None:
+            bounds.append(CostLog.created_at >= raw.start)
+        if raw.end is not None:
+            bounds.append(
+                CostLog.created_at <= raw.end if raw.end_inclusive else CostLog.created_at < raw.end
+            )
+        conditions.append(bounds)
+    query = _aggregate_query(group, filters, rolled=False)
+    if all(conditions):
+        query = query.where(or_(*(and_(*bounds) for bounds in conditions)))
+    statements.append(query)
+
+    totals: dict[Any, CostTotals] = {}
+    for statement in statements:
+        result = await db.execute(statement)
+        for row in result.all():
+            if not row.request_count:
+                continue
+            key = row.group_key if group is not None else None
+            entry = totals.setdefault(key, CostTotals())
+            entry.input_tokens += int(row.input_tokens or 0)
+            entry.output_tokens += int(row.output_tokens or 0)
+            entry.cost_usd += float(row.total_cost or 0.0)
+            entry.request_count += int(row.request_count or 0)
+    return totals
+
+
+async def refresh_cost_rollups(db: AsyncSession, now: datetime | None = None) -> int:
+    """
+    Roll up closed hours of cost_logs into cost_rollups and commit.
+
+    Hours count as closed settings.cost_rollup_grace_seconds after they end.
+    Starting from the newest rolled bucket (less the lookback), every closed
+    hour is recomputed and replaced, so the refresh is idempotent.
+
+    Args:
+        db: Database session
+        now: Current time (for tests)
+
+    Returns:
+        Number of rollup rows written
+    """
+    now = now or datetime.now(UTC)
+    cutoff = floor_hour(now - timedelta(seconds=settings.cost_rollup_grace_seconds))
+
+    newest = (await db.execute(select(func.max(CostRollup.bucket)))).scalar()
+    if newest is None:
+        oldest = (await db.execute(select(func.min(CostLog.created_at)))).scalar()
+        if oldest is None:
+            return 0
+        start = floor_hour(oldest)
+    else:
+        start = newest + HOUR - settings.cost_rollup_lookback_hours * HOUR
+    if start >= cutoff:
+        return 0
+
+    columns = _raw_columns()
+    bucket = func.date_trunc("hour", CostLog.created_at)
+    keys = [bucket, *(columns[name] for name in DIMENSIONS)]
+    aggregate = (
+        select(
+            *keys,
+            func.sum(CostLog.input_tokens),
+            func.sum(CostLog.output_tokens),
+            func.sum(CostLog.cost_usd),
+            func.count(CostLog.id),
+        )
+        .join(Session, CostLog.session_id == Session.id)
+        .where(CostLog.created_at >= start, CostLog.created_at < cutoff)
+        .group_by(*keys)
+    )
+
+    await db.execute(
+        delete(CostRollup).where(CostRollup.bucket >= start, CostRollup.bucket < cutoff)
+    )
+    result = await db.execute(
+        insert(CostRollup).from_select(
+            [
+                "bucket",
+                *DIMENSIONS,
+                "input_tokens",
+                "output_tokens",
+                "cost_usd",
+                "request_count",
+            ],
+            aggregate,
+        )
+    )
+    await db.commit()
+    written = int(getattr(result, "rowcount", 0) or 0)
+    logger.info(f"Rolled up costs for {start.isoformat()} - {cutoff.isoformat()} ({written} rows)")
+    return written
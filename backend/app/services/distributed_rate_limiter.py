@@ -0,0 +1,316 @@
+"""
+Distributed rate limiting (GCRA token buckets in Redis).
+
+Limits are enforced across all workers: each bucket is a single Redis key
+holding its theoretical arrival time (TAT), updated by an atomic Lua script.
+One call checks several buckets at once (e.g. a client's RPM and TPM plus the
+provider's quota) and only consumes from them if all allow the request, so a
+rejected request never eats into the other limits.
+
+If Redis is unavailable, the same algorithm runs against process-local
+buckets, so limits degrade to per-worker instead of disappearing. Redis calls
+time out quickly, and after a failure Redis is left alone for
+REDIS_RETRY_SECONDS, so a dead Redis costs one short timeout rather than one
+per request.
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, replace
+
+import redis.asyncio as redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bucket key prefix
+KEY_PREFIX = "agent-hub:ratelimit:"
+
+# Default bucket period (limits are per minute)
+PERIOD_SECONDS = 60.0
+
+# Connect/read timeout for Redis calls (every check is on the request path)
+REDIS_TIMEOUT_SECONDS = 0.5
+
+# After a Redis error, use local buckets without trying Redis for this long
+REDIS_RETRY_SECONDS = 30.0
+
+# Check every bucket, then consume from all of them only if all allow.
+# KEYS: bucket keys. ARGV: (interval_ms, burst_ms, cost) per key, then force.
+# Returns {allowed, rejecting key index (1-based, 0 if allowed), retry_after_ms}
+_GCRA_SCRIPT = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local force = ARGV[#KEYS * 3 + 1] == "1"
+local tats = {}
+for i = 1, #KEYS do
+    local interval = tonumber(ARGV[(i - 1) * 3 + 1])
+    local burst = tonumber(ARGV[(i - 1) * 3 + 2])
+    local cost = tonumber(ARGV[(i - 1) * 3 + 3])
+    local tat = tonumber(redis.call("GET", KEYS[i]) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + cost * interval
+    if not force and new_tat - burst > now then
+        return {0, i, math.ceil(new_tat - burst - now)}
+    end
+    tats[i] = new_tat
+end
+for i = 1, #KEYS do
+    redis.call("SET", KEYS[i], string.format("%.3f", tats[i]), "PX", math.max(math.ceil(tats[i] - now), 1))
+end
+return {1, 0, 0}
+"""
+
+
+@dataclass
+class Limit:
+    """One bucket: `limit` units per `period` seconds, consuming `cost` units."""
+
+    key: str
+    limit: int
+    cost: int = 1
+    unit: str = "requests"  # "requests" or "tokens"
+    scope: str = ""  # Shown in rejection messages (e.g. provider name)
+    period: float = PERIOD_SECONDS
+
+    @property
+    def description(self) -> str:
+        """Limit description, e.g. "claude tokens/minute"."""
+        return f"{self.scope} {self.unit}/minute".lstrip()
+
+    @property
+    def interval_ms(self) -> float:
+        """Milliseconds to regenerate one unit."""
+        return self.period * 1000 / self.limit
+
+    @property
+    def effective_cost(self) -> int:
+        """Cost clamped to the bucket size so an oversized request can still pass."""
+        return min(self.cost, self.limit)
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of a rate limit check."""
+
+    allowed: bool
+    retry_after: float = 0.0  # Seconds until the rejecting bucket allows the request
+    limit: Limit | None = None  # Bucket that rejected the request
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After header value (whole seconds, at least 1)."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+    @property
+    def message(self) -> str:
+        """Human readable rejection message."""
+        if self.allowed or self.limit is None:
+            return ""
+        return (
+            f"Rate limit exceeded: {self.limit.limit} {self.limit.description}. "
+            f"Retry after {self.retry_after_header}s"
+        )
+
+
+@dataclass
+class RateLimiterStats:
+    """Rate limiter statistics."""
+
+    allowed: int = 0
+    rejected: int = 0
+    local_fallbacks: int = 0  # Checks served by local buckets because Redis failed
+
+
+class _LocalBuckets:
+    """Process-local GCRA buckets used while Redis is unavailable."""
+
+    def __init__(self) -> None:
+        self._tats: dict[str, float] = {}  # key -> TAT in monotonic ms
+        self._lock = threading.Lock()
+
+    def apply(self, limits: list[Limit], force: bool = False) -> RateLimitDecision:
+        now = time.monotonic() * 1000
+        with self._lock:
+            new_tats = []
+            for limit in limits:
+                tat = max(self._tats.get(limit.key, now), now)
+                new_tat = tat + limit.effective_cost * limit.interval_ms
+                burst = limit.period * 1000
+                if not force and new_tat - burst > now:
+                    return RateLimitDecision(
+                        allowed=False, retry_after=(new_tat - burst - now) / 1000, limit=limit
+                    )
+                new_tats.append(new_tat)
+            for limit, new_tat in zip(limits, new_tats, strict=True):
+                self._tats[limit.key] = new_tat
+            # Drop buckets that have fully refilled
+            if len(self._tats) > 10_000:
+                self._tats = {k: tat for k, tat in self._tats.items() if tat > now}
+        return RateLimitDecision(allowed=True)
+
+
+class DistributedRateLimiter:
+    """GCRA rate limiter shared across workers via Redis."""
+
+    def __init__(self, redis_url: str | None = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            redis_url: Redis connection URL. Falls back to settings.
+        """
+        self._redis_url = redis_url or settings.agent_hub_redis_url
+        self._client: redis.Redis | None = None  # type: ignore[type-arg]
+        self._local = _LocalBuckets()
+        self._stats = RateLimiterStats()
+        self._redis_retry_at = 0.0  # Monotonic time before which Redis is skipped
+
+    async def _get_client(self) -> redis.Redis:  # type: ignore[type-arg]
+        """Get or create Redis client."""
+        if self._client is None:
+            self._client = redis.from_url(
+                self._redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+                socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+                socket_timeout=REDIS_TIMEOUT_SECONDS,
+            )
+        return self._client
+
+    async def acquire(self, limits: list[Limit]) -> RateLimitDecision:
+        """
+        Consume from all buckets if every one of them allows the request.
+
+        Args:
+            limits: Buckets to check (limits <= 0 are treated as unlimited)
+
+        Returns:
+            Decision; when rejected, includes the bucket and retry delay
+        """
+        limits = [limit for limit in limits if limit.limit > 0]
+        if not limits:
+            return RateLimitDecision(allowed=True)
+
+        decision = await self._apply(limits, force=False)
+        if decision.allowed:
+            self._stats.allowed += 1
+        else:
+            self._stats.rejected += 1
+            logger.info(f"Rate limited {decision.limit.key if decision.limit else ''}")
+        return decision
+
+    async def charge(self, limits: list[Limit]) -> None:
+        """
+        Consume from buckets unconditionally (e.g. output tokens after a response).
+
+        Args:
+            limits: Buckets to charge
+        """
+        limits = [limit for limit in limits if limit.limit > 0 and limit.cost > 0]
+        if limits:
+            await self._apply(limits, force=True)
+
+    async def _apply(self, limits: list[Limit], force: bool) -> RateLimitDecision:
+        """Run the GCRA script, falling back to local buckets on Redis errors."""
+        if time.monotonic() < self._redis_retry_at:
+            self._stats.local_fallbacks += 1
+            return self._local.apply(limits, force=force)
+        args: list[float | int | str] = []
+        for limit in limits:
+            args.extend([limit.interval_ms, limit.period * 1000, limit.effective_cost])
+        args.append("1" if force else "0")
+        try:
+            client = await self._get_client()
+            allowed, index, retry_ms = await client.eval(  # type: ignore[no-untyped-call]
+                _GCRA_SCRIPT,
+                len(limits),
+                *[f"{KEY_PREFIX}{limit.key}" for limit in limits],
+                *args,
+            )
+        except Exception as e:
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            logger.warning(
+                f"Rate limiter Redis error (using local buckets for "
+                f"{REDIS_RETRY_SECONDS:.0f}s): {e}"
+            )
+            self._stats.local_fallbacks += 1
+            return self._local.apply(limits, force=force)
+
+        if allowed:
+            return RateLimitDecision(allowed=True)
+        return RateLimitDecision(
+            allowed=False, retry_after=int(retry_ms) / 1000, limit=limits[int(index) - 1]
+        )
+
+    def get_stats(self) -> RateLimiterStats:
+        """Get rate limiter statistics."""
+        return self._stats
+
+    def reset_stats(self) -> None:
+        """Reset rate limiter statistics."""
+        self._stats = RateLimiterStats()
+
+    async def close(self) -> None:
+        """Close Redis connection."""
+        if self._client:
+            await self._client.close()
+            self._client = None
+
+
+def client_limits(client_id: str, rpm: int, tpm: int, tokens: int) -> list[Limit]:
+    """Buckets for a registered client's RPM/TPM."""
+    return [
+        Limit(key=f"client:{client_id}:rpm", limit=rpm),
+        Limit(key=f"client:{client_id}:tpm", limit=tpm, cost=tokens, unit="tokens"),
+    ]
+
+
+def api_key_limits(key_hash: str, rpm: int, tpm: int, tokens: int) -> list[Limit]:
+    """Buckets for an API key's RPM/TPM."""
+    return [
+        Limit(key=f"key:{key_hash}:rpm", limit=rpm),
+        Limit(key=f"key:{key_hash}:tpm", limit=tpm, cost=tokens, unit="tokens"),
+    ]
+
+
+def token_limits(limits: list[Limit], tokens: int) -> list[Limit]:
+    """The token buckets among limits, re-costed (for charging output tokens)."""
+    return [replace(limit, cost=tokens) for limit in limits if limit.unit == "tokens"]
+
+
+def provider_limits(provider: str, tokens: int) -> list[Limit]:
+    """Buckets for a provider's configured RPM/TPM (none if unconfigured)."""
+    limits = []
+    rpm = settings.rate_limit_provider_rpm.get(provider, 0)
+    if rpm > 0:
+        limits.append(Limit(key=f"provider:{provider}:rpm", limit=rpm, scope=provider))
+    tpm = settings.rate_limit_provider_tpm.get(provider, 0)
+    if tpm > 0:
+        limits.append(
+            Limit(
+                key=f"provider:{provider}:tpm",
+                limit=tpm,
+                cost=tokens,
+                unit="tokens",
+                scope=provider,
+            )
+        )
+    return limits
+
+
+# Singleton instance
+_rate_limiter: DistributedRateLimiter | None = None
+
+
+def get_distributed_rate_limiter() -> DistributedRateLimiter:
+    """Get the singleton distributed rate limiter instance."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = DistributedRateLimiter()
+    return _rate_limiter
@@ -0,0 +1,397 @@
+"""
+Redis Streams backend for session events.
+
+Events are appended to a single stream (STREAM_KEY) so every worker sees
+every event, regardless of which worker published it:
+
+- Appends are buffered and written with one pipelined XADD batch every
+  FLUSH_INTERVAL_SECONDS (or FLUSH_BATCH_SIZE events), trimmed with
+  MAXLEN ~ settings.event_stream_maxlen.
+- Each worker runs one XREAD reader that fans events out to its own
+  WebSocket subscribers (EventPublisher.fan_out).
+- Handlers (webhook dispatch) run from the WEBHOOK_GROUP consumer group, so
+  each event is handled by exactly one worker; entries left pending by a
+  dead worker are reclaimed with XAUTOCLAIM after CLAIM_IDLE_MS.
+
+Stream entry IDs double as event IDs, which is what lets reconnecting
+clients resume with XRANGE from their last-seen ID.
+
+If Redis is unavailable, events are delivered locally instead (this worker's
+subscribers and handlers only) rather than lost.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import socket
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from app.config import settings
+from app.services.events import SessionEvent
+
+if TYPE_CHECKING:
+    from app.services.events import EventPublisher
+
+logger = logging.getLogger(__name__)
+
+# Stream holding all session events
+STREAM_KEY = "agent-hub:events"
+
+# Consumer group that runs event handlers (webhooks) once per event
+WEBHOOK_GROUP = "webhooks"
+
+# Flush buffered events at least this often
+FLUSH_INTERVAL_SECONDS = 0.02
+
+# Flush as soon as this many events are buffered; also the read batch size
+FLUSH_BATCH_SIZE = 100
+
+# How long XREAD/XREADGROUP block waiting for new entries
+READ_BLOCK_MS = 1000
+
+# Pending group entries idle this long are reclaimed from their consumer
+CLAIM_IDLE_MS = 60_000
+
+# Back off this long after a Redis error in a reader loop
+ERROR_BACKOFF_SECONDS = 1.0
+
+# Time allowed for the final flush on shutdown
+SHUTDOWN_TIMEOUT_SECONDS = 5.0
+
+
+@dataclass
+class EventStreamStats:
+    """Counters for the Redis Streams event backend."""
+
+    appended: int = 0
+    flushes: int = 0
+    local_fallbacks: int = 0  # Events delivered locally because XADD failed
+    read: int = 0  # Entries fanned out to this worker's subscribers
+    handled: int = 0  # Entries this worker ran handlers for (group consumer)
+    claimed: int = 0  # Entries reclaimed from idle consumers
+    read_errors: int = 0
+
+
+class RedisStreamEventBackend:
+    """Publishes session events through a Redis Stream shared by all workers."""
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        stream_key: str = STREAM_KEY,
+        maxlen: int | None = None,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        """
+        Initialize the backend.
+
+        Args:
+            redis_url: Redis connection URL. Falls back to settings.
+            stream_key: Stream to append to and read from
+            maxlen: Approximate stream length to keep. Falls back to settings.
+            batch_size: Events per pipelined XADD batch
+            flush_interval: Seconds between flushes while events are buffered
+        """
+        self._redis_url = redis_url or settings.agent_hub_redis_url
+        self._client: redis.Redis | None = None  # type: ignore[type-arg]
+        self._stream_key = stream_key
+        self._maxlen = maxlen if maxlen is not None else settings.event_stream_maxlen
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._publisher: EventPublisher | None = None
+        self._buffer: deque[SessionEvent] = deque()
+        self._wakeup = asyncio.Event()
+        self._shutdown_event = asyncio.Event()
+        self._reader_ready = asyncio.Event()
+        self._flush_task: asyncio.Task[None] | None = None
+        self._reader_tasks: list[asyncio.Task[None]] = []
+        self.stats = EventStreamStats()
+
+    async def _get_client(self) -> redis.Redis:  # type: ignore[type-arg]
+        """Get or create Redis client."""
+        if self._client is None:
+            self._client = redis.from_url(
+                self._redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+        return self._client
+
+    def attach(self, publisher: "EventPublisher") -> None:
+        """Bind the publisher whose subscribers and handlers receive events."""
+        self._publisher = publisher
+
+    @property
+    def pending(self) -> int:
+        """Number of events waiting to be appended."""
+        return len(self._buffer)
+
+    def publish(self, event: SessionEvent) -> int:
+        """
+        Buffer an event for the next XADD batch (never blocks).
+
+        Returns:
+            0 - local subscribers receive the event from the stream reader
+        """
+        self._buffer.append(event)
+        self._ensure_started()
+        if len(self._buffer) >= self._batch_size:
+            self._wakeup.set()
+        return 0
+
+    def _ensure_started(self) -> None:
+        """Start background tasks on first use (also covers apps run without lifespan)."""
+        if self._flush_task is None and not self._shutdown_event.is_set():
+            self._start_tasks()
+
+    async def start(self) -> None:
+        """Start the flush, fan-out and group consumer tasks."""
+        self._start_tasks()
+
+    def _start_tasks(self) -> None:
+        if self._flush_task is not None:
+            return
+        self._shutdown_event.clear()
+        self._reader_ready.clear()
+        self._reader_tasks = [
+            asyncio.create_task(self._fan_out_loop()),
+            asyncio.create_task(self._group_loop()),
+        ]
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(
+            f"Started Redis event stream {self._stream_key} "
+            f"(consumer={self._consumer}, maxlen~{self._maxlen})"
+        )
+
+    # --- Publishing ---
+
+    async def _flush_loop(self) -> None:
+        """Flush whenever a batch fills up or the interval elapses."""
+        # Don't append until the reader has a cursor, or it would miss our own events
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._reader_ready.wait(), timeout=READ_BLOCK_MS / 1000)
+        while not self._shutdown_event.is_set():
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Append all buffered events, one pipelined XADD batch at a time.
+
+        Returns:
+            Number of events appended
+        """
+        appended = 0
+        while self._buffer:
+            count = min(len(self._buffer), self._batch_size)
+            batch = [self._buffer.popleft() for _ in range(count)]
+            try:
+                client = await self._get_client()
+                pipe = client.pipeline(transaction=False)
+                for event in batch:
+                    fields = {"event": json.dumps(event.to_dict())}
+                    if event.outboxed:
+                        fields["outboxed"] = "1"
+                    pipe.xadd(
+                        self._stream_key,
+                        fields,
+                        maxlen=self._maxlen,
+                        approximate=True,
+                    )
+                await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Event stream append failed, delivering locally: {e}")
+                self.stats.local_fallbacks += len(batch)
+                self._deliver_locally(batch)
+                continue
+            self.stats.appended += len(batch)
+            self.stats.flushes += 1
+            appended += len(batch)
+        return appended
+
+    def _deliver_locally(self, events: list[SessionEvent]) -> None:
+        """Deliver events to this worker only (Redis unavailable)."""
+        if self._publisher is None:
+            return
+        for event in events:
+            self._publisher.fan_out(event)
+            self._publisher.run_handlers(event)
+
+    # --- Reading ---
+
+    def _decode(self, entry_id: str, fields: dict[str, Any]) -> SessionEvent | None:
+        """Build an event from a stream entry, using the entry ID as event ID."""
+        try:
+            event = SessionEvent.from_dict(json.loads(fields["event"]))
+        except Exception as e:
+            logger.warning(f"Skipping malformed event stream entry {entry_id}: {e}")
+            return None
+        event.event_id = entry_id
+        event.outboxed = fields.get("outboxed") == "1"
+        return event
+
+    async def _fan_out_loop(self) -> None:
+        """Read every new entry and queue it for this worker's WebSocket subscribers."""
+        last_id: str | None = None
+        while not self._shutdown_event.is_set():
+            try:
+                client = await self._get_client()
+                if last_id is None:
+                    latest = await client.xrevrange(self._stream_key, count=1)
+                    last_id = latest[0][0] if latest else "0-0"
+                    self._reader_ready.set()
+                response = await client.xread(
+                    {self._stream_key: last_id}, count=self._batch_size, block=READ_BLOCK_MS
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.read_errors += 1
+                logger.warning(f"Event stream read failed: {e}")
+                self._reader_ready.set()  # Let appends fall back rather than wait
+                await asyncio.sleep(ERROR_BACKOFF_SECONDS)
+                continue
+
+            for _stream, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    event = self._decode(entry_id, fields)
+                    if event is not None and self._publisher is not None:
+                        self._publisher.fan_out(event)
+                        self.stats.read += 1
+
+    async def _ensure_group(self, client: redis.Redis) -> None:  # type: ignore[type-arg]
+        """Create the handler consumer group (and stream) if missing."""
+        try:
+            await client.xgroup_create(self._stream_key, WEBHOOK_GROUP, id="$", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _group_loop(self) -> None:
+        """Run handlers for entries delivered to this worker by the consumer group."""
+        group_ready = False
+        claim_cursor = "0-0"
+        next_claim = 0.0
+        loop = asyncio.get_running_loop()
+        while not self._shutdown_event.is_set():
+            if self._publisher is None or not self._publisher.has_handlers:
+                # Leave entries to workers that have handlers registered
+                await asyncio.sleep(READ_BLOCK_MS / 1000)
+                continue
+            try:
+                client = await self._get_client()
+                if not group_ready:
+                    await self._ensure_group(client)
+                    group_ready = True
+
+                if loop.time() >= next_claim:
+                    claim_cursor, claimed, *_ = await client.xautoclaim(
+                        self._stream_key,
+                        WEBHOOK_GROUP,
+                        self._consumer,
+                        min_idle_time=CLAIM_IDLE_MS,
+                        start_id=claim_cursor,
+                        count=self._batch_size,
+                    )
+                    if claimed:
+                        self.stats.claimed += len(claimed)
+                        await self._handle_entries(client, claimed)
+                    if claim_cursor == "0-0":  # Full pass done; next one later
+                        next_claim = loop.time() + CLAIM_IDLE_MS / 1000
+
+                response = await client.xreadgroup(
+                    WEBHOOK_GROUP,
+                    self._consumer,
+                    {self._stream_key: ">"},
+                    count=self._batch_size,
+                    block=READ_BLOCK_MS,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.read_errors += 1
+                logger.warning(f"Event stream group read failed: {e}")
+                group_ready = False
+                await asyncio.sleep(ERROR_BACKOFF_SECONDS)
+                continue
+
+            for _stream, entries in response or []:
+                await self._handle_entries(client, entries)
+
+    async def _handle_entries(
+        self,
+        client: redis.Redis,  # type: ignore[type-arg]
+        entries: list[tuple[str, dict[str, Any]]],
+    ) -> None:
+        """Run handlers for group entries, then acknowledge them."""
+        assert self._publisher is not None
+        entry_ids = []
+        for entry_id, fields in entries:
+            entry_ids.append(entry_id)
+            if not fields:
+                continue  # Trimmed before it could be claimed
+            event = self._decode(entry_id, fields)
+            if event is not None:
+                self._publisher.run_handlers(event)
+                self.stats.handled += 1
+        if entry_ids:
+            await client.xack(self._stream_key, WEBHOOK_GROUP, *entry_ids)  # type: ignore[no-untyped-call]
+
+    async def read_since(self, last_event_id: str, limit: int) -> list[SessionEvent]:
+        """Events appended after last_event_id (that the stream still retains)."""
+        client = await self._get_client()
+        entries = await client.xrange(
+            self._stream_key, min=f"({last_event_id}", max="+", count=limit
+        )
+        events = [self._decode(entry_id, fields) for entry_id, fields in entries or []]
+        return [event for event in events if event is not None]
+
+    # --- Lifecycle ---
+
+    async def shutdown(self) -> None:
+        """Append everything still buffered and stop background tasks."""
+        self._shutdown_event.set()
+        self._wakeup.set()
+        self._reader_ready.set()
+        if self._flush_task is not None:
+            try:
+                await asyncio.wait_for(self._flush_task, timeout=SHUTDOWN_TIMEOUT_SECONDS)
+            except TimeoutError:
+                self._flush_task.cancel()
+            self._flush_task = None
+
+        try:
+            await asyncio.wait_for(self.flush(), timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        except TimeoutError:
+            logger.warning(f"Timed out flushing events, {self.pending} events lost")
+
+        for task in self._reader_tasks:
+            task.cancel()
+        for task in self._reader_tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._reader_tasks = []
+
+        if self._client:
+            await self._client.close()
+            self._client = None
+        logger.info(
+            f"Event stream stopped (appended={self.stats.appended} "
+            f"local_fallbacks={self.stats.local_fallbacks})"
+        )
+
+    def get_stats(self) -> EventStreamStats:
+        """Get backend statistics."""
+        return self.stats
@@ -3,18 +3,33 @@ Event publishing service for session activity notifications.
 
 Broadcasts events to WebSocket subscribers and triggers webhook callbacks.
 Event types: session_start, message, tool_use, complete, error.
+
+Publishing never waits on a WebSocket: each subscriber has a bounded queue
+drained by its own task, so the publish_* helpers are cheap to await from
+the completion path.
+
+Where events travel is up to the backend (settings.event_backend):
+- "memory": delivered within this worker (tests, single-worker deployments)
+- "redis": appended to a Redis Stream and read back by every worker
+  (see event_streams.RedisStreamEventBackend)
+
+Every event gets an event_id; reconnecting WebSocket clients can pass the
+last one they saw to replay what they missed.
 """
 
 import asyncio
 import logging
+from collections import deque
 from collections.abc import Callable
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from enum import Enum
-from typing import Any
+from typing import Any, Protocol
 
 from fastapi import WebSocket
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -76,25 +91,61 @@ class SessionEvent:
     session_id: str
     timestamp: datetime = field(default_factory=lambda: datetime.now(UTC))
     data: dict[str, Any] = field(default_factory=dict)
+    event_id: str | None = None  # Assigned by the backend ("<ms>-<seq>", ordered)
+    # Webhook deliveries were staged in the outbox (skip live webhook dispatch)
+    outboxed: bool = field(default=False, compare=False)
 
     def to_dict(self) -> dict[str, Any]:
         """Convert event to JSON-serializable dict."""
-        return {
+        result = {
             "event_type": self.event_type.value,
             "session_id": self.session_id,
             "timestamp": self.timestamp.isoformat(),
             "data": self.data,
         }
+        if self.event_id is not None:
+            result["event_id"] = self.event_id
+        return result
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "SessionEvent":
+        """Rebuild an event from to_dict() output."""
+        return cls(
+            event_type=SessionEventType(data["event_type"]),
+            session_id=data["session_id"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            data=data.get("data") or {},
+            event_id=data.get("event_id"),
+        )
+
+
+def event_id_key(event_id: str) -> tuple[int, int]:
+    """Sort key for "<ms>-<seq>" event IDs.
+
+    Raises:
+        ValueError: If the ID is malformed
+    """
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
 
 
 @dataclass
 class WebSocketSubscription:
-    """A WebSocket client subscribed to session events."""
+    """A WebSocket client subscribed to session events.
+
+    Events are queued (bounded) and sent by the subscription's own drain task,
+    so a slow client never holds up the publisher.
+    """
 
     websocket: WebSocket
     session_ids: set[str] = field(default_factory=set)
     event_types: set[SessionEventType] = field(default_factory=set)
     subscribed_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+    pending: deque[dict[str, Any]] = field(default_factory=deque)
+    ready: asyncio.Event = field(default_factory=asyncio.Event)  # Set while pending is non-empty
+    idle: asyncio.Event = field(default_factory=asyncio.Event)  # Set once pending has been sent
+    task: asyncio.Task[None] | None = None
+    dropped: int = 0
 
     def matches(self, event: SessionEvent) -> bool:
         """Check if this subscription should receive the event."""
@@ -102,10 +153,98 @@ class WebSocketSubscription:
             return False
         return not (self.event_types and event.event_type not in self.event_types)
 
+    def index_keys(self) -> list[tuple[str | None, SessionEventType | None]]:
+        """(session_id, event_type) index buckets; None means unfiltered."""
+        session_keys: list[str | None] = list(self.session_ids) or [None]
+        type_keys: list[SessionEventType | None] = list(self.event_types) or [None]
+        return [(sid, et) for sid in session_keys for et in type_keys]
+
+
+@dataclass
+class PublisherStats:
+    """Event fan-out statistics."""
+
+    published: int = 0  # Events published
+    enqueued: int = 0  # Event deliveries queued for WebSocket subscribers
+    sent: int = 0  # Event deliveries sent
+    dropped: int = 0  # Oldest events dropped from full queues
+    slow_disconnects: int = 0  # Subscribers disconnected for falling behind
+    send_failures: int = 0  # Subscribers removed after a failed send
+
 
 EventHandler = Callable[[SessionEvent], None]
 
 
+class EventBackend(Protocol):
+    """Transport between publishers and the workers that deliver events."""
+
+    def attach(self, publisher: "EventPublisher") -> None:
+        """Bind the publisher whose subscribers and handlers receive events."""
+        ...
+
+    def publish(self, event: SessionEvent) -> int:
+        """Hand an event off (never blocks); returns local subscribers queued for."""
+        ...
+
+    async def read_since(self, last_event_id: str, limit: int) -> list[SessionEvent]:
+        """Events published after last_event_id, oldest first."""
+        ...
+
+    async def start(self) -> None:
+        """Start background tasks."""
+        ...
+
+    async def shutdown(self) -> None:
+        """Flush and stop background tasks."""
+        ...
+
+
+class InMemoryEventBackend:
+    """Delivers events within this worker, keeping recent ones for replay."""
+
+    def __init__(self, maxlen: int | None = None):
+        self._history: deque[SessionEvent] = deque(
+            maxlen=maxlen if maxlen is not None else settings.event_stream_maxlen
+        )
+        self._publisher: EventPublisher | None = None
+        self._last_ms = 0
+        self._seq = 0
+
+    def attach(self, publisher: "EventPublisher") -> None:
+        self._publisher = publisher
+
+    def _next_id(self) -> str:
+        ms = int(datetime.now(UTC).timestamp() * 1000)
+        if ms <= self._last_ms:
+            self._seq += 1
+        else:
+            self._last_ms, self._seq = ms, 0
+        return f"{self._last_ms}-{self._seq}"
+
+    def publish(self, event: SessionEvent) -> int:
+        assert self._publisher is not None
+        event.event_id = self._next_id()
+        self._history.append(event)
+        queued = self._publisher.fan_out(event)
+        self._publisher.run_handlers(event)
+        return queued
+
+    async def read_since(self, last_event_id: str, limit: int) -> list[SessionEvent]:
+        after = event_id_key(last_event_id)
+        missed = [e for e in self._history if e.event_id and event_id_key(e.event_id) > after]
+        return missed[:limit]
+
+    async def start(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+# WebSocket close code for subscribers disconnected for falling behind ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
 @dataclass
 class EventPublisher:
     """
@@ -113,11 +252,26 @@ class EventPublisher:
 
     Manages WebSocket subscriptions filtered by session_id and event_type.
     Handlers can be registered for programmatic event consumption (e.g., webhooks).
+
+    publish() never waits on a WebSocket: matching subscribers are found via an
+    index keyed by session_id then event_type, and the event is appended to each
+    one's bounded queue. When a queue is full, slow_consumer_policy decides
+    whether the oldest queued event is dropped ("drop_oldest") or the
+    subscriber is disconnected ("disconnect").
     """
 
     _subscriptions: dict[str, WebSocketSubscription] = field(default_factory=dict)
     _handlers: list[EventHandler] = field(default_factory=list)
     _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # session_id -> event_type -> subscription IDs (None keys = unfiltered)
+    _index: dict[str | None, dict[SessionEventType | None, set[str]]] = field(default_factory=dict)
+    _stats: PublisherStats = field(default_factory=PublisherStats)
+    queue_size: int = field(default_factory=lambda: settings.event_subscriber_queue_size)
+    slow_consumer_policy: str = field(default_factory=lambda: settings.event_slow_consumer_policy)
+    backend: EventBackend = field(default_factory=InMemoryEventBackend)
+
+    def __post_init__(self) -> None:
+        self.backend.attach(self)
 
     def add_handler(self, handler: EventHandler) -> None:
         """Add handler for all events (used by webhook dispatcher)."""
@@ -128,11 +282,37 @@ class EventPublisher:
         if handler in self._handlers:
             self._handlers.remove(handler)
 
+    def _add_to_index(self, subscription_id: str, sub: WebSocketSubscription) -> None:
+        for sid, et in sub.index_keys():
+            self._index.setdefault(sid, {}).setdefault(et, set()).add(subscription_id)
+
+    def _remove_from_index(self, subscription_id: str, sub: WebSocketSubscription) -> None:
+        for sid, et in sub.index_keys():
+            by_type = self._index.get(sid)
+            if by_type is None or et not in by_type:
+                continue
+            by_type[et].discard(subscription_id)
+            if not by_type[et]:
+                del by_type[et]
+            if not by_type:
+                del self._index[sid]
+
+    def _matching_ids(self, event: SessionEvent) -> set[str]:
+        """Subscription IDs whose filters match the event."""
+        matched: set[str] = set()
+        for sid in (event.session_id, None):
+            by_type = self._index.get(sid)
+            if by_type:
+                for et in (event.event_type, None):
+                    matched |= by_type.get(et, set())
+        return matched
+
     async def subscribe(
         self,
         websocket: WebSocket,
         session_ids: set[str] | None = None,
         event_types: set[SessionEventType] | None = None,
+        last_event_id: str | None = None,
     ) -> str:
         """
         Subscribe a WebSocket to session events.
@@ -141,6 +321,8 @@ class EventPublisher:
             websocket: The WebSocket connection to send events to.
             session_ids: Optional set of session IDs to filter. Empty = all sessions.
             event_types: Optional set of event types to filter. Empty = all types.
+            last_event_id: Resume after this event ID, replaying missed events
+                (as many as the backend still retains) before live ones.
 
         Returns:
             Subscription ID for later unsubscription.
@@ -153,22 +335,51 @@ class EventPublisher:
             session_ids=session_ids or set(),
             event_types=event_types or set(),
         )
+        subscription.idle.set()
         async with self._lock:
             self._subscriptions[subscription_id] = subscription
+            self._add_to_index(subscription_id, subscription)
+        # Live events queue up meanwhile; the drain task starts after the replay
+        if last_event_id:
+            await self._replay(subscription, last_event_id)
+        subscription.task = asyncio.create_task(self._drain(subscription_id, subscription))
         logger.info(
             f"WebSocket subscribed: {subscription_id} "
             f"(sessions={session_ids or 'all'}, types={event_types or 'all'})"
         )
         return subscription_id
 
+    async def _replay(self, sub: WebSocketSubscription, last_event_id: str) -> None:
+        """Queue matching events published after last_event_id ahead of live ones."""
+        try:
+            missed = await self.backend.read_since(last_event_id, limit=self.queue_size)
+        except Exception as e:
+            logger.warning(f"Event replay from {last_event_id} failed: {e}")
+            return
+        live_ids = {payload.get("event_id") for payload in sub.pending}
+        backlog = [
+            event.to_dict()
+            for event in missed
+            if sub.matches(event) and event.event_id not in live_ids
+        ]
+        if backlog:
+            combined = backlog + list(sub.pending)
+            sub.pending = deque(combined[-self.queue_size :])
+            sub.idle.clear()
+            sub.ready.set()
+
     async def unsubscribe(self, subscription_id: str) -> bool:
         """Remove a WebSocket subscription."""
         async with self._lock:
-            if subscription_id in self._subscriptions:
-                del self._subscriptions[subscription_id]
-                logger.info(f"WebSocket unsubscribed: {subscription_id}")
-                return True
-        return False
+            sub = self._subscriptions.pop(subscription_id, None)
+            if sub is None:
+                return False
+            self._remove_from_index(subscription_id, sub)
+        if sub.task is not None and sub.task is not asyncio.current_task():
+            sub.task.cancel()
+        sub.idle.set()
+        logger.info(f"WebSocket unsubscribed: {subscription_id}")
+        return True
 
     async def update_subscription(
         self,
@@ -181,51 +392,126 @@ class EventPublisher:
             if subscription_id not in self._subscriptions:
                 return False
             sub = self._subscriptions[subscription_id]
+            self._remove_from_index(subscription_id, sub)
             if session_ids is not None:
                 sub.session_ids = session_ids
             if event_types is not None:
                 sub.event_types = event_types
+            self._add_to_index(subscription_id, sub)
         return True
 
     async def publish(self, event: SessionEvent) -> int:
         """
         Publish an event to all matching subscribers.
 
+        Returns immediately: WebSocket sends happen in each subscriber's drain task.
+
         Returns:
-            Number of subscribers notified.
+            Number of local subscribers the event was queued for (0 when the
+            backend delivers asynchronously, e.g. via Redis).
         """
-        notified = 0
-        failed_subscriptions: list[str] = []
+        self._stats.published += 1
+        return self.backend.publish(event)
 
-        async with self._lock:
-            subscriptions = list(self._subscriptions.items())
+    def fan_out(self, event: SessionEvent) -> int:
+        """
+        Queue an event for this worker's matching WebSocket subscribers.
 
-        for sub_id, sub in subscriptions:
-            if not sub.matches(event):
-                continue
-            try:
-                await sub.websocket.send_json(event.to_dict())
-                notified += 1
-            except Exception as e:
-                logger.warning(f"Failed to send event to {sub_id}: {e}")
-                failed_subscriptions.append(sub_id)
+        Called by the backend once the event reaches this worker.
+
+        Returns:
+            Number of subscribers the event was queued for.
+        """
+        payload = event.to_dict()
+        queued = 0
+        for sub_id in self._matching_ids(event):
+            sub = self._subscriptions.get(sub_id)
+            if sub is not None and self._enqueue(sub_id, sub, payload):
+                queued += 1
+
+        if queued > 0:
+            logger.debug(
+                f"Queued {event.event_type.value} for session {event.session_id} "
+                f"to {queued} WebSocket(s)"
+            )
+        return queued
 
-        for sub_id in failed_subscriptions:
-            await self.unsubscribe(sub_id)
+    def run_handlers(self, event: SessionEvent) -> None:
+        """
+        Run registered handlers (e.g. webhook dispatch) for an event.
 
+        Called by the backend exactly once per event across workers where it
+        supports that (Redis consumer group), otherwise in the publishing worker.
+        """
         for handler in self._handlers:
             try:
                 handler(event)
             except Exception as e:
                 logger.error(f"Event handler error: {e}")
 
-        if notified > 0 or self._handlers:
-            logger.debug(
-                f"Published {event.event_type.value} for session {event.session_id} "
-                f"to {notified} WebSocket(s) and {len(self._handlers)} handler(s)"
-            )
+    @property
+    def has_handlers(self) -> bool:
+        """Whether any handlers are registered."""
+        return bool(self._handlers)
+
+    def _enqueue(self, sub_id: str, sub: WebSocketSubscription, payload: dict[str, Any]) -> bool:
+        """Queue an event for a subscriber, applying the slow consumer policy."""
+        if len(sub.pending) >= self.queue_size:
+            if self.slow_consumer_policy == "disconnect":
+                self._stats.slow_disconnects += 1
+                logger.warning(f"Disconnecting slow WebSocket subscriber: {sub_id}")
+                loop = asyncio.get_running_loop()
+                loop.create_task(self._disconnect_slow(sub_id, sub))  # noqa: RUF006 - fire-and-forget
+                return False
+            sub.pending.popleft()
+            sub.dropped += 1
+            self._stats.dropped += 1
+        sub.pending.append(payload)
+        sub.idle.clear()
+        sub.ready.set()
+        self._stats.enqueued += 1
+        return True
 
-        return notified
+    async def _disconnect_slow(self, sub_id: str, sub: WebSocketSubscription) -> None:
+        """Remove a subscriber that fell behind and close its socket."""
+        if not await self.unsubscribe(sub_id):
+            return
+        try:
+            await sub.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception as e:
+            logger.debug(f"Error closing slow WebSocket {sub_id}: {e}")
+
+    async def _drain(self, sub_id: str, sub: WebSocketSubscription) -> None:
+        """Send a subscriber's queued events in order until it unsubscribes."""
+        while True:
+            await sub.ready.wait()
+            while sub.pending:
+                payload = sub.pending.popleft()
+                try:
+                    await sub.websocket.send_json(payload)
+                except Exception as e:
+                    logger.warning(f"Failed to send event to {sub_id}: {e}")
+                    self._stats.send_failures += 1
+                    sub.pending.clear()
+                    await self.unsubscribe(sub_id)
+                    return
+                self._stats.sent += 1
+            sub.ready.clear()
+            sub.idle.set()
+
+    async def flush(self, timeout: float | None = None) -> None:
+        """Wait until every subscriber's queue has been sent (or timeout)."""
+        waits = [sub.idle.wait() for sub in list(self._subscriptions.values())]
+        if waits:
+            await asyncio.wait_for(asyncio.gather(*waits), timeout)
+
+    def get_stats(self) -> PublisherStats:
+        """Get fan-out statistics."""
+        return self._stats
+
+    def get_queue_depths(self) -> dict[str, int]:
+        """Queued (unsent) events per subscription ID."""
+        return {sub_id: len(sub.pending) for sub_id, sub in self._subscriptions.items()}
 
     async def get_subscription_count(self) -> int:
         """Get current number of active subscriptions."""
@@ -235,24 +521,44 @@ class EventPublisher:
     async def get_subscriptions_for_session(self, session_id: str) -> int:
         """Get count of subscriptions watching a specific session."""
         async with self._lock:
-            count = 0
-            for sub in self._subscriptions.values():
-                if not sub.session_ids or session_id in sub.session_ids:
-                    count += 1
-            return count
+            watching: set[str] = set()
+            for sid in (session_id, None):
+                for ids in self._index.get(sid, {}).values():
+                    watching |= ids
+            return len(watching)
 
 
 _event_publisher: EventPublisher | None = None
 
 
 def get_event_publisher() -> EventPublisher:
-    """Get the global event publisher instance."""
+    """Get the global event publisher instance (backend chosen by settings)."""
     global _event_publisher
     if _event_publisher is None:
-        _event_publisher = EventPublisher()
+        backend: EventBackend
+        if settings.event_backend == "redis":
+            from app.services.event_streams import RedisStreamEventBackend
+
+            backend = RedisStreamEventBackend()
+        else:
+            backend = InMemoryEventBackend()
+        _event_publisher = EventPublisher(backend=backend)
     return _event_publisher
 
 
+async def start_event_bus() -> None:
+    """Start the event backend's background tasks (call on app startup)."""
+    await get_event_publisher().backend.start()
+
+
+async def shutdown_event_bus() -> None:
+    """Flush and stop the event backend (call on app shutdown)."""
+    global _event_publisher
+    if _event_publisher is not None:
+        await _event_publisher.backend.shutdown()
+        _event_publisher = None
+
+
 async def publish_session_start(
     session_id: str,
     model: str,
@@ -272,6 +578,24 @@ async def publish_session_start(
     )
 
 
+def message_event(
+    session_id: str,
+    role: str,
+    content: str,
+    tokens: int | None = None,
+) -> SessionEvent:
+    """Build a message event."""
+    return SessionEvent(
+        event_type=SessionEventType.MESSAGE,
+        session_id=session_id,
+        data={
+            "role": role,
+            "content": content,
+            "tokens": tokens,
+        },
+    )
+
+
 async def publish_message(
     session_id: str,
     role: str,
@@ -279,18 +603,7 @@ async def publish_message(
     tokens: int | None = None,
 ) -> None:
     """Helper to publish message event."""
-    publisher = get_event_publisher()
-    await publisher.publish(
-        SessionEvent(
-            event_type=SessionEventType.MESSAGE,
-            session_id=session_id,
-            data={
-                "role": role,
-                "content": content,
-                "tokens": tokens,
-            },
-        )
-    )
+    await get_event_publisher().publish(message_event(session_id, role, content, tokens))
 
 
 async def publish_tool_use(
@@ -314,6 +627,24 @@ async def publish_tool_use(
     )
 
 
+def complete_event(
+    session_id: str,
+    input_tokens: int,
+    output_tokens: int,
+    cost: float | None = None,
+) -> SessionEvent:
+    """Build a complete event."""
+    return SessionEvent(
+        event_type=SessionEventType.COMPLETE,
+        session_id=session_id,
+        data={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost": cost,
+        },
+    )
+
+
 async def publish_complete(
     session_id: str,
     input_tokens: int,
@@ -321,17 +652,8 @@ async def publish_complete(
     cost: float | None = None,
 ) -> None:
     """Helper to publish complete event."""
-    publisher = get_event_publisher()
-    await publisher.publish(
-        SessionEvent(
-            event_type=SessionEventType.COMPLETE,
-            session_id=session_id,
-            data={
-                "input_tokens": input_tokens,
-                "output_tokens": output_tokens,
-                "cost": cost,
-            },
-        )
+    await get_event_publisher().publish(
+        complete_event(session_id, input_tokens, output_tokens, cost)
     )
 
 
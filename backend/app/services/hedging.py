@@ -0,0 +1,104 @@
+"""Hedging policy for router requests.
+
+When the primary provider has not answered within an adaptive delay (the
+observed latency percentile for the model), the router races the fallback
+provider against it; the first success wins and the other call is cancelled.
+
+Hedges are rationed per agent with a token-bucket budget: every request
+deposits `budget` tokens (e.g. 0.05) and every hedge withdraws one, so at most
+that fraction of an agent's requests hedge, with a small burst allowance.
+"""
+
+import logging
+from dataclasses import dataclass
+
+from app.config import settings
+from app.services.circuit_breaker import CircuitBreakerManager
+from app.services.token_counter import estimate_cost
+
+logger = logging.getLogger(__name__)
+
+# Hedges an agent may bank for a burst of slow requests
+HEDGE_BUDGET_MAX_TOKENS = 10.0
+
+# Budget key for requests without an agent
+DEFAULT_AGENT = "_default"
+
+
+@dataclass
+class HedgeStats:
+    """Counters for hedged requests."""
+
+    requests: int = 0  # Requests eligible for hedging
+    hedged: int = 0  # Requests where the fallback was fired
+    hedge_wins: int = 0  # Hedged requests served by the fallback
+    budget_denied: int = 0  # Hedges skipped because the agent's budget was spent
+    extra_cost_usd: float = 0.0  # Estimated input cost of the cancelled duplicate calls
+
+    @property
+    def win_rate(self) -> float:
+        """Fraction of hedged requests the fallback won."""
+        return self.hedge_wins / self.hedged if self.hedged else 0.0
+
+
+class HedgePolicy:
+    """Decides when to hedge and whether an agent may, and keeps hedge stats."""
+
+    def __init__(self, circuit_breaker: CircuitBreakerManager) -> None:
+        """Initialize hedge policy.
+
+        Args:
+            circuit_breaker: Source of per provider/model latency percentiles
+        """
+        self._circuit_breaker = circuit_breaker
+        self._budgets: dict[str, float] = {}
+        self.stats = HedgeStats()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether hedging is switched on."""
+        return settings.router_hedging_enabled
+
+    def delay_for(self, provider: str, model: str) -> float:
+        """Seconds to wait for the primary before hedging."""
+        observed = self._circuit_breaker.latency_percentile(
+            provider, model, settings.router_hedge_percentile
+        )
+        delay_ms = observed if observed is not None else settings.router_hedge_default_delay_ms
+        return max(delay_ms, settings.router_hedge_min_delay_ms) / 1000
+
+    def on_request(self, agent_slug: str | None) -> None:
+        """Deposit the agent's share of hedges for one eligible request."""
+        agent = agent_slug or DEFAULT_AGENT
+        budget = settings.router_hedge_agent_budgets.get(agent, settings.router_hedge_budget)
+        self.stats.requests += 1
+        # New agents start with one hedge in hand
+        balance = self._budgets.get(agent, 1.0)
+        self._budgets[agent] = min(balance + budget, HEDGE_BUDGET_MAX_TOKENS)
+
+    def try_acquire(self, agent_slug: str | None) -> bool:
+        """Spend one hedge from the agent's budget, if it has one."""
+        agent = agent_slug or DEFAULT_AGENT
+        balance = self._budgets.get(agent, 0.0)
+        if balance < 1.0:
+            self.stats.budget_denied += 1
+            return False
+        self._budgets[agent] = balance - 1.0
+        self.stats.hedged += 1
+        return True
+
+    def on_hedged_result(self, hedge_won: bool, input_tokens: int, loser_model: str) -> None:
+        """Record the outcome of a hedged request.
+
+        The cancelled call has been sent the same prompt, so its extra cost is
+        estimated as the winner's input tokens at the loser's model price.
+        """
+        if hedge_won:
+            self.stats.hedge_wins += 1
+        self.stats.extra_cost_usd += estimate_cost(
+            input_tokens=input_tokens, output_tokens=0, model=loser_model
+        ).total_cost_usd
+
+    def get_stats(self) -> HedgeStats:
+        """Get hedge statistics."""
+        return self.stats
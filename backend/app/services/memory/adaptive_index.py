@@ -222,6 +222,11 @@ async def invalidate_index_cache() -> None:
         _index_cache = None
         logger.info("Adaptive index cache invalidated")
 
+    # Mandate demotions are compiled into memory-context snapshots
+    from .context_snapshot import bump_context_generation
+
+    await bump_context_generation()
+
 
 async def refresh_index_if_needed(
     utility_score_changes: dict[str, float] | None = None,
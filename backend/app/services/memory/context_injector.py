@@ -19,6 +19,7 @@ from typing import Any
 
 from .budget import BudgetUsage, count_tokens
 from .citation_parser import format_guardrail_citation, format_mandate_citation
+from .context_snapshot import get_context_snapshot_cache
 from .graphiti_client import get_graphiti
 from .metrics_collector import InjectionMetrics, record_injection_metrics
 from .service import (
@@ -940,6 +941,7 @@ async def inject_progressive_context(
 
     This is the main entry point for memory injection at SessionStart.
     Reference items are NOT injected here - use /api/memory/search for on-demand lookup.
+    The memory block is served from a per-scope compiled snapshot (see context_snapshot).
 
     Args:
         messages: List of message dicts with role and content
@@ -979,35 +981,37 @@ async def inject_progressive_context(
     if not query:
         return messages, ProgressiveContext()
 
-    # Build progressive context
-    context = await build_progressive_context(
-        query=query,
-        scope=scope,
-        scope_id=scope_id,
-    )
-
-    # Format context for injection
-    # Get memory settings to check if reference index is enabled
-    settings = await get_memory_settings()
+    # Compiled snapshot per scope: a hit needs no Neo4j/Postgres round trips
+    async def _compile() -> tuple[str | None, ProgressiveContext]:
+        compiled = await build_progressive_context(query="", scope=scope, scope_id=scope_id)
+
+        # Build reference TOON index if enabled
+        settings = await get_memory_settings()
+        reference_episodes: list[tuple[str, str | None, str, bool]] | None = None
+        if settings.reference_index_enabled:
+            reference_episodes = await build_reference_toon_index(scope, scope_id)
+
+        # Format with full mandates/guardrails + optional TOON reference index
+        formatted = format_context_with_reference_index(
+            compiled,
+            reference_episodes=reference_episodes,
+            include_citations=True,
+        )
+        if not formatted:
+            return None, compiled
 
-    # Build reference TOON index if enabled
-    reference_episodes: list[tuple[str, str | None, str, bool]] | None = None
-    if settings.reference_index_enabled:
-        reference_episodes = await build_reference_toon_index(scope, scope_id)
+        # Wrap in memory context tags
+        return f"{MEMORY_CONTEXT_START}\n{formatted}\n{MEMORY_CONTEXT_END}", compiled
 
-    # Format with full mandates/guardrails + optional TOON reference index
-    formatted = format_context_with_reference_index(
-        context,
-        reference_episodes=reference_episodes,
-        include_citations=True,
+    snapshot, snapshot_hit = await get_context_snapshot_cache().get_or_build(
+        scope, scope_id, _compile
     )
+    context = snapshot.new_context(query=query[:100], snapshot_hit=snapshot_hit)
 
-    if not formatted:
+    memory_block = snapshot.memory_block
+    if not memory_block:
         return messages, context
 
-    # Wrap in memory context tags
-    memory_block = f"{MEMORY_CONTEXT_START}\n{formatted}\n{MEMORY_CONTEXT_END}"
-
     # Inject into system message
     modified_messages = list(messages)
     first_msg = modified_messages[0] if modified_messages else None
@@ -1029,9 +1033,11 @@ async def inject_progressive_context(
     context.debug_info["injection_latency_ms"] = latency_ms
 
     logger.info(
-        "Injected progressive context: variant=%s latency=%dms tokens=%d mandates=%d guardrails=%d",
+        "Injected progressive context: variant=%s latency=%dms snapshot=%s tokens=%d "
+        "mandates=%d guardrails=%d",
         variant,
         latency_ms,
+        "hit" if snapshot_hit else "miss",
         context.total_tokens,
         len(context.mandates),
         len(context.guardrails),
@@ -1050,7 +1056,7 @@ async def inject_progressive_context(
             session_id=session_id,
             external_id=external_id,
             project_id=project_id,
-            memories_loaded=context.get_loaded_uuids(),
+            memories_loaded=list(snapshot.loaded_uuids),
         )
         record_injection_metrics(metrics)
 
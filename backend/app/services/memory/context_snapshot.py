@@ -0,0 +1,281 @@
+"""
+Compiled memory-context snapshots for inject_progressive_context.
+
+The injected memory block depends only on (scope, scope_id), the episodes in
+those groups and the memory settings - not on the query. Building it costs
+roughly eight Neo4j/Postgres round trips (mandates, guardrails and auto-inject
+references for up to two scopes, settings twice, TOON reference index).
+
+Snapshots cache the compiled block, loaded UUIDs and token counts per scope so
+a hit needs zero graph queries. Invalidation is generation-based:
+- Episode writes, tier changes and settings updates call
+  bump_context_generation(), which increments a process-local counter and a
+  shared Redis counter (other workers see it within GENERATION_REFRESH_SECONDS)
+- Snapshots also expire after SNAPSHOT_TTL_SECONDS so adaptive-index demotions,
+  which refresh on their own TTL, are picked up
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+from .memory_models import MemoryScope
+
+if TYPE_CHECKING:
+    from redis.asyncio.client import Redis as AsyncRedis
+
+    from .context_injector import ProgressiveContext
+
+logger = logging.getLogger(__name__)
+
+# Snapshot lifetime (matches the adaptive index TTL used for mandate demotion)
+SNAPSHOT_TTL_SECONDS = 300.0
+
+# Maximum cached scopes (LRU eviction beyond this)
+MAX_SNAPSHOTS = 1024
+
+# How often the shared Redis generation is re-read on the hot path
+GENERATION_REFRESH_SECONDS = 1.0
+
+# Back-off before retrying Redis after a connection failure
+REDIS_RETRY_SECONDS = 30.0
+
+REDIS_GENERATION_KEY = "agent-hub:memory:context-generation"
+
+SnapshotKey = tuple[str, str | None]
+Generation = tuple[int, int]  # (local, shared)
+
+
+@dataclass
+class ContextSnapshot:
+    """Compiled memory context for one (scope, scope_id)."""
+
+    scope: MemoryScope
+    scope_id: str | None
+    generation: Generation
+    memory_block: str | None  # Wrapped <memory> block, None if nothing to inject
+    context: "ProgressiveContext"
+    loaded_uuids: list[str]
+    total_tokens: int
+    built_at: float
+
+    def is_expired(self, ttl_seconds: float, now: float | None = None) -> bool:
+        """Check if snapshot is older than ttl_seconds."""
+        return (now if now is not None else time.monotonic()) - self.built_at >= ttl_seconds
+
+    def new_context(self, **debug_info: Any) -> "ProgressiveContext":
+        """Copy the compiled context for one request (callers may mutate it)."""
+        return replace(
+            self.context,
+            mandates=list(self.context.mandates),
+            guardrails=list(self.context.guardrails),
+            reference=list(self.context.reference),
+            debug_info={**self.context.debug_info, **debug_info},
+        )
+
+
+@dataclass
+class SnapshotStats:
+    """Snapshot cache statistics."""
+
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0  # Misses caused by a generation bump
+    expired: int = 0  # Misses caused by TTL
+    generation_bumps: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Calculate snapshot hit rate."""
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+
+SnapshotBuilder = Callable[[], Awaitable[tuple[str | None, "ProgressiveContext"]]]
+
+
+class ContextSnapshotCache:
+    """Per-scope cache of compiled memory context keyed by generation."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = SNAPSHOT_TTL_SECONDS,
+        max_entries: int = MAX_SNAPSHOTS,
+        redis_url: str | None = None,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._redis_url = redis_url or settings.agent_hub_redis_url
+        self._snapshots: OrderedDict[SnapshotKey, ContextSnapshot] = OrderedDict()
+        self._building: dict[SnapshotKey, asyncio.Future[ContextSnapshot]] = {}
+        self._local_generation = 0
+        self._shared_generation = 0
+        self._shared_checked_at = 0.0
+        self._redis: AsyncRedis[str] | None = None
+        self._redis_failed_at: float | None = None
+        self.stats = SnapshotStats()
+
+    async def _get_redis(self) -> "AsyncRedis[str] | None":
+        """Get Redis client, or None while Redis is unavailable."""
+        if self._redis is not None:
+            return self._redis
+        now = time.monotonic()
+        if self._redis_failed_at is not None and now - self._redis_failed_at < REDIS_RETRY_SECONDS:
+            return None
+        try:
+            client: AsyncRedis[str] = aioredis.from_url(
+                self._redis_url, encoding="utf-8", decode_responses=True
+            )
+            await client.ping()
+            self._redis = client
+            self._redis_failed_at = None
+        except Exception as e:
+            logger.warning("Redis unavailable for memory snapshots, using local generation: %s", e)
+            self._redis_failed_at = now
+        return self._redis
+
+    def _drop_redis(self, error: Exception) -> None:
+        logger.warning("Memory snapshot generation lookup failed: %s", error)
+        self._redis = None
+        self._redis_failed_at = time.monotonic()
+
+    async def current_generation(self) -> Generation:
+        """Get the current generation, re-reading the shared counter at most once a second."""
+        now = time.monotonic()
+        if now - self._shared_checked_at >= GENERATION_REFRESH_SECONDS:
+            self._shared_checked_at = now
+            client = await self._get_redis()
+            if client is not None:
+                try:
+                    value = await client.get(REDIS_GENERATION_KEY)
+                    self._shared_generation = int(value or 0)
+                except Exception as e:
+                    self._drop_redis(e)
+        return (self._local_generation, self._shared_generation)
+
+    async def bump_generation(self) -> None:
+        """Invalidate all snapshots in this worker and, via Redis, in every worker."""
+        self._local_generation += 1
+        self.stats.generation_bumps += 1
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                self._shared_generation = int(await client.incr(REDIS_GENERATION_KEY))
+                self._shared_checked_at = time.monotonic()
+            except Exception as e:
+                self._drop_redis(e)
+
+    async def get_or_build(
+        self,
+        scope: MemoryScope,
+        scope_id: str | None,
+        builder: SnapshotBuilder,
+    ) -> tuple[ContextSnapshot, bool]:
+        """
+        Get the snapshot for a scope, compiling it with builder on a miss.
+
+        Concurrent misses for the same scope share a single build.
+
+        Returns:
+            Tuple of (snapshot, hit)
+        """
+        key: SnapshotKey = (scope.value, scope_id)
+        generation = await self.current_generation()
+
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None:
+            if snapshot.generation != generation:
+                self.stats.stale += 1
+            elif snapshot.is_expired(self._ttl_seconds):
+                self.stats.expired += 1
+            else:
+                self._snapshots.move_to_end(key)
+                self.stats.hits += 1
+                return snapshot, True
+
+        self.stats.misses += 1
+        pending = self._building.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending), False
+
+        future: asyncio.Future[ContextSnapshot] = asyncio.get_running_loop().create_future()
+        self._building[key] = future
+        try:
+            memory_block, context = await builder()
+            snapshot = ContextSnapshot(
+                scope=scope,
+                scope_id=scope_id,
+                generation=generation,
+                memory_block=memory_block,
+                context=context,
+                loaded_uuids=context.get_loaded_uuids(),
+                total_tokens=context.total_tokens,
+                built_at=time.monotonic(),
+            )
+            # A bump during the build means the result may already be outdated;
+            # serve it to this request but don't cache it
+            if await self.current_generation() == generation:
+                self._store(key, snapshot)
+            future.set_result(snapshot)
+            return snapshot, False
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            self._building.pop(key, None)
+
+    def _store(self, key: SnapshotKey, snapshot: ContextSnapshot) -> None:
+        self._snapshots[key] = snapshot
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self._max_entries:
+            self._snapshots.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all snapshots held by this worker."""
+        self._snapshots.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "hit_rate": round(self.stats.hit_rate, 4),
+            "stale": self.stats.stale,
+            "expired": self.stats.expired,
+            "generation_bumps": self.stats.generation_bumps,
+            "snapshots": len(self._snapshots),
+            "generation": [self._local_generation, self._shared_generation],
+            "ttl_seconds": self._ttl_seconds,
+        }
+
+
+# Global snapshot cache instance
+_snapshot_cache: ContextSnapshotCache | None = None
+
+
+def get_context_snapshot_cache() -> ContextSnapshotCache:
+    """Get the global snapshot cache instance."""
+    global _snapshot_cache
+    if _snapshot_cache is None:
+        _snapshot_cache = ContextSnapshotCache()
+    return _snapshot_cache
+
+
+async def bump_context_generation() -> None:
+    """Invalidate compiled memory context after episode, tier or settings changes."""
+    try:
+        await get_context_snapshot_cache().bump_generation()
+    except Exception as e:
+        logger.warning("Failed to bump memory context generation: %s", e)
@@ -16,6 +16,13 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+async def _bump_context_generation() -> None:
+    """Invalidate compiled memory context after an episode property change."""
+    from app.services.memory.context_snapshot import bump_context_generation
+
+    await bump_context_generation()
+
+
 async def execute_episode_query(
     query: str,
     params: dict[str, Any],
@@ -73,6 +80,7 @@ async def execute_episode_update(
         records = await execute_episode_query(query, params, driver, operation)
         if records:
             logger.debug("%s succeeded for episode %s", operation, episode_uuid[:8])
+            await _bump_context_generation()
             return True
         logger.warning("Episode %s not found for %s", episode_uuid[:8], operation)
         return False
@@ -113,6 +121,8 @@ async def execute_batch_update(
 
         updated_count = sum(1 for success in results.values() if success)
         logger.info("%s: %d/%d episodes updated", operation, updated_count, len(updates))
+        if updated_count:
+            await _bump_context_generation()
         return results
     except Exception:
         return {update.get("uuid", ""): False for update in updates}
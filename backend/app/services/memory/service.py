@@ -12,6 +12,7 @@ from typing import Any
 
 from graphiti_core.utils.datetime_utils import utc_now
 
+from .context_snapshot import bump_context_generation
 from .graphiti_client import get_graphiti
 from .memory_models import (
     MemoryCategory,
@@ -294,6 +295,7 @@ class MemoryService:
         try:
             await self._graphiti.remove_episode(episode_uuid)
             logger.info("Deleted episode: %s", episode_uuid)
+            await bump_context_generation()
             return True
         except Exception as e:
             logger.error("Failed to delete episode %s: %s", episode_uuid, e)
@@ -324,6 +326,8 @@ class MemoryService:
                 logger.warning("Bulk delete failed for %s: %s", uuid, e)
 
         logger.info("Bulk delete complete: %d deleted, %d failed", deleted, failed)
+        if deleted:
+            await bump_context_generation()
         return {"deleted": deleted, "failed": failed, "errors": errors}
 
     async def get_episode(self, episode_uuid: str) -> dict[str, Any] | None:
@@ -163,6 +163,11 @@ async def update_memory_settings(
     await db.commit()
     await db.refresh(settings)
 
+    # Settings are compiled into memory-context snapshots
+    from .context_snapshot import bump_context_generation
+
+    await bump_context_generation()
+
     logger.info(
         "Updated memory settings: enabled=%s, max_mandates=%d, max_guardrails=%d, ref_index=%s",
         settings.enabled,
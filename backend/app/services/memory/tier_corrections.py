@@ -13,6 +13,7 @@ import logging
 import uuid
 from collections.abc import Awaitable, Callable
 
+from .context_snapshot import bump_context_generation
 from .graphiti_client import get_graphiti
 
 logger = logging.getLogger(__name__)
@@ -83,6 +84,7 @@ async def create_correction_node(
                 original_uuid[:8],
                 reason,
             )
+            await bump_context_generation()
             await log_tier_change_fn(
                 original_uuid,
                 "harmful",
@@ -144,6 +146,7 @@ async def handle_harmful_episode(
         )
         if records:
             logger.info("Marked episode %s as harmful (removed from search)", episode_uuid[:8])
+            await bump_context_generation()
             return True
         return False
     except Exception as e:
@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import logging
 
+from .context_snapshot import bump_context_generation
 from .graphiti_client import get_graphiti
 
 logger = logging.getLogger(__name__)
@@ -75,6 +76,7 @@ async def demote_episode(
         )
         if records:
             logger.info("Demoted episode %s to %s: %s", episode_uuid[:8], new_tier, reason)
+            await bump_context_generation()
             return True
         return False
     except Exception as e:
@@ -117,6 +119,7 @@ async def promote_episode(
         )
         if records:
             logger.info("Promoted episode %s to %s: %s", episode_uuid[:8], new_tier, reason)
+            await bump_context_generation()
             return True
         return False
     except Exception as e:
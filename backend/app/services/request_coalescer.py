@@ -0,0 +1,377 @@
+"""
+Single-flight coalescing of identical in-flight completions.
+
+ResponseCache only helps once the first response has been written, so N
+identical concurrent requests still become N provider calls. The coalescer
+lets the first caller execute while the others wait for its result:
+
+- In-process: followers await the leader's future
+- Across workers: the leader holds a Redis lock (SET NX PX) and, when done,
+  writes the result to a short-lived key and publishes it on a per-key
+  channel; followers in other workers subscribe and pick it up
+
+If the leader fails, local followers get the same exception. Remote followers
+only see the lock disappear without a result, so they execute themselves (as
+they also do when the wait times out). Redis errors degrade to in-process
+coalescing only.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, replace
+from typing import Any
+
+import redis.asyncio as redis
+
+from app.adapters.base import CacheMetrics, CompletionResult, ContainerState, ToolCallResult
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Leader lock key prefix (value is the leader's token)
+LOCK_PREFIX = "agent-hub:inflight:lock:"
+
+# Finished result key prefix (read by followers that subscribed late)
+RESULT_PREFIX = "agent-hub:inflight:result:"
+
+# Per-key channel the leader publishes its result on
+CHANNEL_PREFIX = "agent-hub:inflight:done:"
+
+# How long a published result stays readable for late followers
+RESULT_TTL_SECONDS = 30
+
+# How often a remote follower checks that the leader still holds the lock
+POLL_INTERVAL_SECONDS = 1.0
+
+# Delete the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class CoalescerStats:
+    """Coalescing statistics."""
+
+    leaders: int = 0  # Requests that executed and shared their result
+    coalesced_local: int = 0  # Followers served by a leader in this worker
+    coalesced_remote: int = 0  # Followers served by a leader in another worker
+    remote_fallbacks: int = 0  # Remote followers that gave up and executed themselves
+
+    @property
+    def coalesced(self) -> int:
+        """Total requests that reused another request's result."""
+        return self.coalesced_local + self.coalesced_remote
+
+
+def _encode_result(result: CompletionResult) -> str:
+    """Serialise a CompletionResult for fan-out (raw_response is dropped)."""
+    return json.dumps(
+        {
+            "content": result.content,
+            "model": result.model,
+            "provider": result.provider,
+            "input_tokens": result.input_tokens,
+            "output_tokens": result.output_tokens,
+            "finish_reason": result.finish_reason,
+            "cache_metrics": (
+                {
+                    "cache_creation_input_tokens": result.cache_metrics.cache_creation_input_tokens,
+                    "cache_read_input_tokens": result.cache_metrics.cache_read_input_tokens,
+                }
+                if result.cache_metrics
+                else None
+            ),
+            "tool_calls": (
+                [
+                    {
+                        "id": t.id,
+                        "name": t.name,
+                        "input": t.input,
+                        "caller_type": t.caller_type,
+                        "caller_tool_id": t.caller_tool_id,
+                    }
+                    for t in result.tool_calls
+                ]
+                if result.tool_calls is not None
+                else None
+            ),
+            "container": (
+                {"id": result.container.id, "expires_at": result.container.expires_at}
+                if result.container
+                else None
+            ),
+            "thinking_content": result.thinking_content,
+            "thinking_tokens": result.thinking_tokens,
+        }
+    )
+
+
+def _decode_result(payload: str) -> CompletionResult:
+    """Rebuild a CompletionResult published by another worker."""
+    data = json.loads(payload)
+    return CompletionResult(
+        content=data["content"],
+        model=data["model"],
+        provider=data["provider"],
+        input_tokens=data["input_tokens"],
+        output_tokens=data["output_tokens"],
+        finish_reason=data.get("finish_reason"),
+        cache_metrics=CacheMetrics(**data["cache_metrics"]) if data.get("cache_metrics") else None,
+        tool_calls=(
+            [ToolCallResult(**t) for t in data["tool_calls"]]
+            if data.get("tool_calls") is not None
+            else None
+        ),
+        container=ContainerState(**data["container"]) if data.get("container") else None,
+        thinking_content=data.get("thinking_content"),
+        thinking_tokens=data.get("thinking_tokens"),
+    )
+
+
+class RequestCoalescer:
+    """Single-flight execution of identical completion requests."""
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        lock_ttl: float | None = None,
+        wait_timeout: float | None = None,
+        distributed: bool = True,
+    ):
+        """
+        Initialize the coalescer.
+
+        Args:
+            redis_url: Redis connection URL. Falls back to settings.
+            lock_ttl: Seconds a leader holds the cross-worker lock. Falls back to settings.
+            wait_timeout: Seconds a remote follower waits before executing itself.
+                Falls back to settings.
+            distributed: Coalesce across workers via Redis (in-process only if False).
+        """
+        self._redis_url = redis_url or settings.agent_hub_redis_url
+        self._lock_ttl = lock_ttl if lock_ttl is not None else settings.request_coalescing_lock_ttl
+        self._wait_timeout = (
+            wait_timeout if wait_timeout is not None else settings.request_coalescing_wait_timeout
+        )
+        self._distributed = distributed
+        self._client: redis.Redis | None = None  # type: ignore[type-arg]
+        self._inflight: dict[str, asyncio.Future[CompletionResult]] = {}
+        self._stats = CoalescerStats()
+
+    async def _get_client(self) -> redis.Redis:  # type: ignore[type-arg]
+        """Get or create Redis client."""
+        if self._client is None:
+            self._client = redis.from_url(
+                self._redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+        return self._client
+
+    @staticmethod
+    def make_key(base_key: str, **params: Any) -> str:
+        """
+        Derive a coalescing key from a response cache key.
+
+        Args:
+            base_key: Key from ResponseCache._generate_cache_key
+            **params: Extra request parameters that change the response
+                (thinking level, tools, response format, ...)
+
+        Returns:
+            Key identifying requests that may share one provider call
+        """
+        if not params:
+            return base_key
+        params_json = json.dumps(params, sort_keys=True, default=str)
+        params_hash = hashlib.sha256(params_json.encode()).hexdigest()[:16]
+        return f"{base_key}:{params_hash}"
+
+    async def run(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[CompletionResult]],
+    ) -> tuple[CompletionResult, bool]:
+        """
+        Execute fn once per key across concurrent callers.
+
+        Args:
+            key: Coalescing key (see make_key)
+            fn: Coroutine factory performing the provider call
+
+        Returns:
+            Tuple of (result, coalesced) where coalesced is True if the result
+            came from another caller's execution
+        """
+        while (existing := self._inflight.get(key)) is not None:
+            try:
+                result = await asyncio.shield(existing)
+            except asyncio.CancelledError:
+                if existing.cancelled():
+                    # Leader was cancelled (client went away); try to take over
+                    continue
+                raise
+            self._stats.coalesced_local += 1
+            logger.info(f"Coalesced request with in-process leader: {key}")
+            return replace(result), True
+
+        future: asyncio.Future[CompletionResult] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result, coalesced = await self._run_leader(key, fn)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so failures without followers don't log "never retrieved"
+            future.exception()
+            raise
+        except BaseException:
+            # Cancelled: followers take over rather than inherit the cancellation
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result, coalesced
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_leader(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[CompletionResult]],
+    ) -> tuple[CompletionResult, bool]:
+        """Execute as this worker's leader, deferring to a leader in another worker."""
+        if not self._distributed:
+            self._stats.leaders += 1
+            return await fn(), False
+
+        token = uuid.uuid4().hex
+        lock_key = f"{LOCK_PREFIX}{key}"
+        try:
+            client = await self._get_client()
+            acquired = await client.set(lock_key, token, nx=True, px=int(self._lock_ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Coalescing lock error (running uncoordinated): {e}")
+            self._stats.leaders += 1
+            return await fn(), False
+
+        if not acquired:
+            result = await self._wait_for_remote(client, key)
+            if result is not None:
+                self._stats.coalesced_remote += 1
+                logger.info(f"Coalesced request with remote leader: {key}")
+                return result, True
+            self._stats.remote_fallbacks += 1
+            return await fn(), False
+
+        self._stats.leaders += 1
+        try:
+            result = await fn()
+        except BaseException:
+            await self._release(client, lock_key, token)
+            raise
+        await self._publish(client, key, result)
+        await self._release(client, lock_key, token)
+        return result, False
+
+    async def _wait_for_remote(self, client: Any, key: str) -> CompletionResult | None:
+        """
+        Wait for another worker's leader to publish its result.
+
+        Returns:
+            The leader's result, or None if the leader finished without one
+            (failed or crashed) or the wait timed out
+        """
+        lock_key = f"{LOCK_PREFIX}{key}"
+        result_key = f"{RESULT_PREFIX}{key}"
+        deadline = time.monotonic() + self._wait_timeout
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(f"{CHANNEL_PREFIX}{key}")
+        except Exception as e:
+            logger.warning(f"Coalescing subscribe error: {e}")
+            return None
+
+        try:
+            while time.monotonic() < deadline:
+                # Checked after subscribing so a result published in between isn't missed
+                pipe = client.pipeline(transaction=False)
+                pipe.get(result_key)
+                pipe.exists(lock_key)
+                payload, locked = await pipe.execute()
+                if payload:
+                    return _decode_result(payload)
+                if not locked:
+                    return None
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=min(POLL_INTERVAL_SECONDS, max(deadline - time.monotonic(), 0)),
+                )
+                if message and isinstance(message.get("data"), str):
+                    return _decode_result(message["data"])
+            logger.warning(f"Timed out waiting for remote leader: {key}")
+            return None
+        except Exception as e:
+            logger.warning(f"Coalescing wait error: {e}")
+            return None
+        finally:
+            with contextlib.suppress(Exception):
+                await pubsub.aclose()
+
+    async def _publish(self, client: Any, key: str, result: CompletionResult) -> None:
+        """Fan the leader's result out to followers in other workers."""
+        try:
+            payload = _encode_result(result)
+            pipe = client.pipeline(transaction=False)
+            pipe.setex(f"{RESULT_PREFIX}{key}", RESULT_TTL_SECONDS, payload)
+            pipe.publish(f"{CHANNEL_PREFIX}{key}", payload)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Coalescing publish error: {e}")
+
+    async def _release(self, client: Any, lock_key: str, token: str) -> None:
+        """Release the leader lock if it hasn't expired and been taken over."""
+        try:
+            await client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            logger.warning(f"Coalescing lock release error: {e}")
+
+    @property
+    def inflight(self) -> int:
+        """Keys currently being executed by a leader in this worker."""
+        return len(self._inflight)
+
+    def get_stats(self) -> CoalescerStats:
+        """Get coalescing statistics."""
+        return self._stats
+
+    def reset_stats(self) -> None:
+        """Reset coalescing statistics."""
+        self._stats = CoalescerStats()
+
+    async def close(self) -> None:
+        """Close Redis connection."""
+        if self._client:
+            await self._client.close()
+            self._client = None
+
+
+# Singleton instance
+_request_coalescer: RequestCoalescer | None = None
+
+
+def get_request_coalescer() -> RequestCoalescer:
+    """Get the singleton request coalescer instance."""
+    global _request_coalescer
+    if _request_coalescer is None:
+        _request_coalescer = RequestCoalescer()
+    return _request_coalescer
@@ -1,6 +1,7 @@
 """Request execution logic for model routing."""
 
 import logging
+import time
 from typing import Any
 
 from app.adapters.base import (
@@ -11,10 +12,8 @@ from app.adapters.base import (
     ProviderError,
     RateLimitError,
 )
-from app.services.circuit_breaker import (
-    CIRCUIT_BREAKER_THRESHOLD,
-    CircuitBreakerManager,
-)
+from app.adapters.concurrency_limiter import ConcurrencyLimitError
+from app.services.circuit_breaker import CircuitBreakerManager, CircuitState
 from app.services.error_tracking import ErrorTracker, increment_circuit_trips
 from app.services.model_mapping import map_model_to_provider
 
@@ -65,12 +64,17 @@ class RequestExecutor:
             Completion result
 
         Raises:
-            CircuitBreakerError: If circuit is open
+            CircuitBreakerError: If the provider or provider/model circuit is open
         """
+        # Map model for fallback providers
+        effective_model = model
+        if provider != primary:
+            effective_model = map_model_to_provider(model, provider)
+
         # Check circuit breaker
-        if not await self._circuit_breaker.check_circuit(provider):
-            state = self._circuit_breaker._get_circuit_state(provider)
-            logger.warning(f"Circuit open for {provider}, skipping")
+        if not await self._circuit_breaker.check_circuit(provider, effective_model):
+            state = self._circuit_breaker.blocking_state(provider, effective_model)
+            logger.warning(f"Circuit open for {provider}/{effective_model}, skipping")
             raise CircuitBreakerError(
                 provider=provider,
                 consecutive_failures=state.consecutive_failures,
@@ -78,19 +82,29 @@ class RequestExecutor:
                 cooldown_until=state.cooldown_until,
             )
 
-        # Map model for fallback providers
-        effective_model = model
         if provider != primary:
-            effective_model = map_model_to_provider(model, provider)
             logger.info(f"Fallback: {primary} -> {provider}, model: {model} -> {effective_model}")
 
-        return await adapter.complete(
-            messages=messages,
-            model=effective_model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            **kwargs,
-        )
+        # Feed the provider/model outcome window with outcome and latency
+        start = time.monotonic()
+        try:
+            result = await adapter.complete(
+                messages=messages,
+                model=effective_model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs,
+            )
+        except ProviderError:
+            latency_ms = (time.monotonic() - start) * 1000
+            self._circuit_breaker.record_outcome(provider, effective_model, latency_ms, failed=True)
+            raise
+        except BaseException:
+            self._circuit_breaker.release_probe(provider, effective_model)
+            raise
+        latency_ms = (time.monotonic() - start) * 1000
+        self._circuit_breaker.record_outcome(provider, effective_model, latency_ms, failed=False)
+        return result
 
     async def handle_provider_error(self, error: Exception, provider: str, model: str) -> Exception:
         """Handle provider error and update circuit state.
@@ -104,8 +118,11 @@ class RequestExecutor:
             The error (potentially modified)
 
         Raises:
-            CircuitBreakerError: If circuit threshold is reached
+            CircuitBreakerError: If the failure left the provider's circuit open
         """
+        if isinstance(error, ConcurrencyLimitError):
+            logger.warning(f"{error}, trying next provider")
+            return error  # Our own saturation, not a provider failure
         if isinstance(error, RateLimitError):
             logger.warning(f"Rate limit on {provider}, trying next provider")
         elif isinstance(error, ProviderError) and error.retriable:
@@ -119,12 +136,12 @@ class RequestExecutor:
         error_signature = self._error_tracker.compute_error_signature(error, provider, model)
         state = await self._circuit_breaker.on_failure(provider, consecutive, error_signature)
 
-        # Trip circuit breaker if threshold reached
-        if consecutive >= CIRCUIT_BREAKER_THRESHOLD:
+        # Trip circuit breaker once the (possibly cluster-wide) state is open
+        if state.state == CircuitState.OPEN:
             increment_circuit_trips()
             raise CircuitBreakerError(
                 provider=provider,
-                consecutive_failures=consecutive,
+                consecutive_failures=state.consecutive_failures,
                 last_error_signature=state.last_error_signature or "",
                 cooldown_until=state.cooldown_until,
             )
@@ -0,0 +1,220 @@
+"""
+Batched background writer for request_logs rows.
+
+AccessControlMiddleware used to open a session and commit one RequestLog row
+inline on every request (including rejections). Instead it now enqueues the
+row here and returns; a background task drains the queue with a single
+multi-row INSERT every FLUSH_BATCH_SIZE rows or FLUSH_INTERVAL_SECONDS,
+whichever comes first.
+
+The queue is bounded: when Postgres falls behind, new rows are dropped and
+counted rather than growing memory or slowing responses.
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import insert
+
+from app.db import _get_session_factory
+from app.models import RequestLog
+
+logger = logging.getLogger(__name__)
+
+# Flush when this many rows are pending
+FLUSH_BATCH_SIZE = 200
+
+# Flush at least this often while rows are pending
+FLUSH_INTERVAL_SECONDS = 0.5
+
+# Maximum pending rows before new rows are dropped
+MAX_QUEUE_SIZE = 10_000
+
+# Time allowed for the final flush on shutdown
+SHUTDOWN_TIMEOUT_SECONDS = 5.0
+
+
+@dataclass
+class RequestLogWriterStats:
+    """Counters for the request log writer."""
+
+    enqueued: int = 0
+    written: int = 0
+    dropped: int = 0  # Rejected because the queue was full
+    failed: int = 0  # Lost because a flush failed
+    flushes: int = 0
+
+
+class RequestLogWriter:
+    """Bounded in-memory queue of RequestLog rows flushed in batches."""
+
+    def __init__(
+        self,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+    ) -> None:
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_queue_size = max_queue_size
+        self._rows: deque[dict[str, Any]] = deque()
+        self._wakeup = asyncio.Event()
+        self._shutdown_event = asyncio.Event()
+        self._flush_task: asyncio.Task[None] | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.stats = RequestLogWriterStats()
+
+    @property
+    def pending(self) -> int:
+        """Number of rows waiting to be written."""
+        return len(self._rows)
+
+    def enqueue(self, **fields: Any) -> bool:
+        """
+        Queue a RequestLog row for the next batch (never blocks).
+
+        Returns:
+            False if the row was dropped because the queue is full
+        """
+        if len(self._rows) >= self._max_queue_size:
+            self.stats.dropped += 1
+            if self.stats.dropped == 1 or self.stats.dropped % 1000 == 0:
+                logger.warning(
+                    "Request log queue full (%d rows), dropped %d rows so far",
+                    self._max_queue_size,
+                    self.stats.dropped,
+                )
+            return False
+
+        fields.setdefault("created_at", datetime.now(UTC))
+        self._rows.append(fields)
+        self.stats.enqueued += 1
+        self._ensure_started()
+        if len(self._rows) >= self._batch_size:
+            self._wakeup.set()
+        return True
+
+    def _ensure_started(self) -> None:
+        """Start the flush task on first use (also covers apps run without lifespan)."""
+        if self._flush_task is None and not self._shutdown_event.is_set():
+            self.start()
+
+    def start(self) -> None:
+        """Start the background flush task in the running event loop."""
+        if self._flush_task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._shutdown_event.clear()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(
+            "Started request log writer (batch=%d, interval=%.2fs)",
+            self._batch_size,
+            self._flush_interval,
+        )
+
+    async def _flush_loop(self) -> None:
+        """Flush whenever a batch fills up or the interval elapses."""
+        while not self._shutdown_event.is_set():
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Write all pending rows, one multi-row INSERT per batch.
+
+        Returns:
+            Number of rows written
+        """
+        written = 0
+        while self._rows:
+            count = min(len(self._rows), self._batch_size)
+            batch = [self._rows.popleft() for _ in range(count)]
+            try:
+                await self._write_batch(batch)
+            except Exception as e:
+                # Audit rows are best-effort; retrying would let a dead DB fill the queue
+                self.stats.failed += len(batch)
+                logger.warning("Failed to write %d request logs: %s", len(batch), e)
+                continue
+            self.stats.written += len(batch)
+            self.stats.flushes += 1
+            written += len(batch)
+        return written
+
+    async def _write_batch(self, rows: list[dict[str, Any]]) -> None:
+        """Insert rows in one statement and commit."""
+        session_factory = _get_session_factory()
+        async with session_factory() as session:
+            await session.execute(insert(RequestLog), rows)
+            await session.commit()
+
+    async def shutdown(self) -> None:
+        """Stop the flush task and write everything still queued."""
+        self._shutdown_event.set()
+        self._wakeup.set()
+        if self._flush_task is not None:
+            try:
+                await asyncio.wait_for(self._flush_task, timeout=SHUTDOWN_TIMEOUT_SECONDS)
+            except TimeoutError:
+                self._flush_task.cancel()
+            self._flush_task = None
+
+        try:
+            await asyncio.wait_for(self.flush(), timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        except TimeoutError:
+            logger.warning("Timed out flushing request logs, %d rows lost", self.pending)
+        logger.info(
+            "Request log writer stopped (written=%d dropped=%d failed=%d)",
+            self.stats.written,
+            self.stats.dropped,
+            self.stats.failed,
+        )
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get writer statistics."""
+        return {
+            "pending": self.pending,
+            "enqueued": self.stats.enqueued,
+            "written": self.stats.written,
+            "dropped": self.stats.dropped,
+            "failed": self.stats.failed,
+            "flushes": self.stats.flushes,
+        }
+
+
+# Global writer instance
+_writer: RequestLogWriter | None = None
+
+
+def get_request_log_writer() -> RequestLogWriter:
+    """Get the shared writer, creating it on first use in this event loop."""
+    global _writer
+    loop = asyncio.get_running_loop()
+    if _writer is None or (_writer.loop is not None and _writer.loop is not loop):
+        _writer = RequestLogWriter()
+    return _writer
+
+
+def get_request_log_writer_stats() -> dict[str, Any] | None:
+    """Get stats for the shared writer, or None if it was never started."""
+    return _writer.get_stats() if _writer is not None else None
+
+
+async def start_request_log_writer() -> None:
+    """Start the writer (call on app startup)."""
+    get_request_log_writer().start()
+
+
+async def shutdown_request_log_writer() -> None:
+    """Flush and stop the writer (call on app shutdown)."""
+    global _writer
+    if _writer is not None:
+        await _writer.shutdown()
+        _writer = None
@@ -3,20 +3,63 @@ Request queue for handling dual-provider failures.
 
 Queues requests when all providers are unavailable, then retries them
 when providers recover.
+
+Admission is weighted-fair: queued requests are grouped into flows by
+(priority class, client), and flows are served by deficit round robin.
+Each visit credits a flow with its class weight, and a request is
+dispatched once the flow's credit covers its cost. One client with a
+backlog therefore gets its share of the throughput and no more, and
+interactive work outpaces batch and background work without starving them.
+
+Dispatched requests run concurrently, up to
+config.max_concurrency_per_provider per provider. An entry that times out
+or is cancelled while queued is dropped when it reaches the head of its
+flow, so expiry never scans the queue.
 """
 
 import asyncio
 import contextlib
 import logging
+import math
 import time
+from collections import deque
 from collections.abc import Callable, Coroutine
 from dataclasses import dataclass, field
+from enum import StrEnum
 from typing import Any
 
 from app.services.health_prober import HealthEvent, HealthProber, ProviderHealth
 
 logger = logging.getLogger(__name__)
 
+# Client key for requests enqueued without a client_id
+DEFAULT_CLIENT = "_default"
+
+# Provider key for requests not tied to a provider
+ANY_PROVIDER = "_any"
+
+# Completions kept for measuring the service rate
+SERVICE_RATE_WINDOW_SECONDS = 60.0
+
+# Completions needed before the measured rate replaces the static estimate
+MIN_RATE_SAMPLES = 5
+
+
+class RequestPriority(StrEnum):
+    """Priority class of a queued request."""
+
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+    BACKGROUND = "background"
+
+
+def _default_priority_weights() -> dict[RequestPriority, int]:
+    return {
+        RequestPriority.INTERACTIVE: 8,
+        RequestPriority.BATCH: 2,
+        RequestPriority.BACKGROUND: 1,
+    }
+
 
 @dataclass
 class QueuedRequest:
@@ -27,6 +70,21 @@ class QueuedRequest:
     execute_fn: Callable[[], Coroutine[Any, Any, Any]]
     future: asyncio.Future[Any]
     timeout_at: float
+    client_id: str = DEFAULT_CLIENT
+    priority: RequestPriority = RequestPriority.INTERACTIVE
+    provider: str | None = None
+    cost: float = 1.0
+    dispatched: bool = False
+    task: asyncio.Task[None] | None = None
+
+
+@dataclass
+class _Flow:
+    """Queued requests of one (priority, client) pair, in arrival order."""
+
+    requests: deque[QueuedRequest] = field(default_factory=deque)
+    deficit: float = 0.0
+    has_turn: bool = False  # Whether this round's quantum has been credited
 
 
 @dataclass
@@ -36,6 +94,11 @@ class RequestQueueConfig:
     max_queue_size: int = 100
     request_timeout_seconds: float = 60.0
     retry_interval_seconds: float = 5.0
+    max_concurrency_per_provider: int = 4
+    # Share of max_queue_size one identified client may hold
+    max_client_fraction: float = 0.5
+    # Deficit round robin quantum per priority class
+    priority_weights: dict[RequestPriority, int] = field(default_factory=_default_priority_weights)
 
 
 @dataclass
@@ -43,6 +106,7 @@ class RequestQueueStats:
     """Statistics for the request queue."""
 
     current_size: int = 0
+    in_flight: int = 0
     total_queued: int = 0
     total_succeeded: int = 0
     total_failed: int = 0
@@ -65,28 +129,34 @@ class RequestQueue:
 
     When all providers are unavailable, queues incoming requests and
     retries them when providers recover. Provides configurable queue
-    size and timeout.
+    size and timeout, weighted-fair ordering across clients and priority
+    classes, and bounded per-provider concurrency.
     """
 
     config: RequestQueueConfig = field(default_factory=RequestQueueConfig)
     health_prober: HealthProber | None = None
-    _queue: asyncio.Queue[QueuedRequest] | None = None
+    _flows: dict[tuple[RequestPriority, str], _Flow] = field(default_factory=dict)
+    _active: deque[tuple[RequestPriority, str]] = field(default_factory=deque)
+    _pending: int = 0
+    _client_pending: dict[str, int] = field(default_factory=dict)
+    _priority_pending: dict[RequestPriority, int] = field(default_factory=dict)
+    _provider_in_flight: dict[str, int] = field(default_factory=dict)
+    _tasks: set[asyncio.Task[None]] = field(default_factory=set)
+    _completions: deque[float] = field(default_factory=deque)
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event)
     _stats: RequestQueueStats = field(default_factory=RequestQueueStats)
     _running: bool = False
     _processor_task: asyncio.Task[None] | None = None
     _request_counter: int = 0
 
-    def __post_init__(self) -> None:
-        self._queue = asyncio.Queue(maxsize=self.config.max_queue_size)
-        self._stats = RequestQueueStats()
-
     def _on_provider_recovered(
         self, event: HealthEvent, provider: str, health: ProviderHealth
     ) -> None:
         """Handle provider recovery event."""
         if event == HealthEvent.PROVIDER_RECOVERED:
             logger.info(f"Provider {provider} recovered, processing queued requests")
-            if not self._running and self._queue and not self._queue.empty():
+            self._wakeup.set()
+            if not self._running and self._pending:
                 self.start_processing()
 
     def register_with_prober(self, prober: HealthProber) -> None:
@@ -104,6 +174,10 @@ class RequestQueue:
         self,
         request_fn: Callable[[], Coroutine[Any, Any, Any]],
         timeout: float | None = None,
+        client_id: str | None = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        provider: str | None = None,
+        cost: float = 1.0,
     ) -> Any:
         """
         Enqueue a request for later execution.
@@ -111,26 +185,35 @@ class RequestQueue:
         Args:
             request_fn: Async function to execute when providers available
             timeout: Optional timeout override (defaults to config timeout)
+            client_id: Client or project the request is fair-shared under
+            priority: Priority class of the request
+            provider: Provider the request will use, for concurrency limits
+            cost: Relative cost of the request (e.g. estimated tokens / 1000)
 
         Returns:
             Result from the request function when executed
 
         Raises:
-            QueueFullError: If queue is at capacity
+            QueueFullError: If the queue, or the client's share of it, is full
             asyncio.TimeoutError: If request times out waiting in queue
         """
-        if self._queue is None:
-            self._queue = asyncio.Queue(maxsize=self.config.max_queue_size)
-
-        if self._queue.full():
+        client = client_id or DEFAULT_CLIENT
+        client_limit = max(1, int(self.config.max_queue_size * self.config.max_client_fraction))
+        if self._pending >= self.config.max_queue_size or (
+            client_id is not None and self._client_pending.get(client, 0) >= client_limit
+        ):
             self._stats.total_rejected += 1
-            raise QueueFullError(retry_after=self.config.retry_interval_seconds)
+            raise QueueFullError(
+                retry_after=max(
+                    self.get_estimated_wait_time(priority), self.config.retry_interval_seconds
+                )
+            )
 
         self._request_counter += 1
         request_id = f"req-{self._request_counter}"
         effective_timeout = timeout or self.config.request_timeout_seconds
 
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         future: asyncio.Future[Any] = loop.create_future()
 
         request = QueuedRequest(
@@ -139,16 +222,27 @@ class RequestQueue:
             execute_fn=request_fn,
             future=future,
             timeout_at=time.time() + effective_timeout,
+            client_id=client,
+            priority=priority,
+            provider=provider,
+            cost=max(cost, 0.0),
+        )
+        future.add_done_callback(lambda _: self._on_request_done(request))
+
+        key = (priority, client)
+        flow = self._flows.get(key)
+        if flow is None:
+            flow = self._flows[key] = _Flow()
+            self._active.append(key)
+        flow.requests.append(request)
+        self._count_pending(request, 1)
+        self._stats.total_queued += 1
+        self._stats.current_size = self._pending
+        self._wakeup.set()
+        logger.info(
+            f"Request {request_id} queued for {client} ({priority.value}, "
+            f"size: {self._stats.current_size})"
         )
-
-        try:
-            self._queue.put_nowait(request)
-            self._stats.total_queued += 1
-            self._stats.current_size = self._queue.qsize()
-            logger.info(f"Request {request_id} queued (size: {self._stats.current_size})")
-        except asyncio.QueueFull as err:
-            self._stats.total_rejected += 1
-            raise QueueFullError(retry_after=self.config.retry_interval_seconds) from err
 
         try:
             return await asyncio.wait_for(future, timeout=effective_timeout)
@@ -157,43 +251,143 @@ class RequestQueue:
             logger.warning(f"Request {request_id} timed out after {effective_timeout}s")
             raise
 
-    async def _process_queue(self) -> None:
-        """Process queued requests when providers are available."""
-        if self._queue is None:
-            return
+    def _count_pending(self, request: QueuedRequest, delta: int) -> None:
+        """Adjust the queued-request counters for one request."""
+        self._pending += delta
+        self._client_pending[request.client_id] = (
+            self._client_pending.get(request.client_id, 0) + delta
+        )
+        if not self._client_pending[request.client_id]:
+            del self._client_pending[request.client_id]
+        self._priority_pending[request.priority] = (
+            self._priority_pending.get(request.priority, 0) + delta
+        )
 
-        while self._running and not self._queue.empty():
+    def _on_request_done(self, request: QueuedRequest) -> None:
+        """Future callback: release a queued slot, or stop a cancelled execution.
+
+        A request that expires or is cancelled while queued stays in its flow
+        and is dropped when it reaches the head; only the counters change here.
+        """
+        if not request.dispatched:
+            self._count_pending(request, -1)
+            self._stats.current_size = self._pending
+        elif request.future.cancelled() and request.task is not None:
+            request.task.cancel()
+
+    def _quantum(self, priority: RequestPriority) -> int:
+        return max(self.config.priority_weights.get(priority, 1), 1)
+
+    def _provider_ready(self, provider: str | None) -> bool:
+        """Whether a request for provider may be dispatched now."""
+        key = provider or ANY_PROVIDER
+        if self._provider_in_flight.get(key, 0) >= self.config.max_concurrency_per_provider:
+            return False
+        if provider and self.health_prober:
+            return self.health_prober.is_provider_available(provider)
+        return True
+
+    def _next_request(self) -> QueuedRequest | None:
+        """Pick the next request by deficit round robin over active flows.
+
+        Flows whose head request is waiting on a provider slot are passed
+        over without losing their credit. Returns None if nothing can be
+        dispatched right now.
+        """
+        blocked = 0
+        while self._active and blocked < len(self._active):
+            key = self._active[0]
+            flow = self._flows[key]
+            while flow.requests and flow.requests[0].future.done():
+                flow.requests.popleft()
+            if not flow.requests:
+                self._active.popleft()
+                del self._flows[key]
+                continue
+
+            request = flow.requests[0]
+            if not self._provider_ready(request.provider):
+                self._active.rotate(-1)
+                blocked += 1
+                continue
+
+            if not flow.has_turn:
+                flow.deficit += self._quantum(key[0])
+                flow.has_turn = True
+            if flow.deficit < request.cost:
+                flow.has_turn = False
+                self._active.rotate(-1)
+                continue
+
+            flow.deficit -= request.cost
+            flow.requests.popleft()
+            if not flow.requests:
+                self._active.popleft()
+                del self._flows[key]
+            request.dispatched = True
+            self._count_pending(request, -1)
+            self._stats.current_size = self._pending
+            return request
+        return None
+
+    def _dispatch(self, request: QueuedRequest) -> None:
+        """Run a request in its own task, holding a slot of its provider."""
+        provider = request.provider or ANY_PROVIDER
+        self._provider_in_flight[provider] = self._provider_in_flight.get(provider, 0) + 1
+        self._stats.in_flight += 1
+        task = asyncio.create_task(self._execute(request))
+        request.task = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, request: QueuedRequest) -> None:
+        """Execute a dispatched request and resolve its future."""
+        provider = request.provider or ANY_PROVIDER
+        try:
+            result = await request.execute_fn()
+            self._record_completion()
+            if not request.future.done():
+                request.future.set_result(result)
+                self._stats.total_succeeded += 1
+                logger.info(f"Request {request.id} succeeded")
+        except asyncio.CancelledError:
+            request.future.cancel()
+            raise
+        except Exception as e:
+            self._record_completion()
+            if not request.future.done():
+                request.future.set_exception(e)
+                self._stats.total_failed += 1
+                logger.warning(f"Request {request.id} failed: {e}")
+        finally:
+            self._provider_in_flight[provider] -= 1
+            self._stats.in_flight -= 1
+            self._wakeup.set()
+
+    async def _process_queue(self) -> None:
+        """Dispatch queued requests while providers are available."""
+        while self._running and self._pending:
             if self.health_prober and not self.health_prober.get_available_providers():
                 logger.debug("No providers available, waiting")
                 await asyncio.sleep(self.config.retry_interval_seconds)
                 continue
 
-            try:
-                request: QueuedRequest = self._queue.get_nowait()
-                self._stats.current_size = self._queue.qsize()
-            except asyncio.QueueEmpty:
-                break
-
-            if request.future.done():
+            self._wakeup.clear()
+            request = self._next_request()
+            if request is None:
+                # Everything queued is waiting for a provider slot
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=self.config.retry_interval_seconds
+                    )
                 continue
 
             if time.time() > request.timeout_at:
-                if not request.future.done():
-                    request.future.set_exception(TimeoutError(f"Request {request.id} timed out"))
-                    self._stats.total_timeout += 1
+                request.future.set_exception(TimeoutError(f"Request {request.id} timed out"))
+                self._stats.total_timeout += 1
                 continue
 
-            try:
-                result = await request.execute_fn()
-                if not request.future.done():
-                    request.future.set_result(result)
-                    self._stats.total_succeeded += 1
-                    logger.info(f"Request {request.id} succeeded")
-            except Exception as e:
-                if not request.future.done():
-                    request.future.set_exception(e)
-                    self._stats.total_failed += 1
-                    logger.warning(f"Request {request.id} failed: {e}")
+            self._dispatch(request)
 
         self._running = False
         self._processor_task = None
@@ -207,38 +401,86 @@ class RequestQueue:
         logger.info("Request queue processor started")
 
     async def stop_processing(self) -> None:
-        """Stop processing queued requests."""
+        """Stop processing queued requests and cancel in-flight ones."""
         self._running = False
         if self._processor_task:
             self._processor_task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
                 await self._processor_task
             self._processor_task = None
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         logger.info("Request queue processor stopped")
 
+    def _record_completion(self) -> None:
+        now = time.monotonic()
+        self._completions.append(now)
+        while self._completions and now - self._completions[0] > SERVICE_RATE_WINDOW_SECONDS:
+            self._completions.popleft()
+
+    def get_service_rate(self) -> float | None:
+        """Completed requests per second over the recent window, if measured."""
+        now = time.monotonic()
+        while self._completions and now - self._completions[0] > SERVICE_RATE_WINDOW_SECONDS:
+            self._completions.popleft()
+        if len(self._completions) < MIN_RATE_SAMPLES:
+            return None
+        elapsed = max(now - self._completions[0], 1.0)
+        return len(self._completions) / elapsed
+
     def get_stats(self) -> RequestQueueStats:
         """Get queue statistics."""
-        if self._queue:
-            self._stats.current_size = self._queue.qsize()
+        self._stats.current_size = self._pending
         return self._stats
 
     def get_queue_size(self) -> int:
         """Get current queue size."""
-        return self._queue.qsize() if self._queue else 0
+        return self._pending
 
     def get_queue_position(self, request_id: str) -> int | None:
-        """Get position of a request in queue (for UI display)."""
-        if self._queue is None:
-            return None
-        for position, item in enumerate(list(self._queue._queue), start=1):  # type: ignore[attr-defined]
-            if item.id == request_id:
-                return position
+        """Approximate dispatch position of a request (for UI display).
+
+        Counts the live requests ahead of it in its own flow, plus what
+        deficit round robin serves from every other flow in the rounds it
+        takes to get there.
+        """
+        for key, flow in self._flows.items():
+            live = [r for r in flow.requests if not r.future.done()]
+            for index, request in enumerate(live, start=1):
+                if request.id != request_id:
+                    continue
+                rounds = index / self._quantum(key[0])
+                others = sum(
+                    min(
+                        sum(1 for r in other.requests if not r.future.done()),
+                        math.ceil(rounds * self._quantum(other_key[0])),
+                    )
+                    for other_key, other in self._flows.items()
+                    if other_key != key
+                )
+                return index + others
         return None
 
-    def get_estimated_wait_time(self) -> float:
-        """Estimate wait time based on queue size and retry interval."""
-        queue_size = self.get_queue_size()
-        return queue_size * self.config.retry_interval_seconds
+    def get_estimated_wait_time(self, priority: RequestPriority | None = None) -> float:
+        """
+        Estimate how long a newly queued request would wait.
+
+        Uses the measured service rate once enough requests have completed,
+        otherwise queue size times the retry interval. Given a priority, the
+        estimate covers that class's backlog at its weighted share of the
+        throughput.
+        """
+        rate = self.get_service_rate()
+        if rate is None:
+            return self._pending * self.config.retry_interval_seconds
+        if priority is None:
+            return self._pending / rate
+
+        active = {p for p, count in self._priority_pending.items() if count} | {priority}
+        share = self._quantum(priority) / sum(self._quantum(p) for p in active)
+        return self._priority_pending.get(priority, 0) / (rate * share)
 
 
 # Global singleton
@@ -2,18 +2,39 @@
 Response caching service for identical API requests.
 
 Caches completion responses in Redis to avoid redundant API calls.
+
+Two levels:
+- L1: optional in-process LRU of parsed responses (byte-size bound, short TTL),
+  so repeat hits skip the Redis round trip and json.loads
+- L2: Redis (primary + stale-if-error fallback keys)
+
+Behind the exact tiers sits an optional semantic tier (see semantic_cache.py)
+that serves responses for near-identical prompts.
+
+Every entry is indexed in Redis sorted sets by model, agent and project
+(score = fallback expiry), so purge() can drop a slice of the cache with ZSCAN
++ UNLINK in bounded batches instead of KEYS. clear_all() walks the prefixes
+with SCAN.
+
+invalidate(), purge() and clear_all() publish on a Redis channel so every
+worker drops the affected L1 and semantic entries.
 """
 
+import asyncio
+import contextlib
 import hashlib
 import json
 import logging
-from dataclasses import dataclass
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from datetime import UTC, datetime
 from typing import Any
 
 import redis.asyncio as redis
 
 from app.config import settings
+from app.services.semantic_cache import SemanticCache, SemanticCacheStats
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +50,20 @@ CACHE_PREFIX = "agent-hub:response:"
 # Fallback cache prefix (separate storage for stale-if-error responses)
 FALLBACK_PREFIX = "agent-hub:fallback:"
 
+# Sorted-set indexes of cache keys by model/agent/project
+INDEX_PREFIX = "agent-hub:response-index:"
+INDEX_DIMENSIONS = ("model", "agent", "project")
+
+# Keys per SCAN/ZSCAN page and UNLINK call when purging
+PURGE_BATCH_SIZE = 500
+
+# Pub/sub channel for cross-worker L1 invalidation ("*" clears everything)
+INVALIDATION_CHANNEL = "agent-hub:response-cache:invalidate"
+INVALIDATE_ALL = "*"
+
+# Back-off before resubscribing after a pub/sub connection failure
+SUBSCRIBER_RETRY_SECONDS = 5.0
+
 
 @dataclass
 class CacheStats:
@@ -39,6 +74,9 @@ class CacheStats:
     total_requests: int = 0
     fallback_hits: int = 0
     fallback_misses: int = 0
+    l1_hits: int = 0  # Served from the in-process LRU
+    l2_hits: int = 0  # Served from Redis
+    l1_evictions: int = 0
 
     @property
     def hit_rate(self) -> float:
@@ -97,13 +135,78 @@ class CachedResponse:
         )
 
 
+def _index_key(dimension: str, value: str) -> str:
+    """Redis key of the sorted set indexing cache keys for one model/agent/project."""
+    return f"{INDEX_PREFIX}{dimension}:{value}"
+
+
+class L1Cache:
+    """In-process LRU of parsed responses bounded by total payload bytes."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        # key -> (expires_at, payload size, response)
+        self._entries: OrderedDict[str, tuple[float, int, CachedResponse]] = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Total payload bytes held."""
+        return self._bytes
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Get a copy of a live entry (callers may mutate it)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, response = entry
+        if time.monotonic() >= expires_at:
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return replace(response)
+
+    def put(self, key: str, response: CachedResponse, size: int, ttl: float) -> None:
+        """Store a response for min(ttl, L1 ttl), evicting LRU entries over budget."""
+        if size > self._max_bytes:
+            return
+        self.delete(key)
+        self._entries[key] = (time.monotonic() + min(ttl, self._ttl), size, response)
+        self._bytes += size
+        while self._bytes > self._max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        """Drop one entry."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+        self._bytes = 0
+
+
 class ResponseCache:
-    """Redis-based response cache for API completions."""
+    """Redis-based response cache for API completions, with optional L1 LRU."""
 
     def __init__(
         self,
         redis_url: str | None = None,
         default_ttl: int = DEFAULT_CACHE_TTL,
+        l1_max_bytes: int | None = None,
+        l1_ttl: float | None = None,
+        semantic_cache: SemanticCache | None = None,
     ):
         """
         Initialize response cache.
@@ -111,12 +214,31 @@ class ResponseCache:
         Args:
             redis_url: Redis connection URL. Falls back to settings.
             default_ttl: Default TTL in seconds (default 5 minutes).
+            l1_max_bytes: L1 byte budget, 0 disables L1. Falls back to settings.
+            l1_ttl: Maximum L1 entry lifetime in seconds. Falls back to settings.
+            semantic_cache: Semantic tier. Created from settings if enabled there.
         """
         self._redis_url = redis_url or settings.agent_hub_redis_url
         self._default_ttl = default_ttl
         self._client: redis.Redis | None = None  # type: ignore[type-arg]
         self._stats = CacheStats()
 
+        if l1_max_bytes is None:
+            l1_max_bytes = (
+                settings.response_cache_l1_max_bytes if settings.response_cache_l1_enabled else 0
+            )
+        self._l1: L1Cache | None = (
+            L1Cache(l1_max_bytes, l1_ttl if l1_ttl is not None else settings.response_cache_l1_ttl)
+            if l1_max_bytes > 0
+            else None
+        )
+        if semantic_cache is None and settings.semantic_cache_enabled:
+            semantic_cache = SemanticCache()
+        self._semantic = semantic_cache
+        self._subscriber_task: asyncio.Task[None] | None = None
+        # Bumped on every L1 invalidation so a racing Redis read isn't cached
+        self._l1_epoch = 0
+
     async def _get_client(self) -> redis.Redis:  # type: ignore[type-arg]
         """Get or create Redis client."""
         if self._client is None:
@@ -125,8 +247,69 @@ class ResponseCache:
                 encoding="utf-8",
                 decode_responses=True,
             )
+        if self._has_local_tiers:
+            self._ensure_subscriber()
         return self._client
 
+    @property
+    def _has_local_tiers(self) -> bool:
+        """Whether this worker holds entries other workers must invalidate."""
+        return self._l1 is not None or self._semantic is not None
+
+    def _ensure_subscriber(self) -> None:
+        """Start the L1 invalidation listener if it isn't running."""
+        if self._subscriber_task is not None and not self._subscriber_task.done():
+            return
+        self._subscriber_task = asyncio.create_task(self._listen_for_invalidations())
+
+    async def _listen_for_invalidations(self) -> None:
+        """Apply invalidations published by any worker to the local L1."""
+        while True:
+            try:
+                client = self._client
+                if client is None:
+                    return
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        self._apply_invalidation(message.get("data"))
+                finally:
+                    with contextlib.suppress(Exception):
+                        await pubsub.aclose()  # type: ignore[attr-defined]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener error: {e}")
+            # Invalidations may have been missed while disconnected
+            self._apply_invalidation(INVALIDATE_ALL)
+            await asyncio.sleep(SUBSCRIBER_RETRY_SECONDS)
+
+    def _apply_invalidation(self, data: Any) -> None:
+        """Drop the L1 and semantic entries named in an invalidation message."""
+        if not self._has_local_tiers or not isinstance(data, str):
+            return
+        self._l1_epoch += 1
+        if data == INVALIDATE_ALL:
+            if self._l1 is not None:
+                self._l1.clear()
+            if self._semantic is not None:
+                self._semantic.clear()
+        else:
+            if self._l1 is not None:
+                self._l1.delete(data)
+            if self._semantic is not None:
+                self._semantic.invalidate(data)
+
+    async def _publish_invalidation(self, client: Any, data: str) -> None:
+        """Tell other workers to drop L1 and semantic entries."""
+        if not self._has_local_tiers:
+            return
+        try:
+            await client.publish(INVALIDATION_CHANNEL, data)
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish error: {e}")
+
     def _generate_cache_key(
         self,
         model: str,
@@ -155,6 +338,8 @@ class ResponseCache:
         model: str,
         messages: list[dict[str, str]],
         temperature: float,
+        agent_slug: str | None = None,
+        semantic: bool = True,
     ) -> CachedResponse | None:
         """
         Get cached response if available.
@@ -163,29 +348,71 @@ class ResponseCache:
             model: Model identifier
             messages: Request messages
             temperature: Temperature parameter
+            agent_slug: Agent whose semantic similarity threshold applies
+            semantic: Fall back to the semantic tier on an exact miss
 
         Returns:
             CachedResponse if found, None otherwise
         """
+        response = await self._get_exact(model, messages, temperature)
+        if response is None and semantic and self._semantic is not None:
+            try:
+                response = await self._semantic.get(model, messages, temperature, agent_slug)
+            except Exception as e:
+                logger.warning(f"Semantic cache get error: {e}")
+            if response is not None:
+                self._stats.hits += 1
+        # A miss only once every tier has missed, so hit_rate counts each request once
+        if response is None:
+            self._stats.misses += 1
+        return response
+
+    async def _get_exact(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        temperature: float,
+    ) -> CachedResponse | None:
+        """Look the request up by exact key in L1, then Redis."""
         self._stats.total_requests += 1
 
         try:
-            client = await self._get_client()
             cache_key = self._generate_cache_key(model, messages, temperature)
 
-            cached_data = await client.get(cache_key)
+            if self._l1 is not None:
+                response = self._l1.get(cache_key)
+                if response is not None:
+                    self._stats.hits += 1
+                    self._stats.l1_hits += 1
+                    logger.debug(f"L1 cache hit: {cache_key}")
+                    return response
+
+            client = await self._get_client()
+            epoch = self._l1_epoch
+            if self._l1 is not None:
+                # Fetch remaining TTL in the same round trip so L1 never outlives Redis
+                pipe = client.pipeline(transaction=False)
+                pipe.get(cache_key)
+                pipe.pttl(cache_key)
+                cached_data, ttl_ms = await pipe.execute()
+            else:
+                cached_data, ttl_ms = await client.get(cache_key), None
+
             if cached_data:
                 self._stats.hits += 1
+                self._stats.l2_hits += 1
                 logger.info(f"Cache hit: {cache_key}")
                 data = json.loads(cached_data)
-                return CachedResponse.from_dict(data)
+                response = CachedResponse.from_dict(data)
+                if self._l1 is not None and ttl_ms and ttl_ms > 0 and epoch == self._l1_epoch:
+                    self._l1.put(cache_key, response, len(cached_data), ttl_ms / 1000)
+                    return replace(response)
+                return response
 
-            self._stats.misses += 1
             return None
 
         except Exception as e:
             logger.warning(f"Cache get error: {e}")
-            self._stats.misses += 1
             return None
 
     async def set(
@@ -200,6 +427,9 @@ class ResponseCache:
         finish_reason: str | None = None,
         ttl: int | None = None,
         stale_if_error_ttl: int | None = None,
+        semantic: bool = True,
+        agent_slug: str | None = None,
+        project_id: str | None = None,
     ) -> str:
         """
         Cache a response.
@@ -215,6 +445,9 @@ class ResponseCache:
             finish_reason: Why generation stopped
             ttl: Custom TTL in seconds (uses default if not specified)
             stale_if_error_ttl: TTL for fallback cache during outages (uses STALE_IF_ERROR_TTL if not specified)
+            semantic: Also index the response in the semantic tier
+            agent_slug: Agent the response was generated for (purge index)
+            project_id: Project the response was generated for (purge index)
 
         Returns:
             Cache key used
@@ -234,20 +467,36 @@ class ResponseCache:
                 cache_key=cache_key,
             )
 
-            # Store in primary cache with short TTL
-            await client.setex(
-                cache_key,
-                ttl or self._default_ttl,
-                json.dumps(cached_response.to_dict()),
-            )
+            # Serialise once for both keys
+            payload = json.dumps(cached_response.to_dict())
+            primary_ttl = ttl or self._default_ttl
 
-            # Also store in fallback cache with longer TTL for stale-if-error
+            # Primary cache with short TTL, plus fallback cache with longer TTL
+            # for stale-if-error, plus purge indexes, in one round trip
             fallback_key = cache_key.replace(CACHE_PREFIX, FALLBACK_PREFIX)
-            await client.setex(
-                fallback_key,
-                stale_if_error_ttl or STALE_IF_ERROR_TTL,
-                json.dumps(cached_response.to_dict()),
-            )
+            fallback_ttl = stale_if_error_ttl or STALE_IF_ERROR_TTL
+            pipe = client.pipeline(transaction=False)
+            pipe.setex(cache_key, primary_ttl, payload)
+            pipe.setex(fallback_key, fallback_ttl, payload)
+            now = time.time()
+            for dimension, value in (
+                ("model", model),
+                ("agent", agent_slug),
+                ("project", project_id),
+            ):
+                if not value:
+                    continue
+                index_key = _index_key(dimension, value)
+                # Trim members whose keys have expired so indexes stay bounded
+                pipe.zremrangebyscore(index_key, "-inf", now)
+                pipe.zadd(index_key, {cache_key: now + fallback_ttl})
+                pipe.expire(index_key, fallback_ttl)
+            await pipe.execute()
+
+            if self._l1 is not None:
+                self._l1.put(cache_key, cached_response, len(payload), primary_ttl)
+            if semantic and self._semantic is not None:
+                await self._semantic.put(model, messages, temperature, cached_response, primary_ttl)
 
             logger.info(f"Cached response: {cache_key}")
             return cache_key
@@ -308,41 +557,158 @@ class ResponseCache:
         Returns:
             True if key was deleted, False otherwise
         """
+        l1_deleted = self._l1.delete(cache_key) if self._l1 is not None else False
+        if self._semantic is not None:
+            self._semantic.invalidate(cache_key)
+        self._l1_epoch += 1
         try:
             client = await self._get_client()
             result = await client.delete(cache_key)
-            return result > 0
+            await self._publish_invalidation(client, cache_key)
+            return result > 0 or l1_deleted
         except Exception as e:
             logger.warning(f"Cache invalidate error: {e}")
-            return False
+            return l1_deleted
 
     async def clear_all(self) -> int:
         """
-        Clear all cached responses.
+        Clear all cached responses (primary and fallback) and purge indexes.
+
+        Walks each prefix with SCAN and UNLINKs in batches, so Redis is never
+        blocked for a whole-keyspace scan.
 
         Returns:
-            Number of keys deleted
+            Number of response keys deleted
         """
+        self._apply_invalidation(INVALIDATE_ALL)
         try:
             client = await self._get_client()
-            keys = await client.keys(f"{CACHE_PREFIX}*")
-            if keys:
-                return await client.delete(*keys)
-            return 0
+            await self._publish_invalidation(client, INVALIDATE_ALL)
+            deleted = 0
+            for prefix in (CACHE_PREFIX, FALLBACK_PREFIX):
+                deleted += await self._unlink_matching(client, f"{prefix}*")
+            await self._unlink_matching(client, f"{INDEX_PREFIX}*")
+            return deleted
         except Exception as e:
             logger.warning(f"Cache clear error: {e}")
             return 0
 
+    async def purge(
+        self,
+        model: str | None = None,
+        agent_slug: str | None = None,
+        project_id: str | None = None,
+    ) -> int:
+        """
+        Delete cached responses for one model, agent or project.
+
+        Walks that dimension's index with ZSCAN and UNLINKs primary and
+        fallback keys in batches. With no selector, clears everything.
+        Other workers drop their whole L1/semantic tiers, which are
+        short-lived.
+
+        Args:
+            model: Purge responses for this model
+            agent_slug: Purge responses generated for this agent
+            project_id: Purge responses generated for this project
+
+        Returns:
+            Number of response keys deleted
+
+        Raises:
+            ValueError: If more than one selector is given
+        """
+        selectors = [
+            (dimension, value)
+            for dimension, value in zip(
+                INDEX_DIMENSIONS, (model, agent_slug, project_id), strict=True
+            )
+            if value
+        ]
+        if not selectors:
+            return await self.clear_all()
+        if len(selectors) > 1:
+            raise ValueError("Purge by one of model, agent or project at a time")
+
+        dimension, value = selectors[0]
+        index_key = _index_key(dimension, value)
+        self._apply_invalidation(INVALIDATE_ALL)
+        try:
+            client = await self._get_client()
+            await self._publish_invalidation(client, INVALIDATE_ALL)
+            deleted = 0
+            cursor = 0
+            while True:
+                cursor, members = await client.zscan(index_key, cursor, count=PURGE_BATCH_SIZE)
+                keys = [member for member, _ in members]
+                if keys:
+                    fallback_keys = [k.replace(CACHE_PREFIX, FALLBACK_PREFIX) for k in keys]
+                    deleted += await client.unlink(*keys, *fallback_keys)
+                if cursor == 0:
+                    break
+            await client.unlink(index_key)
+            logger.info(f"Purged {deleted} cached response keys for {dimension}={value}")
+            return deleted
+        except Exception as e:
+            logger.warning(f"Cache purge error: {e}")
+            return 0
+
+    async def _unlink_matching(self, client: Any, pattern: str) -> int:
+        """UNLINK keys matching a pattern, SCANning and deleting in batches."""
+        deleted = 0
+        batch: list[str] = []
+        async for key in client.scan_iter(match=pattern, count=PURGE_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= PURGE_BATCH_SIZE:
+                deleted += await client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await client.unlink(*batch)
+        return deleted
+
     def get_stats(self) -> CacheStats:
         """Get cache statistics."""
+        if self._l1 is not None:
+            self._stats.l1_evictions = self._l1.evictions
         return self._stats
 
+    def get_l1_info(self) -> dict[str, Any]:
+        """Get L1 occupancy (empty dict when L1 is disabled)."""
+        if self._l1 is None:
+            return {}
+        return {"entries": len(self._l1), "bytes": self._l1.size_bytes}
+
+    def get_semantic_stats(self) -> SemanticCacheStats | None:
+        """Get semantic tier statistics (None when the tier is disabled)."""
+        if self._semantic is None:
+            return None
+        return self._semantic.get_stats()
+
+    def get_semantic_info(self) -> dict[str, Any]:
+        """Get semantic tier occupancy (empty dict when the tier is disabled)."""
+        if self._semantic is None:
+            return {}
+        return {"entries": len(self._semantic)}
+
     def reset_stats(self) -> None:
         """Reset cache statistics."""
         self._stats = CacheStats()
+        if self._semantic is not None:
+            self._semantic.reset_stats()
+        if self._l1 is not None:
+            self._l1.evictions = 0
 
     async def close(self) -> None:
         """Close Redis connection."""
+        if self._subscriber_task is not None:
+            self._subscriber_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self._subscriber_task
+            self._subscriber_task = None
+        if self._l1 is not None:
+            self._l1.clear()
+        if self._semantic is not None:
+            self._semantic.clear()
         if self._client:
             await self._client.close()
             self._client = None
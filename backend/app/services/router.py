@@ -1,7 +1,9 @@
 """Model router with fallback and tier-based selection support."""
 
+import asyncio
 import logging
-from collections.abc import Callable
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass, field
 from typing import Any
 
 from app.adapters.base import (
@@ -24,6 +26,8 @@ from app.services.error_tracking import (
     ErrorTracker,
     get_thrashing_metrics,
 )
+from app.services.hedging import HedgePolicy, HedgeStats
+from app.services.model_mapping import map_model_to_provider
 from app.services.provider_chain import ProviderChainManager
 from app.services.request_executor import RequestExecutor
 from app.services.tier_classifier import Tier, get_model_for_tier
@@ -54,6 +58,15 @@ def get_router() -> "ModelRouter":
     return _router_instance
 
 
+@dataclass
+class _HedgeOutcome:
+    """Result of racing the primary against a hedge, or why neither served it."""
+
+    result: CompletionResult | None = None
+    error: Exception | None = None
+    tried: set[str] = field(default_factory=set)
+
+
 class ModelRouter:
     """Routes completion requests to providers with fallback support.
 
@@ -78,6 +91,7 @@ class ModelRouter:
         self._circuit_breaker = CircuitBreakerManager(self._chain_manager.provider_chain)
         self._error_tracker = ErrorTracker()
         self._executor = RequestExecutor(self._circuit_breaker, self._error_tracker)
+        self._hedging = HedgePolicy(self._circuit_breaker)
 
         # Keep backwards compatible properties
         self._provider_chain = self._chain_manager.provider_chain
@@ -104,6 +118,18 @@ class ModelRouter:
         """Get current circuit breaker status for all providers."""
         return self._circuit_breaker.get_circuit_status()
 
+    def is_circuit_open(self, provider: str, model: str | None = None) -> bool:
+        """Whether the provider (or provider/model) circuit is currently open."""
+        return self._circuit_breaker.is_open(provider, model)
+
+    def get_circuit_window_status(self) -> dict[str, dict[str, str | int | float]]:
+        """Get rolling-window stats and circuit state per provider/model."""
+        return self._circuit_breaker.get_window_status()
+
+    def get_hedge_stats(self) -> HedgeStats:
+        """Get hedged request statistics."""
+        return self._hedging.get_stats()
+
     # Expose internal methods for testing
     def _compute_error_signature(self, error: Exception, provider: str, model: str) -> str:
         """Compute a signature for an error to detect identical failures."""
@@ -128,16 +154,21 @@ class ModelRouter:
         max_tokens: int | None = None,
         temperature: float = 1.0,
         auto_tier: bool = False,
+        agent_slug: str | None = None,
         **kwargs: Any,
     ) -> CompletionResult:
         """Generate completion with automatic fallback and tier-based selection.
 
+        With hedging enabled, a slow primary is raced against the first
+        fallback provider instead of being waited out.
+
         Args:
             messages: Conversation messages
             model: Model identifier (optional if auto_tier=True)
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
             auto_tier: Automatically select model based on message complexity
+            agent_slug: Agent the request is for (hedging budget attribution)
             **kwargs: Additional provider-specific parameters
 
         Returns:
@@ -157,17 +188,28 @@ class ModelRouter:
         primary = self._determine_primary_provider(model)
         chain = self._get_fallback_chain(primary)
 
+        resolved_model = model  # Narrowed to str for the closure
+
+        def attempt(provider: str) -> Coroutine[Any, Any, CompletionResult]:
+            return self._attempt(
+                provider, primary, resolved_model, messages, max_tokens, temperature, **kwargs
+            )
+
         last_error: Exception | None = None
+        tried: set[str] = set()
+
+        if self._hedging.enabled and len(chain) > 1:
+            self._hedging.on_request(agent_slug)
+            hedge = await self._complete_hedged(chain[0], chain[1], model, agent_slug, attempt)
+            if hedge.result is not None:
+                return hedge.result
+            last_error, tried = hedge.error, hedge.tried
 
         for i, provider in enumerate(chain):
+            if provider in tried:
+                continue
             try:
-                adapter = self._get_adapter(provider)
-                result = await self._executor.try_provider(
-                    adapter, provider, primary, model, messages, max_tokens, temperature, **kwargs
-                )
-
-                # Success - reset circuit state
-                await self._circuit_breaker.on_success(provider)
+                result = await attempt(provider)
 
                 if i > 0:
                     logger.info(f"Request served by fallback provider: {provider}")
@@ -176,16 +218,8 @@ class ModelRouter:
 
                 return result
 
-            except CircuitBreakerError as e:
-                # Store and continue to next provider
-                last_error = e
-                continue
-
             except (RateLimitError, ProviderError, ValueError) as e:
-                last_error = await self._executor.handle_provider_error(e, provider, model)
-                if isinstance(e, ProviderError) and not e.retriable:
-                    # Non-retriable error - don't try other providers
-                    raise
+                last_error = await self._handle_attempt_error(e, provider, model)
                 continue
 
         # All providers failed
@@ -197,3 +231,97 @@ class ModelRouter:
             provider="router",
             retriable=False,
         )
+
+    async def _attempt(
+        self,
+        provider: str,
+        primary: str,
+        model: str,
+        messages: list[Message],
+        max_tokens: int | None,
+        temperature: float,
+        **kwargs: Any,
+    ) -> CompletionResult:
+        """Try one provider and reset its circuit state on success."""
+        adapter = self._get_adapter(provider)
+        result = await self._executor.try_provider(
+            adapter, provider, primary, model, messages, max_tokens, temperature, **kwargs
+        )
+
+        # Success - reset circuit state
+        await self._circuit_breaker.on_success(provider)
+        return result
+
+    async def _handle_attempt_error(self, error: Exception, provider: str, model: str) -> Exception:
+        """Track a failed attempt; re-raise errors that must not fall back.
+
+        Returns:
+            The error to report if no other provider succeeds
+        """
+        if isinstance(error, CircuitBreakerError):
+            # Provider skipped - continue to next provider
+            return error
+        last_error = await self._executor.handle_provider_error(error, provider, model)
+        if isinstance(error, ProviderError) and not error.retriable:
+            # Non-retriable error - don't try other providers
+            raise error
+        return last_error
+
+    async def _complete_hedged(
+        self,
+        primary: str,
+        hedge: str,
+        model: str,
+        agent_slug: str | None,
+        attempt: Callable[[str], Coroutine[Any, Any, CompletionResult]],
+    ) -> _HedgeOutcome:
+        """Run the primary; if it is still running after the hedge delay, race the hedge.
+
+        The first success wins and the other call is cancelled.
+
+        Args:
+            primary: Primary provider
+            hedge: Provider to hedge with
+            model: Requested (primary) model
+            agent_slug: Agent whose hedge budget is spent
+            attempt: Starts a request against a provider
+
+        Returns:
+            The winning result, or the last error and the providers tried
+        """
+        outcome = _HedgeOutcome(tried={primary})
+        tasks: dict[asyncio.Task[CompletionResult], str] = {
+            asyncio.create_task(attempt(primary)): primary
+        }
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedging.delay_for(primary, model))
+            if not done and self._hedging.try_acquire(agent_slug):
+                logger.info(f"Primary {primary} slow for {model}, hedging with {hedge}")
+                tasks[asyncio.create_task(attempt(hedge))] = hedge
+                outcome.tried.add(hedge)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = tasks[task]
+                    error = task.exception()
+                    if error is None:
+                        outcome.result = task.result()
+                        if len(tasks) > 1:
+                            loser = hedge if provider == primary else primary
+                            loser_model = (
+                                model if loser == primary else map_model_to_provider(model, hedge)
+                            )
+                            self._hedging.on_hedged_result(
+                                provider == hedge, outcome.result.input_tokens, loser_model
+                            )
+                            logger.info(f"Hedged request for {model} won by {provider}")
+                        return outcome
+                    if not isinstance(error, (RateLimitError, ProviderError, ValueError)):
+                        raise error
+                    outcome.error = await self._handle_attempt_error(error, provider, model)
+            return outcome
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,192 @@
+"""Latency- and load-aware ordering of an agent's allowed models.
+
+RoutingScorer keeps, per model, an EWMA of successful-request latency, an
+EWMA of the error rate and the number of requests in flight. For each request
+it orders the agent's primary and fallback models according to a policy:
+
+- strict: the agent's configured order
+- least_latency: lowest score first, where
+  score = latency * (in_flight + 1) / (1 - error_rate)
+- p2c: power of two choices; two random candidates are compared by score
+  and the better one goes first, the rest keep their configured order
+
+Under every policy, models whose circuit breaker is open or that are at
+settings.routing_max_in_flight are demoted to the end of the order rather
+than dropped, so they are still tried if everything else fails. Each
+decision is kept in a bounded in-memory log for inspection.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ROUTING_POLICIES = ("strict", "least_latency", "p2c")
+
+# Floor for (1 - error_rate) so a model that always fails gets a large, finite score
+MIN_SUCCESS_RATE = 0.01
+
+
+@dataclass
+class ModelHealth:
+    """Rolling health of one model."""
+
+    latency_ms: float | None = None  # EWMA over successful requests
+    error_rate: float = 0.0  # EWMA over all outcomes
+    in_flight: int = 0
+    requests: int = 0
+
+
+@dataclass
+class RoutingDecision:
+    """How one request's candidate models were ordered, and what happened."""
+
+    agent_slug: str
+    policy: str
+    order: list[str]
+    scores: dict[str, float]
+    demoted: dict[str, str]  # Model -> reason it was moved to the end
+    timestamp: datetime = field(default_factory=lambda: datetime.now(UTC))
+    attempts: list[str] = field(default_factory=list)
+    model_used: str | None = None
+
+
+class RoutingScorer:
+    """Tracks per-model health and orders candidates for each request."""
+
+    def __init__(self) -> None:
+        self._health: dict[str, ModelHealth] = {}
+        self._decisions: deque[RoutingDecision] = deque(maxlen=settings.routing_decision_log_size)
+        self._lock = threading.Lock()
+
+    def _get_health(self, model: str) -> ModelHealth:
+        if model not in self._health:
+            self._health[model] = ModelHealth()
+        return self._health[model]
+
+    def score(self, model: str) -> float:
+        """Expected cost of sending the next request to model (lower is better)."""
+        health = self._get_health(model)
+        latency = (
+            health.latency_ms
+            if health.latency_ms is not None
+            else settings.routing_default_latency_ms
+        )
+        return latency * (health.in_flight + 1) / max(1.0 - health.error_rate, MIN_SUCCESS_RATE)
+
+    def plan(
+        self,
+        agent_slug: str,
+        candidates: list[str],
+        policy: str | None = None,
+        is_circuit_open: Callable[[str], bool] | None = None,
+    ) -> RoutingDecision:
+        """Order an agent's allowed models for one request and log the decision.
+
+        Args:
+            agent_slug: Agent the request is for
+            candidates: Allowed models in configured order (primary first)
+            policy: Routing policy (defaults to settings.routing_policy)
+            is_circuit_open: Whether a model's circuit breaker is open
+
+        Returns:
+            The decision; its `order` is the sequence to try
+        """
+        policy = policy or settings.routing_policy
+        if policy not in ROUTING_POLICIES:
+            logger.warning(f"Unknown routing policy {policy!r} for {agent_slug}, using strict")
+            policy = "strict"
+        candidates = list(dict.fromkeys(candidates))
+
+        with self._lock:
+            scores = {model: round(self.score(model), 1) for model in candidates}
+            demoted: dict[str, str] = {}
+            for model in candidates:
+                if is_circuit_open is not None and is_circuit_open(model):
+                    demoted[model] = "circuit_open"
+                elif 0 < settings.routing_max_in_flight <= self._get_health(model).in_flight:
+                    demoted[model] = "max_in_flight"
+
+            healthy = [model for model in candidates if model not in demoted]
+            if policy == "least_latency":
+                healthy.sort(key=lambda model: scores[model])
+            elif policy == "p2c" and len(healthy) > 1:
+                a, b = random.sample(healthy, 2)
+                first = a if scores[a] <= scores[b] else b
+                healthy.remove(first)
+                healthy.insert(0, first)
+
+            decision = RoutingDecision(
+                agent_slug=agent_slug,
+                policy=policy,
+                order=healthy + [model for model in candidates if model in demoted],
+                scores=scores,
+                demoted=demoted,
+            )
+            self._decisions.append(decision)
+        return decision
+
+    def start(self, model: str) -> float:
+        """Mark a request to model as in flight; returns its start time."""
+        with self._lock:
+            self._get_health(model).in_flight += 1
+        return time.monotonic()
+
+    def finish(self, model: str, started: float, failed: bool | None) -> None:
+        """Record a finished request.
+
+        Args:
+            model: Model the request went to
+            started: Value returned by start()
+            failed: Whether the provider failed it; None if it was abandoned
+                (e.g. cancelled) and should not count as an outcome
+        """
+        latency_ms = (time.monotonic() - started) * 1000
+        alpha = settings.routing_ewma_alpha
+        with self._lock:
+            health = self._get_health(model)
+            health.in_flight = max(health.in_flight - 1, 0)
+            if failed is None:
+                return
+            health.requests += 1
+            health.error_rate += alpha * (float(failed) - health.error_rate)
+            if not failed:
+                if health.latency_ms is None:
+                    health.latency_ms = latency_ms
+                else:
+                    health.latency_ms += alpha * (latency_ms - health.latency_ms)
+
+    def get_decisions(
+        self, limit: int = 100, agent_slug: str | None = None
+    ) -> list[RoutingDecision]:
+        """Most recent decisions first."""
+        with self._lock:
+            decisions = list(self._decisions)
+        if agent_slug:
+            decisions = [d for d in decisions if d.agent_slug == agent_slug]
+        return decisions[::-1][:limit]
+
+    def get_health(self) -> dict[str, ModelHealth]:
+        """Snapshot of per-model health."""
+        with self._lock:
+            return {model: ModelHealth(**vars(health)) for model, health in self._health.items()}
+
+
+# Global scorer instance
+_routing_scorer: RoutingScorer | None = None
+
+
+def get_routing_scorer() -> RoutingScorer:
+    """Get or create the global routing scorer."""
+    global _routing_scorer
+    if _routing_scorer is None:
+        _routing_scorer = RoutingScorer()
+    return _routing_scorer
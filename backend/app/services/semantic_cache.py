@@ -0,0 +1,412 @@
+"""
+Semantic (embedding-similarity) response cache tier.
+
+Exact-key caching misses prompts that differ only in whitespace, timestamps
+or trivial wording. This tier sits behind ResponseCache's exact lookup:
+
+- The final user turn is normalised (case, whitespace, timestamps, UUIDs)
+  and embedded
+- Everything before it (system prompt, injected context, history) plus model
+  and temperature is hashed into a namespace; only entries with an identical
+  prefix are compared
+- Vectors live in an in-process NumPy flat index per namespace (exact cosine
+  search, which is fast enough at the sizes an in-process tier holds)
+- A response is served when similarity meets the threshold, which can be set
+  per agent
+
+Entries expire with the primary cache TTL and are evicted LRU once the tier
+holds max_entries. The tier is per worker and opt-in (semantic_cache_enabled).
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any, Protocol
+
+import numpy as np
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from app.services.response_cache import CachedResponse
+
+logger = logging.getLogger(__name__)
+
+# Dimension of the local hashing embedder
+HASHING_EMBEDDER_DIM = 256
+
+_UUID_RE = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b")
+_TIMESTAMP_RE = re.compile(
+    r"\b\d{4}-\d{2}-\d{2}(?:[t ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?)?\b"
+)
+_TIME_RE = re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_prompt(content: Any) -> str:
+    """
+    Normalise message content so trivially different prompts compare equal.
+
+    Lowercases, replaces UUIDs and timestamps with placeholders and collapses
+    whitespace. Non-string (multimodal) content is serialised first.
+    """
+    text = content if isinstance(content, str) else json.dumps(content, sort_keys=True)
+    text = text.lower()
+    text = _UUID_RE.sub("<uuid>", text)
+    text = _TIMESTAMP_RE.sub("<timestamp>", text)
+    text = _TIME_RE.sub("<time>", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class Embedder(Protocol):
+    """Turns normalised prompt text into a vector."""
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed text (the index L2-normalises the result)."""
+        ...
+
+
+class HashingEmbedder:
+    """
+    Local deterministic embedder (feature hashing of words and char trigrams).
+
+    Needs no network and gives identical vectors across processes, so it is
+    used in tests and works as a cheap lexical-similarity embedder.
+    """
+
+    def __init__(self, dim: int = HASHING_EMBEDDER_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> list[str]:
+        words = _WORD_RE.findall(text)
+        trigrams = [text[i : i + 3] for i in range(max(len(text) - 2, 0))]
+        return [f"w:{w}" for w in words] + [f"c:{t}" for t in trigrams]
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed text by hashing its features into signed buckets."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+
+class GeminiEmbedder:
+    """Gemini embeddings (same model the memory system uses)."""
+
+    def __init__(self) -> None:
+        self._embedder: Any = None
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed text via the Gemini API."""
+        if self._embedder is None:
+            from app.services.memory.graphiti_client import create_gemini_embedder
+
+            self._embedder = create_gemini_embedder()
+        values = await self._embedder.create(input_data=text)
+        return np.asarray(values, dtype=np.float32)
+
+
+def create_embedder(name: str) -> Embedder:
+    """Create the embedder named in settings ("gemini" or "hashing")."""
+    if name == "hashing":
+        return HashingEmbedder()
+    if name == "gemini":
+        return GeminiEmbedder()
+    raise ValueError(f"Unknown semantic cache embedder: {name}")
+
+
+@dataclass
+class SemanticCacheStats:
+    """Semantic tier statistics."""
+
+    lookups: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    embed_errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Calculate semantic hit rate."""
+        if self.lookups == 0:
+            return 0.0
+        return self.hits / self.lookups
+
+
+class FlatIndex:
+    """
+    Exact cosine-similarity index over unit vectors in one NumPy matrix.
+
+    Rows are removed by swapping in the last row, so the matrix stays dense.
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = 64):
+        self._vectors = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._ids: list[int] = []
+        self._rows: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def dim(self) -> int:
+        """Vector dimension."""
+        return int(self._vectors.shape[1])
+
+    def add(self, entry_id: int, vector: np.ndarray) -> None:
+        """Add a unit vector."""
+        if len(self._ids) == self._vectors.shape[0]:
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+        row = len(self._ids)
+        self._vectors[row] = vector
+        self._ids.append(entry_id)
+        self._rows[entry_id] = row
+
+    def remove(self, entry_id: int) -> None:
+        """Remove a vector by id."""
+        row = self._rows.pop(entry_id, None)
+        if row is None:
+            return
+        last = len(self._ids) - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._vectors[row] = self._vectors[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._ids.pop()
+
+    def search(self, vector: np.ndarray) -> tuple[int, float] | None:
+        """Return (entry id, cosine similarity) of the nearest vector."""
+        if not self._ids:
+            return None
+        scores = self._vectors[: len(self._ids)] @ vector
+        row = int(np.argmax(scores))
+        return self._ids[row], float(scores[row])
+
+
+@dataclass
+class _Entry:
+    namespace: str
+    cache_key: str
+    response: "CachedResponse"
+    expires_at: float
+
+
+class SemanticCache:
+    """In-process semantic response cache."""
+
+    def __init__(
+        self,
+        embedder: Embedder | None = None,
+        threshold: float | None = None,
+        agent_thresholds: dict[str, float] | None = None,
+        max_entries: int | None = None,
+    ):
+        """
+        Initialize the semantic tier.
+
+        Args:
+            embedder: Embedder to use. Falls back to settings.
+            threshold: Default minimum cosine similarity. Falls back to settings.
+            agent_thresholds: Per-agent-slug thresholds. Falls back to settings.
+            max_entries: Entry budget before LRU eviction. Falls back to settings.
+        """
+        self._embedder = embedder or create_embedder(settings.semantic_cache_embedder)
+        self._threshold = threshold if threshold is not None else settings.semantic_cache_threshold
+        self._agent_thresholds = (
+            agent_thresholds
+            if agent_thresholds is not None
+            else settings.semantic_cache_agent_thresholds
+        )
+        self._max_entries = (
+            max_entries if max_entries is not None else settings.semantic_cache_max_entries
+        )
+        self._indexes: dict[str, FlatIndex] = {}
+        # entry id -> entry, in LRU order
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._next_id = 0
+        self._stats = SemanticCacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def threshold_for(self, agent_slug: str | None) -> float:
+        """Similarity threshold for an agent (default if not configured)."""
+        if agent_slug and agent_slug in self._agent_thresholds:
+            return self._agent_thresholds[agent_slug]
+        return self._threshold
+
+    @staticmethod
+    def _split(
+        model: str,
+        messages: list[dict[str, Any]],
+        temperature: float,
+    ) -> tuple[str, str] | None:
+        """Split a request into (prefix namespace, normalised final user turn)."""
+        if not messages or messages[-1].get("role") != "user":
+            return None
+        prefix = [
+            {"role": m.get("role"), "content": normalize_prompt(m.get("content", ""))}
+            for m in messages[:-1]
+        ]
+        prefix_json = json.dumps(
+            {"model": model, "temperature": temperature, "prefix": prefix}, sort_keys=True
+        )
+        namespace = hashlib.sha256(prefix_json.encode()).hexdigest()[:32]
+        return namespace, normalize_prompt(messages[-1].get("content", ""))
+
+    async def _embed(self, text: str) -> np.ndarray | None:
+        """Embed and L2-normalise, or None if embedding failed."""
+        try:
+            vector = np.asarray(await self._embedder.embed(text), dtype=np.float32).ravel()
+        except Exception as e:
+            self._stats.embed_errors += 1
+            logger.warning(f"Semantic cache embed error: {e}")
+            return None
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        return vector / norm
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        index = self._indexes.get(entry.namespace)
+        if index is not None:
+            index.remove(entry_id)
+            if not len(index):
+                del self._indexes[entry.namespace]
+
+    async def get(
+        self,
+        model: str,
+        messages: list[dict[str, Any]],
+        temperature: float,
+        agent_slug: str | None = None,
+    ) -> "CachedResponse | None":
+        """
+        Find a cached response for a semantically similar request.
+
+        Args:
+            model: Model identifier
+            messages: Request messages
+            temperature: Temperature parameter
+            agent_slug: Agent whose threshold applies
+
+        Returns:
+            Copy of the CachedResponse if one is similar enough, None otherwise
+        """
+        split = self._split(model, messages, temperature)
+        if split is None:
+            return None
+        namespace, text = split
+        self._stats.lookups += 1
+
+        index = self._indexes.get(namespace)
+        vector = await self._embed(text) if index is not None else None
+        # Re-read: the index may have been dropped while embedding
+        index = self._indexes.get(namespace)
+        if vector is None or index is None or index.dim != vector.shape[0]:
+            self._stats.misses += 1
+            return None
+
+        match = index.search(vector)
+        if match is not None:
+            entry_id, similarity = match
+            entry = self._entries[entry_id]
+            if time.monotonic() >= entry.expires_at:
+                self._remove(entry_id)
+                self._stats.expirations += 1
+            elif similarity >= self.threshold_for(agent_slug):
+                self._entries.move_to_end(entry_id)
+                self._stats.hits += 1
+                logger.info(f"Semantic cache hit ({similarity:.3f}): {entry.cache_key}")
+                return replace(entry.response)
+
+        self._stats.misses += 1
+        return None
+
+    async def put(
+        self,
+        model: str,
+        messages: list[dict[str, Any]],
+        temperature: float,
+        response: "CachedResponse",
+        ttl: float,
+    ) -> bool:
+        """
+        Index a response under its request's final user turn.
+
+        Args:
+            model: Model identifier
+            messages: Request messages
+            temperature: Temperature parameter
+            response: CachedResponse to serve on similar requests
+            ttl: Seconds the entry stays servable
+
+        Returns:
+            True if the response was indexed
+        """
+        split = self._split(model, messages, temperature)
+        if split is None or self._max_entries <= 0:
+            return False
+        namespace, text = split
+        vector = await self._embed(text)
+        if vector is None:
+            return False
+
+        index = self._indexes.get(namespace)
+        if index is None:
+            index = self._indexes[namespace] = FlatIndex(vector.shape[0])
+        elif index.dim != vector.shape[0]:
+            return False
+
+        # Replace a near-duplicate rather than stacking copies of one prompt
+        match = index.search(vector)
+        if match is not None and match[1] >= 0.999:
+            self._remove(match[0])
+            index = self._indexes.setdefault(namespace, FlatIndex(vector.shape[0]))
+
+        entry_id = self._next_id
+        self._next_id += 1
+        index.add(entry_id, vector)
+        self._entries[entry_id] = _Entry(
+            namespace=namespace,
+            cache_key=response.cache_key,
+            response=response,
+            expires_at=time.monotonic() + ttl,
+        )
+        while len(self._entries) > self._max_entries:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+            self._stats.evictions += 1
+        return True
+
+    def invalidate(self, cache_key: str) -> int:
+        """Drop entries created from an exact cache key."""
+        entry_ids = [i for i, e in self._entries.items() if e.cache_key == cache_key]
+        for entry_id in entry_ids:
+            self._remove(entry_id)
+        return len(entry_ids)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+        self._indexes.clear()
+
+    def get_stats(self) -> SemanticCacheStats:
+        """Get semantic tier statistics."""
+        return self._stats
+
+    def reset_stats(self) -> None:
+        """Reset semantic tier statistics."""
+        self._stats = SemanticCacheStats()
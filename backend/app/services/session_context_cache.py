@@ -0,0 +1,383 @@
+"""
+Hot cache of session conversation context.
+
+Continuing a session needs its ordered message history. Instead of loading
+every Message row on every turn, the history is cached per session with its
+per-message token counts and running total:
+
+- L1: in-process LRU of decoded contexts
+- L2: one Redis list per session. Element 0 is a header [generation,
+  complete] and each further element is a compact JSON message
+  ["u", tokens, content]. Completions are appended with RPUSHX after they
+  commit, so a turn costs one small write instead of a reload.
+
+An L1 hit is validated against Redis with LINDEX 0 + LLEN in one round trip:
+same generation and length means nothing changed, a longer list means other
+workers appended turns (only those are fetched), and a new generation means
+the list was reloaded. Closing or deleting a session, or writing its
+messages outside CompletionWrite, invalidates the entry.
+
+A cold session is loaded newest first with keyset pagination on
+ix_messages_session_created, stopping once the tail exceeds the model's
+context window: older history could not be sent anyway, and the request is
+rejected by the context check as before. Such an entry is marked incomplete
+and only serves requests whose window it still overflows.
+
+Cold loads race with appends from other requests. Every append and
+invalidation bumps a per-session version key, and a cold load only stores
+its result if the version did not change meanwhile (WATCH/MULTI).
+"""
+
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import redis.asyncio as redis
+from redis.exceptions import WatchError
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Message as DBMessage
+from app.services.token_counter import count_single_message_tokens
+
+logger = logging.getLogger(__name__)
+
+# Redis list of a session's encoded context
+CONTEXT_PREFIX = "agent-hub:session-context:"
+
+# Counter bumped by every append/invalidation (guards cold loads)
+VERSION_PREFIX = "agent-hub:session-context-version:"
+
+# Compact role codes for the Redis encoding
+ROLE_CODES = {"user": "u", "assistant": "a", "system": "s"}
+ROLES_BY_CODE = {code: role for role, code in ROLE_CODES.items()}
+
+
+@dataclass
+class ContextMessage:
+    """One message of a session's context."""
+
+    role: str
+    content: str
+    tokens: int  # Prompt-side count (Message.context_tokens)
+
+
+@dataclass
+class SessionContext:
+    """Ordered context of a session, oldest message first."""
+
+    messages: list[ContextMessage] = field(default_factory=list)
+    total_tokens: int = 0
+    complete: bool = True  # False: only the newest messages past a token budget are held
+    generation: str = ""  # Identifies the Redis list this was decoded from
+
+    def covers(self, token_budget: int) -> bool:
+        """Whether this context is enough for a request limited to token_budget."""
+        return self.complete or self.total_tokens > token_budget
+
+    def extend(self, messages: list[ContextMessage]) -> None:
+        """Append newer messages and update the running total."""
+        self.messages.extend(messages)
+        self.total_tokens += sum(m.tokens for m in messages)
+
+    def copy(self) -> "SessionContext":
+        """Shallow copy that is safe to hand to callers."""
+        return SessionContext(
+            messages=list(self.messages),
+            total_tokens=self.total_tokens,
+            complete=self.complete,
+            generation=self.generation,
+        )
+
+
+@dataclass
+class SessionContextCacheStats:
+    """Session context cache statistics."""
+
+    l1_hits: int = 0
+    redis_hits: int = 0
+    db_loads: int = 0
+    appends: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+
+
+def encode_message(message: ContextMessage) -> str:
+    """Compact Redis encoding of one message."""
+    role = ROLE_CODES.get(message.role, message.role)
+    return json.dumps([role, message.tokens, message.content], separators=(",", ":"))
+
+
+def decode_message(data: str) -> ContextMessage:
+    """Inverse of encode_message."""
+    role, tokens, content = json.loads(data)
+    return ContextMessage(role=ROLES_BY_CODE.get(role, role), content=content, tokens=tokens)
+
+
+def _encode_header(generation: str, complete: bool) -> str:
+    return json.dumps([generation, int(complete)], separators=(",", ":"))
+
+
+class SessionContextCache:
+    """Per-session context held in an in-process LRU and Redis lists."""
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        max_sessions: int | None = None,
+        ttl: int | None = None,
+    ):
+        """
+        Initialize session context cache.
+
+        Args:
+            redis_url: Redis connection URL. Falls back to settings.
+            max_sessions: Sessions held in L1. Falls back to settings.
+            ttl: Redis TTL in seconds, refreshed on every load and append.
+        """
+        self._redis_url = redis_url or settings.agent_hub_redis_url
+        self._max_sessions = max_sessions or settings.session_context_cache_max_sessions
+        self._ttl = ttl or settings.session_context_cache_ttl
+        self._client: redis.Redis | None = None  # type: ignore[type-arg]
+        self._l1: OrderedDict[str, SessionContext] = OrderedDict()
+        self.stats = SessionContextCacheStats()
+
+    async def _get_client(self) -> redis.Redis:  # type: ignore[type-arg]
+        """Get or create Redis client."""
+        if self._client is None:
+            self._client = redis.from_url(
+                self._redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+        return self._client
+
+    def _put_l1(self, session_id: str, context: SessionContext) -> None:
+        self._l1[session_id] = context
+        self._l1.move_to_end(session_id)
+        while len(self._l1) > self._max_sessions:
+            self._l1.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def load(self, db: AsyncSession, session_id: str, token_budget: int) -> SessionContext:
+        """
+        Get a session's context, from cache if possible.
+
+        Args:
+            db: Database session (used on a cache miss)
+            session_id: Session ID
+            token_budget: Context window of the model the request goes to
+
+        Returns:
+            The session's context (a copy the caller may keep)
+        """
+        if settings.session_context_cache_enabled:
+            try:
+                context = await self._get_cached(session_id)
+            except Exception as e:
+                logger.warning(f"Session context cache get error for {session_id}: {e}")
+                context = None
+            if context is not None and context.covers(token_budget):
+                return context.copy()
+
+        try:
+            client = await self._get_client() if settings.session_context_cache_enabled else None
+            version = await client.get(f"{VERSION_PREFIX}{session_id}") if client else None
+        except Exception as e:
+            logger.warning(f"Session context cache unavailable for {session_id}: {e}")
+            client = version = None
+
+        context = await load_context_tail(db, session_id, token_budget)
+        self.stats.db_loads += 1
+        if client is not None:
+            await self._store(client, session_id, context, version)
+        return context.copy()
+
+    async def _get_cached(self, session_id: str) -> SessionContext | None:
+        """Current context from L1 (validated against Redis) or Redis."""
+        key = f"{CONTEXT_PREFIX}{session_id}"
+        client = await self._get_client()
+        cached = self._l1.get(session_id)
+        if cached is not None:
+            pipe = client.pipeline(transaction=False)
+            pipe.lindex(key, 0)
+            pipe.llen(key)
+            header, length = await pipe.execute()
+            if header is not None and json.loads(header)[0] == cached.generation:
+                known = len(cached.messages) + 1
+                if length > known:
+                    # Turns appended by other workers
+                    cached.extend([decode_message(m) for m in await client.lrange(key, known, -1)])
+                if length >= known:
+                    self._l1.move_to_end(session_id)
+                    self.stats.l1_hits += 1
+                    return cached
+            self._l1.pop(session_id, None)
+
+        items = await client.lrange(key, 0, -1)
+        if not items:
+            return None
+        generation, complete = json.loads(items[0])
+        context = SessionContext(complete=bool(complete), generation=generation)
+        context.extend([decode_message(m) for m in items[1:]])
+        self._put_l1(session_id, context)
+        self.stats.redis_hits += 1
+        return context
+
+    async def _store(
+        self,
+        client: Any,
+        session_id: str,
+        context: SessionContext,
+        version: str | None,
+    ) -> None:
+        """Write a freshly loaded context unless the session changed meanwhile."""
+        key = f"{CONTEXT_PREFIX}{session_id}"
+        version_key = f"{VERSION_PREFIX}{session_id}"
+        context.generation = uuid.uuid4().hex
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                await pipe.watch(version_key)
+                if await pipe.get(version_key) != version:
+                    return
+                pipe.multi()
+                pipe.delete(key)
+                pipe.rpush(
+                    key,
+                    _encode_header(context.generation, context.complete),
+                    *(encode_message(m) for m in context.messages),
+                )
+                pipe.expire(key, self._ttl)
+                await pipe.execute()
+        except WatchError:
+            return
+        except Exception as e:
+            logger.warning(f"Session context cache set error for {session_id}: {e}")
+            return
+        self._put_l1(session_id, context.copy())
+
+    async def append(self, session_id: str, messages: list[ContextMessage]) -> None:
+        """Append a committed turn to the session's cached context, if cached."""
+        if not settings.session_context_cache_enabled or not messages:
+            return
+        key = f"{CONTEXT_PREFIX}{session_id}"
+        version_key = f"{VERSION_PREFIX}{session_id}"
+        try:
+            client = await self._get_client()
+            pipe = client.pipeline(transaction=True)
+            pipe.incr(version_key)
+            pipe.expire(version_key, self._ttl)
+            pipe.rpushx(key, *(encode_message(m) for m in messages))
+            pipe.expire(key, self._ttl)
+            _, _, length, _ = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Session context cache append error for {session_id}: {e}")
+            self._l1.pop(session_id, None)
+            return
+        self.stats.appends += 1
+
+        cached = self._l1.get(session_id)
+        if cached is None:
+            return
+        if length == len(cached.messages) + 1 + len(messages):
+            cached.extend(messages)
+        else:
+            # Other workers appended too; the next load catches up from Redis
+            self._l1.pop(session_id, None)
+
+    async def invalidate(self, *session_ids: str) -> None:
+        """Drop cached contexts (call after a session is closed or its messages change)."""
+        if not settings.session_context_cache_enabled or not session_ids:
+            return
+        for session_id in session_ids:
+            self._l1.pop(session_id, None)
+        try:
+            client = await self._get_client()
+            pipe = client.pipeline(transaction=True)
+            for session_id in session_ids:
+                pipe.incr(f"{VERSION_PREFIX}{session_id}")
+                pipe.expire(f"{VERSION_PREFIX}{session_id}", self._ttl)
+                pipe.delete(f"{CONTEXT_PREFIX}{session_id}")
+            await pipe.execute()
+            self.stats.invalidations += len(session_ids)
+        except Exception as e:
+            logger.warning(f"Session context cache invalidate error: {e}")
+
+    def get_stats(self) -> SessionContextCacheStats:
+        """Get cache statistics."""
+        return self.stats
+
+    @property
+    def l1_size(self) -> int:
+        """Sessions held in L1."""
+        return len(self._l1)
+
+    async def close(self) -> None:
+        """Close Redis connection."""
+        self._l1.clear()
+        if self._client:
+            await self._client.close()
+            self._client = None
+
+
+async def load_context_tail(db: AsyncSession, session_id: str, token_budget: int) -> SessionContext:
+    """
+    Load a session's newest messages until their tokens exceed token_budget.
+
+    Walks ix_messages_session_created newest first with keyset pagination
+    (created_at, id), so only the tail that can matter is read.
+    """
+    page_size = settings.session_context_page_size
+    tail: list[ContextMessage] = []
+    total = 0
+    complete = True
+    cursor: tuple[Any, int] | None = None
+    while True:
+        stmt = (
+            select(
+                DBMessage.id,
+                DBMessage.role,
+                DBMessage.content,
+                DBMessage.context_tokens,
+                DBMessage.created_at,
+            )
+            .where(DBMessage.session_id == session_id)
+            .order_by(DBMessage.created_at.desc(), DBMessage.id.desc())
+            .limit(page_size)
+        )
+        if cursor is not None:
+            stmt = stmt.where(tuple_(DBMessage.created_at, DBMessage.id) < cursor)
+        rows = (await db.execute(stmt)).all()
+        for row in rows:
+            tokens = (
+                row.context_tokens
+                if row.context_tokens is not None
+                else count_single_message_tokens(row.role, row.content)
+            )
+            tail.append(ContextMessage(role=row.role, content=row.content, tokens=tokens))
+            total += tokens
+            if total > token_budget:
+                complete = False
+                break
+        if not complete or len(rows) < page_size:
+            break
+        cursor = (rows[-1].created_at, rows[-1].id)
+
+    tail.reverse()
+    return SessionContext(messages=tail, total_tokens=total, complete=complete)
+
+
+# Singleton instance
+_session_context_cache: SessionContextCache | None = None
+
+
+def get_session_context_cache() -> SessionContextCache:
+    """Get the singleton session context cache."""
+    global _session_context_cache
+    if _session_context_cache is None:
+        _session_context_cache = SessionContextCache()
+    return _session_context_cache
@@ -2,10 +2,24 @@
 Token counting and cost estimation service.
 
 Uses tiktoken for accurate token counting before API calls.
+
+Per-message counts are cached in a bounded LRU keyed by a hash of role and
+content, so re-counting a long conversation only encodes turns not seen
+before. Counts persisted on Message rows (context_tokens) are primed into the
+cache when a session's history is loaded, so that holds across restarts and
+workers too. Large uncached inputs are encoded in a thread pool by the async
+variants (tiktoken releases the GIL while encoding).
 """
 
+import asyncio
+import hashlib
+import json
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any
 
 import tiktoken
@@ -36,6 +50,19 @@ CONTEXT_LIMITS: dict[str, int] = {
 # Default context limit
 DEFAULT_CONTEXT_LIMIT = 100000
 
+# Cached per-message token counts
+TOKEN_CACHE_MAX_ENTRIES = 50_000
+
+# Uncached characters above which async counting moves to the thread pool
+LARGE_INPUT_CHARS = 100_000
+
+# Per-message overhead (~4 tokens for role + formatting) and priming tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+PRIMING_TOKENS = 2
+
+# Estimate ~1000 tokens per image (varies by size/resolution)
+IMAGE_TOKENS = 1000
+
 
 @dataclass
 class TokenEstimate:
@@ -70,8 +97,9 @@ def _get_model_base(model: str) -> str:
     return "claude-sonnet-4"
 
 
+@lru_cache(maxsize=1)
 def _get_encoding() -> tiktoken.Encoding:
-    """Get tiktoken encoding for Claude-like models."""
+    """Get tiktoken encoding for Claude-like models (loaded once)."""
     # Claude uses a GPT-4-like tokenizer
     try:
         return tiktoken.get_encoding("cl100k_base")
@@ -94,12 +122,131 @@ def count_tokens(text: str) -> int:
     return len(encoding.encode(text))
 
 
+class TokenCountCache:
+    """Thread-safe LRU of per-message token counts keyed by content hash."""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._counts: OrderedDict[bytes, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: bytes) -> bool:
+        with self._lock:
+            return key in self._counts
+
+    def get(self, key: bytes) -> int | None:
+        """Get a cached count."""
+        with self._lock:
+            count = self._counts.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._counts.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def put(self, key: bytes, count: int) -> None:
+        """Store a count, evicting the least recently used over the bound."""
+        with self._lock:
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            while len(self._counts) > self._max_entries:
+                self._counts.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all counts."""
+        with self._lock:
+            self._counts.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_token_cache = TokenCountCache()
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_token_cache() -> TokenCountCache:
+    """Get the shared per-message token count cache."""
+    return _token_cache
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the thread pool used for large inputs."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="token-count")
+    return _executor
+
+
+def _message_key(role: str, content: Any) -> bytes:
+    """Hash a message's role and content into a cache key."""
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True)
+    return hashlib.blake2b(f"{role}\0{content}".encode(), digest_size=16).digest()
+
+
+def _content_chars(content: Any) -> int:
+    """Approximate size of content for the thread pool threshold."""
+    if isinstance(content, str):
+        return len(content)
+    return sum(
+        len(block.get("text", "")) if isinstance(block, dict) else len(str(block))
+        for block in content
+    )
+
+
+def _encode_message(role: str, content: Any) -> int:
+    """Encode one message, including per-message overhead."""
+    encoding = _get_encoding()
+    total = MESSAGE_OVERHEAD_TOKENS + len(encoding.encode(role))
+
+    # Handle multi-modal content (vision API)
+    if isinstance(content, list):
+        for block in content:
+            if isinstance(block, dict):
+                block_type = block.get("type", "")
+                if block_type == "text":
+                    total += len(encoding.encode(block.get("text", "")))
+                elif block_type == "image":
+                    total += IMAGE_TOKENS
+            elif isinstance(block, str):
+                total += len(encoding.encode(block))
+    else:
+        total += len(encoding.encode(content))
+    return total
+
+
+def count_single_message_tokens(role: str, content: Any) -> int:
+    """
+    Count one message's tokens (including overhead), using the cache.
+
+    This is the value persisted as Message.context_tokens.
+    """
+    key = _message_key(role, content)
+    count = _token_cache.get(key)
+    if count is None:
+        count = _encode_message(role, content)
+        _token_cache.put(key, count)
+    return count
+
+
+def prime_message_tokens(role: str, content: Any, tokens: int) -> None:
+    """Seed the cache with a count persisted earlier (e.g. from a Message row)."""
+    _token_cache.put(_message_key(role, content), tokens)
+
+
 def count_message_tokens(messages: list[dict[str, Any]]) -> int:
     """
     Count tokens in a list of messages.
 
     Includes per-message overhead for role tokens.
     Handles multi-modal content (text + images) for vision API.
+    Messages counted before are served from the cache.
 
     Args:
         messages: List of message dicts with "role" and "content"
@@ -108,34 +255,29 @@ def count_message_tokens(messages: list[dict[str, Any]]) -> int:
     Returns:
         Total token count
     """
-    encoding = _get_encoding()
-    total = 0
-
-    for message in messages:
-        # Per-message overhead (~4 tokens for role + formatting)
-        total += 4
-        role = message.get("role", "")
-        content = message.get("content", "")
-        total += len(encoding.encode(role))
-
-        # Handle multi-modal content (vision API)
-        if isinstance(content, list):
-            for block in content:
-                if isinstance(block, dict):
-                    block_type = block.get("type", "")
-                    if block_type == "text":
-                        total += len(encoding.encode(block.get("text", "")))
-                    elif block_type == "image":
-                        # Estimate ~1000 tokens per image (varies by size/resolution)
-                        total += 1000
-                elif isinstance(block, str):
-                    total += len(encoding.encode(block))
-        else:
-            total += len(encoding.encode(content))
-
+    total = sum(
+        count_single_message_tokens(m.get("role", ""), m.get("content", "")) for m in messages
+    )
     # Priming tokens at start
-    total += 2
-    return total
+    return total + PRIMING_TOKENS
+
+
+async def count_message_tokens_async(messages: list[dict[str, Any]]) -> int:
+    """
+    Count tokens like count_message_tokens without blocking the event loop.
+
+    Only messages missing from the cache are encoded; if they add up to more
+    than LARGE_INPUT_CHARS they are encoded in the thread pool.
+    """
+    uncached_chars = 0
+    for m in messages:
+        if _message_key(m.get("role", ""), m.get("content", "")) not in _token_cache:
+            uncached_chars += _content_chars(m.get("content", ""))
+
+    if uncached_chars <= LARGE_INPUT_CHARS:
+        return count_message_tokens(messages)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), count_message_tokens, messages)
 
 
 def estimate_cost(
@@ -189,8 +331,20 @@ def estimate_request(
     Returns:
         Token estimate with cost and context warnings
     """
-    input_tokens = count_message_tokens(messages)
+    return _build_estimate(count_message_tokens(messages), model, max_tokens)
+
+
+async def estimate_request_async(
+    messages: list[dict[str, str]],
+    model: str,
+    max_tokens: int = 8192,  # DEFAULT_OUTPUT_LIMIT from app.constants
+) -> TokenEstimate:
+    """Estimate like estimate_request, counting via count_message_tokens_async."""
+    return _build_estimate(await count_message_tokens_async(messages), model, max_tokens)
+
 
+def _build_estimate(input_tokens: int, model: str, max_tokens: int) -> TokenEstimate:
+    """Build a TokenEstimate from a counted input size."""
     # Estimate output as min(max_tokens, typical response)
     # Most responses are much shorter than max_tokens
     estimated_output = min(max_tokens, max(500, input_tokens // 2))
@@ -0,0 +1,447 @@
+"""
+Transactional outbox for webhook deliveries.
+
+Instead of dispatching webhooks fire-and-forget, request handlers stage one
+WebhookOutbox row per (event, matching webhook) in the same database
+transaction as the rows the event describes (messages, cost logs). The
+payload is serialized and signed once, when staged.
+
+Staging reads the active subscriptions from the database, so rows are staged
+for webhooks registered on any worker. Each worker caches them for
+settings.webhook_outbox_cache_ttl; the webhook API publishes on a Redis
+channel after every change so all workers reload on their next staging.
+
+OutboxRelay claims due rows in batches: a short transaction selects them
+with FOR UPDATE SKIP LOCKED, marks them in_flight with a lease
+(settings.webhook_outbox_lease_seconds) and commits, so any number of
+workers can relay concurrently without double delivery and no connection
+sits idle in a transaction while it POSTs. Deliveries go through the
+dispatcher's pooled client; a second short transaction then deletes the
+delivered rows and reschedules failed ones with exponential backoff, marking
+them "dead" after settings.webhook_outbox_max_attempts. Delivery is
+at-least-once: rows of a relay that dies mid-batch are claimed again once
+their lease expires.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+import redis.asyncio as redis
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import _get_session_factory
+from app.models import WebhookOutbox, WebhookSubscription
+from app.services.events import SessionEvent
+from app.services.webhooks import (
+    WebhookConfig,
+    _event_payload,
+    compute_signature,
+    get_webhook_dispatcher,
+    webhook_matches,
+)
+
+logger = logging.getLogger(__name__)
+
+# Retry backoff: BACKOFF_BASE_SECONDS * 2**(attempts - 1), capped
+BACKOFF_BASE_SECONDS = 5.0
+BACKOFF_MAX_SECONDS = 3600.0
+
+# Back off this long after the relay itself fails (e.g. database down)
+ERROR_BACKOFF_SECONDS = 5.0
+
+# Time allowed for the in-flight batch on shutdown
+SHUTDOWN_TIMEOUT_SECONDS = 10.0
+
+# Pub/sub channel telling every worker to reload its active webhooks
+INVALIDATION_CHANNEL = "agent-hub:webhooks:invalidate"
+
+# Back-off before resubscribing after a pub/sub connection failure
+SUBSCRIBER_RETRY_SECONDS = 5.0
+
+# Keep invalidation publishes from stalling the webhook API when Redis is down
+REDIS_TIMEOUT_SECONDS = 2.0
+
+
+class ActiveWebhookCache:
+    """
+    This worker's copy of the active webhook subscriptions.
+
+    Loaded through the staging caller's session and kept for `ttl` seconds, or
+    until an invalidation arrives on INVALIDATION_CHANNEL.
+    """
+
+    def __init__(self, ttl: float | None = None, redis_url: str | None = None) -> None:
+        self._ttl = ttl if ttl is not None else settings.webhook_outbox_cache_ttl
+        self._redis_url = redis_url or settings.agent_hub_redis_url
+        self._webhooks: list[WebhookConfig] | None = None
+        self._loaded_at = 0.0
+        # Bumped on every invalidation so a racing load isn't cached
+        self._epoch = 0
+        self._client: redis.Redis | None = None  # type: ignore[type-arg]
+        self._subscriber_task: asyncio.Task[None] | None = None
+
+    async def get(self, db: AsyncSession) -> list[WebhookConfig]:
+        """Active webhooks, from the cache or loaded through db."""
+        if self._webhooks is not None and time.monotonic() - self._loaded_at < self._ttl:
+            return self._webhooks
+        epoch = self._epoch
+        result = await db.execute(
+            select(WebhookSubscription).where(WebhookSubscription.is_active == 1)
+        )
+        webhooks = [
+            WebhookConfig(
+                id=webhook.id,
+                url=webhook.url,
+                secret=webhook.secret,
+                event_types=webhook.event_types,
+                project_id=webhook.project_id,
+            )
+            for webhook in result.scalars().all()
+        ]
+        if epoch == self._epoch:
+            self._webhooks = webhooks
+            self._loaded_at = time.monotonic()
+        return webhooks
+
+    def clear(self) -> None:
+        """Drop this worker's copy; the next get() reloads it."""
+        self._webhooks = None
+        self._epoch += 1
+
+    async def invalidate(self) -> None:
+        """Drop the cached webhooks in every worker (call after a webhook change)."""
+        self.clear()
+        try:
+            await self._get_client().publish(INVALIDATION_CHANNEL, "*")
+        except Exception as e:
+            logger.warning(f"Webhook cache invalidation publish error: {e}")
+
+    def _get_client(self) -> redis.Redis:  # type: ignore[type-arg]
+        if self._client is None:
+            self._client = redis.from_url(
+                self._redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+                socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+            )
+        return self._client
+
+    def start(self) -> None:
+        """Start listening for invalidations from other workers."""
+        if self._subscriber_task is not None and not self._subscriber_task.done():
+            return
+        self._subscriber_task = asyncio.create_task(self._listen_for_invalidations())
+
+    async def _listen_for_invalidations(self) -> None:
+        """Clear the cache whenever any worker publishes an invalidation."""
+        while True:
+            try:
+                pubsub = self._get_client().pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                try:
+                    async for _message in pubsub.listen():
+                        self.clear()
+                finally:
+                    with contextlib.suppress(Exception):
+                        await pubsub.aclose()  # type: ignore[attr-defined]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Webhook cache invalidation listener error: {e}")
+            # Invalidations may have been missed while disconnected
+            self.clear()
+            await asyncio.sleep(SUBSCRIBER_RETRY_SECONDS)
+
+    async def close(self) -> None:
+        """Stop the listener and close the Redis client."""
+        if self._subscriber_task is not None:
+            self._subscriber_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._subscriber_task
+            self._subscriber_task = None
+        if self._client is not None:
+            with contextlib.suppress(Exception):
+                await self._client.close()
+            self._client = None
+
+
+_active_webhooks = ActiveWebhookCache()
+
+
+async def invalidate_active_webhooks() -> None:
+    """Make every worker reload its active webhooks before staging again."""
+    await _active_webhooks.invalidate()
+
+
+async def stage_webhook_event(db: AsyncSession, event: SessionEvent) -> int:
+    """
+    Stage webhook deliveries for an event in the caller's transaction.
+
+    Marks the event as outboxed so live dispatch skips it, unless no webhook
+    matched. The caller commits.
+
+    Args:
+        db: Database session whose transaction the rows join
+        event: Event to deliver
+
+    Returns:
+        Number of rows staged (one per matching webhook)
+    """
+    if not settings.webhook_outbox_enabled:
+        return 0
+    staged = 0
+    for webhook in await _active_webhooks.get(db):
+        if not webhook_matches(webhook, event):
+            continue
+        payload_json = json.dumps(
+            {**_event_payload(event), "webhook_id": webhook.id}, sort_keys=True
+        )
+        db.add(
+            WebhookOutbox(
+                webhook_id=webhook.id,
+                url=webhook.url,
+                event_type=event.event_type.value,
+                session_id=event.session_id,
+                payload=payload_json,
+                signature=compute_signature(payload_json, webhook.secret),
+            )
+        )
+        staged += 1
+    if staged:
+        event.outboxed = True
+    return staged
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt after `attempts` failures."""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+@dataclass
+class _Claim:
+    """A leased outbox row, detached from the claiming transaction."""
+
+    id: int
+    webhook_id: int
+    url: str
+    payload: str
+    signature: str
+    attempts: int
+
+
+@dataclass
+class OutboxRelayStats:
+    """Counters for the outbox relay."""
+
+    claimed: int = 0
+    delivered: int = 0
+    failed: int = 0  # Attempts that failed (row rescheduled or marked dead)
+    dead: int = 0
+    errors: int = 0  # Relay iterations that failed outright
+
+
+class OutboxRelay:
+    """Delivers pending outbox rows in batches, safely alongside other relays."""
+
+    def __init__(
+        self,
+        batch_size: int | None = None,
+        poll_interval: float | None = None,
+        max_attempts: int | None = None,
+    ) -> None:
+        self._batch_size = batch_size or settings.webhook_outbox_batch_size
+        self._poll_interval = poll_interval or settings.webhook_outbox_poll_interval
+        self._max_attempts = max_attempts or settings.webhook_outbox_max_attempts
+        self._wakeup = asyncio.Event()
+        self._shutdown_event = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.stats = OutboxRelayStats()
+
+    def wake(self) -> None:
+        """Check for new rows now rather than at the next poll."""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the relay loop in the running event loop."""
+        if self._task is not None:
+            return
+        self._shutdown_event.clear()
+        self._task = asyncio.create_task(self._relay_loop())
+        logger.info(
+            f"Started webhook outbox relay (batch={self._batch_size}, "
+            f"poll={self._poll_interval:.1f}s)"
+        )
+
+    async def _relay_loop(self) -> None:
+        """Relay full batches back to back; otherwise wait for a wakeup or the poll."""
+        while not self._shutdown_event.is_set():
+            try:
+                claimed = await self.relay_once()
+            except Exception as e:
+                self.stats.errors += 1
+                logger.warning(f"Webhook outbox relay failed: {e}")
+                await asyncio.sleep(ERROR_BACKOFF_SECONDS)
+                continue
+            if claimed < self._batch_size:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+                self._wakeup.clear()
+
+    async def relay_once(self) -> int:
+        """
+        Claim one batch of due rows, deliver them and record the outcomes.
+
+        Claiming and recording are separate short transactions; nothing is
+        held open while the batch is delivered.
+
+        Returns:
+            Number of rows claimed
+        """
+        claims = await self._claim()
+        if not claims:
+            return 0
+        self.stats.claimed += len(claims)
+
+        dispatcher = get_webhook_dispatcher()
+        deliveries = await asyncio.gather(
+            *(
+                dispatcher.send_signed(claim.webhook_id, claim.url, claim.payload, claim.signature)
+                for claim in claims
+            )
+        )
+
+        session_factory = _get_session_factory()
+        async with session_factory() as db, db.begin():
+            now = datetime.now(UTC)
+            delivered_ids = []
+            for claim, delivery in zip(claims, deliveries, strict=True):
+                if delivery.success:
+                    delivered_ids.append(claim.id)
+                    continue
+                self.stats.failed += 1
+                attempts = claim.attempts + 1
+                last_error = (delivery.error or f"HTTP {delivery.status_code}")[:500]
+                values: dict[str, object] = {
+                    "attempts": attempts,
+                    "last_error": last_error,
+                    "locked_until": None,
+                }
+                if attempts >= self._max_attempts:
+                    values["status"] = "dead"
+                    self.stats.dead += 1
+                    logger.warning(
+                        f"Webhook {claim.webhook_id} outbox row {claim.id} dead after "
+                        f"{attempts} attempts: {last_error}"
+                    )
+                else:
+                    values["status"] = "pending"
+                    values["next_attempt_at"] = now + retry_delay(attempts)
+                await db.execute(
+                    update(WebhookOutbox).where(WebhookOutbox.id == claim.id).values(**values)
+                )
+            if delivered_ids:
+                await db.execute(delete(WebhookOutbox).where(WebhookOutbox.id.in_(delivered_ids)))
+                self.stats.delivered += len(delivered_ids)
+        return len(claims)
+
+    async def _claim(self) -> list[_Claim]:
+        """Lease due rows (pending, or in_flight with an expired lease) and commit."""
+        session_factory = _get_session_factory()
+        async with session_factory() as db, db.begin():
+            now = datetime.now(UTC)
+            result = await db.execute(
+                select(WebhookOutbox)
+                .where(
+                    or_(
+                        and_(
+                            WebhookOutbox.status == "pending",
+                            WebhookOutbox.next_attempt_at <= now,
+                        ),
+                        and_(
+                            WebhookOutbox.status == "in_flight",
+                            WebhookOutbox.locked_until <= now,
+                        ),
+                    )
+                )
+                .order_by(WebhookOutbox.id)
+                .limit(self._batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.scalars().all()
+            locked_until = now + timedelta(seconds=settings.webhook_outbox_lease_seconds)
+            claims = []
+            for row in rows:
+                row.status = "in_flight"
+                row.locked_until = locked_until
+                claims.append(
+                    _Claim(
+                        id=row.id,
+                        webhook_id=row.webhook_id,
+                        url=row.url,
+                        payload=row.payload,
+                        signature=row.signature,
+                        attempts=row.attempts,
+                    )
+                )
+        return claims
+
+    async def shutdown(self) -> None:
+        """Stop the relay after its in-flight batch."""
+        self._shutdown_event.set()
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=SHUTDOWN_TIMEOUT_SECONDS)
+            except TimeoutError:
+                self._task.cancel()
+            self._task = None
+        logger.info(
+            f"Webhook outbox relay stopped (delivered={self.stats.delivered} "
+            f"dead={self.stats.dead})"
+        )
+
+    def get_stats(self) -> OutboxRelayStats:
+        """Get relay statistics."""
+        return self.stats
+
+
+# Global relay instance
+_relay: OutboxRelay | None = None
+
+
+def get_outbox_relay() -> OutboxRelay | None:
+    """Get the running relay, if any."""
+    return _relay
+
+
+def wake_outbox_relay() -> None:
+    """Nudge this worker's relay after staging rows (other workers poll)."""
+    if _relay is not None:
+        _relay.wake()
+
+
+async def start_outbox_relay() -> None:
+    """Start the relay (call on app startup)."""
+    global _relay
+    if not settings.webhook_outbox_enabled:
+        return
+    if _relay is None:
+        _relay = OutboxRelay()
+    _relay.start()
+    _active_webhooks.start()
+
+
+async def shutdown_outbox_relay() -> None:
+    """Stop the relay (call on app shutdown)."""
+    global _relay
+    if _relay is not None:
+        await _relay.shutdown()
+        _relay = None
+    await _active_webhooks.close()
@@ -2,23 +2,51 @@
 Webhook service for delivering session events to external endpoints.
 
 Handles webhook registration, HMAC signature generation, and async delivery.
+
+Deliveries share one pooled HTTP client (HTTP/2 when the optional h2 package
+is installed), run concurrently across webhooks with at most
+settings.webhook_max_concurrency_per_endpoint in flight per URL, and are
+tracked per webhook (latency, failures). Webhooks with batch_window_ms > 0
+receive the events of each window as one signed POST:
+{"webhook_id": ..., "events": [{"event_type", "session_id", "timestamp", "data"}, ...]}
 """
 
+import asyncio
 import hashlib
 import hmac
+import importlib.util
 import json
 import logging
 import secrets
+import time
+from collections import deque
 from dataclasses import dataclass, field
-from datetime import UTC, datetime
 from typing import Any
 
 import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.models import WebhookSubscription
 from app.services.events import SessionEvent, get_event_publisher
 
 logger = logging.getLogger(__name__)
 
+# HTTP/2 needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Latency samples kept per webhook for percentiles
+LATENCY_SAMPLES = 256
+
+# Time allowed for pending batches and in-flight deliveries on shutdown
+SHUTDOWN_TIMEOUT_SECONDS = 10.0
+
+WEBHOOK_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": "AgentHub-Webhook/1.0",
+}
+
 
 @dataclass
 class WebhookPayload:
@@ -93,6 +121,7 @@ class WebhookDelivery:
     status_code: int | None = None
     error: str | None = None
     duration_ms: float = 0.0
+    events: int = 1  # Events carried by the POST (>1 for batches)
 
 
 @dataclass
@@ -104,6 +133,66 @@ class WebhookConfig:
     secret: str
     event_types: list[str]
     project_id: str | None = None
+    batch_window_ms: int = field(default_factory=lambda: settings.webhook_batch_window_ms)
+
+
+@dataclass
+class WebhookEndpointStats:
+    """Delivery statistics for one webhook."""
+
+    url: str
+    deliveries: int = 0  # POSTs attempted (a batch counts once)
+    events: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_status: int | None = None
+    last_error: str | None = None
+    recent_ms: deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+    def record(self, delivery: WebhookDelivery) -> None:
+        """Record a delivery attempt."""
+        self.deliveries += 1
+        self.events += delivery.events
+        self.total_ms += delivery.duration_ms
+        self.max_ms = max(self.max_ms, delivery.duration_ms)
+        self.recent_ms.append(delivery.duration_ms)
+        self.last_status = delivery.status_code
+        if delivery.success:
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = delivery.error or f"HTTP {delivery.status_code}"
+
+    @property
+    def avg_ms(self) -> float:
+        """Mean delivery latency."""
+        return self.total_ms / self.deliveries if self.deliveries else 0.0
+
+    @property
+    def p95_ms(self) -> float:
+        """95th percentile latency over recent deliveries."""
+        if not self.recent_ms:
+            return 0.0
+        ordered = sorted(self.recent_ms)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def webhook_matches(config: WebhookConfig, event: SessionEvent) -> bool:
+    """Whether a webhook subscribes to the event's type (no filter matches all)."""
+    return not (config.event_types and event.event_type.value not in config.event_types)
+
+
+def _event_payload(event: SessionEvent) -> dict[str, Any]:
+    """Event fields as delivered in webhook payloads."""
+    return {
+        "event_type": event.event_type.value,
+        "session_id": event.session_id,
+        "timestamp": event.timestamp.isoformat(),
+        "data": event.data,
+    }
 
 
 @dataclass
@@ -111,12 +200,24 @@ class WebhookDispatcher:
     """
     Dispatches events to registered webhooks.
 
-    Handles HMAC signing and async HTTP delivery.
+    Handles HMAC signing and async HTTP delivery over a shared client.
     """
 
     _webhooks: dict[int, WebhookConfig] = field(default_factory=dict)
     _timeout_seconds: float = 10.0
     _max_retries: int = 3
+    max_connections: int = field(default_factory=lambda: settings.webhook_max_connections)
+    max_concurrency_per_endpoint: int = field(
+        default_factory=lambda: settings.webhook_max_concurrency_per_endpoint
+    )
+    batch_max_events: int = field(default_factory=lambda: settings.webhook_batch_max_events)
+    _client: httpx.AsyncClient | None = None
+    _loop: asyncio.AbstractEventLoop | None = None
+    _endpoint_limits: dict[str, asyncio.Semaphore] = field(default_factory=dict)
+    _stats: dict[int, WebhookEndpointStats] = field(default_factory=dict)
+    _batches: dict[int, list[SessionEvent]] = field(default_factory=dict)
+    _batch_timers: dict[int, asyncio.TimerHandle] = field(default_factory=dict)
+    _tasks: set[asyncio.Task[Any]] = field(default_factory=set)
 
     def register_webhook(self, config: WebhookConfig) -> None:
         """Register a webhook configuration."""
@@ -127,13 +228,141 @@ class WebhookDispatcher:
         """Unregister a webhook."""
         if webhook_id in self._webhooks:
             del self._webhooks[webhook_id]
+            self._stats.pop(webhook_id, None)
+            self._batches.pop(webhook_id, None)
+            timer = self._batch_timers.pop(webhook_id, None)
+            if timer is not None:
+                timer.cancel()
             logger.info(f"Unregistered webhook {webhook_id}")
             return True
         return False
 
     def _should_deliver(self, config: WebhookConfig, event: SessionEvent) -> bool:
         """Check if webhook should receive this event."""
-        return not (config.event_types and event.event_type.value not in config.event_types)
+        return webhook_matches(config, event)
+
+    def matching_webhooks(self, event: SessionEvent) -> list[WebhookConfig]:
+        """Registered webhooks that should receive an event."""
+        return [w for w in self._webhooks.values() if self._should_deliver(w, event)]
+
+    async def load_webhooks(self, db: AsyncSession) -> int:
+        """
+        Register all active webhook subscriptions from the database.
+
+        Returns:
+            Number of webhooks registered.
+        """
+        result = await db.execute(
+            select(WebhookSubscription).where(WebhookSubscription.is_active == 1)
+        )
+        webhooks = result.scalars().all()
+        for webhook in webhooks:
+            self.register_webhook(
+                WebhookConfig(
+                    id=webhook.id,
+                    url=webhook.url,
+                    secret=webhook.secret,
+                    event_types=webhook.event_types,
+                    project_id=webhook.project_id,
+                )
+            )
+        return len(webhooks)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared client, recreating it if the event loop changed."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                http2=settings.webhook_http2 and HTTP2_AVAILABLE,
+            )
+            self._loop = loop
+            self._endpoint_limits = {}
+        return self._client
+
+    def _endpoint_limit(self, url: str) -> asyncio.Semaphore:
+        """Semaphore bounding in-flight POSTs to one URL."""
+        limit = self._endpoint_limits.get(url)
+        if limit is None:
+            limit = asyncio.Semaphore(self.max_concurrency_per_endpoint)
+            self._endpoint_limits[url] = limit
+        return limit
+
+    async def _post(
+        self, webhook: WebhookConfig, payload: dict[str, Any], events: int = 1
+    ) -> WebhookDelivery:
+        """Sign and POST a payload."""
+        payload_json = json.dumps(payload, sort_keys=True)
+        signature = compute_signature(payload_json, webhook.secret)
+        batch_size = events if "events" in payload else None
+        return await self.send_signed(
+            webhook.id, webhook.url, payload_json, signature, events=events, batch_size=batch_size
+        )
+
+    async def send_signed(
+        self,
+        webhook_id: int,
+        url: str,
+        payload_json: str,
+        signature: str,
+        events: int = 1,
+        batch_size: int | None = None,
+    ) -> WebhookDelivery:
+        """
+        POST an already serialized and signed payload over the shared client.
+
+        The outcome is recorded in the webhook's stats.
+
+        Args:
+            webhook_id: Webhook the payload belongs to.
+            url: Callback URL.
+            payload_json: Request body, sent verbatim.
+            signature: HMAC-SHA256 of payload_json.
+            events: Events carried by the payload.
+            batch_size: Set for batch payloads (X-Webhook-Batch-Size header).
+
+        Returns:
+            WebhookDelivery with result details.
+        """
+        headers = {
+            **WEBHOOK_HEADERS,
+            "X-Webhook-Signature": signature,
+            "X-Webhook-Id": str(webhook_id),
+        }
+        if batch_size is not None:
+            headers["X-Webhook-Batch-Size"] = str(batch_size)
+
+        client = self._get_client()
+        async with self._endpoint_limit(url):
+            start_time = time.perf_counter()
+            try:
+                response = await client.post(url, content=payload_json, headers=headers)
+                delivery = WebhookDelivery(
+                    webhook_id=webhook_id,
+                    url=url,
+                    success=200 <= response.status_code < 300,
+                    status_code=response.status_code,
+                )
+            except httpx.TimeoutException:
+                delivery = WebhookDelivery(
+                    webhook_id=webhook_id, url=url, success=False, error="Timeout"
+                )
+            except Exception as e:
+                delivery = WebhookDelivery(
+                    webhook_id=webhook_id, url=url, success=False, error=str(e)[:200]
+                )
+            delivery.duration_ms = (time.perf_counter() - start_time) * 1000
+        delivery.events = events
+
+        stats = self._stats.get(webhook_id)
+        if stats is None:
+            stats = self._stats[webhook_id] = WebhookEndpointStats(url=url)
+        stats.record(delivery)
+        return delivery
 
     async def deliver(self, webhook: WebhookConfig, event: SessionEvent) -> WebhookDelivery:
         """
@@ -146,60 +375,23 @@ class WebhookDispatcher:
         Returns:
             WebhookDelivery with result details.
         """
-        payload = WebhookPayload(
-            event_type=event.event_type.value,
-            session_id=event.session_id,
-            timestamp=event.timestamp.isoformat(),
-            data=event.data,
-            webhook_id=webhook.id,
-        )
-        payload_json = payload.to_json()
-        signature = compute_signature(payload_json, webhook.secret)
-
-        headers = {
-            "Content-Type": "application/json",
-            "X-Webhook-Signature": signature,
-            "X-Webhook-Id": str(webhook.id),
-            "User-Agent": "AgentHub-Webhook/1.0",
-        }
+        return await self._post(webhook, {**_event_payload(event), "webhook_id": webhook.id})
 
-        start_time = datetime.now(UTC)
-        try:
-            async with httpx.AsyncClient(timeout=self._timeout_seconds) as client:
-                response = await client.post(
-                    webhook.url,
-                    content=payload_json,
-                    headers=headers,
-                )
-            duration_ms = (datetime.now(UTC) - start_time).total_seconds() * 1000
+    async def deliver_batch(
+        self, webhook: WebhookConfig, events: list[SessionEvent]
+    ) -> WebhookDelivery:
+        """
+        Deliver several events to a webhook in one signed POST.
 
-            success = 200 <= response.status_code < 300
-            return WebhookDelivery(
-                webhook_id=webhook.id,
-                url=webhook.url,
-                success=success,
-                status_code=response.status_code,
-                duration_ms=duration_ms,
-            )
+        Args:
+            webhook: The webhook configuration.
+            events: Events to deliver, oldest first.
 
-        except httpx.TimeoutException:
-            duration_ms = (datetime.now(UTC) - start_time).total_seconds() * 1000
-            return WebhookDelivery(
-                webhook_id=webhook.id,
-                url=webhook.url,
-                success=False,
-                error="Timeout",
-                duration_ms=duration_ms,
-            )
-        except Exception as e:
-            duration_ms = (datetime.now(UTC) - start_time).total_seconds() * 1000
-            return WebhookDelivery(
-                webhook_id=webhook.id,
-                url=webhook.url,
-                success=False,
-                error=str(e)[:200],
-                duration_ms=duration_ms,
-            )
+        Returns:
+            WebhookDelivery with result details.
+        """
+        payload = {"webhook_id": webhook.id, "events": [_event_payload(e) for e in events]}
+        return await self._post(webhook, payload, events=len(events))
 
     async def dispatch(
         self, event: SessionEvent, use_celery_on_failure: bool = True
@@ -207,44 +399,101 @@ class WebhookDispatcher:
         """
         Dispatch an event to all matching webhooks.
 
+        Webhooks are delivered to concurrently. Batching webhooks only queue
+        the event here; their batch is sent when its window closes (and
+        always falls back to Celery retry on failure).
+
         Args:
             event: The event to dispatch.
             use_celery_on_failure: Queue failed deliveries for Celery retry.
 
         Returns:
-            List of delivery results.
+            List of delivery results (immediate deliveries only).
         """
-        deliveries = []
-        for webhook in self._webhooks.values():
-            if self._should_deliver(webhook, event):
-                delivery = await self.deliver(webhook, event)
-                deliveries.append(delivery)
-                if delivery.success:
-                    logger.debug(
-                        f"Webhook {webhook.id} delivered: {delivery.status_code} "
-                        f"({delivery.duration_ms:.0f}ms)"
-                    )
-                else:
-                    logger.warning(
-                        f"Webhook {webhook.id} failed: {delivery.error or delivery.status_code}"
-                    )
-                    if use_celery_on_failure:
-                        self._queue_retry(webhook, event)
-        return deliveries
+        immediate = []
+        for webhook in self.matching_webhooks(event):
+            if webhook.batch_window_ms > 0:
+                self._add_to_batch(webhook, event)
+            else:
+                immediate.append(webhook)
+
+        deliveries = await asyncio.gather(*(self.deliver(w, event) for w in immediate))
+        for webhook, delivery in zip(immediate, deliveries, strict=True):
+            self._log_delivery(delivery)
+            if not delivery.success and use_celery_on_failure:
+                self._queue_retry(webhook, event)
+        return list(deliveries)
+
+    def dispatch_nowait(self, event: SessionEvent) -> None:
+        """Dispatch in a tracked background task (for synchronous event handlers)."""
+        self._spawn(self.dispatch(event))
+
+    def _spawn(self, coro: Any) -> None:
+        """Run a coroutine in a task that close() waits for."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _log_delivery(self, delivery: WebhookDelivery) -> None:
+        if delivery.success:
+            logger.debug(
+                f"Webhook {delivery.webhook_id} delivered {delivery.events} event(s): "
+                f"{delivery.status_code} ({delivery.duration_ms:.0f}ms)"
+            )
+        else:
+            logger.warning(
+                f"Webhook {delivery.webhook_id} failed: {delivery.error or delivery.status_code}"
+            )
+
+    # --- Batching ---
+
+    def _add_to_batch(self, webhook: WebhookConfig, event: SessionEvent) -> None:
+        """Queue an event for the webhook's current batch window."""
+        pending = self._batches.setdefault(webhook.id, [])
+        pending.append(event)
+        if len(pending) >= self.batch_max_events:
+            self._send_batch_now(webhook.id)
+        elif webhook.id not in self._batch_timers:
+            self._batch_timers[webhook.id] = asyncio.get_running_loop().call_later(
+                webhook.batch_window_ms / 1000, self._send_batch_now, webhook.id
+            )
+
+    def _send_batch_now(self, webhook_id: int) -> None:
+        """Close the webhook's batch window and send what it collected."""
+        timer = self._batch_timers.pop(webhook_id, None)
+        if timer is not None:
+            timer.cancel()
+        events = self._batches.pop(webhook_id, [])
+        webhook = self._webhooks.get(webhook_id)
+        if events and webhook is not None:
+            self._spawn(self._send_batch(webhook, events))
+
+    async def _send_batch(self, webhook: WebhookConfig, events: list[SessionEvent]) -> None:
+        delivery = await self.deliver_batch(webhook, events)
+        self._log_delivery(delivery)
+        if not delivery.success:
+            self._queue_retry_payload(
+                webhook, {"webhook_id": webhook.id, "events": [_event_payload(e) for e in events]}
+            )
+
+    async def flush(self) -> None:
+        """Send all open batches and wait for in-flight deliveries."""
+        for webhook_id in list(self._batches):
+            self._send_batch_now(webhook_id)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    # --- Retry, stats, lifecycle ---
 
     def _queue_retry(self, webhook: WebhookConfig, event: SessionEvent) -> None:
         """Queue a failed webhook delivery for Celery retry."""
+        self._queue_retry_payload(webhook, {**_event_payload(event), "webhook_id": webhook.id})
+
+    def _queue_retry_payload(self, webhook: WebhookConfig, payload: dict[str, object]) -> None:
+        """Queue a failed payload (single event or batch) for Celery retry."""
         try:
             from app.tasks.webhook_tasks import send_webhook_with_signature
 
-            payload: dict[str, object] = {
-                "event_type": event.event_type.value,
-                "session_id": event.session_id,
-                "timestamp": event.timestamp.isoformat(),
-                "data": event.data,
-                "webhook_id": webhook.id,
-            }
-
             send_webhook_with_signature.delay(
                 webhook_id=webhook.id,
                 url=webhook.url,
@@ -255,6 +504,23 @@ class WebhookDispatcher:
         except Exception as e:
             logger.error(f"Failed to queue webhook {webhook.id} for retry: {e}")
 
+    def get_stats(self) -> dict[int, WebhookEndpointStats]:
+        """Get per-webhook delivery statistics."""
+        return self._stats
+
+    async def close(self) -> None:
+        """Send open batches, wait for in-flight deliveries and close the client."""
+        try:
+            await asyncio.wait_for(self.flush(), timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        except TimeoutError:
+            logger.warning(f"Timed out waiting for {len(self._tasks)} webhook deliveries")
+            for task in self._tasks:
+                task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
 
 _webhook_dispatcher: WebhookDispatcher | None = None
 
@@ -274,11 +540,14 @@ def init_webhook_dispatcher() -> WebhookDispatcher:
 
     def on_event(event: SessionEvent) -> None:
         """Synchronous handler that schedules async dispatch."""
-        import asyncio
+        if event.outboxed:
+            # Staged in the webhook outbox with its transaction; the relay delivers it
+            from app.services.webhook_outbox import wake_outbox_relay
 
+            wake_outbox_relay()
+            return
         try:
-            loop = asyncio.get_running_loop()
-            loop.create_task(dispatcher.dispatch(event))  # noqa: RUF006 - fire-and-forget
+            dispatcher.dispatch_nowait(event)
         except RuntimeError:
             # No running event loop - skip webhook dispatch (e.g., in sync tests)
             logger.debug("No event loop available for webhook dispatch")
@@ -286,3 +555,9 @@ def init_webhook_dispatcher() -> WebhookDispatcher:
     publisher.add_handler(on_event)
     logger.info("Webhook dispatcher initialized and connected to event publisher")
     return dispatcher
+
+
+async def shutdown_webhook_dispatcher() -> None:
+    """Deliver pending webhooks and close the shared client (call on app shutdown)."""
+    if _webhook_dispatcher is not None:
+        await _webhook_dispatcher.close()
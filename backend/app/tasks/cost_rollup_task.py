@@ -0,0 +1,34 @@
+"""Celery task for cost rollups."""
+
+import asyncio
+import logging
+
+from app.celery_app import celery_app
+from app.db import get_db
+from app.services.cost_rollups import refresh_cost_rollups
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.cost_rollup_task.refresh_cost_rollups_task")
+def refresh_cost_rollups_task() -> dict[str, object]:
+    """Celery task to roll up closed hours of cost logs.
+
+    Runs every 5 minutes via celery beat.
+    Keeps cost_rollups current for /analytics/costs.
+
+    Returns:
+        Dict with rollup statistics
+    """
+
+    async def _run_refresh() -> int:
+        async for db in get_db():
+            return await refresh_cost_rollups(db)
+        return 0
+
+    try:
+        written = asyncio.run(_run_refresh())
+        return {"status": "success", "rollups_written": written}
+    except Exception as e:
+        logger.error(f"Cost rollup task failed: {e}")
+        return {"status": "error", "error": str(e)}
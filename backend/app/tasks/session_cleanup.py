@@ -12,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.models import Session
+from app.services.session_context_cache import get_session_context_cache
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +44,7 @@ async def cleanup_stale_sessions(db: AsyncSession) -> int:
     timeouts = get_session_timeouts()
     now = datetime.now(UTC)
     total_cleaned = 0
+    cleaned_ids: list[str] = []
 
     for session_type, timeout_minutes in timeouts.items():
         cutoff = now - timedelta(minutes=timeout_minutes)
@@ -70,9 +72,11 @@ async def cleanup_stale_sessions(db: AsyncSession) -> int:
                 f"(idle > {timeout_minutes}min): {session_ids[:5]}..."
             )
             total_cleaned += len(session_ids)
+            cleaned_ids.extend(session_ids)
 
     if total_cleaned > 0:
         await db.commit()
+        await get_session_context_cache().invalidate(*cleaned_ids)
         logger.info(f"Session cleanup complete: {total_cleaned} sessions marked completed")
     else:
         logger.debug("Session cleanup: no stale sessions found")
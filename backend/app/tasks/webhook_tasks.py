@@ -2,15 +2,30 @@
 
 import json
 import logging
+import threading
 from typing import Any
 
 import httpx
 from celery import shared_task
 
-from app.services.webhooks import compute_signature
+from app.services.webhooks import WEBHOOK_HEADERS, compute_signature
 
 logger = logging.getLogger(__name__)
 
+# Pooled client shared by all tasks (and retries) in this worker process
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> httpx.Client:
+    """Get the worker's shared client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(timeout=30.0)
+    return _client
+
 
 @shared_task(
     bind=True,
@@ -23,10 +38,9 @@ def send_webhook(
     self: Any, url: str, payload: dict[str, object], headers: dict[str, str] | None = None
 ) -> dict[str, object]:
     """Send webhook with exponential backoff retry."""
-    with httpx.Client(timeout=30.0) as client:
-        response = client.post(url, json=payload, headers=headers or {})
-        response.raise_for_status()
-        return {"status": response.status_code, "url": url}
+    response = _get_client().post(url, json=payload, headers=headers or {})
+    response.raise_for_status()
+    return {"status": response.status_code, "url": url}
 
 
 @shared_task(
@@ -49,7 +63,7 @@ def send_webhook_with_signature(
     Args:
         webhook_id: ID of the webhook subscription.
         url: Callback URL.
-        payload: Event payload dict.
+        payload: Event payload dict (or a batch: {"webhook_id", "events": [...]}).
         secret: HMAC secret for signature.
 
     Returns:
@@ -59,17 +73,17 @@ def send_webhook_with_signature(
     signature = compute_signature(payload_json, secret)
 
     headers = {
-        "Content-Type": "application/json",
+        **WEBHOOK_HEADERS,
         "X-Webhook-Signature": signature,
         "X-Webhook-Id": str(webhook_id),
-        "User-Agent": "AgentHub-Webhook/1.0",
     }
+    if "events" in payload:
+        headers["X-Webhook-Batch-Size"] = str(len(payload["events"]))  # type: ignore[arg-type]
 
     logger.info(f"Sending webhook {webhook_id} to {url} (attempt {self.request.retries + 1})")
 
-    with httpx.Client(timeout=30.0) as client:
-        response = client.post(url, content=payload_json, headers=headers)
-        response.raise_for_status()
+    response = _get_client().post(url, content=payload_json, headers=headers)
+    response.raise_for_status()
 
     logger.info(f"Webhook {webhook_id} delivered successfully: {response.status_code}")
     return {"status": response.status_code, "url": url, "webhook_id": webhook_id}
@@ -0,0 +1,37 @@
+"""add_webhook_outbox_lease
+
+Revision ID: a6b7c8d9e0f1
+Revises: z5a6b7c8d9e0
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a6b7c8d9e0f1"
+down_revision: str | Sequence[str] | None = "z5a6b7c8d9e0"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Add webhook_outbox.locked_until.
+
+    The outbox relay claims rows by marking them in_flight with a lease
+    instead of holding row locks while it delivers them; rows whose lease
+    expired (their relay died) are claimed again.
+    """
+    op.add_column(
+        "webhook_outbox",
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Drop webhook_outbox.locked_until, returning leased rows to pending."""
+    op.execute("UPDATE webhook_outbox SET status = 'pending' WHERE status = 'in_flight'")
+    op.drop_column("webhook_outbox", "locked_until")
@@ -0,0 +1,34 @@
+"""add_stream_timing_to_request_logs
+
+Revision ID: u0v1w2x3y4z5
+Revises: t9u0v1w2x3y4
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "u0v1w2x3y4z5"
+down_revision: str | Sequence[str] | None = "t9u0v1w2x3y4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Add ttfb_ms and duration_ms columns to request_logs table.
+
+    Recorded by the ASGI access control middleware: time to first body chunk
+    and time to the final chunk (full stream duration for SSE responses).
+    """
+    op.add_column("request_logs", sa.Column("ttfb_ms", sa.Integer(), nullable=True))
+    op.add_column("request_logs", sa.Column("duration_ms", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove stream timing columns from request_logs table."""
+    op.drop_column("request_logs", "duration_ms")
+    op.drop_column("request_logs", "ttfb_ms")
@@ -0,0 +1,32 @@
+"""add_context_tokens_to_messages
+
+Revision ID: v1w2x3y4z5a6
+Revises: u0v1w2x3y4z5
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "v1w2x3y4z5a6"
+down_revision: str | Sequence[str] | None = "u0v1w2x3y4z5"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Add context_tokens column to messages table.
+
+    Per-message prompt token count recorded when the message is saved, so
+    loading a session's history doesn't re-encode earlier turns.
+    """
+    op.add_column("messages", sa.Column("context_tokens", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove context_tokens column from messages table."""
+    op.drop_column("messages", "context_tokens")
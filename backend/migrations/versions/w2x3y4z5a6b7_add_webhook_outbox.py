@@ -0,0 +1,60 @@
+"""add_webhook_outbox
+
+Revision ID: w2x3y4z5a6b7
+Revises: v1w2x3y4z5a6
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "w2x3y4z5a6b7"
+down_revision: str | Sequence[str] | None = "v1w2x3y4z5a6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Create webhook_outbox table.
+
+    Signed webhook payloads staged in the same transaction as the messages
+    and cost logs they describe, delivered by the outbox relay.
+    """
+    op.create_table(
+        "webhook_outbox",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("webhook_id", sa.Integer(), nullable=False),
+        sa.Column("url", sa.String(2048), nullable=False),
+        sa.Column("event_type", sa.String(50), nullable=False),
+        sa.Column("session_id", sa.String(36), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("signature", sa.String(64), nullable=False),
+        sa.Column("status", sa.String(10), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.String(500), nullable=True),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["webhook_id"], ["webhook_subscriptions.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_webhook_outbox_pending", "webhook_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade() -> None:
+    """Drop webhook_outbox table."""
+    op.drop_index("ix_webhook_outbox_pending", table_name="webhook_outbox")
+    op.drop_table("webhook_outbox")
@@ -0,0 +1,59 @@
+"""add_session_rollups
+
+Revision ID: x3y4z5a6b7c8
+Revises: w2x3y4z5a6b7
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "x3y4z5a6b7c8"
+down_revision: str | Sequence[str] | None = "w2x3y4z5a6b7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Add message rollup columns and keyset index to sessions table.
+
+    message_count and token totals are kept up to date by message inserts,
+    so the session list no longer aggregates messages per page.
+    """
+    for column in ("message_count", "total_input_tokens", "total_output_tokens"):
+        op.add_column(
+            "sessions",
+            sa.Column(column, sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    op.execute(
+        """
+        UPDATE sessions AS s
+        SET message_count = m.message_count,
+            total_input_tokens = m.input_tokens,
+            total_output_tokens = m.output_tokens
+        FROM (
+            SELECT session_id,
+                   count(*) AS message_count,
+                   coalesce(sum(tokens) FILTER (WHERE role = 'user'), 0) AS input_tokens,
+                   coalesce(sum(tokens) FILTER (WHERE role = 'assistant'), 0) AS output_tokens
+            FROM messages
+            GROUP BY session_id
+        ) AS m
+        WHERE s.id = m.session_id
+        """
+    )
+
+    op.create_index("ix_sessions_created_id", "sessions", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    """Remove message rollup columns and keyset index from sessions table."""
+    op.drop_index("ix_sessions_created_id", table_name="sessions")
+    op.drop_column("sessions", "total_output_tokens")
+    op.drop_column("sessions", "total_input_tokens")
+    op.drop_column("sessions", "message_count")
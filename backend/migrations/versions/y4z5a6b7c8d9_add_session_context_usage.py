@@ -0,0 +1,60 @@
+"""add_session_context_usage
+
+Revision ID: y4z5a6b7c8d9
+Revises: x3y4z5a6b7c8
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "y4z5a6b7c8d9"
+down_revision: str | Sequence[str] | None = "x3y4z5a6b7c8"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Add running context usage columns to sessions table.
+
+    Updated with every cost log, so reading a session's context usage no
+    longer aggregates cost_logs. context_limit_tokens stays NULL for
+    existing sessions (the session model's limit is used).
+    """
+    for column in ("last_input_tokens", "usage_input_tokens", "usage_output_tokens"):
+        op.add_column(
+            "sessions",
+            sa.Column(column, sa.Integer(), nullable=False, server_default="0"),
+        )
+    op.add_column("sessions", sa.Column("context_limit_tokens", sa.Integer(), nullable=True))
+
+    op.execute(
+        """
+        UPDATE sessions AS s
+        SET usage_input_tokens = c.input_tokens,
+            usage_output_tokens = c.output_tokens,
+            last_input_tokens = c.last_input_tokens
+        FROM (
+            SELECT session_id,
+                   sum(input_tokens) AS input_tokens,
+                   sum(output_tokens) AS output_tokens,
+                   (array_agg(input_tokens ORDER BY created_at DESC, id DESC))[1]
+                       AS last_input_tokens
+            FROM cost_logs
+            GROUP BY session_id
+        ) AS c
+        WHERE s.id = c.session_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Remove running context usage columns from sessions table."""
+    op.drop_column("sessions", "context_limit_tokens")
+    op.drop_column("sessions", "usage_output_tokens")
+    op.drop_column("sessions", "usage_input_tokens")
+    op.drop_column("sessions", "last_input_tokens")
@@ -0,0 +1,79 @@
+"""add_cost_rollups
+
+Revision ID: z5a6b7c8d9e0
+Revises: y4z5a6b7c8d9
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "z5a6b7c8d9e0"
+down_revision: str | Sequence[str] | None = "y4z5a6b7c8d9"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Create cost_rollups table.
+
+    Hourly cost totals per project, agent, model, session type and external
+    ID, backfilled here for closed hours and kept current by the cost rollup
+    task.
+    """
+    op.create_table(
+        "cost_rollups",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("bucket", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("project_id", sa.String(100), nullable=False),
+        sa.Column("agent_slug", sa.String(50), nullable=False, server_default=""),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("session_type", sa.String(20), nullable=False),
+        sa.Column("external_id", sa.String(100), nullable=False, server_default=""),
+        sa.Column("input_tokens", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("output_tokens", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("cost_usd", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("request_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "bucket",
+            "project_id",
+            "agent_slug",
+            "model",
+            "session_type",
+            "external_id",
+            name="uq_cost_rollups_key",
+        ),
+    )
+
+    op.execute(
+        """
+        INSERT INTO cost_rollups (
+            bucket, project_id, agent_slug, model, session_type, external_id,
+            input_tokens, output_tokens, cost_usd, request_count
+        )
+        SELECT date_trunc('hour', c.created_at),
+               s.project_id,
+               coalesce(s.agent_slug, ''),
+               c.model,
+               CAST(s.session_type AS VARCHAR),
+               coalesce(s.external_id, ''),
+               sum(c.input_tokens),
+               sum(c.output_tokens),
+               sum(c.cost_usd),
+               count(c.id)
+        FROM cost_logs AS c
+        JOIN sessions AS s ON c.session_id = s.id
+        WHERE c.created_at < date_trunc('hour', now() - interval '5 minutes')
+        GROUP BY 1, 2, 3, 4, 5, 6
+        """
+    )
+
+
+def downgrade() -> None:
+    """Drop cost_rollups table."""
+    op.drop_table("cost_rollups")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: access control middleware overhead.
+
+Compares the pure ASGI AccessControlMiddleware against an equivalent
+BaseHTTPMiddleware implementation (the previous design) on:
+- per-request overhead for a small JSON response
+- delivery delay of SSE chunks (time from yield in the handler to the
+  chunk reaching the server's send callable)
+
+Requests are driven directly through the ASGI interface (no sockets) against
+an auth-bypass path, so the numbers isolate middleware cost. Request logging
+is stubbed to a no-op.
+
+Usage:
+    python scripts/bench_access_control.py
+    python scripts/bench_access_control.py --requests 20000 --chunks 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message
+
+from app.middleware.access_control import (
+    CLIENT_ID_HEADER,
+    REQUEST_SOURCE_HEADER,
+    SOURCE_CLIENT_HEADER,
+    AccessControlMiddleware,
+    detect_tool_type,
+)
+
+PING_PATH = "/api/memory/bench-ping"
+STREAM_PATH = "/api/memory/bench-stream"
+
+
+class LegacyAccessControlMiddleware(BaseHTTPMiddleware):
+    """BaseHTTPMiddleware version of the auth-bypass path (previous design)."""
+
+    async def dispatch(self, request: Request, call_next: Any) -> Any:
+        start_time = time.time()
+        client_id = request.headers.get(CLIENT_ID_HEADER)
+        request_source = request.headers.get(REQUEST_SOURCE_HEADER)
+        tool_type = detect_tool_type(request.headers.get(SOURCE_CLIENT_HEADER))
+
+        request.state.client = None
+        request.state.client_id = client_id
+        request.state.request_source = request_source or "auth-bypass"
+        request.state.is_internal = False
+
+        response = await call_next(request)
+        _ = (response.status_code, int((time.time() - start_time) * 1000), tool_type)
+        return response
+
+
+class _NullWriter:
+    def enqueue(self, **_fields: Any) -> bool:
+        return True
+
+
+def build_app(chunks: int) -> Starlette:
+    """Inner app with a JSON ping and an SSE stream stamping each chunk."""
+
+    async def ping(_request: Request) -> JSONResponse:
+        return JSONResponse({"ok": True})
+
+    async def stream(_request: Request) -> StreamingResponse:
+        async def events():
+            for _ in range(chunks):
+                await asyncio.sleep(0)
+                yield f"data: {time.perf_counter()!r}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route(PING_PATH, ping), Route(STREAM_PATH, stream)])
+
+
+def _scope(path: str) -> dict[str, Any]:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"x-client-id", b"bench"), (b"x-source-client", b"bench-cli")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+
+
+async def _request(app: ASGIApp, path: str, on_body: Any = None) -> None:
+    sent = False
+
+    async def receive() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # Never disconnects
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        if on_body is not None and message["type"] == "http.response.body":
+            on_body(message.get("body", b""))
+
+    await app(_scope(path), receive, send)
+
+
+async def bench_overhead(app: ASGIApp, requests: int) -> float:
+    """Mean microseconds per request."""
+    for _ in range(min(500, requests)):
+        await _request(app, PING_PATH)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await _request(app, PING_PATH)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def bench_stream(app: ASGIApp, streams: int) -> list[float]:
+    """Per-chunk delivery delay in microseconds."""
+    delays: list[float] = []
+
+    def on_body(body: bytes) -> None:
+        received = time.perf_counter()
+        for line in body.decode().splitlines():
+            if line.startswith("data: "):
+                delays.append((received - float(line[6:])) * 1e6)
+
+    for _ in range(streams):
+        await _request(app, STREAM_PATH, on_body)
+    return delays
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=5000, help="Ping requests per variant")
+    parser.add_argument("--streams", type=int, default=20, help="SSE streams per variant")
+    parser.add_argument("--chunks", type=int, default=100, help="Chunks per SSE stream")
+    args = parser.parse_args()
+
+    inner = build_app(args.chunks)
+    variants: dict[str, ASGIApp] = {
+        "no middleware": inner,
+        "BaseHTTPMiddleware": LegacyAccessControlMiddleware(inner),
+        "pure ASGI": AccessControlMiddleware(inner),
+    }
+
+    print(f"{'variant':<20} {'req µs':>9} {'chunk p50 µs':>13} {'chunk p99 µs':>13}")
+    with patch("app.middleware.access_control.get_request_log_writer", return_value=_NullWriter()):
+        for name, app in variants.items():
+            per_request = await bench_overhead(app, args.requests)
+            delays = await bench_stream(app, args.streams)
+            print(
+                f"{name:<20} {per_request:>9.1f} "
+                f"{statistics.median(delays):>13.1f} {_percentile(delays, 0.99):>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark: webhook delivery engine against a local stub HTTP server.
+
+Compares, for the same stream of events fanned out to several webhooks:
+- legacy: a new httpx.AsyncClient (new connection) per delivery, webhooks
+  awaited one after another (the previous WebhookDispatcher.deliver/dispatch)
+- pooled: WebhookDispatcher with its shared client and concurrent dispatch
+- batched: pooled, with batch_window_ms set on every webhook
+
+The stub server speaks minimal HTTP/1.1 with keep-alive, answers every POST
+with 200 after --delay-ms, and counts TCP connections accepted.
+
+Usage:
+    python scripts/bench_webhooks.py
+    python scripts/bench_webhooks.py --webhooks 10 --events 500 --delay-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.events import SessionEvent, SessionEventType
+from app.services.webhooks import (
+    WEBHOOK_HEADERS,
+    WebhookConfig,
+    WebhookDispatcher,
+    WebhookPayload,
+    compute_signature,
+)
+
+
+class StubServer:
+    """Keep-alive HTTP/1.1 server that counts connections and requests."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self.events = 0
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return int(self._server.sockets[0].getsockname()[1])
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def reset(self) -> None:
+        self.connections = self.requests = self.events = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n"):
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                body = await reader.readexactly(length)
+                self.requests += 1
+                self.events += len(json.loads(body).get("events", [None]))
+                await asyncio.sleep(self.delay)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def legacy_dispatch(webhooks: list[WebhookConfig], event: SessionEvent) -> None:
+    """Previous behaviour: sequential webhooks, one client per delivery."""
+    for webhook in webhooks:
+        payload_json = WebhookPayload(
+            event_type=event.event_type.value,
+            session_id=event.session_id,
+            timestamp=event.timestamp.isoformat(),
+            data=event.data,
+            webhook_id=webhook.id,
+        ).to_json()
+        headers = {
+            **WEBHOOK_HEADERS,
+            "X-Webhook-Signature": compute_signature(payload_json, webhook.secret),
+            "X-Webhook-Id": str(webhook.id),
+        }
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            await client.post(webhook.url, content=payload_json, headers=headers)
+
+
+async def run_variant(
+    name: str, server: StubServer, webhooks: list[WebhookConfig], args: argparse.Namespace
+) -> dict[str, Any]:
+    server.reset()
+    events = [
+        SessionEvent(event_type=SessionEventType.MESSAGE, session_id="bench", data={"i": i})
+        for i in range(args.events)
+    ]
+    start = time.perf_counter()
+    if name == "legacy":
+        for event in events:
+            await legacy_dispatch(webhooks, event)
+    else:
+        dispatcher = WebhookDispatcher()
+        for webhook in webhooks:
+            webhook.batch_window_ms = args.batch_window_ms if name == "batched" else 0
+            dispatcher.register_webhook(webhook)
+        # Events arrive as a stream; each dispatch runs in the background as in production
+        for event in events:
+            dispatcher.dispatch_nowait(event)
+            await asyncio.sleep(0)
+        await dispatcher.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "variant": name,
+        "seconds": elapsed,
+        "posts": server.requests,
+        "events": server.events,
+        "connections": server.connections,
+        "events_per_s": server.events / elapsed,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--webhooks", type=int, default=5, help="Registered webhooks")
+    parser.add_argument("--events", type=int, default=200, help="Events dispatched")
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="Stub response delay")
+    parser.add_argument("--batch-window-ms", type=int, default=20, help="Batch window")
+    args = parser.parse_args()
+
+    server = StubServer(delay=args.delay_ms / 1000)
+    port = await server.start()
+    webhooks = [
+        WebhookConfig(id=i, url=f"http://127.0.0.1:{port}/hook/{i}", secret="bench", event_types=[])
+        for i in range(args.webhooks)
+    ]
+
+    print(f"{'variant':<9} {'seconds':>8} {'POSTs':>7} {'events':>7} {'conns':>6} {'events/s':>9}")
+    for name in ("legacy", "pooled", "batched"):
+        r = await run_variant(name, server, webhooks, args)
+        print(
+            f"{r['variant']:<9} {r['seconds']:>8.2f} {r['posts']:>7} {r['events']:>7} "
+            f"{r['connections']:>6} {r['events_per_s']:>9.0f}"
+        )
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
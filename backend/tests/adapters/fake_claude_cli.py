@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Fake Claude CLI speaking the SDK stream-json protocol.
+
+Answers control requests with success and echoes each user prompt back as
+"echo:<pid>:<turn>:<prompt>" so tests can tell which process served a request
+and whether its conversation state was cleared.
+"""
+
+import json
+import os
+import sys
+
+
+def emit(payload: dict) -> None:
+    sys.stdout.write(json.dumps(payload) + "\n")
+    sys.stdout.flush()
+
+
+def main() -> None:
+    if "-v" in sys.argv[1:] or "--version" in sys.argv[1:]:
+        print("9.9.9 (Claude Code)")
+        return
+
+    session_id = f"fake-{os.getpid()}"
+    turn = 0
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        message = json.loads(line)
+        if message.get("type") == "control_request":
+            emit(
+                {
+                    "type": "control_response",
+                    "response": {
+                        "subtype": "success",
+                        "request_id": message["request_id"],
+                        "response": {},
+                    },
+                }
+            )
+            continue
+        if message.get("type") != "user":
+            continue
+
+        prompt = message["message"]["content"]
+        if prompt == "/clear":
+            turn = 0
+        else:
+            turn += 1
+            emit(
+                {
+                    "type": "assistant",
+                    "message": {
+                        "model": "fake",
+                        "content": [
+                            {"type": "text", "text": f"echo:{os.getpid()}:{turn}:{prompt}"}
+                        ],
+                    },
+                }
+            )
+        emit(
+            {
+                "type": "result",
+                "subtype": "success",
+                "duration_ms": 1,
+                "duration_api_ms": 1,
+                "is_error": False,
+                "num_turns": 1,
+                "session_id": session_id,
+            }
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Tests for the Claude CLI warm pool, run against a fake CLI binary."""
+
+import asyncio
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.adapters.base import Message
+from app.adapters.claude import ClaudeAdapter
+from app.adapters.claude_pool import ClaudeWorkerPool, PoolExhaustedError, WorkerSpec
+
+FAKE_CLI = str(Path(__file__).parent / "fake_claude_cli.py")
+
+
+async def _ask(worker, prompt: str) -> str:
+    """Send a prompt through a checked-out worker and return the echoed text."""
+    from claude_agent_sdk.types import AssistantMessage, TextBlock
+
+    await worker.client.query(prompt)
+    text = ""
+    async for msg in worker.client.receive_response():
+        if isinstance(msg, AssistantMessage):
+            text += "".join(b.text for b in msg.content if isinstance(b, TextBlock))
+    return text
+
+
+async def _wait_for(predicate, timeout: float = 10.0) -> None:
+    """Poll until predicate() is true."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.02)
+
+
+@pytest.fixture
+async def make_pool():
+    """Create pools against the fake CLI and close them after the test."""
+    pools: list[ClaudeWorkerPool] = []
+
+    def _make(**kwargs) -> ClaudeWorkerPool:
+        pool = ClaudeWorkerPool(FAKE_CLI, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield _make
+    for pool in pools:
+        await pool.close()
+
+
+class TestClaudeWorkerPool:
+    """Tests for ClaudeWorkerPool."""
+
+    async def test_prespawned_worker_serves_next_request(self, make_pool):
+        """First checkout is cold; the replenished worker makes the next one warm."""
+        pool = make_pool(min_idle=1)
+        spec = WorkerSpec(model="sonnet")
+
+        async with pool.checkout(spec) as worker:
+            first = await _ask(worker, "one")
+        await _wait_for(lambda: pool.get_stats()["models"]["sonnet"]["idle"] == 1)
+
+        async with pool.checkout(spec) as worker:
+            second = await _ask(worker, "two")
+
+        assert first.endswith(":one")
+        assert second.endswith(":two")
+        stats = pool.get_stats()
+        assert stats["cold_checkouts"] == 1
+        assert stats["warm_checkouts"] == 1
+
+    async def test_worker_recycled_after_max_requests(self, make_pool):
+        """Workers are reused with cleared state, then retired after N requests."""
+        pool = make_pool(min_idle=0, max_requests_per_worker=2)
+        spec = WorkerSpec(model="sonnet")
+
+        replies = []
+        for prompt in ("a", "b", "c"):
+            async with pool.checkout(spec) as worker:
+                replies.append(await _ask(worker, prompt))
+            await _wait_for(lambda: pool.get_stats()["models"]["sonnet"]["in_use"] == 0)
+            await asyncio.sleep(0.2)  # let the reset return the worker to idle
+
+        pids = [reply.split(":")[1] for reply in replies]
+        turns = [reply.split(":")[2] for reply in replies]
+        assert pids[0] == pids[1]
+        assert pids[2] != pids[0]
+        # Reset prompt clears conversation state between requests
+        assert turns == ["1", "1", "1"]
+        assert pool.metrics.recycled == 2  # after "a" and "c"
+        assert pool.metrics.retired == 1  # after "b"
+
+    async def test_exhausted_pool_applies_backpressure(self, make_pool):
+        """Checkout waits, then raises PoolExhaustedError when at capacity."""
+        pool = make_pool(max_workers_per_model=1, min_idle=0, acquire_timeout=0.2)
+        spec = WorkerSpec(model="sonnet")
+
+        async with pool.checkout(spec):
+            with pytest.raises(PoolExhaustedError):
+                async with pool.checkout(spec):
+                    pass
+
+        assert pool.metrics.exhausted == 1
+
+    async def test_overflow_spawns_one_shot_worker(self, make_pool):
+        """With overflow, a checkout at capacity gets a one-shot worker at once."""
+        pool = make_pool(max_workers_per_model=1, min_idle=0, overflow=True)
+        spec = WorkerSpec(model="sonnet")
+
+        async with pool.checkout(spec):
+            async with pool.checkout(spec) as extra:
+                assert extra.one_shot
+                assert (await _ask(extra, "extra")).endswith(":extra")
+            assert not extra.is_alive()
+            assert pool.get_stats()["models"]["sonnet"]["live"] == 1
+
+        assert pool.metrics.overflow_checkouts == 1
+        assert pool.metrics.exhausted == 0
+
+    async def test_cancelled_prespawn_frees_slot(self, make_pool):
+        """A background spawn cancelled mid-connect gives its slot back."""
+        pool = make_pool(min_idle=1)
+        spec = WorkerSpec(model="sonnet")
+
+        async with pool.checkout(spec):
+            prespawns = list(pool._background)
+            assert prespawns
+            await asyncio.sleep(0.05)  # Let the spawn start connecting
+            for task in prespawns:
+                task.cancel()
+            await asyncio.gather(*prespawns, return_exceptions=True)
+
+            assert pool.get_stats()["models"]["sonnet"]["live"] == 1
+
+    async def test_waiter_gets_released_capacity(self, make_pool):
+        """A waiting checkout proceeds once a worker is released."""
+        pool = make_pool(max_workers_per_model=1, min_idle=0, acquire_timeout=10.0)
+        spec = WorkerSpec(model="sonnet")
+
+        async def second() -> str:
+            async with pool.checkout(spec) as worker:
+                return await _ask(worker, "queued")
+
+        async with pool.checkout(spec):
+            task = asyncio.create_task(second())
+            await _wait_for(lambda: pool.get_stats()["waiting"] == 1)
+
+        assert (await task).endswith(":queued")
+        assert pool.metrics.exhausted == 0
+
+    async def test_error_retires_worker(self, make_pool):
+        """A worker whose request failed is never handed out again."""
+        pool = make_pool(min_idle=0, max_requests_per_worker=10)
+        spec = WorkerSpec(model="sonnet")
+
+        with pytest.raises(RuntimeError):
+            async with pool.checkout(spec) as worker:
+                failed = worker
+                raise RuntimeError("boom")
+
+        assert not failed.is_alive()
+        assert pool.metrics.unhealthy == 1
+        assert pool.get_stats()["models"]["sonnet"]["live"] == 0
+
+    async def test_idle_workers_expire(self, make_pool):
+        """Idle workers past idle_timeout are retired by the reaper."""
+        pool = make_pool(min_idle=1, idle_timeout=0.1)
+        spec = WorkerSpec(model="sonnet")
+
+        async with pool.checkout(spec):
+            pass
+
+        await _wait_for(lambda: pool.metrics.idle_expired >= 1)
+        assert pool.get_stats()["models"]["sonnet"]["idle"] == 0
+
+
+class TestClaudeAdapterPool:
+    """Tests for ClaudeAdapter checking workers out of the pool."""
+
+    async def test_complete_uses_pool(self):
+        """complete() runs through a pooled worker."""
+        from app.adapters import claude_pool
+
+        with patch("app.adapters.claude.shutil.which", return_value=FAKE_CLI):
+            adapter = ClaudeAdapter()
+        try:
+            result = await adapter.complete(
+                [Message(role="user", content="pooled")], model="claude-sonnet-4-5"
+            )
+            stats = claude_pool.get_claude_pool_stats()
+        finally:
+            await claude_pool.shutdown_claude_pool()
+
+        assert result.content.endswith(":User: pooled")
+        assert stats is not None
+        assert stats["cold_checkouts"] == 1
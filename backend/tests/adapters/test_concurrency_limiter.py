@@ -0,0 +1,177 @@
+"""Tests for adaptive per provider/model concurrency limits."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.adapters.base import ProviderError, RateLimitError
+from app.adapters.concurrency_limiter import (
+    ConcurrencyLimiter,
+    ConcurrencyLimitError,
+    is_overload_error,
+)
+
+
+@pytest.fixture
+def limiter_settings():
+    """Small limits with a short queue deadline."""
+    with patch("app.adapters.concurrency_limiter.settings") as mock_settings:
+        mock_settings.provider_concurrency_enabled = True
+        mock_settings.provider_concurrency_initial = 2
+        mock_settings.provider_concurrency_min = 1
+        mock_settings.provider_concurrency_max = 8
+        mock_settings.provider_concurrency_max_by_provider = {}
+        mock_settings.provider_concurrency_backoff = 0.5
+        mock_settings.provider_concurrency_latency_tolerance = 2.0
+        mock_settings.provider_concurrency_queue_timeout = 1.0
+        mock_settings.provider_concurrency_max_queue = 10
+        yield mock_settings
+
+
+async def _call(limiter: ConcurrencyLimiter, delay: float = 0.0, error: Exception | None = None):
+    async with limiter.slot("gemini", "gemini-3-flash"):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+
+
+def _status(limiter: ConcurrencyLimiter) -> dict:
+    return limiter.get_status()["gemini/gemini-3-flash"]
+
+
+class TestAdmission:
+    """Tests for slots and the wait queue."""
+
+    async def test_excess_calls_wait_for_a_slot(self, limiter_settings):
+        """No more than the limit run at once; the rest queue and then run."""
+        limiter = ConcurrencyLimiter()
+        running = 0
+        peak = 0
+
+        async def tracked():
+            nonlocal running, peak
+            async with limiter.slot("gemini", "gemini-3-flash"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        tasks = [asyncio.create_task(tracked()) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert (_status(limiter)["in_flight"], _status(limiter)["queued"]) == (2, 3)
+
+        await asyncio.gather(*tasks)
+
+        assert peak == 2
+        status = _status(limiter)
+        assert (status["in_flight"], status["queued"], status["admitted"]) == (0, 0, 5)
+
+    async def test_queue_deadline(self, limiter_settings):
+        """A call still waiting at the deadline is rejected and leaves the queue."""
+        limiter_settings.provider_concurrency_queue_timeout = 0.02
+        limiter = ConcurrencyLimiter()
+        holders = [asyncio.create_task(_call(limiter, delay=0.1)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(ConcurrencyLimitError):
+            await _call(limiter)
+
+        assert (_status(limiter)["queued"], _status(limiter)["rejected"]) == (0, 1)
+        await asyncio.gather(*holders)
+
+    def test_limit_error_falls_back_without_retry(self):
+        """A slot timeout lets routers fall back but is not retried in place."""
+        from app.adapters.base import is_retriable_error
+
+        error = ConcurrencyLimitError("claude", "claude-sonnet-4-5", 1.0)
+
+        assert error.retriable
+        assert not is_retriable_error(error)
+
+    async def test_full_queue_rejects_immediately(self, limiter_settings):
+        """Calls beyond max_queue do not wait."""
+        limiter_settings.provider_concurrency_max_queue = 0
+        limiter = ConcurrencyLimiter()
+        holders = [asyncio.create_task(_call(limiter, delay=0.05)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(ConcurrencyLimitError):
+            await _call(limiter)
+        await asyncio.gather(*holders)
+
+    async def test_disabled(self, limiter_settings):
+        """With limits disabled, calls pass straight through."""
+        limiter_settings.provider_concurrency_enabled = False
+        limiter = ConcurrencyLimiter()
+
+        await asyncio.gather(*(_call(limiter, delay=0.01) for _ in range(5)))
+
+        assert limiter.get_status() == {}
+
+
+class TestAdaptation:
+    """Tests for AIMD and latency-gradient adjustments."""
+
+    async def test_overload_halves_limit_once_per_burst(self, limiter_settings):
+        """A burst of 429s counts as one congestion signal."""
+        limiter_settings.provider_concurrency_initial = 8
+        limiter = ConcurrencyLimiter()
+
+        for _ in range(3):
+            with pytest.raises(RateLimitError):
+                await _call(limiter, error=RateLimitError("gemini"))
+
+        status = _status(limiter)
+        assert (status["limit"], status["overloads"]) == (4, 3)
+
+    async def test_other_errors_do_not_shrink(self, limiter_settings):
+        """Errors that are not overload signals only release the slot."""
+        limiter = ConcurrencyLimiter()
+
+        with pytest.raises(ProviderError):
+            await _call(limiter, error=ProviderError("bad request", provider="gemini"))
+
+        assert (_status(limiter)["limit"], _status(limiter)["in_flight"]) == (2, 0)
+
+    async def test_busy_limit_grows_additively(self, limiter_settings):
+        """Successes while the limit is in use add about one slot per limit's worth."""
+        limiter_settings.provider_concurrency_latency_tolerance = 1e9
+        limiter = ConcurrencyLimiter()
+        state = limiter._get_limit("gemini", "gemini-3-flash")
+
+        for _ in range(4):
+            await asyncio.gather(*(_call(limiter) for _ in range(state.current)))
+        assert _status(limiter)["limit"] == 4
+
+        # A limit that is mostly idle does not grow
+        for _ in range(10):
+            await _call(limiter)
+        assert _status(limiter)["limit"] == 4
+
+    async def test_rising_latency_shrinks_limit(self, limiter_settings):
+        """Latency well above the baseline backs the limit off before any 429."""
+        limiter_settings.provider_concurrency_initial = 8
+        limiter = ConcurrencyLimiter()
+        await _call(limiter)
+        state = limiter._limits[("gemini", "gemini-3-flash")]
+        state.long_latency_ms = 0.001
+        state.short_latency_ms = 0.001
+
+        await _call(limiter, delay=0.01)
+
+        assert _status(limiter)["limit"] == 7
+
+
+class TestOverloadErrors:
+    """Tests for is_overload_error."""
+
+    def test_classification(self):
+        """429s and timeouts anywhere in the cause chain are overloads."""
+        wrapped_timeout = ProviderError("Claude OAuth timeout", provider="claude")
+        wrapped_timeout.__cause__ = TimeoutError()
+
+        assert is_overload_error(RateLimitError("gemini"))
+        assert is_overload_error(ProviderError("429", provider="gemini", status_code=429))
+        assert is_overload_error(wrapped_timeout)
+        assert not is_overload_error(ProviderError("bad request", provider="gemini"))
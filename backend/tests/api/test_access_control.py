@@ -3,7 +3,9 @@
 Tests the AccessControlMiddleware and Access Control API endpoints.
 """
 
+import asyncio
 from typing import ClassVar
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from httpx import ASGITransport, AsyncClient
@@ -117,6 +119,109 @@ class TestAccessControlMiddleware:
         pass
 
 
+def _streaming_app(seen_state: dict):
+    """Minimal Starlette app behind the middleware with a streaming endpoint."""
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import StreamingResponse
+    from starlette.routing import Route
+
+    from app.middleware.access_control import AccessControlMiddleware
+
+    async def stream(request: Request) -> StreamingResponse:
+        seen_state["client_id"] = request.state.client_id
+        seen_state["body"] = await request.body()
+        request.state.agent_slug = "coder"
+
+        async def chunks():
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield f"data: {i}\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    inner = Starlette(
+        routes=[
+            Route("/api/memory/stream", stream, methods=["POST"]),
+            Route("/api/complete", stream, methods=["POST"]),
+        ]
+    )
+    return AccessControlMiddleware(inner)
+
+
+class TestAccessControlASGI:
+    """Tests for pass-through behaviour of the pure ASGI middleware."""
+
+    async def test_stream_and_body_pass_through(self):
+        """Bypass paths stream chunks untouched and log stream timing."""
+        seen: dict = {}
+        transport = ASGITransport(app=_streaming_app(seen))
+        with patch("app.middleware.access_control.get_request_log_writer") as get_writer:
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post(
+                    "/api/memory/stream",
+                    content=b"payload",
+                    headers={"X-Client-Id": "cli-1", "X-Source-Client": "st-cli"},
+                )
+
+        assert response.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+        assert seen == {"client_id": "cli-1", "body": b"payload"}
+        fields = get_writer.return_value.enqueue.call_args.kwargs
+        assert fields["status_code"] == 200
+        assert fields["tool_type"] == "cli"
+        assert fields["agent_slug"] is None
+        assert fields["ttfb_ms"] is not None
+        assert fields["duration_ms"] >= fields["ttfb_ms"] >= fields["latency_ms"]
+
+    async def test_authenticated_request_sets_state_and_logs(self):
+        """Authenticated clients reach the handler with request.state populated."""
+        seen: dict = {}
+        client_data = {
+            "id": "client-1",
+            "secret_hash": "hash",
+            "status": "active",
+            "_client_obj": None,
+        }
+        transport = ASGITransport(app=_streaming_app(seen))
+        with (
+            patch(
+                "app.middleware.access_control._get_cached_client",
+                AsyncMock(return_value=client_data),
+            ),
+            patch("app.middleware.access_control.verify_secret", return_value=True),
+            patch("app.middleware.access_control.get_request_log_writer") as get_writer,
+        ):
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post(
+                    "/api/complete",
+                    content=b"{}",
+                    headers={
+                        "X-Client-Id": "client-1",
+                        "X-Client-Secret": "ahc_secret",
+                        "X-Request-Source": "test",
+                    },
+                )
+
+        assert response.status_code == 200
+        assert seen["client_id"] == "client-1"
+        fields = get_writer.return_value.enqueue.call_args.kwargs
+        assert fields["agent_slug"] == "coder"
+        assert fields["request_source"] == "test"
+
+    async def test_rejection_does_not_call_app(self):
+        """Rejected requests never reach the wrapped app."""
+        seen: dict = {}
+        transport = ASGITransport(app=_streaming_app(seen))
+        with patch("app.middleware.access_control.get_request_log_writer") as get_writer:
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post("/api/complete", content=b"{}")
+
+        assert response.status_code == 400
+        assert seen == {}
+        fields = get_writer.return_value.enqueue.call_args.kwargs
+        assert fields["rejection_reason"] == "missing_required_headers"
+
+
 class TestAccessControlAPI:
     """Tests for access control admin API endpoints.
 
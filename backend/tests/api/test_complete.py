@@ -485,3 +485,68 @@ class TestStructuredOutput:
             )
 
             assert response.status_code == 200
+
+
+class TestRateLimitEnforcement:
+    """Tests for client/provider rate limits on /complete."""
+
+    @pytest.fixture
+    def limiter(self):
+        """Limiter on local buckets (no Redis in tests)."""
+        from app.services.distributed_rate_limiter import DistributedRateLimiter
+
+        limiter = DistributedRateLimiter()
+        with (
+            patch.object(limiter, "_get_client", side_effect=ConnectionError("redis down")),
+            patch("app.api.complete.get_distributed_rate_limiter", return_value=limiter),
+            patch("app.api.complete.settings") as mock_settings,
+            patch("app.services.distributed_rate_limiter.settings", mock_settings),
+        ):
+            mock_settings.rate_limit_enabled = True
+            mock_settings.rate_limit_provider_rpm = {}
+            mock_settings.rate_limit_provider_tpm = {}
+            yield limiter
+
+    @staticmethod
+    def _request(rpm: int = 2, tpm: int = 100_000):
+        from types import SimpleNamespace
+
+        client = SimpleNamespace(id="c1", rate_limit_rpm=rpm, rate_limit_tpm=tpm)
+        return SimpleNamespace(state=SimpleNamespace(client=client))
+
+    async def test_client_rpm_enforced(self, limiter):
+        """Test the client's RPM is enforced with a Retry-After header."""
+        from fastapi import HTTPException
+
+        from app.api.complete import MessageInput, _enforce_rate_limits
+
+        messages = [MessageInput(role="user", content="Hi")]
+        with patch("app.api.complete.count_message_tokens_async", AsyncMock(return_value=10)):
+            for _ in range(2):
+                await _enforce_rate_limits(self._request(), "claude", messages)
+            with pytest.raises(HTTPException) as exc_info:
+                await _enforce_rate_limits(self._request(), "claude", messages)
+
+        assert exc_info.value.status_code == 429
+        assert "requests/minute" in exc_info.value.detail
+        assert int(exc_info.value.headers["Retry-After"]) >= 1
+
+    async def test_provider_tpm_enforced(self, limiter):
+        """Test configured provider TPM applies even without a client."""
+        from types import SimpleNamespace
+
+        from fastapi import HTTPException
+
+        from app.api.complete import MessageInput, _enforce_rate_limits
+        from app.services.distributed_rate_limiter import settings as limiter_settings
+
+        limiter_settings.rate_limit_provider_tpm = {"claude": 1000}
+        internal = SimpleNamespace(state=SimpleNamespace())
+        messages = [MessageInput(role="user", content="Hi")]
+        with patch("app.api.complete.count_message_tokens_async", AsyncMock(return_value=600)):
+            charged = await _enforce_rate_limits(internal, "claude", messages)
+            with pytest.raises(HTTPException) as exc_info:
+                await _enforce_rate_limits(internal, "claude", messages)
+
+        assert [limit.key for limit in charged] == ["provider:claude:tpm"]
+        assert "claude tokens/minute" in exc_info.value.detail
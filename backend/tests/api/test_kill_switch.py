@@ -5,7 +5,7 @@ Run with --run-integration to test against a real database.
 """
 
 from typing import ClassVar
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from httpx import ASGITransport, AsyncClient
@@ -161,3 +161,41 @@ class TestBlockedRequestsLog:
         assert response.status_code == 200
         data = response.json()
         assert len(data["requests"]) <= 10
+
+
+class TestResponseCachePurge:
+    """Tests for DELETE /api/admin/response-cache."""
+
+    INTERNAL_HEADERS: ClassVar[dict[str, str]] = {"X-Agent-Hub-Internal": "agent-hub-internal-v1"}
+
+    @pytest.fixture
+    def mock_cache(self):
+        cache = AsyncMock()
+        cache.purge.return_value = 4
+        with patch("app.api.admin.get_response_cache", return_value=cache):
+            yield cache
+
+    async def test_purge_by_agent(self, async_client, mock_cache):
+        """Test purging one agent's cached responses."""
+        response = await async_client.delete(
+            "/api/admin/response-cache?agent=coder", headers=self.INTERNAL_HEADERS
+        )
+        assert response.status_code == 200
+        assert response.json() == {"deleted": 4, "scope": "agent=coder"}
+        mock_cache.purge.assert_awaited_once_with(model=None, agent_slug="coder", project_id=None)
+
+    async def test_purge_all(self, async_client, mock_cache):
+        """Test purging everything when no selector is given."""
+        response = await async_client.delete(
+            "/api/admin/response-cache", headers=self.INTERNAL_HEADERS
+        )
+        assert response.status_code == 200
+        assert response.json()["scope"] == "all"
+
+    async def test_purge_rejects_multiple_selectors(self, async_client, mock_cache):
+        """Test combining selectors is a 400."""
+        mock_cache.purge.side_effect = ValueError("one at a time")
+        response = await async_client.delete(
+            "/api/admin/response-cache?agent=coder&model=m1", headers=self.INTERNAL_HEADERS
+        )
+        assert response.status_code == 400
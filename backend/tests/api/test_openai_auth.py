@@ -1,18 +1,19 @@
 """Tests for API key authentication."""
 
 from datetime import UTC, datetime
+from unittest.mock import patch
 
 import pytest
 
 from app.main import app
 from app.services.api_key_auth import (
     KEY_PREFIX,
-    _rate_limits,
     check_rate_limit,
     generate_api_key,
     get_key_prefix,
     hash_api_key,
 )
+from app.services.distributed_rate_limiter import DistributedRateLimiter
 from tests.conftest import APITestClient
 
 
@@ -56,42 +57,49 @@ class TestAPIKeyGeneration:
 class TestRateLimiting:
     """Tests for rate limiting logic."""
 
-    def setup_method(self):
-        """Clear rate limits before each test."""
-        _rate_limits.clear()
-
-    def test_rate_limit_allows_under_limit(self):
+    @pytest.fixture(autouse=True)
+    def limiter(self):
+        """Fresh limiter on local buckets (no Redis in tests)."""
+        limiter = DistributedRateLimiter()
+        with (
+            patch.object(limiter, "_get_client", side_effect=ConnectionError("redis down")),
+            patch("app.services.api_key_auth.get_distributed_rate_limiter", return_value=limiter),
+        ):
+            yield limiter
+
+    async def test_rate_limit_allows_under_limit(self):
         """Requests under limit are allowed."""
-        allowed, error = check_rate_limit("test_key", rpm_limit=10, tpm_limit=10000)
-        assert allowed is True
-        assert error is None
+        decision = await check_rate_limit("test_key", rpm_limit=10, tpm_limit=10000)
+        assert decision.allowed is True
+        assert decision.message == ""
 
-    def test_rate_limit_blocks_over_rpm(self):
+    async def test_rate_limit_blocks_over_rpm(self):
         """Requests over RPM limit are blocked."""
         key = "rpm_test_key"
 
         # Make 10 requests (at limit)
         for _ in range(10):
-            allowed, _ = check_rate_limit(key, rpm_limit=10, tpm_limit=100000)
-            assert allowed is True
+            decision = await check_rate_limit(key, rpm_limit=10, tpm_limit=100000)
+            assert decision.allowed is True
 
         # 11th request should be blocked
-        allowed, error = check_rate_limit(key, rpm_limit=10, tpm_limit=100000)
-        assert allowed is False
-        assert "requests/minute" in error
+        decision = await check_rate_limit(key, rpm_limit=10, tpm_limit=100000)
+        assert decision.allowed is False
+        assert "requests/minute" in decision.message
+        assert int(decision.retry_after_header) >= 1
 
-    def test_rate_limit_blocks_over_tpm(self):
+    async def test_rate_limit_blocks_over_tpm(self):
         """Requests over TPM limit are blocked."""
         key = "tpm_test_key"
 
         # Make request with high token count
-        allowed, _ = check_rate_limit(key, rpm_limit=100, tpm_limit=1000, token_count=500)
-        assert allowed is True
+        decision = await check_rate_limit(key, rpm_limit=100, tpm_limit=1000, token_count=500)
+        assert decision.allowed is True
 
         # Another high-token request should exceed limit
-        allowed, error = check_rate_limit(key, rpm_limit=100, tpm_limit=1000, token_count=600)
-        assert allowed is False
-        assert "tokens/minute" in error
+        decision = await check_rate_limit(key, rpm_limit=100, tpm_limit=1000, token_count=600)
+        assert decision.allowed is False
+        assert "tokens/minute" in decision.message
 
 
 class TestAPIKeyEndpoints:
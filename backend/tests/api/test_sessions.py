@@ -1,10 +1,13 @@
 """Tests for sessions API endpoints."""
 
 from datetime import UTC, datetime
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
+from app.api.sessions import decode_session_cursor, encode_session_cursor
 from app.db import get_db
 from app.main import app
 from tests.conftest import APITestClient
@@ -100,6 +103,11 @@ class TestGetSession:
         mock_db_session.session_type = "completion"
         mock_db_session.created_at = datetime(2026, 1, 6, 10, 0, 0)
         mock_db_session.updated_at = datetime(2026, 1, 6, 10, 0, 0)
+        # Running context usage record (no request yet limited by another model)
+        mock_db_session.last_input_tokens = 50000
+        mock_db_session.usage_input_tokens = 80000
+        mock_db_session.usage_output_tokens = 3000
+        mock_db_session.context_limit_tokens = None
 
         # Create mock messages
         mock_msg = MagicMock()
@@ -117,20 +125,8 @@ class TestGetSession:
         mock_session_result = MagicMock()
         mock_session_result.scalar_one_or_none.return_value = mock_db_session
 
-        # Token totals query result (0, 0)
-        mock_token_totals_result = MagicMock()
-        mock_token_totals_result.one.return_value = (0, 0)
-
-        # Latest context query result (None - no context yet)
-        mock_latest_context_result = MagicMock()
-        mock_latest_context_result.scalar_one_or_none.return_value = None
-
-        # Return different results for each execute call
-        mock_session.execute.side_effect = [
-            mock_session_result,
-            mock_token_totals_result,
-            mock_latest_context_result,
-        ]
+        # Context usage needs no further queries
+        mock_session.execute.side_effect = [mock_session_result]
 
         response = client.get("/api/sessions/test-session-123")
 
@@ -141,8 +137,11 @@ class TestGetSession:
         assert data["messages"][0]["content"] == "Hello"
         # Verify context_usage is included
         assert "context_usage" in data
-        assert data["context_usage"]["used_tokens"] == 0
+        assert data["context_usage"]["used_tokens"] == 50000
         assert data["context_usage"]["limit_tokens"] == 200000
+        assert data["context_usage"]["percent_used"] == 25.0
+        assert data["context_usage"]["cumulative_input_tokens"] == 80000
+        assert data["context_usage"]["cumulative_output_tokens"] == 3000
 
     def test_get_session_not_found(self, client, mock_session):
         """Test 404 for non-existent session."""
@@ -186,20 +185,44 @@ class TestDeleteSession:
         assert response.status_code == 404
 
 
+def _list_row(session_id: str = "session-1", **overrides):
+    """Row of the session list query."""
+    row = {
+        "id": session_id,
+        "project_id": "test-project",
+        "provider": "claude",
+        "model": "claude-sonnet-4-5",
+        "status": "active",
+        "agent_slug": None,
+        "session_type": "completion",
+        "message_count": 0,
+        "total_input_tokens": 0,
+        "total_output_tokens": 0,
+        "created_at": datetime(2026, 1, 6, 10, 0, 0),
+        "updated_at": datetime(2026, 1, 6, 10, 0, 0),
+    }
+    row.update(overrides)
+    return SimpleNamespace(**row)
+
+
+def _list_result(rows):
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+def _count_result(total):
+    result = MagicMock()
+    result.scalar.return_value = total
+    return result
+
+
 class TestListSessions:
     """Tests for GET /api/sessions."""
 
     def test_list_sessions_empty(self, client, mock_session):
-        """Test listing sessions when none exist."""
-        # Mock count query
-        mock_count_result = MagicMock()
-        mock_count_result.scalar.return_value = 0
-
-        # Mock list query
-        mock_list_result = MagicMock()
-        mock_list_result.scalars.return_value.all.return_value = []
-
-        mock_session.execute = AsyncMock(side_effect=[mock_count_result, mock_list_result])
+        """An empty first page needs no count query."""
+        mock_session.execute = AsyncMock(side_effect=[_list_result([])])
 
         response = client.get("/api/sessions")
 
@@ -207,50 +230,16 @@ class TestListSessions:
         data = response.json()
         assert data["sessions"] == []
         assert data["total"] == 0
+        assert data["total_is_estimate"] is False
+        assert data["next_cursor"] is None
         assert data["page"] == 1
         assert data["page_size"] == 20
+        assert mock_session.execute.await_count == 1
 
     def test_list_sessions_with_results(self, client, mock_session):
-        """Test listing sessions with results."""
-        # Create mock session
-        mock_db_session = MagicMock()
-        mock_db_session.id = "session-1"
-        mock_db_session.project_id = "test-project"
-        mock_db_session.provider = "claude"
-        mock_db_session.model = "claude-sonnet-4-5"
-        mock_db_session.status = "active"
-        mock_db_session.agent_slug = None
-        mock_db_session.session_type = "completion"
-        mock_db_session.created_at = datetime(2026, 1, 6, 10, 0, 0)
-        mock_db_session.updated_at = datetime(2026, 1, 6, 10, 0, 0)
-
-        # Mock count query
-        mock_count_result = MagicMock()
-        mock_count_result.scalar.return_value = 1
-
-        # Mock list query
-        mock_list_result = MagicMock()
-        mock_list_result.scalars.return_value.all.return_value = [mock_db_session]
-
-        # Mock message count query
-        mock_msg_count_result = MagicMock()
-        mock_msg_count_result.all.return_value = [("session-1", 5)]
-
-        # Mock token stats query
-        mock_token_stats_result = MagicMock()
-        mock_token_stats_result.all.return_value = [
-            ("session-1", "user", 100),
-            ("session-1", "assistant", 200),
-        ]
-
-        mock_session.execute = AsyncMock(
-            side_effect=[
-                mock_count_result,
-                mock_list_result,
-                mock_msg_count_result,
-                mock_token_stats_result,
-            ]
-        )
+        """Message counts and token totals come from the session rollup columns."""
+        row = _list_row(message_count=5, total_input_tokens=100, total_output_tokens=200)
+        mock_session.execute = AsyncMock(side_effect=[_list_result([row])])
 
         response = client.get("/api/sessions")
 
@@ -262,51 +251,108 @@ class TestListSessions:
         assert data["sessions"][0]["total_input_tokens"] == 100
         assert data["sessions"][0]["total_output_tokens"] == 200
         assert data["total"] == 1
+        sql = str(
+            mock_session.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect())
+        )
+        assert "messages" not in sql
+        assert "ORDER BY sessions.created_at DESC, sessions.id DESC" in sql
 
     def test_list_sessions_filter_by_project(self, client, mock_session):
         """Test filtering by project_id."""
-        # Mock count query
-        mock_count_result = MagicMock()
-        mock_count_result.scalar.return_value = 0
-
-        # Mock list query
-        mock_list_result = MagicMock()
-        mock_list_result.scalars.return_value.all.return_value = []
-
-        mock_session.execute = AsyncMock(side_effect=[mock_count_result, mock_list_result])
+        mock_session.execute = AsyncMock(side_effect=[_list_result([])])
 
         response = client.get("/api/sessions?project_id=my-project")
 
         assert response.status_code == 200
+        sql = str(mock_session.execute.await_args_list[0].args[0])
+        assert "sessions.project_id = :project_id_1" in sql
 
     def test_list_sessions_filter_by_status(self, client, mock_session):
         """Test filtering by status."""
-        mock_count_result = MagicMock()
-        mock_count_result.scalar.return_value = 0
-
-        mock_list_result = MagicMock()
-        mock_list_result.scalars.return_value.all.return_value = []
-
-        mock_session.execute = AsyncMock(side_effect=[mock_count_result, mock_list_result])
+        mock_session.execute = AsyncMock(side_effect=[_list_result([])])
 
         response = client.get("/api/sessions?status=active")
 
         assert response.status_code == 200
 
     def test_list_sessions_pagination(self, client, mock_session):
-        """Test pagination parameters."""
-        mock_count_result = MagicMock()
-        mock_count_result.scalar.return_value = 50
+        """OFFSET pagination still works for page numbers."""
+        mock_session.execute = AsyncMock(side_effect=[_list_result([]), _count_result(50)])
 
-        mock_list_result = MagicMock()
-        mock_list_result.scalars.return_value.all.return_value = []
-
-        mock_session.execute = AsyncMock(side_effect=[mock_count_result, mock_list_result])
-
-        response = client.get("/api/sessions?page=3&page_size=10")
+        response = client.get("/api/sessions?page=3&page_size=10&count=exact")
 
         assert response.status_code == 200
         data = response.json()
         assert data["page"] == 3
         assert data["page_size"] == 10
-        assert data["total"] == 50
+        assert data["total"] == 20
+
+    def test_list_sessions_next_cursor(self, client, mock_session):
+        """A full page returns a cursor for the row after it."""
+        rows = [
+            _list_row(f"session-{i}", created_at=datetime(2026, 1, 6, 10, 0, 3 - i))
+            for i in range(3)
+        ]
+        mock_session.execute = AsyncMock(side_effect=[_list_result(rows), _count_result(7)])
+
+        response = client.get("/api/sessions?page_size=2&count=exact")
+
+        data = response.json()
+        assert [s["id"] for s in data["sessions"]] == ["session-0", "session-1"]
+        assert data["total"] == 7
+        assert decode_session_cursor(data["next_cursor"]) == (
+            datetime(2026, 1, 6, 10, 0, 2),
+            "session-1",
+        )
+
+    def test_list_sessions_cursor_seeks(self, client, mock_session):
+        """A cursor continues after (created_at, id) without OFFSET."""
+        cursor = encode_session_cursor(datetime(2026, 1, 6, 10, 0, 0), "session-9")
+        mock_session.execute = AsyncMock(side_effect=[_list_result([])])
+
+        response = client.get(f"/api/sessions?cursor={cursor}&count=none")
+
+        assert response.status_code == 200
+        assert response.json()["total"] is None
+        sql = str(
+            mock_session.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect())
+        )
+        assert "(sessions.created_at, sessions.id) <" in sql
+        assert "OFFSET" not in sql
+
+    def test_list_sessions_invalid_cursor(self, client, mock_session):
+        """Malformed cursors are rejected."""
+        response = client.get("/api/sessions?cursor=not-a-cursor")
+
+        assert response.status_code == 400
+
+    def test_list_sessions_estimated_total(self, client, mock_session):
+        """By default the total is the planner's estimate instead of count(*)."""
+        rows = [_list_row(f"session-{i}") for i in range(3)]
+        mock_session.execute = AsyncMock(side_effect=[_list_result(rows)])
+        explain_result = MagicMock()
+        explain_result.scalar.return_value = [{"Plan": {"Plan Rows": 1234}}]
+        conn = MagicMock()
+        conn.dialect = postgresql.dialect()
+        conn.exec_driver_sql = AsyncMock(return_value=explain_result)
+        mock_session.connection = AsyncMock(return_value=conn)
+        mock_session.begin_nested = MagicMock()
+
+        response = client.get("/api/sessions?page_size=2&project_id=p1")
+
+        data = response.json()
+        assert (data["total"], data["total_is_estimate"]) == (1234, True)
+        assert mock_session.execute.await_count == 1
+        explain_sql = conn.exec_driver_sql.await_args.args[0]
+        assert explain_sql.startswith("EXPLAIN (FORMAT JSON) SELECT sessions.id")
+
+    def test_list_sessions_estimate_falls_back_to_count(self, client, mock_session):
+        """Without planner statistics the total is counted exactly."""
+        rows = [_list_row(f"session-{i}") for i in range(3)]
+        mock_session.execute = AsyncMock(side_effect=[_list_result(rows), _count_result(3)])
+        mock_session.connection = AsyncMock(side_effect=RuntimeError("no connection"))
+
+        response = client.get("/api/sessions?page_size=2")
+
+        data = response.json()
+        assert (data["total"], data["total_is_estimate"]) == (3, False)
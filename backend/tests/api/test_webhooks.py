@@ -1,7 +1,7 @@
 """Tests for webhooks API endpoints."""
 
 from datetime import UTC, datetime
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -22,6 +22,13 @@ def mock_db_session():
     return session
 
 
+@pytest.fixture(autouse=True)
+def invalidate_webhooks():
+    """Stub the cross-worker webhook cache invalidation (Redis)."""
+    with patch("app.api.webhooks.invalidate_active_webhooks", AsyncMock()) as invalidate:
+        yield invalidate
+
+
 @pytest.fixture
 def client(mock_db_session):
     """Test client with mocked database and source headers."""
@@ -53,7 +60,7 @@ def mock_webhook():
 class TestCreateWebhook:
     """Tests for POST /api/webhooks."""
 
-    def test_create_webhook_success(self, client, mock_db_session):
+    def test_create_webhook_success(self, client, mock_db_session, invalidate_webhooks):
         """Test creating a new webhook subscription."""
 
         def set_timestamps(obj):
@@ -78,6 +85,7 @@ class TestCreateWebhook:
         assert data["event_types"] == ["message", "session_start"]
         assert "secret" in data  # Secret returned only on create
         assert len(data["secret"]) == 64  # 32 bytes hex
+        invalidate_webhooks.assert_awaited_once()  # Every worker stages for it
         mock_db_session.add.assert_called_once()
         mock_db_session.commit.assert_awaited_once()
 
@@ -150,6 +150,18 @@ def clear_db_cache():
     db._get_session_factory.cache_clear()
 
 
+@pytest.fixture(autouse=True)
+def in_memory_event_bus():
+    """Deliver session events in-process instead of through Redis Streams."""
+    from app.config import settings
+    from app.services import events
+
+    events._event_publisher = None
+    with patch.object(settings, "event_backend", "memory"):
+        yield
+    events._event_publisher = None
+
+
 class RealAPICallError(Exception):
     """Raised when a test tries to make a real API call without proper mocking."""
 
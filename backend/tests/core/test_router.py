@@ -1,7 +1,8 @@
 """Tests for ModelRouter."""
 
+import asyncio
 import time
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -12,6 +13,7 @@ from app.adapters.base import (
     ProviderError,
     RateLimitError,
 )
+from app.adapters.concurrency_limiter import ConcurrencyLimitError
 from app.services.router import (
     CIRCUIT_BREAKER_COOLDOWN,
     CIRCUIT_BREAKER_THRESHOLD,
@@ -143,6 +145,28 @@ class TestModelRouter:
 
         assert result.provider == "gemini"
 
+    @pytest.mark.asyncio
+    async def test_fallback_on_concurrency_limit(self, mock_claude_adapter, mock_gemini_adapter):
+        """Test fallback when no concurrency slot frees up for the primary."""
+        mock_claude_adapter.complete = AsyncMock(
+            side_effect=ConcurrencyLimitError("claude", "claude-sonnet-4-5-20250514", 30.0)
+        )
+
+        router = ModelRouter(
+            adapter_factory={
+                "claude": lambda: mock_claude_adapter,
+                "gemini": lambda: mock_gemini_adapter,
+            }
+        )
+
+        messages = [Message(role="user", content="Hi")]
+        result = await router.complete(messages, model="claude-sonnet-4-5-20250514")
+
+        assert result.provider == "gemini"
+        mock_gemini_adapter.complete.assert_called_once()
+        # Local saturation does not count towards the provider's circuit
+        assert router.get_circuit_status()["claude"]["consecutive_failures"] == 0
+
     @pytest.mark.asyncio
     async def test_no_fallback_on_non_retriable_error(
         self, mock_claude_adapter, mock_gemini_adapter
@@ -461,3 +485,118 @@ class TestThrashingDetection:
     def test_circuit_breaker_cooldown_constant(self):
         """Test circuit breaker cooldown value."""
         assert CIRCUIT_BREAKER_COOLDOWN == 60.0
+
+
+@pytest.fixture
+def hedging_settings():
+    """Enable hedging with a short fixed delay."""
+    with patch("app.services.hedging.settings") as mock_settings:
+        mock_settings.router_hedging_enabled = True
+        mock_settings.router_hedge_percentile = 0.9
+        mock_settings.router_hedge_default_delay_ms = 20.0
+        mock_settings.router_hedge_min_delay_ms = 10.0
+        mock_settings.router_hedge_budget = 0.5
+        mock_settings.router_hedge_agent_budgets = {"frugal": 0.0}
+        yield mock_settings
+
+
+def _slow_adapter(result: CompletionResult, delay: float) -> MagicMock:
+    adapter = MagicMock()
+    cancelled = []
+
+    async def complete(**kwargs):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return result
+
+    adapter.complete = AsyncMock(side_effect=complete)
+    adapter.cancelled = cancelled
+    return adapter
+
+
+class TestHedging:
+    """Tests for hedged requests."""
+
+    async def test_slow_primary_is_hedged(self, hedging_settings, mock_gemini_adapter):
+        """The fallback wins when the primary is still running after the delay."""
+        claude = _slow_adapter(mock_gemini_adapter.complete.return_value, delay=5)
+        router = ModelRouter(
+            adapter_factory={"claude": lambda: claude, "gemini": lambda: mock_gemini_adapter}
+        )
+        messages = [Message(role="user", content="Hi")]
+
+        result = await router.complete(messages, model="claude-sonnet-4-5-20250514")
+        await asyncio.sleep(0)
+
+        assert result.provider == "gemini"
+        assert claude.cancelled == [True]
+        stats = router.get_hedge_stats()
+        assert (stats.requests, stats.hedged, stats.hedge_wins) == (1, 1, 1)
+        assert stats.win_rate == 1.0
+        assert stats.extra_cost_usd > 0
+
+    async def test_fast_primary_not_hedged(
+        self, hedging_settings, mock_claude_adapter, mock_gemini_adapter
+    ):
+        """A primary that answers within the delay never fires the hedge."""
+        router = ModelRouter(
+            adapter_factory={
+                "claude": lambda: mock_claude_adapter,
+                "gemini": lambda: mock_gemini_adapter,
+            }
+        )
+        messages = [Message(role="user", content="Hi")]
+
+        result = await router.complete(messages, model="claude-sonnet-4-5-20250514")
+
+        assert result.provider == "claude"
+        mock_gemini_adapter.complete.assert_not_called()
+        assert router.get_hedge_stats().hedged == 0
+
+    async def test_primary_wins_race(self, hedging_settings, mock_claude_adapter):
+        """If the primary answers first after hedging, the hedge is cancelled."""
+        claude = _slow_adapter(mock_claude_adapter.complete.return_value, delay=0.05)
+        gemini = _slow_adapter(mock_claude_adapter.complete.return_value, delay=5)
+        router = ModelRouter(adapter_factory={"claude": lambda: claude, "gemini": lambda: gemini})
+        messages = [Message(role="user", content="Hi")]
+
+        await router.complete(messages, model="claude-sonnet-4-5-20250514")
+        await asyncio.sleep(0)
+
+        assert gemini.cancelled == [True]
+        stats = router.get_hedge_stats()
+        assert (stats.hedged, stats.hedge_wins) == (1, 0)
+
+    async def test_budget_exhausted(self, hedging_settings, mock_gemini_adapter):
+        """An agent without hedge budget waits for the primary."""
+        claude = _slow_adapter(mock_gemini_adapter.complete.return_value, delay=0.05)
+        router = ModelRouter(
+            adapter_factory={"claude": lambda: claude, "gemini": lambda: mock_gemini_adapter}
+        )
+        messages = [Message(role="user", content="Hi")]
+
+        # The starting allowance covers one hedge; the second must wait
+        await router.complete(messages, model="claude-sonnet-4-5-20250514", agent_slug="frugal")
+        await router.complete(messages, model="claude-sonnet-4-5-20250514", agent_slug="frugal")
+
+        stats = router.get_hedge_stats()
+        assert (stats.hedged, stats.budget_denied) == (1, 1)
+
+    async def test_both_fail_falls_through(self, hedging_settings):
+        """When the primary fails and no hedge fired, the chain continues as before."""
+        error = ProviderError("Server error", provider="claude", retriable=True)
+        claude = MagicMock()
+        claude.complete = AsyncMock(side_effect=error)
+        gemini = MagicMock()
+        gemini.complete = AsyncMock(side_effect=error)
+        router = ModelRouter(adapter_factory={"claude": lambda: claude, "gemini": lambda: gemini})
+        messages = [Message(role="user", content="Hi")]
+
+        with pytest.raises(ProviderError):
+            await router.complete(messages, model="claude-sonnet-4-5-20250514")
+
+        claude.complete.assert_awaited_once()
+        gemini.complete.assert_awaited_once()
@@ -26,6 +26,19 @@ def mock_session():
     return session
 
 
+def _list_result(rows):
+    """Result of the session list query (one row per session, rollups included)."""
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+def _count_result(total):
+    result = MagicMock()
+    result.scalar.return_value = total
+    return result
+
+
 @pytest.fixture
 def client(mock_session):
     """Test client with mocked database and source headers."""
@@ -52,36 +65,14 @@ class TestSessionsApiFiltering:
         mock_db_session.status = "completed"
         mock_db_session.agent_slug = "thesis_generation"
         mock_db_session.session_type = "completion"
+        mock_db_session.message_count = 3
+        mock_db_session.total_input_tokens = 50
+        mock_db_session.total_output_tokens = 100
         mock_db_session.created_at = datetime(2026, 1, 12, 10, 0, 0)
         mock_db_session.updated_at = datetime(2026, 1, 12, 10, 0, 0)
 
-        # Mock count query
-        mock_count_result = MagicMock()
-        mock_count_result.scalar.return_value = 1
-
-        # Mock list query
-        mock_list_result = MagicMock()
-        mock_list_result.scalars.return_value.all.return_value = [mock_db_session]
-
-        # Mock message count query
-        mock_msg_count_result = MagicMock()
-        mock_msg_count_result.all.return_value = [("session-1", 3)]
-
-        # Mock token stats query
-        mock_token_stats_result = MagicMock()
-        mock_token_stats_result.all.return_value = [
-            ("session-1", "user", 50),
-            ("session-1", "assistant", 100),
-        ]
-
-        mock_session.execute = AsyncMock(
-            side_effect=[
-                mock_count_result,
-                mock_list_result,
-                mock_msg_count_result,
-                mock_token_stats_result,
-            ]
-        )
+        # Single page: the list query alone answers, no count query
+        mock_session.execute = AsyncMock(side_effect=[_list_result([mock_db_session])])
 
         response = client.get("/api/sessions?project_id=portfolio-ai")
 
@@ -90,34 +81,49 @@ class TestSessionsApiFiltering:
         assert len(data["sessions"]) == 1
         assert data["sessions"][0]["project_id"] == "portfolio-ai"
         assert data["sessions"][0]["agent_slug"] == "thesis_generation"
+        assert data["sessions"][0]["message_count"] == 3
         assert data["sessions"][0]["total_input_tokens"] == 50
         assert data["sessions"][0]["total_output_tokens"] == 100
+        assert data["total"] == 1
+        assert data["total_is_estimate"] is False
+        assert data["next_cursor"] is None
+        sql = str(mock_session.execute.await_args.args[0])
+        assert "sessions.project_id = :project_id_1" in sql
 
     def test_list_sessions_filter_by_status(self, client, mock_session):
         """Test filtering by status works."""
-        mock_count_result = MagicMock()
-        mock_count_result.scalar.return_value = 0
-
-        mock_list_result = MagicMock()
-        mock_list_result.scalars.return_value.all.return_value = []
-
-        mock_session.execute = AsyncMock(side_effect=[mock_count_result, mock_list_result])
+        mock_session.execute = AsyncMock(side_effect=[_list_result([])])
 
         response = client.get("/api/sessions?status=active")
 
         assert response.status_code == 200
         data = response.json()
         assert data["sessions"] == []
+        assert data["total"] == 0
+        assert data["next_cursor"] is None
 
     def test_list_sessions_pagination(self, client, mock_session):
         """Test pagination parameters work."""
-        mock_count_result = MagicMock()
-        mock_count_result.scalar.return_value = 50
-
-        mock_list_result = MagicMock()
-        mock_list_result.scalars.return_value.all.return_value = []
-
-        mock_session.execute = AsyncMock(side_effect=[mock_count_result, mock_list_result])
+        rows = []
+        for i in range(11):
+            row = MagicMock()
+            row.id = f"session-{i}"
+            row.project_id = "portfolio-ai"
+            row.provider = "claude"
+            row.model = "claude-sonnet-4-5"
+            row.status = "completed"
+            row.agent_slug = None
+            row.session_type = "completion"
+            row.message_count = 0
+            row.total_input_tokens = 0
+            row.total_output_tokens = 0
+            row.created_at = datetime(2026, 1, 12, 10, 0, 59 - i)
+            row.updated_at = row.created_at
+            rows.append(row)
+
+        # A full page (page_size + 1 rows fetched) needs the total; the mocked
+        # database is not PostgreSQL, so the estimate falls back to count(*)
+        mock_session.execute = AsyncMock(side_effect=[_list_result(rows), _count_result(50)])
 
         response = client.get("/api/sessions?page=3&page_size=10")
 
@@ -125,7 +131,12 @@ class TestSessionsApiFiltering:
         data = response.json()
         assert data["page"] == 3
         assert data["page_size"] == 10
+        assert len(data["sessions"]) == 10
         assert data["total"] == 50
+        assert data["total_is_estimate"] is False
+        assert data["next_cursor"] is not None
+        sql = str(mock_session.execute.await_args_list[0].args[0])
+        assert "LIMIT :param_1 OFFSET :param_2" in sql
 
 
 class TestSessionCreation:
@@ -201,24 +212,16 @@ class TestGetSession:
         mock_db_session.created_at = datetime(2026, 1, 12, 10, 0, 0)
         mock_db_session.updated_at = datetime(2026, 1, 12, 10, 0, 0)
         mock_db_session.messages = []
+        # Running context usage record
+        mock_db_session.last_input_tokens = 100
+        mock_db_session.usage_input_tokens = 100
+        mock_db_session.usage_output_tokens = 50
+        mock_db_session.context_limit_tokens = None
 
-        # Session query result
+        # Session query result; context usage needs no further queries
         mock_session_result = MagicMock()
         mock_session_result.scalar_one_or_none.return_value = mock_db_session
-
-        # Token totals
-        mock_token_result = MagicMock()
-        mock_token_result.one.return_value = (100, 50)
-
-        # Context query
-        mock_context_result = MagicMock()
-        mock_context_result.scalar_one_or_none.return_value = None
-
-        mock_session.execute.side_effect = [
-            mock_session_result,
-            mock_token_result,
-            mock_context_result,
-        ]
+        mock_session.execute.side_effect = [mock_session_result]
 
         response = client.get("/api/sessions/session-portfolio-123")
 
@@ -226,6 +229,10 @@ class TestGetSession:
         data = response.json()
         assert data["project_id"] == "portfolio-ai"
         assert data["agent_slug"] == "strategy_generation"
+        assert data["context_usage"]["used_tokens"] == 100
+        assert data["context_usage"]["cumulative_input_tokens"] == 100
+        assert data["context_usage"]["cumulative_output_tokens"] == 50
+        assert mock_session.execute.await_count == 1
 
 
 class TestMultiProjectScenario:
@@ -234,9 +241,6 @@ class TestMultiProjectScenario:
     def test_multiple_projects_list_separately(self, client, mock_session):
         """Verify sessions from different projects can be listed separately."""
         # First request: filter by portfolio-ai
-        mock_count_1 = MagicMock()
-        mock_count_1.scalar.return_value = 3
-
         mock_session_1 = MagicMock()
         mock_session_1.id = "port-1"
         mock_session_1.project_id = "portfolio-ai"
@@ -245,32 +249,22 @@ class TestMultiProjectScenario:
         mock_session_1.status = "completed"
         mock_session_1.agent_slug = "thesis_generation"
         mock_session_1.session_type = "completion"
+        mock_session_1.message_count = 5
+        mock_session_1.total_input_tokens = 50
+        mock_session_1.total_output_tokens = 100
         mock_session_1.created_at = datetime(2026, 1, 12, 10, 0, 0)
         mock_session_1.updated_at = datetime(2026, 1, 12, 10, 0, 0)
 
-        mock_list_1 = MagicMock()
-        mock_list_1.scalars.return_value.all.return_value = [mock_session_1]
-
-        mock_msg_count_1 = MagicMock()
-        mock_msg_count_1.all.return_value = [("port-1", 5)]
-
-        mock_token_stats_1 = MagicMock()
-        mock_token_stats_1.all.return_value = [("port-1", "user", 50), ("port-1", "assistant", 100)]
-
-        mock_session.execute = AsyncMock(
-            side_effect=[mock_count_1, mock_list_1, mock_msg_count_1, mock_token_stats_1]
-        )
+        mock_session.execute = AsyncMock(side_effect=[_list_result([mock_session_1])])
 
         response = client.get("/api/sessions?project_id=portfolio-ai")
         assert response.status_code == 200
         data = response.json()
+        assert len(data["sessions"]) == 1
         assert all(s["project_id"] == "portfolio-ai" for s in data["sessions"])
 
     def test_sessions_have_agent_slug_field(self, client, mock_session):
         """Verify agent_slug field is present in session response."""
-        mock_count = MagicMock()
-        mock_count.scalar.return_value = 1
-
         mock_db_session = MagicMock()
         mock_db_session.id = "session-purpose"
         mock_db_session.project_id = "summitflow"
@@ -279,28 +273,20 @@ class TestMultiProjectScenario:
         mock_db_session.status = "completed"
         mock_db_session.agent_slug = "mockup_generation"
         mock_db_session.session_type = "completion"
+        mock_db_session.message_count = 2
+        mock_db_session.total_input_tokens = 30
+        mock_db_session.total_output_tokens = 60
         mock_db_session.created_at = datetime(2026, 1, 12, 10, 0, 0)
         mock_db_session.updated_at = datetime(2026, 1, 12, 10, 0, 0)
 
-        mock_list = MagicMock()
-        mock_list.scalars.return_value.all.return_value = [mock_db_session]
-
-        mock_msg_count = MagicMock()
-        mock_msg_count.all.return_value = [("session-purpose", 2)]
-
-        mock_token_stats = MagicMock()
-        mock_token_stats.all.return_value = [
-            ("session-purpose", "user", 30),
-            ("session-purpose", "assistant", 60),
-        ]
-
-        mock_session.execute = AsyncMock(
-            side_effect=[mock_count, mock_list, mock_msg_count, mock_token_stats]
-        )
+        mock_session.execute = AsyncMock(side_effect=[_list_result([mock_db_session])])
 
         response = client.get("/api/sessions")
         assert response.status_code == 200
         data = response.json()
         assert len(data["sessions"]) == 1
+        assert data["total"] == 1
+        assert data["total_is_estimate"] is False
+        assert data["next_cursor"] is None
         assert "agent_slug" in data["sessions"][0]
         assert data["sessions"][0]["agent_slug"] == "mockup_generation"
@@ -0,0 +1,141 @@
+"""Tests for the Redis Streams event backend."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from redis.exceptions import ResponseError
+
+from app.services.event_streams import (
+    STREAM_KEY,
+    WEBHOOK_GROUP,
+    RedisStreamEventBackend,
+)
+from app.services.events import EventPublisher, SessionEvent, SessionEventType
+
+
+def _event(i: int = 0, session_id: str = "s") -> SessionEvent:
+    return SessionEvent(event_type=SessionEventType.MESSAGE, session_id=session_id, data={"i": i})
+
+
+def _entry(entry_id: str, event: SessionEvent) -> tuple[str, dict[str, str]]:
+    return entry_id, {"event": json.dumps(event.to_dict())}
+
+
+@pytest.fixture
+def mock_redis():
+    """Mock Redis client with a recording pipeline."""
+    with patch("app.services.event_streams.redis") as mock:
+        client = AsyncMock()
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[])
+        client.pipeline = MagicMock(return_value=pipe)
+        mock.from_url.return_value = client
+        yield client
+
+
+@pytest.fixture
+def backend(mock_redis):
+    """Backend attached to a publisher, background tasks not started."""
+    backend = RedisStreamEventBackend(redis_url="redis://test", maxlen=500, batch_size=2)
+    publisher = EventPublisher(backend=backend)
+    with patch.object(backend, "_ensure_started"):
+        yield backend, publisher
+
+
+class TestAppend:
+    """Tests for batched XADD."""
+
+    async def test_publish_buffers(self, backend, mock_redis):
+        """Publishing buffers the event instead of writing it inline."""
+        stream, publisher = backend
+
+        assert await publisher.publish(_event()) == 0
+        assert stream.pending == 1
+        mock_redis.pipeline.assert_not_called()
+
+    async def test_flush_pipelines_batches(self, backend, mock_redis):
+        """Buffered events go out as pipelined XADDs, trimmed by approximate MAXLEN."""
+        stream, publisher = backend
+        for i in range(3):
+            await publisher.publish(_event(i))
+
+        assert await stream.flush() == 3
+
+        pipe = mock_redis.pipeline.return_value
+        assert pipe.execute.await_count == 2  # batch_size=2
+        assert pipe.xadd.call_count == 3
+        args, kwargs = pipe.xadd.call_args_list[0]
+        assert args[0] == STREAM_KEY
+        assert json.loads(args[1]["event"])["data"] == {"i": 0}
+        assert kwargs == {"maxlen": 500, "approximate": True}
+        assert stream.get_stats().appended == 3
+
+    async def test_flush_failure_delivers_locally(self, backend, mock_redis):
+        """When Redis is down, events still reach local subscribers and handlers."""
+        stream, publisher = backend
+        mock_redis.pipeline.return_value.execute.side_effect = ConnectionError("down")
+        handled = []
+        publisher.add_handler(handled.append)
+        ws = AsyncMock()
+        await publisher.subscribe(ws)
+
+        await publisher.publish(_event(7))
+        await stream.flush()
+        await publisher.flush(timeout=1)
+
+        assert [e.data["i"] for e in handled] == [7]
+        assert ws.send_json.call_args.args[0]["data"] == {"i": 7}
+        assert stream.get_stats().local_fallbacks == 1
+
+
+class TestRead:
+    """Tests for stream consumers."""
+
+    async def test_handle_entries_runs_handlers_and_acks(self, backend, mock_redis):
+        """Group entries run handlers with the stream ID as event ID, then get acked."""
+        stream, publisher = backend
+        handled = []
+        publisher.add_handler(handled.append)
+        entries = [_entry("1-0", _event(1)), ("2-0", {"event": "not json"}), ("3-0", {})]
+
+        await stream._handle_entries(mock_redis, entries)
+
+        assert [(e.event_id, e.data["i"]) for e in handled] == [("1-0", 1)]
+        mock_redis.xack.assert_awaited_once_with(STREAM_KEY, WEBHOOK_GROUP, "1-0", "2-0", "3-0")
+
+    async def test_ensure_group_ignores_existing(self, backend, mock_redis):
+        """An existing consumer group is not an error."""
+        stream, _ = backend
+        mock_redis.xgroup_create.side_effect = ResponseError("BUSYGROUP already exists")
+
+        await stream._ensure_group(mock_redis)
+
+        mock_redis.xgroup_create.assert_awaited_once_with(
+            STREAM_KEY, WEBHOOK_GROUP, id="$", mkstream=True
+        )
+
+    async def test_read_since_is_exclusive(self, backend, mock_redis):
+        """Replay reads strictly after the last-seen ID."""
+        stream, _ = backend
+        mock_redis.xrange.return_value = [_entry("5-1", _event(5))]
+
+        events = await stream.read_since("5-0", limit=10)
+
+        mock_redis.xrange.assert_awaited_once_with(STREAM_KEY, min="(5-0", max="+", count=10)
+        assert [(e.event_id, e.data["i"]) for e in events] == [("5-1", 5)]
+
+    async def test_resume_through_publisher(self, backend, mock_redis):
+        """Subscribing with last_event_id replays from the stream."""
+        _, publisher = backend
+        mock_redis.xrange.return_value = [
+            _entry("5-1", _event(1)),
+            _entry("5-2", _event(2, session_id="other")),
+        ]
+        ws = AsyncMock()
+
+        await publisher.subscribe(ws, session_ids={"s"}, last_event_id="5-0")
+        await publisher.flush(timeout=1)
+
+        ws.send_json.assert_awaited_once()
+        assert ws.send_json.call_args.args[0]["event_id"] == "5-1"
@@ -1,5 +1,6 @@
 """Tests for webhook callback system."""
 
+import asyncio
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -272,9 +273,169 @@ class TestWebhookDispatcher:
                 mock_queue.assert_called_once_with(webhook, event)
 
 
+class TestDeliveryEngine:
+    """Tests for pooled, concurrent and batched delivery."""
+
+    @pytest.fixture
+    def received(self):
+        """Requests seen by the stub endpoint."""
+        return []
+
+    @pytest.fixture
+    async def dispatcher(self, received):
+        """Dispatcher whose shared client posts to an in-process stub."""
+        release = asyncio.Event()
+        release.set()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            received.append(request)
+            await release.wait()
+            status = 500 if "fail" in str(request.url) else 200
+            return httpx.Response(status)
+
+        dispatcher = WebhookDispatcher(max_concurrency_per_endpoint=2, batch_max_events=3)
+        dispatcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        dispatcher._loop = asyncio.get_running_loop()
+        dispatcher.release = release
+        yield dispatcher
+        await dispatcher.close()
+
+    @staticmethod
+    def _event(i: int = 0) -> SessionEvent:
+        return SessionEvent(event_type=SessionEventType.MESSAGE, session_id="sess-1", data={"i": i})
+
+    async def test_client_is_shared(self):
+        """Deliveries reuse one client instead of opening one per request."""
+        dispatcher = WebhookDispatcher()
+        webhook = WebhookConfig(id=1, url="https://a.com", secret="s", event_types=[])
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client_class.return_value.post = AsyncMock(return_value=MagicMock(status_code=200))
+            await dispatcher.deliver(webhook, self._event(0))
+            await dispatcher.deliver(webhook, self._event(1))
+
+        mock_client_class.assert_called_once()
+
+    async def test_dispatch_is_concurrent(self, dispatcher, received):
+        """A slow webhook doesn't hold up delivery to the others."""
+        for i in range(3):
+            dispatcher.register_webhook(
+                WebhookConfig(id=i, url=f"https://h{i}.com", secret="s", event_types=[])
+            )
+        dispatcher.release.clear()
+
+        task = asyncio.create_task(dispatcher.dispatch(self._event(), use_celery_on_failure=False))
+        await asyncio.sleep(0.01)
+        assert len(received) == 3  # All in flight at once
+        dispatcher.release.set()
+
+        deliveries = await task
+        assert all(d.success for d in deliveries)
+
+    async def test_per_endpoint_concurrency(self, dispatcher, received):
+        """No more than max_concurrency_per_endpoint POSTs to one URL at a time."""
+        webhook = WebhookConfig(id=1, url="https://a.com", secret="s", event_types=[])
+        dispatcher.release.clear()
+
+        tasks = [asyncio.create_task(dispatcher.deliver(webhook, self._event(i))) for i in range(5)]
+        await asyncio.sleep(0.01)
+        assert len(received) == 2
+        dispatcher.release.set()
+        await asyncio.gather(*tasks)
+
+        assert len(received) == 5
+
+    async def test_batch_window(self, dispatcher, received):
+        """Batching webhooks get one signed POST per window."""
+        webhook = WebhookConfig(
+            id=7, url="https://a.com", secret="s", event_types=[], batch_window_ms=10
+        )
+        dispatcher.register_webhook(webhook)
+
+        assert await dispatcher.dispatch(self._event(0)) == []
+        await dispatcher.dispatch(self._event(1))
+        await asyncio.sleep(0.05)
+
+        assert len(received) == 1
+        request = received[0]
+        body = request.content.decode()
+        assert [e["data"]["i"] for e in json.loads(body)["events"]] == [0, 1]
+        assert request.headers["X-Webhook-Batch-Size"] == "2"
+        assert verify_signature(body, request.headers["X-Webhook-Signature"], "s")
+        assert dispatcher.get_stats()[7].events == 2
+
+    async def test_full_batch_sends_early(self, dispatcher, received):
+        """A batch is sent as soon as it reaches batch_max_events."""
+        dispatcher.register_webhook(
+            WebhookConfig(
+                id=1, url="https://a.com", secret="s", event_types=[], batch_window_ms=60_000
+            )
+        )
+        for i in range(4):
+            await dispatcher.dispatch(self._event(i))
+        await asyncio.sleep(0.01)
+        assert len(received) == 1
+
+        await dispatcher.flush()  # Sends the remainder without waiting for the window
+
+        assert [len(json.loads(r.content)["events"]) for r in received] == [3, 1]
+
+    async def test_failed_batch_queues_retry(self, dispatcher):
+        """A failed batch is handed to Celery as one batch payload."""
+        dispatcher.register_webhook(
+            WebhookConfig(
+                id=1, url="https://fail.com", secret="s", event_types=[], batch_window_ms=5
+            )
+        )
+        with patch.object(dispatcher, "_queue_retry_payload") as mock_queue:
+            await dispatcher.dispatch(self._event())
+            await dispatcher.flush()
+
+        payload = mock_queue.call_args.args[1]
+        assert payload["webhook_id"] == 1
+        assert len(payload["events"]) == 1
+
+    async def test_stats(self, dispatcher):
+        """Latency and failures are tracked per webhook."""
+        ok = WebhookConfig(id=1, url="https://a.com", secret="s", event_types=[])
+        bad = WebhookConfig(id=2, url="https://fail.com", secret="s", event_types=[])
+        await dispatcher.deliver(ok, self._event())
+        await dispatcher.deliver(bad, self._event())
+        await dispatcher.deliver(bad, self._event())
+
+        stats = dispatcher.get_stats()
+        assert (stats[1].deliveries, stats[1].failures) == (1, 0)
+        assert (stats[2].failures, stats[2].consecutive_failures) == (2, 2)
+        assert stats[2].last_error == "HTTP 500"
+        assert stats[1].p95_ms >= 0
+
+    async def test_dispatch_nowait_is_tracked(self, dispatcher, received):
+        """Background dispatches are awaited by flush()."""
+        dispatcher.register_webhook(
+            WebhookConfig(id=1, url="https://a.com", secret="s", event_types=[])
+        )
+        dispatcher.release.clear()
+        dispatcher.dispatch_nowait(self._event())
+        assert len(dispatcher._tasks) == 1
+
+        dispatcher.release.set()
+        await dispatcher.flush()
+
+        assert len(received) == 1
+        assert dispatcher._tasks == set()
+
+
 class TestCeleryTask:
     """Tests for Celery webhook task."""
 
+    @pytest.fixture(autouse=True)
+    def fresh_client(self):
+        """Each test starts without a shared client."""
+        from app.tasks import webhook_tasks
+
+        webhook_tasks._client = None
+        yield
+        webhook_tasks._client = None
+
     def test_send_webhook_with_signature_computes_signature(self):
         """Task computes correct signature."""
         from app.tasks.webhook_tasks import send_webhook_with_signature
@@ -311,3 +472,16 @@ class TestCeleryTask:
             payload_json = json.dumps(payload, sort_keys=True)
             expected_sig = compute_signature(payload_json, secret)
             assert call_kwargs["headers"]["X-Webhook-Signature"] == expected_sig
+
+    def test_retries_reuse_client(self):
+        """Attempts share the worker's client instead of opening one each."""
+        from app.tasks.webhook_tasks import send_webhook_with_signature
+
+        with patch("app.tasks.webhook_tasks.httpx.Client") as mock_client_class:
+            mock_client_class.return_value.post.return_value = MagicMock(status_code=200)
+            for _ in range(3):
+                send_webhook_with_signature.run(
+                    webhook_id=1, url="https://example.com/hook", payload={}, secret="s"
+                )
+
+        mock_client_class.assert_called_once()
@@ -1,5 +1,6 @@
 """Tests for WebSocket event broadcasting."""
 
+import asyncio
 from datetime import UTC, datetime
 from unittest.mock import AsyncMock, MagicMock
 
@@ -7,9 +8,11 @@ import pytest
 
 from app.services.events import (
     EventPublisher,
+    InMemoryEventBackend,
     SessionEvent,
     SessionEventType,
     WebSocketSubscription,
+    event_id_key,
     get_event_publisher,
     publish_complete,
     publish_error,
@@ -130,6 +133,7 @@ class TestEventPublisher:
 
         event = SessionEvent(event_type=SessionEventType.MESSAGE, session_id="sess-1")
         notified = await publisher.publish(event)
+        await publisher.flush(timeout=1)
 
         assert notified == 1
         ws1.send_json.assert_called_once()
@@ -144,8 +148,10 @@ class TestEventPublisher:
 
         event = SessionEvent(event_type=SessionEventType.MESSAGE, session_id="s")
         await publisher.publish(event)
+        await publisher.flush(timeout=1)
 
         assert await publisher.get_subscription_count() == 0
+        assert publisher.get_stats().send_failures == 1
 
     @pytest.mark.asyncio
     async def test_update_subscription_filters(self, publisher):
@@ -156,11 +162,13 @@ class TestEventPublisher:
         # Initially doesn't match sess-2
         event = SessionEvent(event_type=SessionEventType.MESSAGE, session_id="sess-2")
         await publisher.publish(event)
+        await publisher.flush(timeout=1)
         ws.send_json.assert_not_called()
 
         # Update to match sess-2
         await publisher.update_subscription(sub_id, session_ids={"sess-2"})
         await publisher.publish(event)
+        await publisher.flush(timeout=1)
         ws.send_json.assert_called_once()
 
     @pytest.mark.asyncio
@@ -200,6 +208,182 @@ class TestEventPublisher:
         assert await publisher.get_subscriptions_for_session("sess-3") == 1  # Only ws3
 
 
+class TestEventFanOut:
+    """Tests for queued, indexed fan-out."""
+
+    @pytest.fixture
+    def publisher(self):
+        """Publisher with small queues."""
+        return EventPublisher(queue_size=2, slow_consumer_policy="drop_oldest")
+
+    @staticmethod
+    def _blocked_ws() -> tuple[AsyncMock, asyncio.Event]:
+        """WebSocket whose sends hang until released."""
+        release = asyncio.Event()
+        ws = AsyncMock()
+
+        async def send_json(payload):
+            await release.wait()
+
+        ws.send_json.side_effect = send_json
+        return ws, release
+
+    @staticmethod
+    def _event(i: int = 0, session_id: str = "s") -> SessionEvent:
+        return SessionEvent(
+            event_type=SessionEventType.MESSAGE, session_id=session_id, data={"i": i}
+        )
+
+    @pytest.mark.asyncio
+    async def test_publish_does_not_wait_for_slow_socket(self, publisher):
+        """Publish returns while a subscriber's send is still blocked."""
+        slow, release = self._blocked_ws()
+        fast = AsyncMock()
+        await publisher.subscribe(slow)
+        await publisher.subscribe(fast)
+
+        await asyncio.wait_for(publisher.publish(self._event()), timeout=0.5)
+        await asyncio.sleep(0.01)
+
+        fast.send_json.assert_called_once()
+        release.set()
+        await publisher.flush(timeout=1)
+        assert publisher.get_stats().sent == 2
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_when_full(self, publisher):
+        """A full queue drops its oldest event and keeps order otherwise."""
+        ws, release = self._blocked_ws()
+        sub_id = await publisher.subscribe(ws)
+        await publisher.publish(self._event(0))
+        await asyncio.sleep(0)  # Drain task takes event 0 and blocks sending it
+
+        for i in range(1, 5):
+            await publisher.publish(self._event(i))
+
+        assert publisher.get_queue_depths() == {sub_id: 2}
+        assert publisher.get_stats().dropped == 2
+        release.set()
+        await publisher.flush(timeout=1)
+        sent = [call.args[0]["data"]["i"] for call in ws.send_json.call_args_list]
+        assert sent == [0, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_disconnect_policy(self):
+        """A full queue disconnects the subscriber under the disconnect policy."""
+        publisher = EventPublisher(queue_size=1, slow_consumer_policy="disconnect")
+        ws, _ = self._blocked_ws()
+        await publisher.subscribe(ws)
+        await publisher.publish(self._event(0))
+        await asyncio.sleep(0)
+
+        await publisher.publish(self._event(1))
+        notified = await publisher.publish(self._event(2))
+        await asyncio.sleep(0.01)
+
+        assert notified == 0
+        assert await publisher.get_subscription_count() == 0
+        assert publisher.get_stats().slow_disconnects == 1
+        ws.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_index_matches_combined_filters(self, publisher):
+        """Indexed matching honours session and event type filters together."""
+        ws = AsyncMock()
+        await publisher.subscribe(
+            ws, session_ids={"a", "b"}, event_types={SessionEventType.MESSAGE}
+        )
+
+        assert await publisher.publish(self._event(session_id="a")) == 1
+        assert await publisher.publish(self._event(session_id="c")) == 0
+        assert (
+            await publisher.publish(SessionEvent(event_type=SessionEventType.ERROR, session_id="b"))
+            == 0
+        )
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_clears_index(self, publisher):
+        """Unsubscribed and re-filtered subscriptions leave no stale index entries."""
+        sub_id = await publisher.subscribe(AsyncMock(), session_ids={"a"})
+        await publisher.update_subscription(sub_id, session_ids={"b"})
+        assert await publisher.publish(self._event(session_id="a")) == 0
+
+        await publisher.unsubscribe(sub_id)
+
+        assert publisher._index == {}
+
+
+class TestEventResume:
+    """Tests for event IDs and resuming from a last-seen event."""
+
+    @staticmethod
+    def _event(i: int, session_id: str = "s") -> SessionEvent:
+        return SessionEvent(
+            event_type=SessionEventType.MESSAGE, session_id=session_id, data={"i": i}
+        )
+
+    def test_round_trip(self):
+        """from_dict restores what to_dict produced, including the event ID."""
+        event = self._event(1)
+        event.event_id = "1700000000000-3"
+
+        restored = SessionEvent.from_dict(event.to_dict())
+
+        assert restored == event
+
+    @pytest.mark.asyncio
+    async def test_published_events_get_ordered_ids(self):
+        """The in-memory backend assigns increasing IDs that reach subscribers."""
+        publisher = EventPublisher()
+        ws = AsyncMock()
+        await publisher.subscribe(ws)
+
+        for i in range(3):
+            await publisher.publish(self._event(i))
+        await publisher.flush(timeout=1)
+
+        ids = [call.args[0]["event_id"] for call in ws.send_json.call_args_list]
+        assert ids == sorted(ids, key=event_id_key)
+        assert len(set(ids)) == 3
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_missed_events(self):
+        """A reconnecting client gets matching events after its last-seen ID first."""
+        publisher = EventPublisher()
+        first = AsyncMock()
+        sub_id = await publisher.subscribe(first, session_ids={"s"})
+        await publisher.publish(self._event(0))
+        await publisher.flush(timeout=1)
+        last_seen = first.send_json.call_args.args[0]["event_id"]
+        await publisher.unsubscribe(sub_id)
+
+        await publisher.publish(self._event(1))
+        await publisher.publish(self._event(99, session_id="other"))
+        await publisher.publish(self._event(2))
+
+        second = AsyncMock()
+        await publisher.subscribe(second, session_ids={"s"}, last_event_id=last_seen)
+        await publisher.publish(self._event(3))
+        await publisher.flush(timeout=1)
+
+        sent = [call.args[0]["data"]["i"] for call in second.send_json.call_args_list]
+        assert sent == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_resume_beyond_retention(self):
+        """Only events the backend still retains are replayed."""
+        publisher = EventPublisher(backend=InMemoryEventBackend(maxlen=2))
+        for i in range(4):
+            await publisher.publish(self._event(i))
+
+        ws = AsyncMock()
+        await publisher.subscribe(ws, last_event_id="0-0")
+        await publisher.flush(timeout=1)
+
+        sent = [call.args[0]["data"]["i"] for call in ws.send_json.call_args_list]
+        assert sent == [2, 3]
+
+
 class TestHelperFunctions:
     """Tests for publish_* helper functions."""
 
@@ -0,0 +1,161 @@
+"""Tests for compiled memory-context snapshots."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.memory.context_injector import ProgressiveContext, inject_progressive_context
+from app.services.memory.context_snapshot import ContextSnapshotCache
+from app.services.memory.service import MemoryScope
+
+
+@pytest.fixture
+def cache():
+    """Snapshot cache with Redis disabled (local generation only)."""
+    snapshot_cache = ContextSnapshotCache()
+    snapshot_cache._get_redis = AsyncMock(return_value=None)
+    return snapshot_cache
+
+
+def _builder(block: str = "<memory>x</memory>"):
+    return AsyncMock(return_value=(block, ProgressiveContext(total_tokens=7)))
+
+
+class TestContextSnapshotCache:
+    """Tests for ContextSnapshotCache."""
+
+    async def test_miss_then_hit(self, cache):
+        """Second lookup for the same scope is served without rebuilding."""
+        builder = _builder()
+
+        first, first_hit = await cache.get_or_build(MemoryScope.GLOBAL, None, builder)
+        second, second_hit = await cache.get_or_build(MemoryScope.GLOBAL, None, builder)
+
+        assert (first_hit, second_hit) == (False, True)
+        assert second is first
+        assert second.total_tokens == 7
+        assert builder.await_count == 1
+        assert cache.get_stats()["hit_rate"] == 0.5
+
+    async def test_scopes_cached_separately(self, cache):
+        """Different scope_ids compile their own snapshots."""
+        builder = _builder()
+
+        await cache.get_or_build(MemoryScope.PROJECT, "a", builder)
+        await cache.get_or_build(MemoryScope.PROJECT, "b", builder)
+
+        assert builder.await_count == 2
+
+    async def test_generation_bump_invalidates(self, cache):
+        """A bump makes existing snapshots stale."""
+        builder = _builder()
+
+        await cache.get_or_build(MemoryScope.GLOBAL, None, builder)
+        await cache.bump_generation()
+        _, hit = await cache.get_or_build(MemoryScope.GLOBAL, None, builder)
+
+        assert hit is False
+        assert builder.await_count == 2
+        assert cache.stats.stale == 1
+
+    async def test_ttl_expiry(self, cache):
+        """Snapshots older than the TTL are rebuilt."""
+        cache._ttl_seconds = 0.0
+        builder = _builder()
+
+        await cache.get_or_build(MemoryScope.GLOBAL, None, builder)
+        _, hit = await cache.get_or_build(MemoryScope.GLOBAL, None, builder)
+
+        assert hit is False
+        assert cache.stats.expired == 1
+
+    async def test_concurrent_misses_share_build(self, cache):
+        """Concurrent misses for one scope run the builder once."""
+        release = asyncio.Event()
+        calls = 0
+
+        async def slow_builder():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "<memory>x</memory>", ProgressiveContext()
+
+        tasks = [
+            asyncio.create_task(cache.get_or_build(MemoryScope.GLOBAL, None, slow_builder))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert calls == 1
+        assert len({id(snapshot) for snapshot, _ in results}) == 1
+
+    async def test_bump_during_build_not_cached(self, cache):
+        """A snapshot built across a bump is served once but not cached."""
+        builder = _builder()
+
+        async def bumping_builder():
+            await cache.bump_generation()
+            return await builder()
+
+        await cache.get_or_build(MemoryScope.GLOBAL, None, bumping_builder)
+        _, hit = await cache.get_or_build(MemoryScope.GLOBAL, None, builder)
+
+        assert hit is False
+
+    async def test_new_context_is_a_copy(self, cache):
+        """Per-request contexts don't leak debug info back into the snapshot."""
+        snapshot, _ = await cache.get_or_build(MemoryScope.GLOBAL, None, _builder())
+
+        context = snapshot.new_context(query="q")
+        context.debug_info["injection_latency_ms"] = 5
+
+        assert snapshot.context.debug_info == {}
+
+    async def test_lru_eviction(self, cache):
+        """Least recently used scopes are evicted beyond max_entries."""
+        cache._max_entries = 1
+        builder = _builder()
+
+        await cache.get_or_build(MemoryScope.PROJECT, "a", builder)
+        await cache.get_or_build(MemoryScope.PROJECT, "b", builder)
+
+        assert cache.get_stats()["snapshots"] == 1
+        _, hit = await cache.get_or_build(MemoryScope.PROJECT, "a", builder)
+        assert hit is False
+
+
+class TestInjectProgressiveContextSnapshot:
+    """Tests for inject_progressive_context serving compiled snapshots."""
+
+    async def test_second_injection_skips_graph_queries(self, cache):
+        """Only the first injection for a scope builds progressive context."""
+        build = AsyncMock(return_value=ProgressiveContext())
+        memory_settings = MagicMock(reference_index_enabled=True)
+        messages = [{"role": "user", "content": "hello"}]
+
+        with (
+            patch(
+                "app.services.memory.context_injector.get_context_snapshot_cache",
+                return_value=cache,
+            ),
+            patch("app.services.memory.context_injector.build_progressive_context", build),
+            patch(
+                "app.services.memory.context_injector.get_memory_settings",
+                AsyncMock(return_value=memory_settings),
+            ),
+            patch(
+                "app.services.memory.context_injector.build_reference_toon_index",
+                AsyncMock(return_value=[("uuid-1", None, "A reference", False)]),
+            ),
+        ):
+            first, first_ctx = await inject_progressive_context(messages, collect_metrics=False)
+            second, second_ctx = await inject_progressive_context(messages, collect_metrics=False)
+
+        assert build.await_count == 1
+        assert first == second
+        assert first[0]["role"] == "system"
+        assert first_ctx.debug_info["snapshot_hit"] is False
+        assert second_ctx.debug_info["snapshot_hit"] is True
@@ -257,6 +257,45 @@ class TestCompleteWithFallback:
         assert result.model_used == "claude-haiku-4-5"
         assert result.used_fallback is False
 
+    @pytest.mark.asyncio
+    async def test_scorer_order_and_decision(self, mock_agent):
+        """Models are tried in the scorer's order and the outcome is recorded."""
+        from app.services.routing_scorer import RoutingScorer
+
+        scorer = RoutingScorer()
+        mock_agent.strategies = {"routing_policy": "least_latency"}
+        tried = []
+
+        async def mock_complete(**kwargs):
+            tried.append(kwargs["model"])
+            return MagicMock()
+
+        with (
+            patch("app.services.agent_routing.get_adapter") as mock_get_adapter,
+            patch("app.services.agent_routing.get_routing_scorer", return_value=scorer),
+            patch(
+                "app.services.agent_routing._is_circuit_open",
+                side_effect=lambda model: model == "claude-sonnet-4-5",
+            ),
+        ):
+            mock_get_adapter.return_value.complete = mock_complete
+            result = await complete_with_fallback(
+                messages=[Message(role="user", content="Hi")],
+                agent=mock_agent,
+                temperature=0.7,
+            )
+
+        # Sonnet's circuit is open, so it is demoted behind both fallbacks
+        assert tried == ["claude-haiku-4-5"]
+        assert result.used_fallback is True
+        decision = scorer.get_decisions()[0]
+        assert decision.order[-1] == "claude-sonnet-4-5"
+        assert (decision.attempts, decision.model_used) == (
+            ["claude-haiku-4-5"],
+            "claude-haiku-4-5",
+        )
+        assert scorer.get_health()["claude-haiku-4-5"].in_flight == 0
+
 
 class TestInjectSystemPromptIntoMessages:
     """Tests for inject_system_prompt_into_messages."""
@@ -103,16 +103,21 @@ class TestResponseCacheFallback:
         """Create mock Redis client."""
         mock = MagicMock()
         mock.get = AsyncMock(return_value=None)
-        mock.setex = AsyncMock()
+        mock.setex = MagicMock()
         mock.delete = AsyncMock(return_value=1)
         mock.keys = AsyncMock(return_value=[])
         mock.close = AsyncMock()
+        # Writes are pipelined; record setex on the client mock for assertions
+        pipe = MagicMock()
+        pipe.setex = mock.setex
+        pipe.execute = AsyncMock()
+        mock.pipeline = MagicMock(return_value=pipe)
         return mock
 
     @pytest.fixture
     def cache(self, mock_redis):
-        """Create ResponseCache with mock Redis."""
-        cache = ResponseCache()
+        """Create ResponseCache with mock Redis (L2 only)."""
+        cache = ResponseCache(l1_max_bytes=0)
         cache._client = mock_redis
         return cache
 
@@ -270,12 +275,16 @@ class TestCacheFallbackIntegration:
         async def mock_get(key):
             return storage.get(key)
 
-        async def mock_setex(key, ttl, value):
+        def mock_setex(key, ttl, value):
             storage[key] = value
 
+        pipe = MagicMock()
+        pipe.setex = mock_setex
+        pipe.execute = AsyncMock()
+
         mock = MagicMock()
         mock.get = mock_get
-        mock.setex = mock_setex
+        mock.pipeline = MagicMock(return_value=pipe)
         mock.close = AsyncMock()
         return mock, storage
 
@@ -283,7 +292,7 @@ class TestCacheFallbackIntegration:
     async def test_fallback_after_primary_expires(self, mock_redis):
         """Test fallback works when primary cache has expired."""
         mock_client, storage = mock_redis
-        cache = ResponseCache()
+        cache = ResponseCache(l1_max_bytes=0)
         cache._client = mock_client
 
         messages = [{"role": "user", "content": "Test"}]
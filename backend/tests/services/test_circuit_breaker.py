@@ -0,0 +1,359 @@
+"""Tests for the locally cached, Redis-shared circuit breaker."""
+
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.circuit_breaker import (
+    CIRCUIT_BREAKER_COOLDOWN,
+    CIRCUIT_BREAKER_THRESHOLD,
+    CIRCUIT_CHANNEL,
+    CircuitBreakerManager,
+    CircuitState,
+    OutcomeWindow,
+    cooldown_for,
+)
+
+
+@pytest.fixture
+def mock_redis():
+    """Redis client mock returned by get_redis_client."""
+    client = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[{}, {}])
+    client.pipeline = MagicMock(return_value=pipe)
+    with patch("app.services.circuit_breaker.get_redis_client", AsyncMock(return_value=client)):
+        yield client
+
+
+@pytest.fixture
+def manager():
+    """Manager with the transition listener stubbed out."""
+    manager = CircuitBreakerManager(["claude", "gemini"])
+    with patch.object(manager, "_listen_for_transitions", AsyncMock()):
+        yield manager
+
+
+class TestLocalReads:
+    """The request path is served from local state."""
+
+    async def test_check_loads_shared_state_once(self, manager, mock_redis):
+        """Shared hashes are loaded on first use only; later checks skip Redis."""
+        cooldown_until = time.time() + 100
+        mock_redis.pipeline.return_value.execute.return_value = [
+            {
+                "state": "open",
+                "failures": "7",
+                "signature": "sig",
+                "cooldown_until": str(cooldown_until),
+            },
+            {},
+        ]
+        manager._subscriber_task = None
+
+        assert not await manager.check_circuit("claude")
+        manager._subscriber_task = MagicMock(done=MagicMock(return_value=False))
+        assert not await manager.check_circuit("claude")
+        assert await manager.check_circuit("gemini")
+
+        mock_redis.pipeline.return_value.execute.assert_awaited_once()
+        mock_redis.get.assert_not_called()
+        state = manager._get_circuit_state("claude")
+        assert (state.consecutive_failures, state.cooldown_until) == (7, cooldown_until)
+
+    async def test_half_open_without_write(self, manager, mock_redis):
+        """An expired cooldown turns half-open locally, without a Redis write."""
+        state = manager._get_circuit_state("claude")
+        state.state = CircuitState.OPEN
+        state.cooldown_until = time.time() - 1
+        manager._subscriber_task = MagicMock(done=MagicMock(return_value=False))
+
+        assert await manager.check_circuit("claude")
+
+        assert state.state == CircuitState.HALF_OPEN
+        mock_redis.eval.assert_not_called()
+
+    async def test_success_when_closed_is_free(self, manager, mock_redis):
+        """A success on a healthy circuit does not write to Redis."""
+        await manager.on_success("claude")
+
+        mock_redis.eval.assert_not_called()
+
+    async def test_success_after_failures_clears_shared_state(self, manager, mock_redis):
+        """The first success after failures closes the shared circuit."""
+        state = manager._get_circuit_state("claude")
+        state.state = CircuitState.HALF_OPEN
+        state.consecutive_failures = 5
+
+        await manager.on_success("claude")
+
+        assert state.state == CircuitState.CLOSED
+        args = mock_redis.eval.call_args.args
+        assert args[1:] == (1, "agent-hub:circuit-breaker:claude", CIRCUIT_CHANNEL, "claude")
+
+
+class TestSharedFailures:
+    """Failures are counted atomically in Redis."""
+
+    async def test_shared_count_opens_circuit(self, manager, mock_redis):
+        """The script's cluster-wide count and state win over the local count."""
+        cooldown_until = time.time() + CIRCUIT_BREAKER_COOLDOWN
+        mock_redis.eval.return_value = [
+            "open",
+            CIRCUIT_BREAKER_THRESHOLD,
+            str(cooldown_until),
+            1,
+            1,
+        ]
+
+        state = await manager.on_failure("claude", 1, "sig")
+
+        assert state.state == CircuitState.OPEN
+        assert state.consecutive_failures == CIRCUIT_BREAKER_THRESHOLD
+        assert state.cooldown_until == cooldown_until
+        args = mock_redis.eval.call_args.args
+        assert args[2] == "agent-hub:circuit-breaker:claude"
+        assert args[-2] == "0"
+
+    async def test_half_open_failure_asks_to_reopen(self, manager, mock_redis):
+        """A failed half-open test request reopens the shared circuit."""
+        manager._get_circuit_state("claude").state = CircuitState.HALF_OPEN
+        mock_redis.eval.return_value = ["open", 6, str(time.time() + 120), 2, 1]
+
+        state = await manager.on_failure("claude", 1, "sig")
+
+        assert mock_redis.eval.call_args.args[-2] == "1"
+        assert state.trips == 2
+
+    async def test_executor_trips_on_shared_open(self, manager, mock_redis):
+        """A circuit opened by the shared count trips even at a low local count."""
+        from app.adapters.base import CircuitBreakerError, ProviderError
+        from app.services.error_tracking import ErrorTracker
+        from app.services.request_executor import RequestExecutor
+
+        executor = RequestExecutor(manager, ErrorTracker())
+        mock_redis.eval.return_value = [
+            "open",
+            CIRCUIT_BREAKER_THRESHOLD,
+            str(time.time() + CIRCUIT_BREAKER_COOLDOWN),
+            1,
+            1,
+        ]
+
+        with (
+            patch("app.services.request_executor.increment_circuit_trips") as trips,
+            pytest.raises(CircuitBreakerError) as exc_info,
+        ):
+            await executor.handle_provider_error(ProviderError("boom", "claude"), "claude", "m")
+
+        trips.assert_called_once()
+        assert exc_info.value.consecutive_failures == CIRCUIT_BREAKER_THRESHOLD
+
+    async def test_redis_error_falls_back_to_local(self, manager, mock_redis):
+        """If the script fails, the local count decides."""
+        mock_redis.eval.side_effect = ConnectionError("down")
+
+        state = await manager.on_failure("claude", CIRCUIT_BREAKER_THRESHOLD, "sig")
+
+        assert state.state == CircuitState.OPEN
+        assert state.consecutive_failures == CIRCUIT_BREAKER_THRESHOLD
+
+
+class TestTransitions:
+    """Transitions published by other workers update local state in place."""
+
+    def test_apply_open_and_close(self, manager):
+        """Open and close messages mutate the same state object."""
+        state = manager._get_circuit_state("claude")
+        cooldown_until = time.time() + 60
+
+        manager._apply_transition(
+            json.dumps(
+                {
+                    "provider": "claude",
+                    "state": "open",
+                    "failures": 5,
+                    "signature": "sig",
+                    "cooldown_until": cooldown_until,
+                }
+            )
+        )
+        assert (state.state, state.consecutive_failures) == (CircuitState.OPEN, 5)
+        assert state.cooldown_until == cooldown_until
+
+        manager._apply_transition(json.dumps({"provider": "claude", "state": "closed"}))
+        assert manager._get_circuit_state("claude") is state
+        assert (state.state, state.consecutive_failures) == (CircuitState.CLOSED, 0)
+
+    async def test_shared_count_cleared_by_any_worker(self, manager, mock_redis):
+        """A failure count published by another worker lets a local success reset it."""
+        manager._apply_transition(
+            json.dumps({"provider": "claude", "state": "closed", "failures": 3, "signature": "s"})
+        )
+        state = manager._get_circuit_state("claude")
+        assert (state.state, state.consecutive_failures) == (CircuitState.CLOSED, 3)
+
+        await manager.on_success("claude")
+
+        mock_redis.eval.assert_awaited_once()
+        assert state.consecutive_failures == 0
+
+    def test_ignores_malformed(self, manager):
+        """Garbage on the channel is ignored."""
+        manager._apply_transition("not json")
+        manager._apply_transition(json.dumps({"state": "open"}))
+        manager._apply_transition(None)
+
+        assert manager.get_circuit_status()["claude"]["state"] == "closed"
+
+
+@pytest.fixture
+def window_settings():
+    """Small window thresholds for the rolling-window breaker."""
+    with patch("app.services.circuit_breaker.settings") as mock_settings:
+        mock_settings.circuit_window_enabled = True
+        mock_settings.circuit_window_size = 10
+        mock_settings.circuit_window_seconds = 300.0
+        mock_settings.circuit_window_min_requests = 4
+        mock_settings.circuit_error_rate_threshold = 0.5
+        mock_settings.circuit_p95_latency_threshold_ms = 1000.0
+        mock_settings.circuit_half_open_max_probes = 1
+        mock_settings.circuit_max_cooldown = 200.0
+        yield mock_settings
+
+
+@pytest.fixture
+def local_manager():
+    """Manager with Redis unavailable."""
+    with patch("app.services.circuit_breaker.get_redis_client", AsyncMock(return_value=None)):
+        yield CircuitBreakerManager(["claude", "gemini"])
+
+
+class TestOutcomeWindow:
+    """Tests for the rolling outcome window."""
+
+    def test_stats(self):
+        """Error rate and nearest-rank p95 over the samples."""
+        window = OutcomeWindow(size=100, seconds=60)
+        for i in range(20):
+            window.record(failed=i < 5, latency_ms=float(i + 1), now=1000.0)
+
+        stats = window.stats(now=1000.0)
+
+        assert (stats.requests, stats.failures) == (20, 5)
+        assert stats.error_rate == 0.25
+        assert stats.p95_ms == 19.0
+
+    def test_bounded_by_count_and_age(self):
+        """Only the newest `size` samples inside the time window count."""
+        window = OutcomeWindow(size=3, seconds=60)
+        window.record(failed=True, latency_ms=1, now=0.0)
+        for _ in range(3):
+            window.record(failed=False, latency_ms=1, now=100.0)
+        assert window.stats(now=100.0).failures == 0
+
+        assert window.stats(now=200.0).requests == 0
+
+
+class TestWindowBreaker:
+    """Tests for provider/model circuits driven by the window."""
+
+    async def test_opens_on_error_rate(self, local_manager, window_settings):
+        """The window circuit opens once enough requests fail; the provider stays closed."""
+        for failed in (False, True, False, True):
+            local_manager.record_outcome("claude", "sonnet", 10.0, failed=failed)
+
+        assert not await local_manager.check_circuit("claude", "sonnet")
+        assert await local_manager.check_circuit("claude", "haiku")
+        assert await local_manager.check_circuit("claude")
+        blocking = local_manager.blocking_state("claude", "sonnet")
+        assert blocking.state == CircuitState.OPEN
+        assert "error rate 50%" in blocking.last_error_signature
+
+    async def test_opens_on_slow_successes(self, local_manager, window_settings):
+        """Slow but successful calls trip the latency threshold."""
+        for _ in range(4):
+            local_manager.record_outcome("claude", "sonnet", 1500.0, failed=False)
+
+        assert not await local_manager.check_circuit("claude", "sonnet")
+        status = local_manager.get_window_status()["claude/sonnet"]
+        assert (status["state"], status["p95_ms"]) == ("open", 1500.0)
+
+    async def test_needs_min_requests(self, local_manager, window_settings):
+        """A few failures are not enough to judge the window."""
+        for _ in range(3):
+            local_manager.record_outcome("claude", "sonnet", 10.0, failed=True)
+
+        assert await local_manager.check_circuit("claude", "sonnet")
+
+    async def test_half_open_limits_probes_and_closes(self, local_manager, window_settings):
+        """After the cooldown only one trial runs; a fast success closes the circuit."""
+        state = local_manager._get_window_state("claude", "sonnet")
+        state.open(time.time() - CIRCUIT_BREAKER_COOLDOWN - 1)
+
+        assert await local_manager.check_circuit("claude", "sonnet")
+        assert not await local_manager.check_circuit("claude", "sonnet")
+
+        local_manager.record_outcome("claude", "sonnet", 10.0, failed=False)
+        assert state.state == CircuitState.CLOSED
+        assert await local_manager.check_circuit("claude", "sonnet")
+
+    async def test_failed_probe_doubles_cooldown(self, local_manager, window_settings):
+        """Each repeated trip doubles the cooldown, up to the cap."""
+        state = local_manager._get_window_state("claude", "sonnet")
+        state.open(time.time() - CIRCUIT_BREAKER_COOLDOWN - 1)
+        assert await local_manager.check_circuit("claude", "sonnet")
+
+        local_manager.record_outcome("claude", "sonnet", 5000.0, failed=False)
+
+        assert (state.state, state.trips) == (CircuitState.OPEN, 2)
+        assert state.cooldown_until == pytest.approx(
+            time.time() + 2 * CIRCUIT_BREAKER_COOLDOWN, abs=1
+        )
+        assert cooldown_for(3) == 200.0
+
+    async def test_provider_probe_released_when_window_rejects(
+        self, local_manager, window_settings
+    ):
+        """A provider trial slot is not held by a request the window rejected."""
+        provider_state = local_manager._get_circuit_state("claude")
+        provider_state.open(time.time() - CIRCUIT_BREAKER_COOLDOWN - 1)
+        local_manager._get_window_state("claude", "sonnet").open(time.time())
+
+        assert not await local_manager.check_circuit("claude", "sonnet")
+
+        assert provider_state.state == CircuitState.HALF_OPEN
+        assert provider_state.probes == []
+
+    async def test_router_skips_slow_provider(self, local_manager, window_settings):
+        """The executor raises CircuitBreakerError for an open provider/model circuit."""
+        from app.adapters.base import CircuitBreakerError
+        from app.services.error_tracking import ErrorTracker
+        from app.services.request_executor import RequestExecutor
+
+        executor = RequestExecutor(local_manager, ErrorTracker())
+        adapter = MagicMock()
+        adapter.complete = AsyncMock(return_value="ok")
+        for _ in range(4):
+            local_manager.record_outcome("claude", "sonnet", 1500.0, failed=False)
+
+        with pytest.raises(CircuitBreakerError):
+            await executor.try_provider(adapter, "claude", "claude", "sonnet", [], None, 1.0)
+        adapter.complete.assert_not_called()
+
+        assert (
+            await executor.try_provider(adapter, "claude", "claude", "haiku", [], None, 1.0) == "ok"
+        )
+        assert local_manager.get_window_status()["claude/haiku"]["requests"] == 1
+
+    async def test_latency_percentile_needs_min_requests(self, local_manager, window_settings):
+        """Percentiles for hedging are only reported once the window is judged."""
+        for latency in (100.0, 200.0, 300.0):
+            local_manager.record_outcome("claude", "sonnet", latency, failed=False)
+        assert local_manager.latency_percentile("claude", "sonnet", 0.9) is None
+
+        local_manager.record_outcome("claude", "sonnet", 400.0, failed=False)
+        assert local_manager.latency_percentile("claude", "sonnet", 0.9) == 400.0
+        assert local_manager.latency_percentile("claude", "sonnet", 0.5) == 200.0
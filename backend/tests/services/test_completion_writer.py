@@ -0,0 +1,254 @@
+"""Tests for single-transaction completion persistence."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models import Message as DBMessage
+from app.models import TruncationEvent
+from app.services.completion_writer import (
+    CompletionWrite,
+    CompletionWriter,
+    persist_completion,
+)
+
+
+def _write(session_id: str = "s1", **kwargs) -> CompletionWrite:
+    return CompletionWrite(
+        session_id=session_id,
+        model="claude-sonnet-4-5",
+        provider="claude",
+        input_tokens=10,
+        output_tokens=5,
+        user_messages=[("user", "hello"), ("assistant", "earlier reply")],
+        assistant_content="hi",
+        cost_usd=0.01,
+        **kwargs,
+    )
+
+
+def _fake_db(session=None) -> MagicMock:
+    db = MagicMock()
+    db.get = AsyncMock(return_value=session)
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+    return db
+
+
+@pytest.fixture
+def events():
+    """Patch the event, outbox, cost-log and token-count calls made by CompletionWrite."""
+    publisher = MagicMock()
+    publisher.publish = AsyncMock()
+    with (
+        patch("app.services.completion_writer.count_single_message_tokens", return_value=1),
+        patch("app.services.completion_writer.stage_webhook_event", AsyncMock()) as stage,
+        patch("app.services.completion_writer.get_event_publisher", return_value=publisher),
+        patch("app.services.completion_writer.get_session_context_cache") as context_cache,
+        patch("app.services.completion_writer.log_token_usage", AsyncMock()) as log_usage,
+    ):
+        context_cache.return_value.append = AsyncMock()
+        context_cache.return_value.invalidate = AsyncMock()
+        yield SimpleNamespace(stage=stage, publish=publisher.publish, log_usage=log_usage)
+
+
+def _published(events) -> list[tuple[str, str]]:
+    """(session_id, event type) of the live events published so far."""
+    return [
+        (call.args[0].session_id, call.args[0].event_type.value)
+        for call in events.publish.await_args_list
+    ]
+
+
+class _FakeSession:
+    """Session/transaction stand-in recording the writes applied to it."""
+
+    def __init__(self, fail: bool = False, fail_session: str | None = None):
+        self.fail = fail
+        self.fail_session = fail_session  # Rows of this session fail at commit
+        self.added: list = []
+        self.transactions = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, *exc):
+        if exc_type is None and any(
+            getattr(row, "session_id", None) == self.fail_session for row in self.added
+        ):
+            self.added.clear()
+            raise RuntimeError("commit failed")
+        return False
+
+    def begin(self):
+        self.transactions += 1
+        return self
+
+    def add(self, row):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.added.append(row)
+
+    async def execute(self, statement):
+        pass
+
+    async def get(self, model, key):
+        return None
+
+
+class TestCompletionWrite:
+    """Tests for CompletionWrite.apply."""
+
+    async def test_apply_stages_everything_in_one_session(self, events):
+        """Messages, cost log, events and session updates join the caller's transaction."""
+        session = SimpleNamespace(
+            models_used=["gpt-5"],
+            providers_used=["openai"],
+            agent_slug=None,
+            provider_metadata={"cache": {"total_cache_read_tokens": 100}},
+            status="active",
+        )
+        db = _fake_db(session)
+        write = _write(
+            agent_slug="coder",
+            close_session=True,
+            cache_metrics={"cache_creation_input_tokens": 3, "cache_read_input_tokens": 7},
+            truncation=TruncationEvent(model="claude-sonnet-4-5", endpoint="complete"),
+        )
+
+        await write.apply(db)
+
+        added = [call.args[0] for call in db.add.call_args_list]
+        messages = [row for row in added if isinstance(row, DBMessage)]
+        assert [(m.role, m.content) for m in messages] == [("user", "hello"), ("assistant", "hi")]
+        assert isinstance(added[-1], TruncationEvent)
+        rollup = db.execute.await_args.args[0].compile().params
+        assert (rollup["message_count_1"], rollup["total_output_tokens_1"]) == (2, 5)
+        staged = [call.args for call in events.stage.call_args_list]
+        assert all(args[0] is db for args in staged)
+        assert [event.event_type.value for _, event in staged] == ["message", "message", "complete"]
+        events.publish.assert_not_called()
+        events.log_usage.assert_awaited_once_with(db, "s1", "claude-sonnet-4-5", 10, 5, 0.01)
+        assert session.models_used == ["gpt-5", "claude-sonnet-4-5"]
+        assert session.providers_used == ["openai", "claude"]
+        assert session.agent_slug == "coder"
+        assert session.provider_metadata["cache"]["total_cache_read_tokens"] == 107
+        assert session.status == "completed"
+        db.commit.assert_not_called()
+
+    async def test_cached_response_only_publishes_complete(self, events):
+        """Cached responses store messages but skip message events."""
+        db = _fake_db()
+
+        write = _write(publish_messages=False)
+        await write.apply(db)
+
+        assert [event.event_type.value for event in write.events] == ["complete"]
+
+    async def test_no_content_stores_no_messages(self, events):
+        """Without assistant content only the session updates are applied."""
+        db = _fake_db()
+        write = _write(close_session=True)
+        write.assistant_content = None
+        write.cost_usd = None
+
+        await write.apply(db)
+
+        db.add.assert_not_called()
+        db.execute.assert_not_called()
+        events.log_usage.assert_not_called()
+
+
+class TestPersistCompletion:
+    """Tests for persist_completion modes."""
+
+    async def test_sync_commits_once(self, events):
+        """Sync mode applies the write and commits a single time."""
+        db = _fake_db()
+        db.commit.side_effect = lambda: events.publish.assert_not_called()
+        with patch("app.services.completion_writer.settings") as mock_settings:
+            mock_settings.completion_persistence_mode = "sync"
+            await persist_completion(db, _write())
+
+        db.commit.assert_awaited_once()
+        assert _published(events) == [("s1", "message"), ("s1", "message"), ("s1", "complete")]
+
+    async def test_deferred_full_queue_falls_back_to_sync(self, events):
+        """A full writer queue makes the request write synchronously."""
+        db = _fake_db()
+        writer = CompletionWriter(max_queue_size=1)
+        writer._writes.append(_write("other"))
+        with (
+            patch("app.services.completion_writer.settings") as mock_settings,
+            patch("app.services.completion_writer.get_completion_writer", return_value=writer),
+        ):
+            mock_settings.completion_persistence_mode = "deferred"
+            await persist_completion(db, _write())
+
+        db.commit.assert_awaited_once()
+        assert writer.stats.overflowed == 1
+
+
+class TestCompletionWriter:
+    """Tests for the deferred writer."""
+
+    async def test_batch_commits_in_one_transaction(self, events):
+        """Queued writes are committed together and release waiting sessions."""
+        session = _FakeSession()
+        writer = CompletionWriter(max_queue_size=10)
+        with patch(
+            "app.services.completion_writer._get_session_factory",
+            return_value=lambda: session,
+        ):
+            assert writer.submit(_write("s1"))
+            assert writer.submit(_write("s2"))
+            await asyncio.wait_for(writer.wait_for_session("s1"), timeout=1)
+            await writer.shutdown()
+
+        assert session.transactions == 1
+        assert len(session.added) == 4
+        assert writer.get_stats()["written"] == 2
+        assert writer._pending_sessions == {}
+
+    async def test_failed_write_is_counted_and_released(self, events):
+        """A write that cannot be committed is logged as lost, not retried forever."""
+        session = _FakeSession(fail=True)
+        writer = CompletionWriter(max_queue_size=10)
+        with patch(
+            "app.services.completion_writer._get_session_factory",
+            return_value=lambda: session,
+        ):
+            writer.submit(_write("s1"))
+            await asyncio.wait_for(writer.wait_for_session("s1"), timeout=1)
+            await writer.shutdown()
+
+        stats = writer.get_stats()
+        assert (stats["written"], stats["failed"], stats["pending"]) == (0, 1, 0)
+        events.publish.assert_not_called()
+
+    async def test_retried_batch_publishes_committed_writes_once(self, events):
+        """Events go out once per committed write, never for a write that was lost."""
+        session = _FakeSession(fail_session="bad")
+        writer = CompletionWriter(max_queue_size=10)
+        with patch(
+            "app.services.completion_writer._get_session_factory",
+            return_value=lambda: session,
+        ):
+            writer.submit(_write("s1"))
+            writer.submit(_write("bad"))
+            writer.submit(_write("s2"))
+            await writer.shutdown()
+
+        assert session.transactions == 4  # The failed batch, then one per write
+        assert (writer.stats.written, writer.stats.failed) == (2, 1)
+        published = _published(events)
+        assert [session_id for session_id, _ in published] == ["s1"] * 3 + ["s2"] * 3
+
+    async def test_submit_after_shutdown_is_refused(self):
+        """Writes arriving during shutdown are applied by the request itself."""
+        writer = CompletionWriter(max_queue_size=10)
+        await writer.shutdown()
+
+        assert not writer.submit(_write())
@@ -1,5 +1,6 @@
 """Tests for context tracking service."""
 
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -11,6 +12,7 @@ from app.services.context_tracker import (
     ContextUsage,
     calculate_context_usage,
     check_context_before_request,
+    context_usage_from_session,
     get_session_token_totals,
     log_token_usage,
     should_emit_warning,
@@ -43,29 +45,39 @@ class TestLogTokenUsage:
         assert cost_log.output_tokens == 500
         assert cost_log.cost_usd == 0.015
 
+        # Running usage record updated atomically in the same transaction
+        statement = mock_db.execute.await_args.args[0]
+        assert str(statement).startswith("UPDATE sessions SET")
+        params = statement.compile().params
+        assert params["last_input_tokens"] == 1000
+        assert params["usage_input_tokens_1"] == 1000
+        assert params["usage_output_tokens_1"] == 500
+        assert params["context_limit_tokens"] == 200000
+
 
 class TestGetSessionTokenTotals:
     """Tests for get_session_token_totals."""
 
     @pytest.mark.asyncio
     async def test_returns_totals(self):
-        """Test that token totals are aggregated correctly."""
+        """Test that token totals are read from the session's usage record."""
         mock_db = AsyncMock()
         mock_result = MagicMock()
-        mock_result.one.return_value = (5000, 2500)
+        mock_result.one_or_none.return_value = (5000, 2500)
         mock_db.execute.return_value = mock_result
 
         input_total, output_total = await get_session_token_totals(mock_db, "test-session-123")
 
         assert input_total == 5000
         assert output_total == 2500
+        assert "cost_logs" not in str(mock_db.execute.await_args.args[0])
 
     @pytest.mark.asyncio
-    async def test_returns_zero_for_no_logs(self):
-        """Test returns 0,0 when no cost logs exist."""
+    async def test_returns_zero_for_unknown_session(self):
+        """Test returns 0,0 when the session does not exist."""
         mock_db = AsyncMock()
         mock_result = MagicMock()
-        mock_result.one.return_value = (0, 0)
+        mock_result.one_or_none.return_value = None
         mock_db.execute.return_value = mock_result
 
         input_total, output_total = await get_session_token_totals(mock_db, "new-session")
@@ -74,23 +86,31 @@ class TestGetSessionTokenTotals:
         assert output_total == 0
 
 
+def _usage_row(last_input: int, limit: int | None = None) -> SimpleNamespace:
+    """Row of the session usage record query."""
+    return SimpleNamespace(
+        last_input_tokens=last_input,
+        usage_input_tokens=last_input * 2,
+        usage_output_tokens=1000,
+        context_limit_tokens=limit,
+    )
+
+
+def _usage_db(row: SimpleNamespace | None) -> AsyncMock:
+    mock_db = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.one_or_none.return_value = row
+    mock_db.execute.return_value = mock_result
+    return mock_db
+
+
 class TestCalculateContextUsage:
     """Tests for calculate_context_usage."""
 
     @pytest.mark.asyncio
     async def test_calculates_usage_correctly(self):
-        """Test context usage calculation."""
-        mock_db = AsyncMock()
-
-        # Token totals query
-        mock_totals = MagicMock()
-        mock_totals.one.return_value = (50000, 20000)
-
-        # Latest context query
-        mock_latest = MagicMock()
-        mock_latest.scalar_one_or_none.return_value = 50000
-
-        mock_db.execute.side_effect = [mock_totals, mock_latest]
+        """Test context usage calculation with a single lookup."""
+        mock_db = _usage_db(_usage_row(50000))
 
         usage = await calculate_context_usage(mock_db, "test-session-123", "claude-sonnet-4-5")
 
@@ -99,19 +119,23 @@ class TestCalculateContextUsage:
         assert usage.percent_used == 25.0
         assert usage.remaining_tokens == 150000
         assert usage.warning is None  # 25% is below warning threshold
+        assert (usage.cumulative_input_tokens, usage.cumulative_output_tokens) == (100000, 1000)
+        assert mock_db.execute.await_count == 1
 
     @pytest.mark.asyncio
-    async def test_warning_at_50_percent(self):
-        """Test note emitted at 50% capacity."""
-        mock_db = AsyncMock()
+    async def test_uses_limit_of_last_model(self):
+        """Test the recorded limit of the last request's model wins."""
+        mock_db = _usage_db(_usage_row(500000, limit=1000000))
 
-        mock_totals = MagicMock()
-        mock_totals.one.return_value = (100000, 40000)
+        usage = await calculate_context_usage(mock_db, "test-session", "claude-sonnet-4-5")
 
-        mock_latest = MagicMock()
-        mock_latest.scalar_one_or_none.return_value = 100000
+        assert usage.limit_tokens == 1000000
+        assert usage.percent_used == 50.0
 
-        mock_db.execute.side_effect = [mock_totals, mock_latest]
+    @pytest.mark.asyncio
+    async def test_warning_at_50_percent(self):
+        """Test note emitted at 50% capacity."""
+        mock_db = _usage_db(_usage_row(100000))
 
         usage = await calculate_context_usage(mock_db, "test-session", "claude-sonnet-4-5")
 
@@ -122,15 +146,7 @@ class TestCalculateContextUsage:
     @pytest.mark.asyncio
     async def test_warning_at_75_percent(self):
         """Test warning emitted at 75% capacity."""
-        mock_db = AsyncMock()
-
-        mock_totals = MagicMock()
-        mock_totals.one.return_value = (150000, 60000)
-
-        mock_latest = MagicMock()
-        mock_latest.scalar_one_or_none.return_value = 150000
-
-        mock_db.execute.side_effect = [mock_totals, mock_latest]
+        mock_db = _usage_db(_usage_row(150000))
 
         usage = await calculate_context_usage(mock_db, "test-session", "claude-sonnet-4-5")
 
@@ -140,15 +156,7 @@ class TestCalculateContextUsage:
     @pytest.mark.asyncio
     async def test_critical_warning_at_90_percent(self):
         """Test critical warning at 90% capacity."""
-        mock_db = AsyncMock()
-
-        mock_totals = MagicMock()
-        mock_totals.one.return_value = (180000, 70000)
-
-        mock_latest = MagicMock()
-        mock_latest.scalar_one_or_none.return_value = 180000
-
-        mock_db.execute.side_effect = [mock_totals, mock_latest]
+        mock_db = _usage_db(_usage_row(180000))
 
         usage = await calculate_context_usage(mock_db, "test-session", "claude-sonnet-4-5")
 
@@ -157,16 +165,8 @@ class TestCalculateContextUsage:
 
     @pytest.mark.asyncio
     async def test_no_context_returns_zero(self):
-        """Test new session with no context logs."""
-        mock_db = AsyncMock()
-
-        mock_totals = MagicMock()
-        mock_totals.one.return_value = (0, 0)
-
-        mock_latest = MagicMock()
-        mock_latest.scalar_one_or_none.return_value = None
-
-        mock_db.execute.side_effect = [mock_totals, mock_latest]
+        """Test new session with no requests yet."""
+        mock_db = _usage_db(_usage_row(0))
 
         usage = await calculate_context_usage(mock_db, "new-session", "claude-sonnet-4-5")
 
@@ -174,6 +174,33 @@ class TestCalculateContextUsage:
         assert usage.percent_used == 0.0
         assert usage.remaining_tokens == 200000
 
+    @pytest.mark.asyncio
+    async def test_unknown_session_returns_zero(self):
+        """Test missing session reports an empty context for the given model."""
+        usage = await calculate_context_usage(_usage_db(None), "missing", "claude-sonnet-4-5")
+
+        assert (usage.used_tokens, usage.limit_tokens) == (0, 200000)
+
+
+class TestContextUsageFromSession:
+    """Tests for context_usage_from_session."""
+
+    def test_reads_loaded_session(self):
+        """Test usage is built from the session row without queries."""
+        session = SimpleNamespace(
+            model="claude-sonnet-4-5",
+            last_input_tokens=150000,
+            usage_input_tokens=400000,
+            usage_output_tokens=9000,
+            context_limit_tokens=None,
+        )
+
+        usage = context_usage_from_session(session)
+
+        assert (usage.used_tokens, usage.limit_tokens) == (150000, 200000)
+        assert "WARNING:" in usage.warning
+        assert usage.cumulative_input_tokens == 400000
+
 
 class TestCheckContextBeforeRequest:
     """Tests for check_context_before_request."""
@@ -37,6 +37,8 @@ class TestCachingBenchmark:
         """Mock settings."""
         with patch("app.services.response_cache.settings") as mock:
             mock.agent_hub_redis_url = "redis://localhost:6379/0"
+            mock.response_cache_l1_enabled = False
+            mock.semantic_cache_enabled = False
             yield mock
 
     def test_benchmark_simulation_without_caching(self):
@@ -284,6 +286,8 @@ class TestResponseCachingHits:
         """Mock settings."""
         with patch("app.services.response_cache.settings") as mock:
             mock.agent_hub_redis_url = "redis://localhost:6379/0"
+            mock.response_cache_l1_enabled = False
+            mock.semantic_cache_enabled = False
             yield mock
 
     @pytest.mark.asyncio
@@ -0,0 +1,208 @@
+"""Tests for hourly cost rollups."""
+
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.cost_rollups import (
+    CostFilters,
+    RawRange,
+    aggregate_costs,
+    plan_ranges,
+    refresh_cost_rollups,
+)
+
+
+def _at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2026, 10, 17, hour, minute, tzinfo=UTC)
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def _scalar(value) -> MagicMock:
+    result = MagicMock()
+    result.scalar.return_value = value
+    return result
+
+
+def _rows(*rows) -> MagicMock:
+    result = MagicMock()
+    result.all.return_value = [SimpleNamespace(**row) for row in rows]
+    return result
+
+
+def _row(group_key, input_tokens, output_tokens, total_cost, request_count) -> dict:
+    return {
+        "group_key": group_key,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_cost": total_cost,
+        "request_count": request_count,
+    }
+
+
+@pytest.fixture
+def rollup_settings():
+    """Rollups enabled, hours closed five minutes after they end."""
+    with patch("app.services.cost_rollups.settings") as mock_settings:
+        mock_settings.cost_rollups_enabled = True
+        mock_settings.cost_rollup_grace_seconds = 300
+        mock_settings.cost_rollup_lookback_hours = 1
+        yield mock_settings
+
+
+class TestPlanRanges:
+    """Tests for splitting a time range between rollups and cost_logs."""
+
+    def test_no_rollups_reads_raw(self):
+        """Without rollups the whole range comes from cost_logs."""
+        rolled, raw = plan_ranges(_at(1), _at(5), None)
+
+        assert rolled is None
+        assert raw == [RawRange(_at(1), _at(5), True)]
+
+    def test_unbounded_range(self):
+        """Everything before the boundary is rolled; the tail is raw."""
+        rolled, raw = plan_ranges(None, None, _at(10))
+
+        assert rolled == (None, _at(10))
+        assert raw == [RawRange(_at(10), None, True)]
+
+    def test_partial_hours_at_edges_are_raw(self):
+        """Hour fractions at the start and end of the range come from cost_logs."""
+        rolled, raw = plan_ranges(_at(1, 30), _at(5, 15), _at(10))
+
+        assert rolled == (_at(2), _at(5))
+        assert raw == [RawRange(_at(1, 30), _at(2), False), RawRange(_at(5), _at(5, 15), True)]
+
+    def test_range_within_one_hour_is_raw(self):
+        """A range without a whole rolled hour is read from cost_logs."""
+        rolled, raw = plan_ranges(_at(1, 10), _at(1, 50), _at(10))
+
+        assert rolled is None
+        assert raw == [RawRange(_at(1, 10), _at(1, 50), True)]
+
+    def test_naive_dates_are_utc(self):
+        """Naive query dates are compared as UTC."""
+        rolled, _ = plan_ranges(datetime(2026, 10, 17, 1), None, _at(10))
+
+        assert rolled == (_at(1), _at(10))
+
+
+class TestAggregateCosts:
+    """Tests for answering cost analytics from rollups plus the raw tail."""
+
+    async def test_merges_rollups_and_tail(self, rollup_settings):
+        """Rolled hours and the current hour are summed per group."""
+        db = MagicMock()
+        db.execute = AsyncMock(
+            side_effect=[
+                _scalar(_at(9)),
+                _rows(_row("p1", 100, 50, 1.0, 4), _row("p2", 10, 5, 0.1, 1)),
+                _rows(_row("p1", 20, 10, 0.5, 2)),
+            ]
+        )
+
+        totals = await aggregate_costs(db, "project_id", CostFilters(agent_slug="coder"))
+
+        assert (totals["p1"].total_tokens, totals["p1"].request_count) == (180, 6)
+        assert totals["p1"].cost_usd == pytest.approx(1.5)
+        assert totals["p2"].request_count == 1
+        rollup_sql, raw_sql = (_sql(call.args[0]) for call in db.execute.await_args_list[1:])
+        assert "FROM cost_rollups" in rollup_sql
+        assert "cost_logs" not in rollup_sql
+        assert "cost_rollups.bucket <" in rollup_sql
+        assert "cost_rollups.agent_slug =" in rollup_sql
+        assert "cost_logs.created_at >=" in raw_sql
+        assert "coalesce(sessions.agent_slug" in raw_sql
+
+    async def test_without_rollups_reads_cost_logs(self, rollup_settings):
+        """Before the first refresh everything comes from cost_logs."""
+        db = MagicMock()
+        db.execute = AsyncMock(side_effect=[_scalar(None), _rows(_row(None, 7, 3, 0.2, 2))])
+
+        totals = await aggregate_costs(db, None, CostFilters())
+
+        assert list(totals) == [None]
+        assert totals[None].total_tokens == 10
+        assert "WHERE" not in _sql(db.execute.await_args.args[0])
+
+    async def test_disabled_skips_rollups(self, rollup_settings):
+        """With rollups disabled the boundary is not even looked up."""
+        rollup_settings.cost_rollups_enabled = False
+        db = MagicMock()
+        db.execute = AsyncMock(side_effect=[_rows()])
+
+        await aggregate_costs(db, "model", CostFilters(model="claude"))
+
+        assert db.execute.await_count == 1
+        assert "cost_rollups" not in _sql(db.execute.await_args.args[0])
+
+    async def test_date_groups_truncate_buckets(self, rollup_settings):
+        """Day groups truncate rollup buckets and cost log timestamps alike."""
+        day = datetime(2026, 10, 17, tzinfo=UTC)
+        db = MagicMock()
+        db.execute = AsyncMock(
+            side_effect=[
+                _scalar(_at(9)),
+                _rows(_row(day, 1, 1, 0.1, 1)),
+                _rows(_row(day, 2, 2, 0.2, 1)),
+            ]
+        )
+
+        totals = await aggregate_costs(db, "day", CostFilters())
+
+        assert totals[day].request_count == 2
+        rollup_sql, raw_sql = (_sql(call.args[0]) for call in db.execute.await_args_list[1:])
+        assert "date_trunc(%(date_trunc_1)s::VARCHAR, cost_rollups.bucket)" in rollup_sql
+        assert "date_trunc(%(date_trunc_1)s::VARCHAR, cost_logs.created_at)" in raw_sql
+
+
+class TestRefreshCostRollups:
+    """Tests for the periodic rollup refresh."""
+
+    async def test_recomputes_closed_hours(self, rollup_settings):
+        """Closed hours since the newest bucket (less the lookback) are replaced."""
+        db = MagicMock()
+        db.execute = AsyncMock(side_effect=[_scalar(_at(6)), MagicMock(), MagicMock(rowcount=12)])
+        db.commit = AsyncMock()
+
+        written = await refresh_cost_rollups(db, now=_at(9, 3))
+
+        assert written == 12
+        delete_stmt, insert_stmt = (call.args[0] for call in db.execute.await_args_list[1:])
+        assert delete_stmt.compile().params == {"bucket_1": _at(6), "bucket_2": _at(8)}
+        insert_sql = _sql(insert_stmt)
+        assert insert_sql.startswith("INSERT INTO cost_rollups (bucket, project_id")
+        assert "GROUP BY date_trunc(" in insert_sql
+        assert "coalesce(sessions.external_id" in insert_sql
+        db.commit.assert_awaited_once()
+
+    async def test_first_run_starts_at_oldest_cost_log(self, rollup_settings):
+        """Without rollups the refresh starts at the hour of the oldest cost log."""
+        db = MagicMock()
+        db.execute = AsyncMock(
+            side_effect=[_scalar(None), _scalar(_at(2, 40)), MagicMock(), MagicMock(rowcount=3)]
+        )
+        db.commit = AsyncMock()
+
+        await refresh_cost_rollups(db, now=_at(9, 30))
+
+        delete_stmt = db.execute.await_args_list[2].args[0]
+        assert delete_stmt.compile().params == {"bucket_1": _at(2), "bucket_2": _at(9)}
+
+    async def test_nothing_closed_is_noop(self, rollup_settings):
+        """Nothing is rewritten until another hour has closed."""
+        db = MagicMock()
+        db.execute = AsyncMock(side_effect=[_scalar(_at(8))])
+        db.commit = AsyncMock()
+        rollup_settings.cost_rollup_lookback_hours = 0
+
+        assert await refresh_cost_rollups(db, now=_at(9, 3)) == 0
+        assert db.execute.await_count == 1
+        db.commit.assert_not_called()
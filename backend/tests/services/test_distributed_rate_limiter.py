@@ -0,0 +1,215 @@
+"""Tests for the distributed (GCRA) rate limiter."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.distributed_rate_limiter import (
+    KEY_PREFIX,
+    REDIS_RETRY_SECONDS,
+    REDIS_TIMEOUT_SECONDS,
+    DistributedRateLimiter,
+    Limit,
+    RateLimitDecision,
+    api_key_limits,
+    client_limits,
+    provider_limits,
+    token_limits,
+)
+
+
+@pytest.fixture
+def mock_settings():
+    """Mock settings."""
+    with patch("app.services.distributed_rate_limiter.settings") as mock:
+        mock.agent_hub_redis_url = "redis://localhost:6379/0"
+        mock.rate_limit_provider_rpm = {"claude": 100}
+        mock.rate_limit_provider_tpm = {"claude": 50_000}
+        yield mock
+
+
+@pytest.fixture
+def local_limiter(mock_settings):
+    """Limiter whose Redis is down, so every check uses local buckets."""
+    limiter = DistributedRateLimiter()
+    with patch.object(limiter, "_get_client", side_effect=ConnectionError("redis down")):
+        yield limiter
+
+
+class TestDecision:
+    """Tests for rate limit decisions."""
+
+    def test_retry_after_header_rounds_up(self):
+        """Test Retry-After is whole seconds and never zero."""
+        assert RateLimitDecision(allowed=False, retry_after=0.2).retry_after_header == "1"
+        assert RateLimitDecision(allowed=False, retry_after=2.1).retry_after_header == "3"
+
+    def test_message_names_limit(self):
+        """Test the rejection message names the exceeded bucket."""
+        limit = Limit(key="provider:claude:tpm", limit=1000, unit="tokens", scope="claude")
+        decision = RateLimitDecision(allowed=False, retry_after=5, limit=limit)
+        assert decision.message == "Rate limit exceeded: 1000 claude tokens/minute. Retry after 5s"
+
+
+class TestLimitBuilders:
+    """Tests for bucket construction."""
+
+    def test_client_and_key_limits(self):
+        """Test RPM costs one request and TPM costs the token estimate."""
+        rpm, tpm = client_limits("c1", 60, 100_000, 1500)
+        assert (rpm.key, rpm.cost, rpm.unit) == ("client:c1:rpm", 1, "requests")
+        assert (tpm.key, tpm.cost, tpm.unit) == ("client:c1:tpm", 1500, "tokens")
+        assert [limit.key for limit in api_key_limits("h", 1, 1, 1)] == ["key:h:rpm", "key:h:tpm"]
+
+    def test_provider_limits_from_settings(self, mock_settings):
+        """Test only configured providers get buckets."""
+        assert [limit.key for limit in provider_limits("claude", 10)] == [
+            "provider:claude:rpm",
+            "provider:claude:tpm",
+        ]
+        assert provider_limits("gemini", 10) == []
+
+    def test_token_limits(self):
+        """Test token buckets are picked out and re-costed."""
+        limits = client_limits("c1", 60, 100_000, 1500)
+        assert [(limit.key, limit.cost) for limit in token_limits(limits, 42)] == [
+            ("client:c1:tpm", 42)
+        ]
+
+
+class TestLocalBuckets:
+    """Tests for the GCRA algorithm via the local fallback."""
+
+    async def test_rpm_burst_then_reject(self, local_limiter):
+        """Test a full minute's requests pass, then the next is rejected."""
+        limits = [Limit(key="k:rpm", limit=5)]
+        for _ in range(5):
+            assert (await local_limiter.acquire(limits)).allowed
+
+        decision = await local_limiter.acquire(limits)
+
+        assert not decision.allowed
+        assert decision.limit is limits[0]
+        assert 0 < decision.retry_after <= 12  # One emission interval (60s / 5)
+        stats = local_limiter.get_stats()
+        assert (stats.allowed, stats.rejected) == (5, 1)
+        assert stats.local_fallbacks == 6
+
+    async def test_tpm_cost(self, local_limiter):
+        """Test token buckets consume the request's token estimate."""
+        assert (await local_limiter.acquire([Limit(key="t", limit=1000, cost=600)])).allowed
+        assert not (await local_limiter.acquire([Limit(key="t", limit=1000, cost=600)])).allowed
+
+    async def test_oversized_request_clamped(self, local_limiter):
+        """Test a request larger than the whole bucket can still pass when it's full."""
+        assert (await local_limiter.acquire([Limit(key="t", limit=1000, cost=5000)])).allowed
+
+    async def test_rejection_consumes_nothing(self, local_limiter):
+        """Test a bucket isn't charged when another bucket rejects the request."""
+        rpm = Limit(key="rpm", limit=10)
+        full = Limit(key="full", limit=1)
+        await local_limiter.acquire([full])
+
+        assert not (await local_limiter.acquire([rpm, full])).allowed
+        for _ in range(10):
+            assert (await local_limiter.acquire([rpm])).allowed
+
+    async def test_refill(self, local_limiter):
+        """Test buckets refill with time."""
+        limits = [Limit(key="k", limit=1)]
+        await local_limiter.acquire(limits)
+        assert not (await local_limiter.acquire(limits)).allowed
+
+        with patch("app.services.distributed_rate_limiter.time.monotonic", return_value=1e9):
+            assert (await local_limiter.acquire(limits)).allowed
+
+    async def test_charge_is_unconditional(self, local_limiter):
+        """Test charges apply even past the limit and affect later checks."""
+        limits = [Limit(key="t", limit=100, cost=100)]
+        await local_limiter.charge(limits)
+        await local_limiter.charge(limits)
+
+        assert not (await local_limiter.acquire([Limit(key="t", limit=100)])).allowed
+
+    async def test_unlimited_skips_check(self, local_limiter):
+        """Test limits <= 0 mean unlimited."""
+        assert (await local_limiter.acquire([Limit(key="k", limit=0)])).allowed
+        assert local_limiter.get_stats().allowed == 0
+
+
+class TestRedisBuckets:
+    """Tests for the Redis path."""
+
+    @pytest.fixture
+    def mock_redis(self, mock_settings):
+        """Mock Redis client."""
+        with patch("app.services.distributed_rate_limiter.redis") as mock:
+            mock_client = AsyncMock()
+            mock.from_url.return_value = mock_client
+            yield mock_client
+
+    async def test_script_args(self, mock_redis):
+        """Test buckets are checked in one atomic script call."""
+        mock_redis.eval.return_value = [1, 0, 0]
+        limiter = DistributedRateLimiter()
+
+        decision = await limiter.acquire(client_limits("c1", 60, 6000, 300))
+
+        assert decision.allowed
+        args = mock_redis.eval.await_args[0]
+        assert args[1] == 2
+        assert args[2:4] == (f"{KEY_PREFIX}client:c1:rpm", f"{KEY_PREFIX}client:c1:tpm")
+        # (interval_ms, burst_ms, cost) per bucket, then the force flag
+        assert args[4:] == (1000.0, 60000.0, 1, 10.0, 60000.0, 300, "0")
+
+    async def test_rejection_maps_bucket(self, mock_redis):
+        """Test the script's rejecting index and delay are surfaced."""
+        mock_redis.eval.return_value = [0, 2, 1500]
+        limiter = DistributedRateLimiter()
+        limits = client_limits("c1", 60, 6000, 300)
+
+        decision = await limiter.acquire(limits)
+
+        assert not decision.allowed
+        assert decision.limit is limits[1]
+        assert decision.retry_after == 1.5
+        assert decision.retry_after_header == "2"
+
+    async def test_charge_forces(self, mock_redis):
+        """Test charges run the script with the force flag."""
+        mock_redis.eval.return_value = [1, 0, 0]
+        limiter = DistributedRateLimiter()
+
+        await limiter.charge([Limit(key="t", limit=100, cost=5, unit="tokens")])
+
+        assert mock_redis.eval.await_args[0][-1] == "1"
+
+    async def test_short_socket_timeouts(self, mock_redis):
+        """Test a hung Redis can only stall a check briefly."""
+        from app.services import distributed_rate_limiter
+
+        mock_redis.eval.return_value = [1, 0, 0]
+        await DistributedRateLimiter().acquire([Limit(key="r", limit=10)])
+
+        kwargs = distributed_rate_limiter.redis.from_url.call_args.kwargs
+        assert kwargs["socket_connect_timeout"] == REDIS_TIMEOUT_SECONDS
+        assert kwargs["socket_timeout"] == REDIS_TIMEOUT_SECONDS
+
+    async def test_failure_skips_redis_until_retry(self, mock_redis):
+        """Test a Redis error sends checks to local buckets for the retry window."""
+        mock_redis.eval.side_effect = ConnectionError("redis down")
+        limiter = DistributedRateLimiter()
+        limits = [Limit(key="r", limit=10)]
+
+        with patch("app.services.distributed_rate_limiter.time.monotonic", return_value=1000.0):
+            assert (await limiter.acquire(limits)).allowed
+            assert (await limiter.acquire(limits)).allowed
+        assert mock_redis.eval.await_count == 1
+        assert limiter.get_stats().local_fallbacks == 2
+
+        mock_redis.eval.side_effect = None
+        mock_redis.eval.return_value = [1, 0, 0]
+        later = 1000.0 + REDIS_RETRY_SECONDS + 1
+        with patch("app.services.distributed_rate_limiter.time.monotonic", return_value=later):
+            assert (await limiter.acquire(limits)).allowed
+        assert mock_redis.eval.await_count == 2
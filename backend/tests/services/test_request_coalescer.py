@@ -0,0 +1,261 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.adapters.base import CacheMetrics, CompletionResult, ToolCallResult
+from app.services.request_coalescer import (
+    CHANNEL_PREFIX,
+    RESULT_PREFIX,
+    RequestCoalescer,
+    _decode_result,
+    _encode_result,
+)
+
+
+def _result(content: str = "Hello") -> CompletionResult:
+    return CompletionResult(
+        content=content,
+        model="claude-sonnet-4-5",
+        provider="claude",
+        input_tokens=10,
+        output_tokens=5,
+        finish_reason="end_turn",
+    )
+
+
+@pytest.fixture
+def mock_settings():
+    """Mock settings."""
+    with patch("app.services.request_coalescer.settings") as mock:
+        mock.agent_hub_redis_url = "redis://localhost:6379/0"
+        mock.request_coalescing_lock_ttl = 5.0
+        mock.request_coalescing_wait_timeout = 5.0
+        yield mock
+
+
+class TestResultEncoding:
+    """Tests for cross-worker result serialisation."""
+
+    def test_round_trip(self):
+        """Test results survive fan-out serialisation."""
+        result = _result()
+        result.cache_metrics = CacheMetrics(cache_read_input_tokens=7)
+        result.tool_calls = [ToolCallResult(id="t1", name="search", input={"q": "x"})]
+        result.raw_response = object()
+
+        decoded = _decode_result(_encode_result(result))
+
+        assert decoded.content == "Hello"
+        assert decoded.cache_metrics.cache_read_input_tokens == 7
+        assert decoded.tool_calls[0].input == {"q": "x"}
+        assert decoded.raw_response is None
+
+
+class TestInProcessCoalescing:
+    """Tests for coalescing within one worker."""
+
+    def test_make_key_includes_params(self):
+        """Test extra parameters split otherwise identical keys."""
+        base = "agent-hub:response:abc"
+        assert RequestCoalescer.make_key(base) == base
+        assert RequestCoalescer.make_key(base, thinking_level="high") != RequestCoalescer.make_key(
+            base, thinking_level=None
+        )
+        assert RequestCoalescer.make_key(base, a=1, b=2) == RequestCoalescer.make_key(
+            base, b=2, a=1
+        )
+
+    async def test_concurrent_callers_share_one_call(self, mock_settings):
+        """Test N identical concurrent requests make one provider call."""
+        coalescer = RequestCoalescer(distributed=False)
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return _result()
+
+        fn = AsyncMock(side_effect=call)
+        tasks = [asyncio.create_task(coalescer.run("k", fn)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        outcomes = await asyncio.gather(*tasks)
+
+        assert fn.await_count == 1
+        assert [coalesced for _, coalesced in outcomes].count(False) == 1
+        assert all(result.content == "Hello" for result, _ in outcomes)
+        stats = coalescer.get_stats()
+        assert stats.leaders == 1
+        assert stats.coalesced_local == 4
+        assert coalescer.inflight == 0
+
+    async def test_followers_get_copies(self, mock_settings):
+        """Test followers can't mutate the leader's result."""
+        coalescer = RequestCoalescer(distributed=False)
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return _result()
+
+        leader = asyncio.create_task(coalescer.run("k", call))
+        follower = asyncio.create_task(coalescer.run("k", call))
+        await asyncio.sleep(0)
+        release.set()
+        (leader_result, _), (follower_result, _) = await asyncio.gather(leader, follower)
+
+        assert follower_result is not leader_result
+        assert follower_result == leader_result
+
+    async def test_leader_error_propagates(self, mock_settings):
+        """Test followers see the leader's exception."""
+        coalescer = RequestCoalescer(distributed=False)
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            raise RuntimeError("provider down")
+
+        tasks = [asyncio.create_task(coalescer.run("k", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(o, RuntimeError) for o in outcomes)
+        assert coalescer.inflight == 0
+
+    async def test_cancelled_leader_hands_over(self, mock_settings):
+        """Test a follower executes itself when the leader is cancelled."""
+        coalescer = RequestCoalescer(distributed=False)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await asyncio.sleep(10)
+            return _result("second")
+
+        leader = asyncio.create_task(coalescer.run("k", call))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(coalescer.run("k", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        result, coalesced = await follower
+        assert result.content == "second"
+        assert coalesced is False
+        assert calls == 2
+
+    async def test_different_keys_not_coalesced(self, mock_settings):
+        """Test different keys execute independently."""
+        coalescer = RequestCoalescer(distributed=False)
+        fn = AsyncMock(return_value=_result())
+
+        await asyncio.gather(coalescer.run("a", fn), coalescer.run("b", fn))
+
+        assert fn.await_count == 2
+        assert coalescer.get_stats().coalesced == 0
+
+
+class TestDistributedCoalescing:
+    """Tests for coalescing across workers via Redis."""
+
+    @pytest.fixture
+    def mock_redis(self):
+        """Mock Redis client."""
+        with patch("app.services.request_coalescer.redis") as mock:
+            mock_client = AsyncMock()
+            pipe = MagicMock()
+            pipe.execute = AsyncMock(return_value=[None, 1])
+            mock_client.pipeline = MagicMock(return_value=pipe)
+            pubsub = AsyncMock()
+            mock_client.pubsub = MagicMock(return_value=pubsub)
+            mock.from_url.return_value = mock_client
+            yield mock_client
+
+    async def test_leader_publishes_and_releases(self, mock_redis, mock_settings):
+        """Test the lock holder fans its result out and releases the lock."""
+        mock_redis.set.return_value = True
+        coalescer = RequestCoalescer()
+
+        result, coalesced = await coalescer.run("k", AsyncMock(return_value=_result()))
+
+        assert result.content == "Hello"
+        assert coalesced is False
+        pipe = mock_redis.pipeline.return_value
+        pipe.setex.assert_called_once()
+        assert pipe.setex.call_args[0][0] == f"{RESULT_PREFIX}k"
+        assert pipe.publish.call_args[0][0] == f"{CHANNEL_PREFIX}k"
+        mock_redis.eval.assert_awaited_once()
+
+    async def test_leader_error_releases_lock(self, mock_redis, mock_settings):
+        """Test a failed leader releases the lock without publishing."""
+        mock_redis.set.return_value = True
+        coalescer = RequestCoalescer()
+
+        with pytest.raises(RuntimeError):
+            await coalescer.run("k", AsyncMock(side_effect=RuntimeError("boom")))
+
+        mock_redis.eval.assert_awaited_once()
+        mock_redis.pipeline.return_value.publish.assert_not_called()
+
+    async def test_follower_uses_published_result(self, mock_redis, mock_settings):
+        """Test a remote follower takes the leader's result without calling the provider."""
+        mock_redis.set.return_value = None  # Another worker holds the lock
+        pubsub = mock_redis.pubsub.return_value
+        pubsub.get_message.return_value = {
+            "type": "message",
+            "data": _encode_result(_result("from leader")),
+        }
+        coalescer = RequestCoalescer()
+        fn = AsyncMock(return_value=_result())
+
+        result, coalesced = await coalescer.run("k", fn)
+
+        assert result.content == "from leader"
+        assert coalesced is True
+        fn.assert_not_awaited()
+        assert coalescer.get_stats().coalesced_remote == 1
+
+    async def test_follower_reads_result_key(self, mock_redis, mock_settings):
+        """Test a follower that subscribed late reads the stored result."""
+        mock_redis.set.return_value = None
+        mock_redis.pipeline.return_value.execute.return_value = [
+            _encode_result(_result("stored")),
+            0,
+        ]
+        coalescer = RequestCoalescer()
+
+        result, coalesced = await coalescer.run("k", AsyncMock(return_value=_result()))
+
+        assert result.content == "stored"
+        assert coalesced is True
+
+    async def test_follower_runs_when_leader_gone(self, mock_redis, mock_settings):
+        """Test a follower executes itself when the lock vanishes without a result."""
+        mock_redis.set.return_value = None
+        mock_redis.pipeline.return_value.execute.return_value = [None, 0]
+        coalescer = RequestCoalescer()
+        fn = AsyncMock(return_value=_result("own"))
+
+        result, coalesced = await coalescer.run("k", fn)
+
+        assert result.content == "own"
+        assert coalesced is False
+        fn.assert_awaited_once()
+        assert coalescer.get_stats().remote_fallbacks == 1
+
+    async def test_redis_error_runs_uncoordinated(self, mock_redis, mock_settings):
+        """Test Redis failures fall back to executing directly."""
+        mock_redis.set.side_effect = ConnectionError("redis down")
+        coalescer = RequestCoalescer()
+        fn = AsyncMock(return_value=_result())
+
+        result, coalesced = await coalescer.run("k", fn)
+
+        assert result.content == "Hello"
+        assert coalesced is False
+        fn.assert_awaited_once()
@@ -0,0 +1,116 @@
+"""Tests for the batched request log writer."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.request_log_writer import RequestLogWriter
+
+
+def _row(endpoint: str = "/api/complete") -> dict:
+    return {"endpoint": endpoint, "method": "POST", "status_code": 200, "latency_ms": 3}
+
+
+@pytest.fixture
+async def writer():
+    """Writer with a recording batch sink instead of Postgres."""
+    log_writer = RequestLogWriter(batch_size=3, flush_interval=0.05, max_queue_size=5)
+    log_writer.batches = []
+
+    async def record(rows):
+        log_writer.batches.append(rows)
+
+    log_writer._write_batch = record
+    yield log_writer
+    await log_writer.shutdown()
+
+
+class TestRequestLogWriter:
+    """Tests for RequestLogWriter."""
+
+    async def test_enqueue_does_not_write_inline(self, writer):
+        """Rows are only written by the background flush."""
+        writer.enqueue(**_row())
+
+        assert writer.batches == []
+        assert writer.pending == 1
+
+    async def test_flushes_after_interval(self, writer):
+        """Pending rows are written once the interval elapses."""
+        writer.enqueue(**_row())
+        await asyncio.sleep(0.2)
+
+        assert len(writer.batches) == 1
+        assert writer.batches[0][0]["endpoint"] == "/api/complete"
+        assert "created_at" in writer.batches[0][0]
+        assert writer.stats.written == 1
+
+    async def test_full_batch_flushes_early(self, writer):
+        """Reaching batch_size triggers a flush before the interval."""
+        writer._flush_interval = 10.0
+        for _ in range(3):
+            writer.enqueue(**_row())
+        await asyncio.sleep(0.05)
+
+        assert [len(batch) for batch in writer.batches] == [3]
+
+    async def test_overflow_dropped_and_counted(self, writer):
+        """Rows beyond max_queue_size are dropped, not blocked on."""
+        writer._flush_interval = 10.0
+        writer._batch_size = 100
+        accepted = [writer.enqueue(**_row()) for _ in range(7)]
+
+        assert accepted == [True] * 5 + [False] * 2
+        assert writer.stats.dropped == 2
+        assert writer.pending == 5
+
+    async def test_shutdown_flushes_pending(self, writer):
+        """Shutdown writes everything still queued, in batch-sized inserts."""
+        writer._flush_interval = 10.0
+        writer._batch_size = 2
+        for i in range(3):
+            writer.enqueue(**_row(f"/e{i}"))
+        await asyncio.sleep(0.05)
+
+        await writer.shutdown()
+
+        assert writer.pending == 0
+        assert writer.stats.written == 3
+
+    async def test_failed_batch_counted(self, writer):
+        """A failing insert is counted and doesn't stop later batches."""
+        writer._write_batch = AsyncMock(side_effect=RuntimeError("db down"))
+        writer.enqueue(**_row())
+
+        assert await writer.flush() == 0
+        assert writer.stats.failed == 1
+        assert writer.pending == 0
+
+
+class TestAccessControlLogging:
+    """Tests for AccessControlMiddleware handing rows to the writer."""
+
+    def test_log_request_only_enqueues(self):
+        """_log_request queues the row without touching the database."""
+        from app.middleware.access_control import AccessControlMiddleware
+
+        middleware = AccessControlMiddleware(app=AsyncMock())
+        with (
+            patch("app.middleware.access_control.get_request_log_writer") as get_writer,
+            patch("app.db.get_db") as get_db,
+        ):
+            middleware._log_request(
+                client_id=None,
+                request_source="pytest",
+                endpoint="/api/complete",
+                method="POST",
+                status_code=401,
+                rejection_reason="authentication_failed",
+                latency_ms=1,
+            )
+
+        get_db.assert_not_called()
+        fields = get_writer.return_value.enqueue.call_args.kwargs
+        assert fields["rejection_reason"] == "authentication_failed"
+        assert fields["tool_type"] == "api"
@@ -1,6 +1,7 @@
 """Tests for request queue service."""
 
 import asyncio
+import time
 from unittest.mock import MagicMock
 
 import pytest
@@ -8,6 +9,7 @@ import pytest
 from app.services.health_prober import HealthEvent, ProviderHealth, ProviderState
 from app.services.request_queue import (
     QueueFullError,
+    RequestPriority,
     RequestQueue,
     RequestQueueConfig,
     RequestQueueStats,
@@ -250,6 +252,165 @@ class TestRequestQueue:
         await queue.stop_processing()
 
 
+class TestFairAdmission:
+    """Tests for weighted-fair ordering and concurrency limits."""
+
+    @pytest.fixture
+    def queue(self):
+        """Queue that runs one request at a time per provider."""
+        config = RequestQueueConfig(
+            max_queue_size=20,
+            request_timeout_seconds=5.0,
+            retry_interval_seconds=0.1,
+            max_concurrency_per_provider=1,
+            max_client_fraction=1.0,
+        )
+        return RequestQueue(config=config)
+
+    async def _run(self, queue, requests):
+        """Enqueue (client, priority) pairs and return the execution order."""
+        order = []
+
+        def make_request(label):
+            async def request_fn():
+                order.append(label)
+
+            return request_fn
+
+        tasks = [
+            asyncio.create_task(
+                queue.enqueue(make_request(f"{client}-{i}"), client_id=client, priority=priority)
+            )
+            for i, (client, priority) in enumerate(requests)
+        ]
+        await asyncio.sleep(0)
+        queue.start_processing()
+        await asyncio.gather(*tasks)
+        return order
+
+    @pytest.mark.asyncio
+    async def test_noisy_client_does_not_starve_others(self, queue):
+        """A late client is served alongside, not after, a backlogged one."""
+        requests = [("noisy", RequestPriority.BATCH)] * 6 + [("quiet", RequestPriority.BATCH)]
+
+        order = await self._run(queue, requests)
+
+        assert order.index("quiet-6") <= 3
+
+    @pytest.mark.asyncio
+    async def test_priority_weights(self, queue):
+        """Interactive flows get their weight's share ahead of background ones."""
+        queue.config.priority_weights = {
+            RequestPriority.INTERACTIVE: 2,
+            RequestPriority.BATCH: 1,
+            RequestPriority.BACKGROUND: 1,
+        }
+        requests = [("bg", RequestPriority.BACKGROUND)] * 3 + [
+            ("ui", RequestPriority.INTERACTIVE)
+        ] * 3
+
+        order = await self._run(queue, requests)
+
+        assert order == ["bg-0", "ui-3", "ui-4", "bg-1", "ui-5", "bg-2"]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_per_provider(self, queue):
+        """Each provider runs up to its limit concurrently, independently."""
+        running = {"claude": 0, "gemini": 0}
+        peak = {"claude": 0, "gemini": 0}
+
+        def make_request(provider):
+            async def request_fn():
+                running[provider] += 1
+                peak[provider] = max(peak[provider], running[provider])
+                await asyncio.sleep(0.01)
+                running[provider] -= 1
+
+            return request_fn
+
+        queue.config.max_concurrency_per_provider = 2
+        tasks = [
+            asyncio.create_task(queue.enqueue(make_request(p), provider=p))
+            for p in ["claude", "gemini"] * 3
+        ]
+        await asyncio.sleep(0)
+        queue.start_processing()
+        await asyncio.gather(*tasks)
+
+        assert peak == {"claude": 2, "gemini": 2}
+        assert queue.get_stats().in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_release_slots(self, queue):
+        """A timed-out entry frees its slot at once and is never executed."""
+        executed = []
+
+        async def request_fn():
+            executed.append(True)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await queue.enqueue(request_fn, timeout=0.01)
+        assert queue.get_queue_size() == 0
+
+        queue.start_processing()
+        await queue.enqueue(request_fn)
+        assert len(executed) == 1
+
+    @pytest.mark.asyncio
+    async def test_client_share_limit(self, queue):
+        """An identified client cannot take more than its share of the queue."""
+        queue.config.max_client_fraction = 0.1
+
+        async def request_fn():
+            return None
+
+        tasks = [
+            asyncio.create_task(queue.enqueue(request_fn, client_id="noisy")) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        with pytest.raises(QueueFullError):
+            await queue.enqueue(request_fn, client_id="noisy")
+        # Other clients still get in
+        tasks.append(asyncio.create_task(queue.enqueue(request_fn, client_id="quiet")))
+        await asyncio.sleep(0)
+        queue.start_processing()
+        await asyncio.gather(*tasks)
+
+    def test_estimated_wait_uses_service_rate(self, queue):
+        """Wait estimates come from measured completions once available."""
+        queue._pending = 10
+        queue._priority_pending = {RequestPriority.INTERACTIVE: 2, RequestPriority.BATCH: 8}
+        assert queue.get_estimated_wait_time() == pytest.approx(1.0)
+
+        now = time.monotonic()
+        queue._completions.extend(now - 10 + i for i in range(10))
+
+        assert queue.get_estimated_wait_time() == pytest.approx(10.0, rel=1e-3)
+        # Interactive work gets 8/10 of one request per second
+        assert queue.get_estimated_wait_time(RequestPriority.INTERACTIVE) == pytest.approx(
+            2.5, rel=1e-3
+        )
+
+    @pytest.mark.asyncio
+    async def test_queue_position(self, queue):
+        """Position accounts for other flows served in the same rounds."""
+
+        async def request_fn():
+            return None
+
+        tasks = [asyncio.create_task(queue.enqueue(request_fn, client_id="a")) for _ in range(3)]
+        tasks.append(asyncio.create_task(queue.enqueue(request_fn, client_id="b")))
+        await asyncio.sleep(0)
+
+        assert queue.get_queue_position("req-4") == 2
+        assert queue.get_queue_position("req-3") == 4
+        assert queue.get_queue_position("missing") is None
+
+        queue.start_processing()
+        await asyncio.gather(*tasks)
+
+
 class TestGlobalQueue:
     """Tests for global queue functions."""
 
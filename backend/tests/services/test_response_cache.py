@@ -1,13 +1,21 @@
 """Tests for response cache service."""
 
+import fnmatch
 import json
-from unittest.mock import AsyncMock, patch
+from typing import ClassVar
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from app.services.response_cache import (
+    CACHE_PREFIX,
+    FALLBACK_PREFIX,
+    INDEX_PREFIX,
+    INVALIDATE_ALL,
+    INVALIDATION_CHANNEL,
     CachedResponse,
     CacheStats,
+    L1Cache,
     ResponseCache,
     get_response_cache,
 )
@@ -90,6 +98,8 @@ class TestResponseCache:
         """Mock settings."""
         with patch("app.services.response_cache.settings") as mock:
             mock.agent_hub_redis_url = "redis://localhost:6379/0"
+            mock.response_cache_l1_enabled = False
+            mock.semantic_cache_enabled = False
             yield mock
 
     def test_generate_cache_key_deterministic(self, mock_settings):
@@ -166,7 +176,9 @@ class TestResponseCache:
     @pytest.mark.asyncio
     async def test_set_caches_response(self, mock_redis, mock_settings):
         """Test set stores response in Redis (primary + fallback)."""
-        mock_redis.setex = AsyncMock()
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        mock_redis.pipeline = MagicMock(return_value=pipe)
 
         cache = ResponseCache()
         key = await cache.set(
@@ -181,7 +193,10 @@ class TestResponseCache:
 
         assert key.startswith("agent-hub:response:")
         # Called twice: once for primary cache, once for fallback cache
-        assert mock_redis.setex.call_count == 2
+        assert pipe.setex.call_count == 2
+        # One round trip, one serialisation shared by both keys
+        pipe.execute.assert_awaited_once()
+        assert pipe.setex.call_args_list[0][0][2] is pipe.setex.call_args_list[1][0][2]
 
     @pytest.mark.asyncio
     async def test_invalidate(self, mock_redis, mock_settings):
@@ -196,14 +211,25 @@ class TestResponseCache:
 
     @pytest.mark.asyncio
     async def test_clear_all(self, mock_redis, mock_settings):
-        """Test clearing all cache entries."""
-        mock_redis.keys.return_value = ["key1", "key2", "key3"]
-        mock_redis.delete.return_value = 3
+        """Test clearing all cache entries scans instead of using KEYS."""
+        pages = {
+            f"{CACHE_PREFIX}*": ["agent-hub:response:a", "agent-hub:response:b"],
+            f"{FALLBACK_PREFIX}*": ["agent-hub:fallback:a"],
+            f"{INDEX_PREFIX}*": [],
+        }
+
+        async def scan_iter(match, count):
+            for key in pages[match]:
+                yield key
+
+        mock_redis.scan_iter = scan_iter
+        mock_redis.unlink.side_effect = lambda *keys: len(keys)
 
         cache = ResponseCache()
         count = await cache.clear_all()
 
         assert count == 3
+        mock_redis.keys.assert_not_called()
 
     def test_get_stats(self, mock_settings):
         """Test getting cache statistics."""
@@ -236,6 +262,8 @@ class TestGetResponseCache:
         """Test singleton behavior."""
         with patch("app.services.response_cache.settings") as mock_settings:
             mock_settings.agent_hub_redis_url = "redis://localhost:6379/0"
+            mock_settings.response_cache_l1_enabled = False
+            mock_settings.semantic_cache_enabled = False
             # Reset singleton
             import app.services.response_cache as module
 
@@ -244,3 +272,288 @@ class TestGetResponseCache:
             cache1 = get_response_cache()
             cache2 = get_response_cache()
             assert cache1 is cache2
+
+
+class _FakeRedis:
+    """Dict-backed Redis stand-in supporting the pipelined calls the cache uses."""
+
+    def __init__(self):
+        self.storage: dict[str, tuple[str, int]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.round_trips = 0
+        self.published: list[tuple[str, str]] = []
+
+    def pipeline(self, transaction: bool = True):
+        fake = self
+        ops: list = []
+
+        class _Pipe:
+            def get(self, key):
+                ops.append(lambda: fake.storage.get(key, (None, 0))[0])
+
+            def pttl(self, key):
+                ops.append(lambda: fake.storage[key][1] * 1000 if key in fake.storage else -2)
+
+            def setex(self, key, ttl, value):
+                ops.append(lambda: fake.storage.__setitem__(key, (value, ttl)))
+
+            def zadd(self, key, mapping):
+                ops.append(lambda: fake.zsets.setdefault(key, {}).update(mapping))
+
+            def zremrangebyscore(self, key, low, high):
+                def op():
+                    zset = fake.zsets.get(key, {})
+                    for member in [m for m, score in zset.items() if score <= high]:
+                        del zset[member]
+
+                ops.append(op)
+
+            def expire(self, key, ttl):
+                ops.append(lambda: None)
+
+            async def execute(self):
+                fake.round_trips += 1
+                return [op() for op in ops]
+
+        return _Pipe()
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self.storage.get(key, (None, 0))[0]
+
+    async def delete(self, *keys):
+        self.round_trips += 1
+        return sum(self.storage.pop(key, None) is not None for key in keys)
+
+    async def publish(self, channel, data):
+        self.published.append((channel, data))
+        return 1
+
+    async def unlink(self, *keys):
+        self.round_trips += 1
+        return sum(
+            (self.storage.pop(key, None) is not None) or (self.zsets.pop(key, None) is not None)
+            for key in keys
+        )
+
+    async def scan_iter(self, match, count):
+        for key in [*self.storage, *self.zsets]:
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def zscan(self, key, cursor, count):
+        # One member per page to exercise cursor handling
+        members = sorted(self.zsets.get(key, {}).items())
+        next_cursor = cursor + 1 if cursor + 1 < len(members) else 0
+        return next_cursor, members[cursor : cursor + 1]
+
+
+class TestL1Cache:
+    """Tests for the in-process L1 LRU."""
+
+    def _response(self, key: str = "k") -> CachedResponse:
+        return CachedResponse(
+            content="x",
+            model="m",
+            provider="p",
+            input_tokens=1,
+            output_tokens=1,
+            finish_reason=None,
+            cached_at="2026-01-06T00:00:00",
+            cache_key=key,
+        )
+
+    def test_byte_bound_evicts_lru(self):
+        """Entries beyond the byte budget evict least recently used first."""
+        l1 = L1Cache(max_bytes=100, ttl=60)
+        l1.put("a", self._response("a"), 40, 60)
+        l1.put("b", self._response("b"), 40, 60)
+        l1.get("a")  # a is now most recent
+        l1.put("c", self._response("c"), 40, 60)
+
+        assert l1.get("b") is None
+        assert l1.get("a") is not None
+        assert l1.size_bytes == 80
+        assert l1.evictions == 1
+
+    def test_ttl_expiry(self):
+        """Entries expire after min(entry ttl, L1 ttl)."""
+        l1 = L1Cache(max_bytes=100, ttl=60)
+        l1.put("a", self._response(), 10, 0)
+
+        assert l1.get("a") is None
+        assert l1.size_bytes == 0
+
+    def test_oversized_entry_not_stored(self):
+        """A single payload larger than the budget is skipped."""
+        l1 = L1Cache(max_bytes=10, ttl=60)
+        l1.put("a", self._response(), 11, 60)
+
+        assert len(l1) == 0
+
+    def test_get_returns_copy(self):
+        """Mutating a returned response doesn't alter the cached entry."""
+        l1 = L1Cache(max_bytes=100, ttl=60)
+        l1.put("a", self._response(), 10, 60)
+        l1.get("a").is_fallback = True  # type: ignore[union-attr]
+
+        assert l1.get("a").is_fallback is False  # type: ignore[union-attr]
+
+
+class TestResponseCacheL1:
+    """Tests for ResponseCache with the L1 tier enabled."""
+
+    MESSAGES: ClassVar[list[dict[str, str]]] = [{"role": "user", "content": "Hello"}]
+
+    @pytest.fixture
+    def fake_redis(self):
+        return _FakeRedis()
+
+    @pytest.fixture
+    def cache(self, fake_redis):
+        cache = ResponseCache(l1_max_bytes=1024 * 1024, l1_ttl=60)
+        cache._client = fake_redis
+        with patch.object(ResponseCache, "_ensure_subscriber"):
+            yield cache
+
+    async def _set(self, cache):
+        return await cache.set(
+            model="claude-sonnet-4-5",
+            messages=self.MESSAGES,
+            temperature=1.0,
+            content="Response",
+            provider="claude",
+            input_tokens=10,
+            output_tokens=5,
+        )
+
+    async def _get(self, cache):
+        return await cache.get(model="claude-sonnet-4-5", messages=self.MESSAGES, temperature=1.0)
+
+    async def test_set_then_get_served_from_l1(self, cache, fake_redis):
+        """A response cached by this worker is served without a Redis round trip."""
+        await self._set(cache)
+        trips = fake_redis.round_trips
+
+        result = await self._get(cache)
+
+        assert result is not None
+        assert result.content == "Response"
+        assert fake_redis.round_trips == trips
+        assert cache.get_stats().l1_hits == 1
+
+    async def test_l2_hit_populates_l1(self, cache, fake_redis):
+        """A Redis hit is promoted into L1 for the next request."""
+        await self._set(cache)
+        cache._l1.clear()
+
+        first = await self._get(cache)
+        second = await self._get(cache)
+
+        stats = cache.get_stats()
+        assert first is not None and second is not None
+        assert (stats.l2_hits, stats.l1_hits, stats.hits) == (1, 1, 2)
+
+    async def test_invalidate_drops_l1_and_publishes(self, cache, fake_redis):
+        """invalidate() clears the local entry and notifies other workers."""
+        key = await self._set(cache)
+
+        assert await cache.invalidate(key) is True
+        assert await self._get(cache) is None
+        assert fake_redis.published == [(INVALIDATION_CHANNEL, key)]
+
+    async def test_remote_invalidation_applies_to_l1(self, cache, fake_redis):
+        """Invalidations published by another worker drop local L1 entries."""
+        key = await self._set(cache)
+        fake_redis.storage.clear()  # Another worker deleted the Redis keys
+
+        cache._apply_invalidation(key)
+
+        assert await self._get(cache) is None
+
+    async def test_remote_clear_all(self, cache, fake_redis):
+        """The clear-all message empties L1."""
+        await self._set(cache)
+
+        cache._apply_invalidation(INVALIDATE_ALL)
+
+        assert cache.get_l1_info() == {"entries": 0, "bytes": 0}
+
+
+class TestResponseCachePurge:
+    """Tests for indexed, targeted purges."""
+
+    @pytest.fixture
+    def fake_redis(self):
+        return _FakeRedis()
+
+    @pytest.fixture
+    def cache(self, fake_redis):
+        cache = ResponseCache(l1_max_bytes=0)
+        cache._client = fake_redis
+        yield cache
+
+    async def _set(self, cache, content, model="claude-sonnet-4-5", agent=None, project=None):
+        return await cache.set(
+            model=model,
+            messages=[{"role": "user", "content": content}],
+            temperature=1.0,
+            content=content,
+            provider="claude",
+            input_tokens=1,
+            output_tokens=1,
+            agent_slug=agent,
+            project_id=project,
+        )
+
+    async def test_set_indexes_by_model_agent_project(self, cache, fake_redis):
+        """Entries are indexed under each dimension they were written with."""
+        key = await self._set(cache, "a", agent="coder", project="p1")
+
+        assert key in fake_redis.zsets[f"{INDEX_PREFIX}model:claude-sonnet-4-5"]
+        assert key in fake_redis.zsets[f"{INDEX_PREFIX}agent:coder"]
+        assert key in fake_redis.zsets[f"{INDEX_PREFIX}project:p1"]
+
+    async def test_set_trims_expired_index_members(self, cache, fake_redis):
+        """Members whose fallback keys expired are trimmed on write."""
+        index_key = f"{INDEX_PREFIX}model:claude-sonnet-4-5"
+        fake_redis.zsets[index_key] = {"agent-hub:response:old": 0.0}
+
+        await self._set(cache, "a")
+
+        assert "agent-hub:response:old" not in fake_redis.zsets[index_key]
+
+    async def test_purge_by_agent(self, cache, fake_redis):
+        """Purging an agent drops its primary and fallback keys only."""
+        keys = [await self._set(cache, c, agent="coder") for c in ("a", "b", "c")]
+        other = await self._set(cache, "d", agent="reviewer")
+
+        deleted = await cache.purge(agent_slug="coder")
+
+        assert deleted == 6
+        for key in keys:
+            assert key not in fake_redis.storage
+            assert key.replace(CACHE_PREFIX, FALLBACK_PREFIX) not in fake_redis.storage
+        assert other in fake_redis.storage
+        assert f"{INDEX_PREFIX}agent:coder" not in fake_redis.zsets
+
+    async def test_purge_by_model(self, cache, fake_redis):
+        """Purging a model leaves other models' entries."""
+        await self._set(cache, "a", model="m1")
+        kept = await self._set(cache, "a", model="m2")
+
+        assert await cache.purge(model="m1") == 2
+        assert kept in fake_redis.storage
+
+    async def test_purge_without_selector_clears_all(self, cache, fake_redis):
+        """No selector clears primary, fallback and index keys."""
+        await self._set(cache, "a", agent="coder", project="p1")
+
+        assert await cache.purge() == 2
+        assert fake_redis.storage == {}
+        assert fake_redis.zsets == {}
+
+    async def test_purge_rejects_multiple_selectors(self, cache):
+        """Only one dimension can be purged at a time."""
+        with pytest.raises(ValueError):
+            await cache.purge(model="m1", agent_slug="coder")
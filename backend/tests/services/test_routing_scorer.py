@@ -0,0 +1,115 @@
+"""Tests for latency- and load-aware agent routing."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.services.routing_scorer import RoutingScorer
+
+
+@pytest.fixture
+def routing_settings():
+    """Routing settings with no in-flight cap."""
+    with patch("app.services.routing_scorer.settings") as mock_settings:
+        mock_settings.routing_policy = "strict"
+        mock_settings.routing_ewma_alpha = 0.5
+        mock_settings.routing_default_latency_ms = 1000.0
+        mock_settings.routing_max_in_flight = 0
+        mock_settings.routing_decision_log_size = 10
+        yield mock_settings
+
+
+def _observe(scorer: RoutingScorer, model: str, latency_ms: float, failed: bool = False) -> None:
+    with patch("app.services.routing_scorer.time.monotonic", side_effect=[0.0, latency_ms / 1000]):
+        started = scorer.start(model)
+        scorer.finish(model, started, failed)
+
+
+class TestScoring:
+    """Tests for health tracking and scores."""
+
+    def test_ewma_latency_and_errors(self, routing_settings):
+        """Latency averages successes only; errors raise the error rate."""
+        scorer = RoutingScorer()
+        _observe(scorer, "a", 100.0)
+        _observe(scorer, "a", 300.0)
+        _observe(scorer, "a", 5.0, failed=True)
+
+        health = scorer.get_health()["a"]
+        assert health.latency_ms == pytest.approx(200.0)
+        assert health.error_rate == pytest.approx(0.5)
+        assert (health.requests, health.in_flight) == (3, 0)
+        assert scorer.score("a") == pytest.approx(400.0)
+
+    def test_in_flight_raises_score(self, routing_settings):
+        """Queued work makes a model look slower; abandoned requests are not outcomes."""
+        scorer = RoutingScorer()
+        started = scorer.start("a")
+        assert scorer.score("a") == 2000.0
+
+        scorer.finish("a", started, None)
+        assert scorer.get_health()["a"].requests == 0
+        assert scorer.score("a") == 1000.0
+
+
+class TestPlan:
+    """Tests for candidate ordering."""
+
+    def test_strict_keeps_order(self, routing_settings):
+        """Strict keeps the configured order even when a fallback is faster."""
+        scorer = RoutingScorer()
+        _observe(scorer, "fallback", 10.0)
+
+        decision = scorer.plan("coder", ["primary", "fallback"])
+
+        assert decision.order == ["primary", "fallback"]
+        assert decision.policy == "strict"
+
+    def test_least_latency(self, routing_settings):
+        """least_latency puts the best score first."""
+        scorer = RoutingScorer()
+        _observe(scorer, "primary", 800.0)
+        _observe(scorer, "fallback", 10.0)
+
+        decision = scorer.plan("coder", ["primary", "fallback", "other"], policy="least_latency")
+
+        assert decision.order == ["fallback", "primary", "other"]
+
+    def test_p2c_picks_better_of_two(self, routing_settings):
+        """p2c compares two random candidates and leads with the better one."""
+        scorer = RoutingScorer()
+        _observe(scorer, "b", 10.0)
+        with patch("app.services.routing_scorer.random.sample", return_value=["a", "b"]):
+            decision = scorer.plan("coder", ["a", "b", "c"], policy="p2c")
+
+        assert decision.order == ["b", "a", "c"]
+
+    def test_demotes_open_circuits_and_busy_models(self, routing_settings):
+        """Unhealthy models move to the end instead of being dropped."""
+        routing_settings.routing_max_in_flight = 1
+        scorer = RoutingScorer()
+        scorer.start("busy")
+
+        decision = scorer.plan(
+            "coder",
+            ["broken", "busy", "ok"],
+            is_circuit_open=lambda model: model == "broken",
+        )
+
+        assert decision.order == ["ok", "broken", "busy"]
+        assert decision.demoted == {"broken": "circuit_open", "busy": "max_in_flight"}
+
+    def test_unknown_policy_falls_back_to_strict(self, routing_settings):
+        """A misconfigured policy does not break routing."""
+        decision = RoutingScorer().plan("coder", ["a", "b"], policy="fastest")
+
+        assert (decision.policy, decision.order) == ("strict", ["a", "b"])
+
+    def test_decision_log(self, routing_settings):
+        """Decisions are logged newest first and can be filtered by agent."""
+        scorer = RoutingScorer()
+        scorer.plan("coder", ["a"])
+        scorer.plan("planner", ["b"])
+
+        assert [d.agent_slug for d in scorer.get_decisions()] == ["planner", "coder"]
+        assert [d.order for d in scorer.get_decisions(agent_slug="coder")] == [["a"]]
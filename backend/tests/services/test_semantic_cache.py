@@ -0,0 +1,264 @@
+"""Tests for the semantic response cache tier."""
+
+from typing import ClassVar
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.services.response_cache import CachedResponse, ResponseCache
+from app.services.semantic_cache import (
+    FlatIndex,
+    HashingEmbedder,
+    SemanticCache,
+    normalize_prompt,
+)
+
+
+def _response(content: str = "Cached", key: str = "agent-hub:response:k") -> CachedResponse:
+    return CachedResponse(
+        content=content,
+        model="claude-sonnet-4-5",
+        provider="claude",
+        input_tokens=10,
+        output_tokens=5,
+        finish_reason="end_turn",
+        cached_at="2026-01-06T00:00:00",
+        cache_key=key,
+    )
+
+
+def _messages(user: str, system: str = "You are helpful.") -> list[dict[str, str]]:
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+
+class TestNormalizePrompt:
+    """Tests for prompt normalisation."""
+
+    def test_whitespace_and_case(self):
+        """Test whitespace runs and case don't matter."""
+        assert normalize_prompt("  Summarise\n\n the   DIFF ") == "summarise the diff"
+
+    def test_timestamps_and_uuids(self):
+        """Test volatile tokens are replaced with placeholders."""
+        a = normalize_prompt("Run at 2026-01-06T10:15:00Z for 3f2c1a9e-1b2c-4d5e-8f90-123456789abc")
+        b = normalize_prompt("Run at 2026-02-11 08:01 for 0a1b2c3d-4e5f-4a6b-8c7d-9e8f7a6b5c4d")
+        assert a == b
+
+    def test_non_string_content(self):
+        """Test multimodal content is serialised deterministically."""
+        content = [{"type": "text", "text": "Hi"}]
+        assert normalize_prompt(content) == normalize_prompt(list(content))
+
+
+class TestHashingEmbedder:
+    """Tests for the local deterministic embedder."""
+
+    async def test_deterministic(self):
+        """Test the same text always embeds to the same vector."""
+        embedder = HashingEmbedder()
+        a = await embedder.embed("summarise the diff")
+        b = await HashingEmbedder().embed("summarise the diff")
+        assert np.array_equal(a, b)
+
+    async def test_similar_text_closer(self):
+        """Test near-identical text scores higher than unrelated text."""
+        embedder = HashingEmbedder()
+
+        def unit(v):
+            return v / np.linalg.norm(v)
+
+        base = unit(await embedder.embed("please summarise the diff for this pull request"))
+        near = unit(await embedder.embed("please summarize the diff for this pull request"))
+        far = unit(await embedder.embed("what is the capital of france"))
+        assert float(base @ near) > float(base @ far)
+
+
+class TestFlatIndex:
+    """Tests for the NumPy flat index."""
+
+    def test_search_and_remove(self):
+        """Test nearest-neighbour search survives swap-removal and growth."""
+        index = FlatIndex(dim=2, initial_capacity=1)
+        index.add(1, np.array([1.0, 0.0], dtype=np.float32))
+        index.add(2, np.array([0.0, 1.0], dtype=np.float32))
+        index.add(3, np.array([0.6, 0.8], dtype=np.float32))
+
+        assert index.search(np.array([0.0, 1.0], dtype=np.float32))[0] == 2
+        index.remove(1)
+        assert len(index) == 2
+        assert index.search(np.array([1.0, 0.0], dtype=np.float32))[0] == 3
+
+    def test_empty(self):
+        """Test searching an empty index."""
+        assert FlatIndex(dim=2).search(np.array([1.0, 0.0], dtype=np.float32)) is None
+
+
+class TestSemanticCache:
+    """Tests for SemanticCache."""
+
+    @pytest.fixture
+    def cache(self):
+        return SemanticCache(
+            embedder=HashingEmbedder(),
+            threshold=0.85,
+            agent_thresholds={"strict": 0.9999},
+            max_entries=3,
+        )
+
+    async def test_hit_on_trivially_different_prompt(self, cache):
+        """Test whitespace/timestamp differences still hit."""
+        await cache.put(
+            "m", _messages("Summarise today's log (2026-01-06 10:00)"), 0.7, _response(), 60
+        )
+
+        hit = await cache.get("m", _messages("summarise  today's log (2026-01-07 09:30)"), 0.7)
+
+        assert hit is not None
+        assert hit.content == "Cached"
+        assert cache.get_stats().hits == 1
+
+    async def test_miss_below_threshold(self, cache):
+        """Test unrelated prompts miss."""
+        await cache.put("m", _messages("Summarise the diff"), 0.7, _response(), 60)
+
+        assert await cache.get("m", _messages("Write a haiku about autumn leaves"), 0.7) is None
+        assert cache.get_stats().misses == 1
+
+    async def test_prefix_must_match(self, cache):
+        """Test a different system prompt or model never matches."""
+        await cache.put("m", _messages("Summarise the diff"), 0.7, _response(), 60)
+
+        assert (
+            await cache.get("m", _messages("Summarise the diff", system="Be terse."), 0.7) is None
+        )
+        assert await cache.get("other", _messages("Summarise the diff"), 0.7) is None
+        assert await cache.get("m", _messages("Summarise the diff"), 0.2) is None
+
+    async def test_agent_threshold(self, cache):
+        """Test per-agent thresholds override the default."""
+        await cache.put("m", _messages("please summarise the diff now"), 0.7, _response(), 60)
+        similar = _messages("please summarize the diff now")
+
+        assert await cache.get("m", similar, 0.7, agent_slug="strict") is None
+        assert await cache.get("m", similar, 0.7, agent_slug="coder") is not None
+
+    async def test_lru_eviction(self, cache):
+        """Test entries beyond max_entries evict least recently used first."""
+        prompts = ["alpha report", "beta summary", "gamma analysis", "delta review"]
+        for i, prompt in enumerate(prompts):
+            await cache.put("m", _messages(prompt), 0.7, _response(prompt, f"k{i}"), 60)
+
+        assert len(cache) == 3
+        assert cache.get_stats().evictions == 1
+        assert await cache.get("m", _messages("alpha report"), 0.7) is None
+        assert await cache.get("m", _messages("delta review"), 0.7) is not None
+
+    async def test_expired_entry_misses(self, cache):
+        """Test entries stop being served after their TTL."""
+        await cache.put("m", _messages("Summarise the diff"), 0.7, _response(), 60)
+
+        with patch("app.services.semantic_cache.time.monotonic", return_value=1e12):
+            assert await cache.get("m", _messages("Summarise the diff"), 0.7) is None
+        assert cache.get_stats().expirations == 1
+        assert len(cache) == 0
+
+    async def test_duplicate_put_replaces(self, cache):
+        """Test re-caching the same prompt doesn't stack entries."""
+        await cache.put("m", _messages("Summarise the diff"), 0.7, _response("old"), 60)
+        await cache.put("m", _messages("Summarise the diff"), 0.7, _response("new"), 60)
+
+        assert len(cache) == 1
+        assert (await cache.get("m", _messages("Summarise the diff"), 0.7)).content == "new"
+
+    async def test_invalidate_by_cache_key(self, cache):
+        """Test exact-key invalidation drops derived semantic entries."""
+        await cache.put("m", _messages("Summarise the diff"), 0.7, _response(key="k1"), 60)
+
+        assert cache.invalidate("k1") == 1
+        assert await cache.get("m", _messages("Summarise the diff"), 0.7) is None
+
+    async def test_requires_final_user_turn(self, cache):
+        """Test requests not ending in a user turn are not cached."""
+        messages = [*_messages("Hi"), {"role": "assistant", "content": "Hello"}]
+        assert await cache.put("m", messages, 0.7, _response(), 60) is False
+        assert await cache.get("m", messages, 0.7) is None
+
+    async def test_embed_error_is_miss(self, cache):
+        """Test embedder failures degrade to a miss."""
+        await cache.put("m", _messages("Summarise the diff"), 0.7, _response(), 60)
+
+        with patch.object(HashingEmbedder, "embed", side_effect=RuntimeError("down")):
+            assert await cache.get("m", _messages("Summarise the diff"), 0.7) is None
+        assert cache.get_stats().embed_errors == 1
+
+
+class TestResponseCacheSemanticTier:
+    """Tests for ResponseCache with the semantic tier enabled."""
+
+    MESSAGES: ClassVar[list[dict[str, str]]] = _messages("Summarise the diff at 10:00")
+
+    @pytest.fixture
+    def cache(self):
+        from tests.services.test_response_cache import _FakeRedis
+
+        cache = ResponseCache(
+            l1_max_bytes=0,
+            semantic_cache=SemanticCache(embedder=HashingEmbedder(), threshold=0.9),
+        )
+        cache._client = _FakeRedis()
+        with patch.object(ResponseCache, "_ensure_subscriber"):
+            yield cache
+
+    async def _set(self, cache, semantic=True):
+        await cache.set(
+            model="m",
+            messages=self.MESSAGES,
+            temperature=0.7,
+            content="Cached",
+            provider="claude",
+            input_tokens=10,
+            output_tokens=5,
+            semantic=semantic,
+        )
+
+    async def test_semantic_fallback_after_exact_miss(self, cache):
+        """Test a near-identical prompt is served by the semantic tier."""
+        await self._set(cache)
+
+        hit = await cache.get("m", _messages("summarise the diff at 11:45"), 0.7)
+
+        assert hit is not None
+        assert hit.content == "Cached"
+        stats = cache.get_stats()
+        assert (stats.hits, stats.misses, stats.hit_rate) == (1, 0, 1.0)
+        assert cache.get_semantic_stats().hits == 1
+
+    async def test_miss_counted_once_after_all_tiers(self, cache):
+        """Test a request missing every tier counts as a single miss."""
+        await self._set(cache)
+
+        assert await cache.get("m", _messages("something else entirely"), 0.7) is None
+
+        stats = cache.get_stats()
+        assert (stats.hits, stats.misses, stats.total_requests) == (0, 1, 1)
+
+    async def test_opt_out(self, cache):
+        """Test semantic=False bypasses the tier on read and write."""
+        await self._set(cache)
+        assert (
+            await cache.get("m", _messages("summarise the diff at 11:45"), 0.7, semantic=False)
+            is None
+        )
+
+        await cache.clear_all()
+        await self._set(cache, semantic=False)
+        assert cache.get_semantic_info() == {"entries": 0}
+
+    async def test_remote_clear_all_drops_semantic(self, cache):
+        """Test a cross-worker clear-all empties the semantic tier."""
+        await self._set(cache)
+
+        cache._apply_invalidation("*")
+
+        assert cache.get_semantic_info() == {"entries": 0}
@@ -0,0 +1,335 @@
+"""Tests for the session context cache."""
+
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from redis.exceptions import WatchError
+from sqlalchemy.dialects import postgresql
+
+from app.services.session_context_cache import (
+    CONTEXT_PREFIX,
+    ContextMessage,
+    SessionContext,
+    SessionContextCache,
+    decode_message,
+    encode_message,
+    load_context_tail,
+)
+
+
+class _FakeRedis:
+    """Dict-backed Redis stand-in supporting the list and pipeline calls the cache uses."""
+
+    def __init__(self):
+        self.strings: dict[str, str] = {}
+        self.lists: dict[str, list[str]] = {}
+        self.round_trips = 0
+        # Hook run between WATCH and EXEC, to simulate a concurrent writer
+        self.on_watch = None
+
+    def _incr(self, key):
+        value = int(self.strings.get(key, "0")) + 1
+        self.strings[key] = str(value)
+        return value
+
+    def _rpushx(self, key, *values):
+        if key not in self.lists:
+            return 0
+        self.lists[key].extend(values)
+        return len(self.lists[key])
+
+    def _rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    def pipeline(self, transaction: bool = True):
+        fake = self
+        ops: list = []
+
+        class _Pipe:
+            watched_version: str | None = None
+            watched_key: str | None = None
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def watch(self, key):
+                self.watched_key = key
+                self.watched_version = fake.strings.get(key)
+                if fake.on_watch is not None:
+                    fake.on_watch()
+
+            async def get(self, key):
+                return fake.strings.get(key)
+
+            def multi(self):
+                pass
+
+            def lindex(self, key, index):
+                ops.append(lambda: (fake.lists.get(key) or [None])[index])
+
+            def llen(self, key):
+                ops.append(lambda: len(fake.lists.get(key, [])))
+
+            def incr(self, key):
+                ops.append(lambda: fake._incr(key))
+
+            def expire(self, key, ttl):
+                ops.append(lambda: True)
+
+            def rpushx(self, key, *values):
+                ops.append(lambda: fake._rpushx(key, *values))
+
+            def rpush(self, key, *values):
+                ops.append(lambda: fake._rpush(key, *values))
+
+            def delete(self, key):
+                ops.append(lambda: fake.lists.pop(key, None) is not None)
+
+            async def execute(self):
+                fake.round_trips += 1
+                if (
+                    self.watched_key is not None
+                    and fake.strings.get(self.watched_key) != self.watched_version
+                ):
+                    raise WatchError()
+                return [op() for op in ops]
+
+        return _Pipe()
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self.strings.get(key)
+
+    async def lrange(self, key, start, end):
+        self.round_trips += 1
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start : end + 1]
+
+
+def _row(row_id: int, role: str, content: str, tokens: int | None = 10):
+    created = datetime(2026, 1, 1, tzinfo=UTC) + timedelta(seconds=row_id)
+    return SimpleNamespace(
+        id=row_id, role=role, content=content, context_tokens=tokens, created_at=created
+    )
+
+
+def _db(pages: list[list]) -> MagicMock:
+    """DB stand-in returning one page of rows (newest first) per query."""
+    db = MagicMock()
+    results = []
+    for rows in pages:
+        result = MagicMock()
+        result.all.return_value = rows
+        results.append(result)
+    db.execute = AsyncMock(side_effect=results)
+    return db
+
+
+@pytest.fixture
+def cache_settings():
+    """Enabled cache with small keyset pages."""
+    with patch("app.services.session_context_cache.settings") as mock_settings:
+        mock_settings.agent_hub_redis_url = "redis://localhost:6379/2"
+        mock_settings.session_context_cache_enabled = True
+        mock_settings.session_context_cache_max_sessions = 2
+        mock_settings.session_context_cache_ttl = 3600
+        mock_settings.session_context_page_size = 2
+        yield mock_settings
+
+
+@pytest.fixture
+def cache(cache_settings):
+    """Cache wired to a fake Redis."""
+    context_cache = SessionContextCache()
+    context_cache.redis = _FakeRedis()
+    context_cache._get_client = AsyncMock(return_value=context_cache.redis)
+    return context_cache
+
+
+class TestEncoding:
+    """Tests for the compact Redis encoding."""
+
+    def test_round_trip(self):
+        """Roles are abbreviated and restored; unknown roles pass through."""
+        for role in ("user", "assistant", "system", "tool"):
+            message = ContextMessage(role=role, content='{"x": "ü"}', tokens=7)
+            assert decode_message(encode_message(message)) == message
+        assert encode_message(ContextMessage("user", "hi", 3)) == '["u",3,"hi"]'
+
+
+class TestLoadContextTail:
+    """Tests for the cold keyset-paginated load."""
+
+    async def test_loads_all_pages_oldest_first(self, cache_settings):
+        """Pages are walked newest first with a (created_at, id) cursor."""
+        db = _db([[_row(4, "assistant", "d"), _row(3, "user", "c")], [_row(2, "assistant", "b")]])
+
+        context = await load_context_tail(db, "s1", token_budget=1000)
+
+        assert [m.content for m in context.messages] == ["b", "c", "d"]
+        assert (context.total_tokens, context.complete) == (30, True)
+        first, second = (call.args[0] for call in db.execute.await_args_list)
+        sql = str(second.compile(dialect=postgresql.dialect()))
+        assert "ORDER BY messages.created_at DESC, messages.id DESC" in sql
+        assert "(messages.created_at, messages.id) <" in sql
+        assert "(messages.created_at, messages.id) <" not in str(
+            first.compile(dialect=postgresql.dialect())
+        )
+
+    async def test_stops_past_token_budget(self, cache_settings):
+        """Only the tail that overflows the budget is read."""
+        db = _db([[_row(9, "assistant", "z"), _row(8, "user", "y")], [_row(7, "user", "x")]])
+
+        context = await load_context_tail(db, "s1", token_budget=15)
+
+        assert [m.content for m in context.messages] == ["y", "z"]
+        assert context.complete is False
+        assert context.covers(15) and not context.covers(100)
+        assert db.execute.await_count == 1
+
+    async def test_counts_missing_token_counts(self, cache_settings):
+        """Rows without a stored count are counted."""
+        db = _db([[_row(1, "user", "hello", tokens=None)]])
+        with patch(
+            "app.services.session_context_cache.count_single_message_tokens", return_value=4
+        ):
+            context = await load_context_tail(db, "s1", token_budget=1000)
+
+        assert context.total_tokens == 4
+
+
+class TestSessionContextCache:
+    """Tests for L1/Redis caching, appends and invalidation."""
+
+    async def test_cold_load_then_cached(self, cache):
+        """The second load is served from L1 after a cheap Redis check."""
+        db = _db([[_row(2, "assistant", "b"), _row(1, "user", "a")], []])
+
+        first = await cache.load(db, "s1", token_budget=1000)
+        second = await cache.load(db, "s1", token_budget=1000)
+
+        assert [m.content for m in second.messages] == ["a", "b"]
+        assert second.messages == first.messages
+        assert db.execute.await_count == 2
+        assert (cache.stats.db_loads, cache.stats.l1_hits) == (1, 1)
+        assert len(cache.redis.lists[f"{CONTEXT_PREFIX}s1"]) == 3
+
+    async def test_append_extends_cached_context(self, cache):
+        """A committed turn is appended without reloading history."""
+        db = _db([[_row(1, "user", "a")], []])
+        await cache.load(db, "s1", token_budget=1000)
+
+        await cache.append(
+            "s1", [ContextMessage("user", "q", 2), ContextMessage("assistant", "r", 3)]
+        )
+        context = await cache.load(db, "s1", token_budget=1000)
+
+        assert [m.content for m in context.messages] == ["a", "q", "r"]
+        assert context.total_tokens == 15
+        assert cache.stats.db_loads == 1
+
+    async def test_other_worker_appends_are_fetched(self, cache):
+        """An L1 entry catches up with turns another worker appended to Redis."""
+        db = _db([[_row(1, "user", "a")], []])
+        await cache.load(db, "s1", token_budget=1000)
+        cache.redis.lists[f"{CONTEXT_PREFIX}s1"].append(
+            encode_message(ContextMessage("assistant", "b", 4))
+        )
+
+        context = await cache.load(db, "s1", token_budget=1000)
+
+        assert [m.content for m in context.messages] == ["a", "b"]
+        assert context.total_tokens == 14
+        assert cache.stats.l1_hits == 1
+
+    async def test_append_to_uncached_session_is_noop(self, cache):
+        """Appends never create a partial context."""
+        await cache.append("s1", [ContextMessage("user", "q", 2)])
+
+        assert f"{CONTEXT_PREFIX}s1" not in cache.redis.lists
+
+    async def test_invalidate_forces_reload(self, cache):
+        """Closed or externally modified sessions are reloaded from the database."""
+        db = _db([[_row(1, "user", "a")], [_row(2, "user", "b"), _row(1, "user", "a")], []])
+        await cache.load(db, "s1", token_budget=1000)
+
+        await cache.invalidate("s1")
+        context = await cache.load(db, "s1", token_budget=1000)
+
+        assert [m.content for m in context.messages] == ["a", "b"]
+        assert cache.stats.db_loads == 2
+
+    async def test_cold_load_skips_store_when_session_changed(self, cache):
+        """A load racing an append does not cache history that misses the new turn."""
+        db = _db([[_row(1, "user", "a")]])
+        cache.redis.on_watch = lambda: cache.redis._incr("agent-hub:session-context-version:s1")
+
+        context = await cache.load(db, "s1", token_budget=1000)
+
+        assert [m.content for m in context.messages] == ["a"]
+        assert f"{CONTEXT_PREFIX}s1" not in cache.redis.lists
+        assert cache.l1_size == 0
+
+    async def test_incomplete_context_reloaded_for_larger_window(self, cache):
+        """A tail cut for a small window is reloaded for a model with a larger one."""
+        db = _db(
+            [
+                [_row(3, "user", "c"), _row(2, "user", "b")],
+                [_row(3, "user", "c"), _row(2, "user", "b")],
+                [_row(1, "user", "a")],
+            ]
+        )
+        small = await cache.load(db, "s1", token_budget=15)
+        large = await cache.load(db, "s1", token_budget=1000)
+
+        assert [m.content for m in small.messages] == ["b", "c"]
+        assert [m.content for m in large.messages] == ["a", "b", "c"]
+        assert large.complete
+
+    async def test_l1_is_bounded(self, cache):
+        """The least recently used session is evicted from L1."""
+        for session_id in ("s1", "s2", "s3"):
+            await cache.load(_db([[_row(1, "user", session_id)]]), session_id, 1000)
+
+        assert cache.l1_size == 2
+        assert cache.stats.evictions == 1
+
+    async def test_redis_failure_falls_back_to_database(self, cache):
+        """Without Redis the context is read from the database."""
+        cache._get_client = AsyncMock(side_effect=ConnectionError("down"))
+        db = _db([[_row(1, "user", "a")]])
+
+        context = await cache.load(db, "s1", token_budget=1000)
+
+        assert [m.content for m in context.messages] == ["a"]
+
+    async def test_disabled_reads_database(self, cache, cache_settings):
+        """With the cache disabled, every load reads the tail from the database."""
+        cache_settings.session_context_cache_enabled = False
+        db = _db([[_row(1, "user", "a")], [_row(1, "user", "a")]])
+
+        await cache.load(db, "s1", token_budget=1000)
+        await cache.load(db, "s1", token_budget=1000)
+
+        assert cache.stats.db_loads == 2
+        assert cache.redis.lists == {}
+
+
+class TestSessionContext:
+    """Tests for SessionContext."""
+
+    def test_copy_is_independent(self):
+        """Extending a copy leaves the cached original alone."""
+        original = SessionContext()
+        original.extend([ContextMessage("user", "a", 1)])
+
+        copy = original.copy()
+        copy.extend([ContextMessage("user", "b", 2)])
+
+        assert (len(original.messages), original.total_tokens) == (1, 1)
@@ -1,11 +1,22 @@
 """Tests for token counter service."""
 
+from unittest.mock import MagicMock, patch
+
+import pytest
+
 from app.services.token_counter import (
+    PRIMING_TOKENS,
+    TokenCountCache,
     count_message_tokens,
+    count_message_tokens_async,
+    count_single_message_tokens,
     count_tokens,
     estimate_cost,
     estimate_request,
+    estimate_request_async,
     get_context_limit,
+    get_token_cache,
+    prime_message_tokens,
 )
 
 
@@ -160,3 +171,95 @@ class TestGetContextLimit:
         limit = get_context_limit("unknown-model")
         # Falls back to claude-sonnet-4 which has 200k limit
         assert limit == 200000
+
+
+@pytest.fixture
+def word_encoding():
+    """Whitespace 'encoding' counting encode() calls, with an empty token cache."""
+    encoding = MagicMock()
+    encoding.encode.side_effect = str.split
+    get_token_cache().clear()
+    with patch("app.services.token_counter._get_encoding", return_value=encoding):
+        yield encoding
+    get_token_cache().clear()
+
+
+class TestTokenCountCache:
+    """Tests for the per-message token count cache."""
+
+    def test_lru_bound(self):
+        """Test least recently used counts are evicted over the bound."""
+        cache = TokenCountCache(max_entries=2)
+        cache.put(b"a", 1)
+        cache.put(b"b", 2)
+        assert cache.get(b"a") == 1
+        cache.put(b"c", 3)
+
+        assert len(cache) == 2
+        assert cache.get(b"b") is None
+        assert cache.get(b"a") == 1
+        assert cache.hits == 2
+        assert cache.misses == 1
+
+    def test_repeat_count_skips_encoding(self, word_encoding):
+        """Test only new turns are encoded when a conversation grows."""
+        history = [
+            {"role": "user", "content": "one two three"},
+            {"role": "assistant", "content": "four five"},
+        ]
+        first = count_message_tokens(history)
+        calls = word_encoding.encode.call_count
+
+        grown = [*history, {"role": "user", "content": "six"}]
+        second = count_message_tokens(grown)
+
+        # Role + content for the single new message
+        assert word_encoding.encode.call_count == calls + 2
+        assert second == first + 4 + 1 + 1
+        assert count_message_tokens(grown) == second
+
+    def test_primed_counts_are_used(self, word_encoding):
+        """Test counts stored on Message rows avoid encoding entirely."""
+        prime_message_tokens("user", "stored turn", 42)
+
+        total = count_message_tokens([{"role": "user", "content": "stored turn"}])
+
+        assert total == 42 + PRIMING_TOKENS
+        word_encoding.encode.assert_not_called()
+
+    def test_single_message_matches_total(self, word_encoding):
+        """Test per-message counts add up to the conversation total."""
+        messages = [
+            {"role": "system", "content": "be brief"},
+            {"role": "user", "content": [{"type": "text", "text": "hi"}, {"type": "image"}]},
+        ]
+        parts = sum(count_single_message_tokens(m["role"], m["content"]) for m in messages)
+
+        assert count_message_tokens(messages) == parts + PRIMING_TOKENS
+
+
+class TestAsyncCounting:
+    """Tests for the non-blocking counting path."""
+
+    async def test_small_input_counts_inline(self, word_encoding):
+        """Test small inputs don't go through the thread pool."""
+        messages = [{"role": "user", "content": "hello there"}]
+        with patch("app.services.token_counter._get_executor") as executor:
+            assert await count_message_tokens_async(messages) == count_message_tokens(messages)
+        executor.assert_not_called()
+
+    async def test_large_input_offloaded(self, word_encoding):
+        """Test large uncached inputs are encoded in the thread pool."""
+        messages = [{"role": "user", "content": "word " * 100}]
+        with patch("app.services.token_counter.LARGE_INPUT_CHARS", 10):
+            tokens = await count_message_tokens_async(messages)
+
+        assert tokens == 4 + 1 + 100 + PRIMING_TOKENS
+
+    async def test_estimate_matches_sync(self, word_encoding):
+        """Test /estimate's async path agrees with estimate_request."""
+        messages = [{"role": "user", "content": "hello there"}]
+
+        result = await estimate_request_async(messages, "claude-sonnet-4-5", max_tokens=100)
+
+        assert result == estimate_request(messages, "claude-sonnet-4-5", max_tokens=100)
@@ -0,0 +1,309 @@
+"""Tests for the webhook transactional outbox."""
+
+import json
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models import WebhookOutbox, WebhookSubscription
+from app.services.events import SessionEvent, SessionEventType
+from app.services.webhook_outbox import (
+    INVALIDATION_CHANNEL,
+    ActiveWebhookCache,
+    OutboxRelay,
+    retry_delay,
+    stage_webhook_event,
+)
+from app.services.webhooks import (
+    WebhookConfig,
+    WebhookDelivery,
+    WebhookDispatcher,
+    init_webhook_dispatcher,
+    verify_signature,
+)
+
+
+def _event(event_type: SessionEventType = SessionEventType.COMPLETE) -> SessionEvent:
+    return SessionEvent(event_type=event_type, session_id="sess-1", data={"cost": 0.1})
+
+
+def _row(row_id: int, attempts: int = 0) -> WebhookOutbox:
+    return WebhookOutbox(
+        id=row_id,
+        webhook_id=1,
+        url="https://a.com",
+        event_type="complete",
+        session_id="sess-1",
+        payload="{}",
+        signature="sig",
+        status="pending",
+        attempts=attempts,
+    )
+
+
+@pytest.fixture
+def dispatcher():
+    """Fresh global dispatcher with two webhooks."""
+    dispatcher = WebhookDispatcher()
+    dispatcher.register_webhook(
+        WebhookConfig(id=1, url="https://a.com", secret="s1", event_types=["complete"])
+    )
+    dispatcher.register_webhook(
+        WebhookConfig(id=2, url="https://b.com", secret="s2", event_types=["error"])
+    )
+    with (
+        patch("app.services.webhook_outbox.get_webhook_dispatcher", return_value=dispatcher),
+        patch("app.services.webhooks._webhook_dispatcher", dispatcher),
+    ):
+        yield dispatcher
+
+
+@pytest.fixture
+def webhook_cache():
+    """Fresh active-webhook cache in place of the worker's."""
+    cache = ActiveWebhookCache(ttl=60)
+    with patch("app.services.webhook_outbox._active_webhooks", cache):
+        yield cache
+
+
+def _subscriptions_db() -> MagicMock:
+    """Staging session whose query returns two active subscriptions."""
+    db = MagicMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = [
+        WebhookSubscription(id=1, url="https://a.com", secret="s1", event_types=["complete"]),
+        WebhookSubscription(id=2, url="https://b.com", secret="s2", event_types=["error"]),
+    ]
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+class _FakeSession:
+    """Session/transaction stand-in returning `rows` for the claim query."""
+
+    def __init__(self, rows: list[WebhookOutbox]):
+        self.rows = rows
+        self.statements: list = []
+        self.transactions = 0
+        self.open = False  # A transaction is in progress
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.open = False
+        return False
+
+    def begin(self):
+        self.transactions += 1
+        self.open = True
+        return self
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = self.rows
+        return result
+
+
+class TestStaging:
+    """Tests for staging rows in the caller's transaction."""
+
+    async def test_stages_signed_rows_for_matching_webhooks(self, webhook_cache):
+        """One pre-signed row per matching webhook joins the session."""
+        db = _subscriptions_db()
+        event = _event()
+
+        assert await stage_webhook_event(db, event) == 1
+
+        row = db.add.call_args.args[0]
+        assert (row.webhook_id, row.url, row.event_type) == (1, "https://a.com", "complete")
+        assert json.loads(row.payload)["webhook_id"] == 1
+        assert verify_signature(row.payload, row.signature, "s1")
+        assert event.outboxed
+
+    async def test_no_matching_webhooks_not_outboxed(self, webhook_cache):
+        """An event no webhook subscribes to stays with live dispatch."""
+        db = _subscriptions_db()
+        event = _event(SessionEventType.MESSAGE)
+
+        assert await stage_webhook_event(db, event) == 0
+
+        db.add.assert_not_called()
+        assert not event.outboxed
+
+    async def test_disabled(self, webhook_cache):
+        """With the outbox disabled, nothing is staged and live dispatch applies."""
+        db = _subscriptions_db()
+        event = _event()
+        with patch("app.services.webhook_outbox.settings") as mock_settings:
+            mock_settings.webhook_outbox_enabled = False
+            assert await stage_webhook_event(db, event) == 0
+
+        db.add.assert_not_called()
+        assert not event.outboxed
+
+    async def test_live_dispatch_skips_outboxed(self, dispatcher):
+        """The event handler leaves outboxed events to the relay."""
+        publisher = MagicMock()
+        with (
+            patch("app.services.webhooks.get_event_publisher", return_value=publisher),
+            patch.object(dispatcher, "dispatch_nowait") as mock_dispatch,
+        ):
+            init_webhook_dispatcher()
+            handler = publisher.add_handler.call_args.args[0]
+            event = _event()
+            event.outboxed = True
+            handler(event)
+            handler(_event())
+
+        mock_dispatch.assert_called_once()
+
+
+class TestActiveWebhookCache:
+    """Tests for the per-worker cache of active webhooks."""
+
+    async def test_cached_until_cleared(self, webhook_cache):
+        """Staging queries the database once per cache lifetime."""
+        db = _subscriptions_db()
+
+        await stage_webhook_event(db, _event())
+        await stage_webhook_event(db, _event())
+        assert db.execute.await_count == 1
+
+        webhook_cache.clear()  # As on an invalidation message
+        await stage_webhook_event(db, _event())
+        assert db.execute.await_count == 2
+
+    async def test_load_racing_invalidation_not_cached(self, webhook_cache):
+        """Webhooks loaded across an invalidation are used once, not kept."""
+        db = _subscriptions_db()
+        result = db.execute.return_value
+
+        async def execute(*args):
+            webhook_cache.clear()
+            return result
+
+        db.execute.side_effect = execute
+
+        assert len(await webhook_cache.get(db)) == 2
+        await webhook_cache.get(db)
+        assert db.execute.await_count == 2
+
+    async def test_invalidate_publishes_to_all_workers(self, webhook_cache):
+        """invalidate() drops the local copy and notifies other workers."""
+        db = _subscriptions_db()
+        await webhook_cache.get(db)
+        client = MagicMock()
+        client.publish = AsyncMock()
+
+        with patch.object(webhook_cache, "_get_client", return_value=client):
+            await webhook_cache.invalidate()
+
+        client.publish.assert_awaited_once_with(INVALIDATION_CHANNEL, "*")
+        await webhook_cache.get(db)
+        assert db.execute.await_count == 2
+
+
+class TestRelay:
+    """Tests for OutboxRelay."""
+
+    @pytest.fixture
+    def relay(self):
+        return OutboxRelay(batch_size=10, poll_interval=0.05, max_attempts=3)
+
+    async def _relay(self, relay, dispatcher, rows, deliveries):
+        session = _FakeSession(rows)
+        open_during_send = []
+
+        async def send(*args):
+            open_during_send.append(session.open)
+            return deliveries[len(open_during_send) - 1]
+
+        with (
+            patch(
+                "app.services.webhook_outbox._get_session_factory",
+                return_value=lambda: session,
+            ),
+            patch.object(dispatcher, "send_signed", AsyncMock(side_effect=send)),
+        ):
+            claimed = await relay.relay_once()
+        assert not any(open_during_send), "delivered inside a transaction"
+        return claimed, session
+
+    async def test_claims_with_skip_locked(self, relay, dispatcher):
+        """The claim query locks rows and skips ones other relays hold."""
+        _, session = await self._relay(relay, dispatcher, [], [])
+
+        sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "LIMIT" in sql
+        assert "webhook_outbox.locked_until <=" in sql  # Expired leases are reclaimed
+        assert session.transactions == 1
+
+    async def test_claim_leases_rows(self, relay, dispatcher):
+        """Claimed rows are marked in_flight until their lease expires."""
+        rows = [_row(1)]
+        deliveries = [WebhookDelivery(webhook_id=1, url="u", success=True)]
+        before = datetime.now(UTC)
+
+        await self._relay(relay, dispatcher, rows, deliveries)
+
+        assert rows[0].status == "in_flight"
+        assert rows[0].locked_until >= before + timedelta(seconds=300)
+
+    async def test_delivered_rows_deleted(self, relay, dispatcher):
+        """Acknowledged rows are removed; failures are rescheduled with backoff."""
+        rows = [_row(1), _row(2)]
+        deliveries = [
+            WebhookDelivery(webhook_id=1, url="https://a.com", success=True, status_code=200),
+            WebhookDelivery(webhook_id=1, url="https://a.com", success=False, status_code=503),
+        ]
+        before = datetime.now(UTC)
+
+        claimed, session = await self._relay(relay, dispatcher, rows, deliveries)
+
+        assert claimed == 2
+        assert session.transactions == 2  # Claim, then outcomes
+        update_stmt, delete_stmt = session.statements[1:]
+        params = update_stmt.compile().params
+        assert (params["id_1"], params["attempts"], params["status"]) == (2, 1, "pending")
+        assert (params["last_error"], params["locked_until"]) == ("HTTP 503", None)
+        assert params["next_attempt_at"] >= before + retry_delay(1)
+        delete_sql = str(delete_stmt.compile(dialect=postgresql.dialect()))
+        assert delete_sql.startswith("DELETE FROM webhook_outbox")
+        assert (relay.stats.delivered, relay.stats.failed) == (1, 1)
+
+    async def test_dead_after_max_attempts(self, relay, dispatcher):
+        """Rows are parked as dead once they run out of attempts."""
+        rows = [_row(1, attempts=2)]
+        deliveries = [WebhookDelivery(webhook_id=1, url="u", success=False, error="Timeout")]
+
+        _, session = await self._relay(relay, dispatcher, rows, deliveries)
+
+        params = session.statements[1].compile().params
+        assert (params["status"], params["attempts"]) == ("dead", 3)
+        assert relay.stats.dead == 1
+
+    async def test_sends_stored_payload(self, relay, dispatcher):
+        """The relay sends the staged body and signature without re-signing."""
+        rows = [_row(1)]
+        session = _FakeSession(rows)
+        send = AsyncMock(return_value=WebhookDelivery(webhook_id=1, url="u", success=True))
+        with (
+            patch(
+                "app.services.webhook_outbox._get_session_factory",
+                return_value=lambda: session,
+            ),
+            patch.object(dispatcher, "send_signed", send),
+        ):
+            await relay.relay_once()
+
+        send.assert_awaited_once_with(1, "https://a.com", "{}", "sig")
+
+    def test_backoff_is_capped(self):
+        """Retry delay doubles per attempt up to the cap."""
+        assert retry_delay(2) == 2 * retry_delay(1)
+        assert retry_delay(50).total_seconds() == 3600
@@ -835,18 +835,16 @@ export default function SessionsPage() {
     isFetchingNextPage,
   } = useInfiniteQuery({
     queryKey: ["sessions", { status: statusFilter, project: projectFilter, pageSize }],
-    queryFn: ({ pageParam = 1 }) =>
+    queryFn: ({ pageParam }) =>
       fetchSessions({
-        page: pageParam,
+        cursor: pageParam,
         page_size: pageSize,
         status: statusFilter || undefined,
         project_id: projectFilter || undefined,
       }),
-    getNextPageParam: (lastPage) => {
-      const totalPages = Math.ceil(lastPage.total / lastPage.page_size);
-      return lastPage.page < totalPages ? lastPage.page + 1 : undefined;
-    },
-    initialPageParam: 1,
+    // Keyset pagination: each page returns the cursor of the next one
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
+    initialPageParam: undefined as string | undefined,
   });
 
   // Flatten all pages into single array
@@ -855,6 +853,8 @@ export default function SessionsPage() {
     [data]
   );
   const total = data?.pages[0]?.total ?? 0;
+  // Planner estimates are prefixed with "~"
+  const totalLabel = data?.pages[0]?.total_is_estimate ? `~${total}` : `${total}`;
 
   // Scroll handler for infinite loading
   const handleScroll = useCallback(() => {
@@ -976,7 +976,7 @@ export default function SessionsPage() {
               </h1>
               <div className="flex items-center gap-3 text-xs font-mono tabular-nums">
                 <span className="text-slate-500 dark:text-slate-400">
-                  {total} total
+                  {totalLabel} total
                 </span>
                 {pageStats && (
                   <>
@@ -1362,7 +1362,7 @@ export default function SessionsPage() {
             {/* End of list indicator */}
             {!hasNextPage && allSessions.length > 0 && !isFetchingNextPage && (
               <div className="flex items-center justify-center py-3 mt-3 text-xs text-slate-500 bg-slate-50 dark:bg-slate-900/50 rounded-lg">
-                Showing all {allSessions.length} of {total} sessions
+                Showing all {allSessions.length} sessions
               </div>
             )}
           </>
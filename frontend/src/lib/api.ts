@@ -181,6 +181,8 @@ export interface ContextUsage {
   percent_used: number;
   remaining_tokens: number;
   warning: string | null;
+  cumulative_input_tokens?: number;
+  cumulative_output_tokens?: number;
 }
 
 export interface Session {
@@ -217,9 +219,11 @@ export interface SessionListItem {
 
 export interface SessionListResponse {
   sessions: SessionListItem[];
-  total: number;
+  total: number | null;
+  total_is_estimate?: boolean;
   page: number;
   page_size: number;
+  next_cursor?: string | null;
 }
 
 export async function fetchSessions(params?: {
@@ -229,6 +233,7 @@ export async function fetchSessions(params?: {
   session_type?: string;
   page?: number;
   page_size?: number;
+  cursor?: string;
 }): Promise<SessionListResponse> {
   const searchParams = new URLSearchParams();
   if (params?.project_id) searchParams.set("project_id", params.project_id);
@@ -239,6 +244,7 @@ export async function fetchSessions(params?: {
   if (params?.page) searchParams.set("page", params.page.toString());
   if (params?.page_size)
     searchParams.set("page_size", params.page_size.toString());
+  if (params?.cursor) searchParams.set("cursor", params.cursor);
 
   const url = searchParams.toString()
     ? `${API_BASE}/sessions?${searchParams}`